@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+
+from loguru import logger
+
+from MAIA.kubernetes_utils import CLUSTER_API_TIMEOUT, get_cluster_api_session
+
+# Resources kept in the cluster-state cache, with their cluster-wide list endpoints.
+WATCHED_RESOURCES = {
+    "nodes": "/api/v1/nodes",
+    "pods": "/api/v1/pods",
+    "namespaces": "/api/v1/namespaces",
+    "services": "/api/v1/services",
+    "ingresses": "/apis/networking.k8s.io/v1/ingresses",
+}
+
+# Maximum age (in seconds) of a snapshot before reads fall back to the API server.
+CLUSTER_STATE_CACHE_MAX_STALENESS = float(os.environ.get("CLUSTER_STATE_CACHE_MAX_STALENESS", "120"))
+# Server-side timeout of a single watch request; the watch is resumed from the last resourceVersion afterwards.
+CLUSTER_STATE_CACHE_WATCH_TIMEOUT = int(os.environ.get("CLUSTER_STATE_CACHE_WATCH_TIMEOUT", "300"))
+
+_PATH_PATTERN = re.compile(
+    r"^(?P<prefix>/api/v1|/apis/networking\.k8s\.io/v1)(?:/namespaces/(?P<namespace>[^/]+))?/(?P<resource>[a-z]+)$"
+)
+
+_cluster_state_cache = None
+_cluster_state_cache_lock = threading.Lock()
+
+
+class ResourceVersionExpired(Exception):
+    """Raised when the API server reports that the watched resourceVersion is too old (HTTP 410 Gone)."""
+
+
+def parse_resource_path(path):
+    """
+    Map a Kubernetes list endpoint to the corresponding watched resource.
+
+    Parameters
+    ----------
+    path : str
+        The list endpoint, e.g. ``/api/v1/nodes`` or ``/apis/networking.k8s.io/v1/namespaces/demo/ingresses``.
+
+    Returns
+    -------
+    tuple or None
+        A ``(resource, namespace)`` tuple, with ``namespace`` set to None for cluster-wide lists, or None if the
+        endpoint is not served by the cache.
+    """
+    match = _PATH_PATTERN.match(path)
+    if match is None:
+        return None
+    resource = match.group("resource")
+    if resource not in WATCHED_RESOURCES or not WATCHED_RESOURCES[resource].startswith(match.group("prefix") + "/"):
+        return None
+    if resource in ("nodes", "namespaces") and match.group("namespace") is not None:
+        return None
+    return resource, match.group("namespace")
+
+
+class ResourceWatcher(threading.Thread):
+    """
+    Background list+watch loop keeping an in-memory copy of one resource kind of one cluster.
+
+    The watcher lists the resource once, then follows the watch stream from the returned resourceVersion,
+    applying ADDED/MODIFIED/DELETED events to its snapshot. Bookmarks and events refresh the staleness clock.
+    If the resourceVersion expires the resource is re-listed; if the watch breaks, the snapshot is marked as
+    not synced (so that readers fall back to direct reads) and the watcher retries with exponential backoff.
+    """
+
+    def __init__(self, api_url, resource, token, watch_timeout=None):
+        super().__init__(name=f"cluster-cache:{api_url}:{resource}", daemon=True)
+        self.api_url = api_url
+        self.resource = resource
+        self.token = token
+        self.watch_timeout = watch_timeout or CLUSTER_STATE_CACHE_WATCH_TIMEOUT
+        self.resource_version = None
+        self.synced = False
+        self.last_sync = None
+        self._objects = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    @property
+    def url(self):
+        return self.api_url + WATCHED_RESOURCES[self.resource]
+
+    @property
+    def headers(self):
+        return {"Authorization": "Bearer {}".format(self.token)}
+
+    def staleness(self):
+        """Return the number of seconds since the snapshot was last known to be current, or None if not synced."""
+        with self._lock:
+            if not self.synced or self.last_sync is None:
+                return None
+            return time.monotonic() - self.last_sync
+
+    def snapshot(self, namespace=None):
+        """
+        Return the cached objects in the same shape as a Kubernetes list response.
+
+        Parameters
+        ----------
+        namespace : str, optional
+            Only return the objects of this namespace.
+
+        Returns
+        -------
+        dict or None
+            The list response, or None if the watcher is not synced.
+        """
+        with self._lock:
+            if not self.synced:
+                return None
+            items = [
+                item for item in self._objects.values() if namespace is None or item["metadata"].get("namespace") == namespace
+            ]
+            return {"kind": "List", "metadata": {"resourceVersion": self.resource_version}, "items": items}
+
+    def stop(self):
+        self._stop_event.set()
+
+    @staticmethod
+    def _key(item):
+        return item["metadata"].get("namespace"), item["metadata"]["name"]
+
+    def _list(self):
+        response = get_cluster_api_session().get(self.url, headers=self.headers, verify=False, timeout=CLUSTER_API_TIMEOUT)
+        response.raise_for_status()
+        body = response.json()
+        with self._lock:
+            self._objects = {self._key(item): item for item in body.get("items", [])}
+            self.resource_version = body["metadata"]["resourceVersion"]
+            self.synced = True
+            self.last_sync = time.monotonic()
+        logger.debug(
+            f"Listed {len(self._objects)} {self.resource} from {self.api_url} at resourceVersion {self.resource_version}"
+        )
+
+    def _watch(self):
+        params = {
+            "watch": "true",
+            "resourceVersion": self.resource_version,
+            "allowWatchBookmarks": "true",
+            "timeoutSeconds": self.watch_timeout,
+        }
+        with get_cluster_api_session().get(
+            self.url,
+            params=params,
+            headers=self.headers,
+            verify=False,
+            stream=True,
+            timeout=(CLUSTER_API_TIMEOUT, self.watch_timeout + CLUSTER_API_TIMEOUT),
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if self._stop_event.is_set():
+                    return
+                if not line:
+                    continue
+                event = json.loads(line)
+                event_type, item = event["type"], event["object"]
+                if event_type == "ERROR":
+                    if item.get("code") == 410:
+                        raise ResourceVersionExpired(item.get("message"))
+                    raise RuntimeError(item.get("message", "watch error"))
+                with self._lock:
+                    if event_type in ("ADDED", "MODIFIED"):
+                        self._objects[self._key(item)] = item
+                    elif event_type == "DELETED":
+                        self._objects.pop(self._key(item), None)
+                    self.resource_version = item["metadata"]["resourceVersion"]
+                    self.last_sync = time.monotonic()
+        with self._lock:
+            # The server closed the watch after timeoutSeconds: the snapshot was current up to now.
+            self.last_sync = time.monotonic()
+
+    def run(self):
+        backoff = 1
+        while not self._stop_event.is_set():
+            try:
+                if not self.synced:
+                    self._list()
+                self._watch()
+                backoff = 1
+            except ResourceVersionExpired:
+                logger.debug(f"Watch on {self.resource} of {self.api_url} expired, re-listing")
+                with self._lock:
+                    self.synced = False
+            except Exception as e:
+                logger.warning(f"Watch on {self.resource} of {self.api_url} broken ({e}), retrying in {backoff} s")
+                with self._lock:
+                    self.synced = False
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 60)
+
+
+class ClusterStateCache:
+    """
+    Process-wide cache of cluster state, organized per cluster and per resource kind.
+
+    Watchers are started lazily the first time a resource of a cluster is requested, so the first read of each
+    resource goes to the API server and subsequent reads are served from memory. Reads return None whenever the
+    snapshot is missing or older than ``max_staleness``, signalling the caller to read from the API server directly.
+    """
+
+    def __init__(self, max_staleness=None):
+        self.max_staleness = max_staleness if max_staleness is not None else CLUSTER_STATE_CACHE_MAX_STALENESS
+        self._watchers = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _get_watcher(self, api_url, resource, token):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Threads do not survive a fork (e.g. gunicorn preloading the app): start over in the child process.
+                self._watchers = {}
+                self._pid = os.getpid()
+            watcher = self._watchers.get((api_url, resource))
+            if watcher is not None and watcher.token != token:
+                watcher.stop()
+                watcher = None
+            if watcher is None:
+                watcher = ResourceWatcher(api_url, resource, token)
+                watcher.start()
+                self._watchers[(api_url, resource)] = watcher
+            return watcher
+
+    def get(self, api_url, path, token):
+        """
+        Return the cached list response for a Kubernetes list endpoint.
+
+        Parameters
+        ----------
+        api_url : str
+            The API URL of the cluster.
+        path : str
+            The list endpoint, e.g. ``/api/v1/pods``.
+        token : str
+            The token used to watch the cluster.
+
+        Returns
+        -------
+        dict or None
+            The list response, or None if the endpoint is not cached or the snapshot is not fresh enough.
+        """
+        parsed = parse_resource_path(path)
+        if parsed is None:
+            return None
+        resource, namespace = parsed
+        watcher = self._get_watcher(api_url, resource, token)
+        staleness = watcher.staleness()
+        if staleness is None or staleness > self.max_staleness:
+            return None
+        return watcher.snapshot(namespace)
+
+    def status(self):
+        """
+        Return the state of every watcher.
+
+        Returns
+        -------
+        dict
+            A dictionary mapping each API URL to its watched resources, with the resourceVersion, whether the watch is
+            synced and the staleness age in seconds.
+        """
+        status = {}
+        with self._lock:
+            watchers = list(self._watchers.items())
+        for (api_url, resource), watcher in watchers:
+            staleness = watcher.staleness()
+            status.setdefault(api_url, {})[resource] = {
+                "synced": staleness is not None,
+                "resource_version": watcher.resource_version,
+                "staleness": round(staleness, 1) if staleness is not None else None,
+            }
+        return status
+
+    def stop(self):
+        with self._lock:
+            for watcher in self._watchers.values():
+                watcher.stop()
+            self._watchers = {}
+
+
+def enable_cluster_state_cache(max_staleness=None):
+    """
+    Enable the process-wide cluster-state cache used by ``MAIA.kubernetes_utils.fetch_from_clusters``.
+
+    Only clusters accessed with a dashboard token (``PRIVATE_CLUSTERS``) are cached: clusters accessed with the
+    ID token of the user keep being queried directly, so that the RBAC of each user is always enforced.
+
+    Parameters
+    ----------
+    max_staleness : float, optional
+        Maximum age in seconds of a cached snapshot. Defaults to ``CLUSTER_STATE_CACHE_MAX_STALENESS``.
+
+    Returns
+    -------
+    ClusterStateCache
+        The cluster-state cache.
+    """
+    global _cluster_state_cache
+    with _cluster_state_cache_lock:
+        if _cluster_state_cache is None:
+            _cluster_state_cache = ClusterStateCache(max_staleness=max_staleness)
+    return _cluster_state_cache
+
+
+def get_cluster_state_cache():
+    """Return the cluster-state cache, or None if it has not been enabled."""
+    return _cluster_state_cache
@@ -5,3 +5,11 @@ class AppsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps"
     label = "apps"
+
+    def ready(self):
+        from django.conf import settings
+
+        if getattr(settings, "CLUSTER_STATE_CACHE", False):
+            from MAIA.cluster_cache import enable_cluster_state_cache
+
+            enable_cluster_state_cache()
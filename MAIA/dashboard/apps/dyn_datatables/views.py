@@ -15,12 +15,16 @@ from apps.models import Utils
 from core.settings import DYNAMIC_DATATB
 from django.db.models.fields import DateField
 
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_pdf import PdfPages
 import base64
 import os
 
+from MAIA.lazy_imports import LazyImport
+
+# Only the PDF export needs pandas and matplotlib
+pd = LazyImport("pandas")
+plt = LazyImport("matplotlib.pyplot")
+PdfPages = LazyImport("matplotlib.backends.backend_pdf", "PdfPages")
+
 
 # TODO: 404 for wrong page number
 def data_table_view(request, **kwargs):
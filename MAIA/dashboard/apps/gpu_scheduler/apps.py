@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class GpuSchedulerConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "apps.gpu_scheduler"
+    label = "gpu_scheduler"
+
+    def ready(self):
+        # Register the signal handlers keeping the GPU availability index up to date.
+        from . import availability  # noqa: F401
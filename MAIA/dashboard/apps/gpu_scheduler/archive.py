@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from loguru import logger
+
+from MAIA.dashboard_utils import GPU_BOOKING_COOLDOWN_DAYS
+
+from .models import GPUBooking, GPUBookingHistory
+
+
+def archive_expired_bookings(retention_days, batch_size=1000, dry_run=False):
+    """
+    Move the GPU bookings that ended more than ``retention_days`` days ago to the history table.
+
+    The retention is never shorter than ``GPU_BOOKING_COOLDOWN_DAYS``, since the booking policy needs the
+    recently ended bookings of each user.
+
+    Parameters
+    ----------
+    retention_days : int
+        Number of days after their end before bookings are archived.
+    batch_size : int, optional
+        Number of bookings moved per transaction (default is 1000).
+    dry_run : bool, optional
+        If True, only count the bookings that would be archived (default is False).
+
+    Returns
+    -------
+    int
+        The number of archived bookings.
+    """
+    cutoff = timezone.now() - timedelta(days=max(retention_days, GPU_BOOKING_COOLDOWN_DAYS))
+    expired = GPUBooking.objects.filter(end_date__lt=cutoff).order_by("id")
+    if dry_run:
+        return expired.count()
+
+    archived = 0
+    while True:
+        with transaction.atomic():
+            batch = list(expired.select_for_update()[:batch_size])
+            if not batch:
+                break
+            GPUBookingHistory.objects.bulk_create(
+                [
+                    GPUBookingHistory(
+                        user_email=booking.user_email,
+                        namespace=booking.namespace,
+                        gpu=booking.gpu,
+                        start_date=booking.start_date,
+                        end_date=booking.end_date,
+                        days=(booking.end_date - booking.start_date).days,
+                    )
+                    for booking in batch
+                ]
+            )
+            GPUBooking.objects.filter(id__in=[booking.id for booking in batch]).delete()
+        archived += len(batch)
+    logger.info(f"Archived {archived} GPU bookings that ended before {cutoff}")
+    return archived
+
+
+def get_archived_booking_days(user_email=None):
+    """
+    Return the total number of booked days in the history table.
+
+    Parameters
+    ----------
+    user_email : str, optional
+        Only count the bookings of this user.
+
+    Returns
+    -------
+    int
+        The total number of archived booking days.
+    """
+    history = GPUBookingHistory.objects.all()
+    if user_email is not None:
+        history = history.filter(user_email=user_email)
+    return history.aggregate(total=Sum("days"))["total"] or 0
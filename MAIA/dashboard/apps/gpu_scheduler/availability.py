@@ -0,0 +1,63 @@
+import threading
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from MAIA.gpu_availability import GPUAvailabilityIndex
+
+from .models import GPUBooking
+
+_availability_index = None
+_availability_fingerprint = None
+_availability_lock = threading.Lock()
+
+
+def _bookings_fingerprint():
+    # Detects bookings created or deleted by other worker processes, which do not receive our signals.
+    return tuple(GPUBooking.objects.aggregate(count=Count("id"), last_id=Max("id")).values())
+
+
+def get_gpu_availability_index():
+    """
+    Return the process-wide GPU availability index of the ``GPUBooking`` table.
+
+    The index is built on first use from the bookings that have not ended yet, since past bookings cannot affect
+    new ones, and kept up to date incrementally when bookings are saved or deleted in this process. Changes made
+    by other processes are detected from the number of bookings and the last booking ID, and trigger a rebuild.
+
+    Returns
+    -------
+    GPUAvailabilityIndex
+        The GPU availability index.
+    """
+    global _availability_index, _availability_fingerprint
+    with _availability_lock:
+        fingerprint = _bookings_fingerprint()
+        if _availability_index is None or fingerprint != _availability_fingerprint:
+            _availability_index = GPUAvailabilityIndex(
+                settings.GPU_SPECS,
+                GPUBooking.objects.filter(end_date__gt=timezone.now()).values("id", "gpu", "start_date", "end_date"),
+            )
+            _availability_fingerprint = fingerprint
+        return _availability_index
+
+
+@receiver(post_save, sender=GPUBooking)
+def _update_gpu_availability(sender, instance, **kwargs):
+    global _availability_fingerprint
+    with _availability_lock:
+        if _availability_index is not None:
+            _availability_index.add_booking(instance.id, instance.gpu, instance.start_date, instance.end_date)
+            _availability_fingerprint = _bookings_fingerprint()
+
+
+@receiver(post_delete, sender=GPUBooking)
+def _remove_gpu_availability(sender, instance, **kwargs):
+    global _availability_fingerprint
+    with _availability_lock:
+        if _availability_index is not None:
+            _availability_index.remove_booking(instance.id)
+            _availability_fingerprint = _bookings_fingerprint()
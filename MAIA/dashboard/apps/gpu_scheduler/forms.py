@@ -1,6 +1,9 @@
 from django import forms
 
+from datetime import datetime, timedelta, timezone
+
 from .models import GPUBooking
+from .availability import get_gpu_availability_index
 from django.conf import settings
 
 if settings.MONGO_DB_ENABLED:
@@ -8,7 +11,7 @@ if settings.MONGO_DB_ENABLED:
 else:
     from apps.models import MAIAProject
 from MAIA.keycloak_utils import get_groups_in_keycloak
-from MAIA.dashboard_utils import get_pending_projects, verify_gpu_booking_policy
+from MAIA.dashboard_utils import GPU_BOOKING_COOLDOWN_DAYS, get_pending_projects, verify_gpu_booking_policy
 
 
 class GPUBookingForm(forms.ModelForm):
@@ -58,7 +61,10 @@ class GPUBookingForm(forms.ModelForm):
             if end_date <= start_date:
                 self.add_error("end_date", "End date must be after start date.")
             else:
-                existing_bookings = GPUBooking.objects.filter(user_email=user_email)
+                existing_bookings = GPUBooking.objects.filter(
+                    user_email=user_email,
+                    end_date__gte=datetime.now(timezone.utc) - timedelta(days=GPU_BOOKING_COOLDOWN_DAYS),
+                )
                 booking_data = {
                     "starting_time": start_date.strftime("%Y-%m-%d  %H:%M:%S"),
                     "ending_time": end_date.strftime("%Y-%m-%d  %H:%M:%S"),
@@ -67,8 +73,9 @@ class GPUBookingForm(forms.ModelForm):
                 is_bookable, err_msg = verify_gpu_booking_policy(
                     existing_bookings,
                     booking_data,
-                    global_existing_bookings=GPUBooking.objects.all().values(),
+                    global_existing_bookings=None,
                     gpu_specs=settings.GPU_SPECS,
+                    availability_index=get_gpu_availability_index(),
                 )
                 # Check existing bookings for the same user
 
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.gpu_scheduler.archive import archive_expired_bookings
+
+
+class Command(BaseCommand):
+    help = "Move expired GPU bookings past the retention window to the GPU booking history table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retention-days",
+            type=int,
+            default=settings.GPU_BOOKING_RETENTION_DAYS,
+            help="Number of days after their end before bookings are archived (default: GPU_BOOKING_RETENTION_DAYS).",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000, help="Number of bookings moved per transaction.")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many bookings would be archived.")
+
+    def handle(self, *args, **options):
+        archived = archive_expired_bookings(
+            options["retention_days"], batch_size=options["batch_size"], dry_run=options["dry_run"]
+        )
+        if options["dry_run"]:
+            self.stdout.write(f"{archived} GPU bookings would be archived.")
+        else:
+            self.stdout.write(f"{archived} GPU bookings archived.")
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-17 05:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gpu_scheduler", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GPUBookingHistory",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("user_email", models.CharField(max_length=255)),
+                ("namespace", models.CharField(max_length=255)),
+                ("gpu", models.CharField(max_length=255)),
+                ("start_date", models.DateTimeField()),
+                ("end_date", models.DateTimeField()),
+                ("days", models.IntegerField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="gpubooking",
+            index=models.Index(fields=["gpu", "end_date"], name="gpubooking_gpu_end_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="gpubooking",
+            index=models.Index(fields=["user_email", "end_date"], name="gpubooking_user_end_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="gpubookinghistory",
+            index=models.Index(fields=["user_email"], name="gpubookinghist_user_idx"),
+        ),
+    ]
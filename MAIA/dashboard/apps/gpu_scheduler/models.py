@@ -4,6 +4,11 @@ from django.db import models
 class GPUBooking(models.Model):
     class Meta:
         app_label = "gpu_scheduler"
+        indexes = [
+            # Availability checks and the archival only look at bookings that end after a given date.
+            models.Index(fields=["gpu", "end_date"], name="gpubooking_gpu_end_idx"),
+            models.Index(fields=["user_email", "end_date"], name="gpubooking_user_end_idx"),
+        ]
 
     user_email = models.CharField(
         max_length=255,
@@ -12,3 +17,18 @@ class GPUBooking(models.Model):
     end_date = models.DateTimeField()
     gpu = models.CharField(max_length=255)
     namespace = models.CharField(max_length=255)
+
+
+class GPUBookingHistory(models.Model):
+    """GPU booking archived after the retention window, only used for reporting."""
+
+    class Meta:
+        app_label = "gpu_scheduler"
+        indexes = [models.Index(fields=["user_email"], name="gpubookinghist_user_idx")]
+
+    user_email = models.CharField(max_length=255)
+    namespace = models.CharField(max_length=255)
+    gpu = models.CharField(max_length=255)
+    start_date = models.DateTimeField()
+    end_date = models.DateTimeField()
+    days = models.IntegerField()
@@ -1 +1,160 @@
-# Create your tests here.
+from datetime import datetime, timedelta, timezone
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+
+from apps.gpu_scheduler import availability
+from apps.gpu_scheduler.availability import get_gpu_availability_index
+from apps.gpu_scheduler.archive import get_archived_booking_days
+from apps.gpu_scheduler.models import GPUBooking, GPUBookingHistory
+from apps.gpu_scheduler.views import GPUSlotSearchAPIView
+
+GPU_SPECS = [{"name": "A100", "replicas": 1, "count": 2}]
+
+
+@override_settings(GPU_SPECS=GPU_SPECS)
+class GPUAvailabilityIndexTests(TestCase):
+    """Test that the GPU availability index follows the GPUBooking table"""
+
+    def setUp(self):
+        availability._availability_index = None
+        self.start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+        self.end = self.start + timedelta(days=7)
+
+    def _book(self):
+        return GPUBooking.objects.create(
+            user_email="user@example.com", start_date=self.start, end_date=self.end, gpu="A100", namespace="demo"
+        )
+
+    def test_index_is_updated_on_save_and_delete(self):
+        index = get_gpu_availability_index()
+        self.assertEqual(index.min_free("A100", self.start, self.end), 2)
+
+        booking = self._book()
+        self.assertIs(get_gpu_availability_index(), index)
+        self.assertEqual(index.min_free("A100", self.start, self.end), 1)
+
+        booking.end_date = self.start + timedelta(days=1)
+        booking.save()
+        self.assertEqual(index.min_free("A100", self.start + timedelta(days=2), self.end), 2)
+
+        booking.delete()
+        self.assertIs(get_gpu_availability_index(), index)
+        self.assertEqual(index.min_free("A100", self.start, self.end), 2)
+
+    def test_index_is_rebuilt_after_external_changes(self):
+        index = get_gpu_availability_index()
+        # Simulate a booking created by another worker process, which does not reach our signal handlers.
+        GPUBooking.objects.bulk_create(
+            [GPUBooking(user_email="other@example.com", start_date=self.start, end_date=self.end, gpu="A100", namespace="demo")]
+        )
+
+        rebuilt = get_gpu_availability_index()
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual(rebuilt.min_free("A100", self.start, self.end), 1)
+
+
+@override_settings(GPU_SPECS=GPU_SPECS)
+class GPUSlotSearchTests(TestCase):
+    """Test the search of the next feasible booking windows"""
+
+    def setUp(self):
+        availability._availability_index = None
+        self.now = datetime.now(timezone.utc).replace(microsecond=0)
+        self.factory = APIRequestFactory()
+
+    def _book(self, email, start_days, end_days):
+        GPUBooking.objects.create(
+            user_email=email,
+            start_date=self.now + timedelta(days=start_days),
+            end_date=self.now + timedelta(days=end_days),
+            gpu="A100",
+            namespace="demo",
+        )
+
+    def _search(self, **params):
+        request = self.factory.get("/maia-api/gpu-slots/", params)
+        return GPUSlotSearchAPIView.as_view()(request)
+
+    def test_windows_respect_capacity(self):
+        self._book("a@example.com", 1, 5)
+        self._book("b@example.com", 3, 10)
+        # Ended bookings are not part of the working set.
+        self._book("c@example.com", -30, -20)
+
+        response = self._search(gpu="A100", duration_days=3, max_windows=3)
+
+        self.assertEqual(response.status_code, 200)
+        # [now + 3, now + 5) is fully booked: the next windows start when one of the bookings ends.
+        expected = [(self.now + timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S") for days in (5, 10)]
+        self.assertEqual([window["starting_time"] for window in response.data["windows"]], expected)
+        self.assertEqual([window["available_gpus"] for window in response.data["windows"]], [1, 2])
+
+    def test_user_cooldown_delays_windows(self):
+        self._book("user@example.com", -10, -2)
+
+        response = self._search(gpu="A100", duration_days=2, user_email="user@example.com")
+
+        expected_start = (self.now + timedelta(days=12)).strftime("%Y-%m-%d %H:%M:%S")
+        self.assertEqual(response.data["windows"][0]["starting_time"], expected_start)
+
+    def test_active_booking_blocks_search(self):
+        self._book("user@example.com", -1, 2)
+
+        response = self._search(gpu="A100", duration_days=2, user_email="user@example.com")
+
+        self.assertEqual(response.data["windows"], [])
+        self.assertIn("active booking", response.data["error"])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self._search(gpu="H100", duration_days=2).status_code, 400)
+        self.assertEqual(self._search(gpu="A100", duration_days=30).status_code, 400)
+        self.assertEqual(self._search(gpu="A100", duration_days="two").status_code, 400)
+        self.assertEqual(self._search(gpu="A100", duration_days=2, max_windows=0).status_code, 400)
+        self.assertEqual(self._search(gpu="A100", duration_days=2, max_windows=-1).status_code, 400)
+
+
+class GPUBookingArchiveTests(TestCase):
+    """Test the archival of expired GPU bookings into the history table"""
+
+    def setUp(self):
+        now = datetime.now(timezone.utc)
+        for email, end_days_ago, length in [
+            ("old@example.com", 200, 10),
+            ("old@example.com", 100, 5),
+            ("recent@example.com", 10, 7),
+            ("active@example.com", -3, 7),
+        ]:
+            GPUBooking.objects.create(
+                user_email=email,
+                start_date=now - timedelta(days=end_days_ago + length),
+                end_date=now - timedelta(days=end_days_ago),
+                gpu="A100",
+                namespace="demo",
+            )
+
+    def test_expired_bookings_are_moved_to_history(self):
+        out = StringIO()
+        call_command("archive_gpu_bookings", "--retention-days", "30", "--dry-run", stdout=out)
+        self.assertIn("2 GPU bookings would be archived", out.getvalue())
+        self.assertEqual(GPUBooking.objects.count(), 4)
+
+        call_command("archive_gpu_bookings", "--retention-days", "30", "--batch-size", "1", stdout=StringIO())
+
+        self.assertEqual(
+            sorted(GPUBooking.objects.values_list("user_email", flat=True)), ["active@example.com", "recent@example.com"]
+        )
+        self.assertEqual(GPUBookingHistory.objects.count(), 2)
+        self.assertEqual(get_archived_booking_days("old@example.com"), 15)
+        self.assertEqual(get_archived_booking_days(), 15)
+
+    def test_retention_never_drops_bookings_within_the_cooldown(self):
+        call_command("archive_gpu_bookings", "--retention-days", "0", stdout=StringIO())
+
+        self.assertEqual(
+            list(GPUBooking.objects.values_list("user_email", flat=True).order_by("id")),
+            ["recent@example.com", "active@example.com"],
+        )
@@ -8,6 +8,7 @@ from django.urls import path
 
 from .views import (
     GPUSchedulabilityAPIView,
+    GPUSlotSearchAPIView,
     book_gpu,
     gpu_booking_info,
     delete_booking,
@@ -16,6 +17,7 @@ from .views import (
 
 urlpatterns = [
     path("gpu-schedulability/", GPUSchedulabilityAPIView.as_view(), name="gpu_schedulability"),
+    path("gpu-slots/", GPUSlotSearchAPIView.as_view(), name="gpu_slots"),
     path("", book_gpu, name="gpu_booking_form"),
     path("my-bookings/", gpu_booking_info, name="book_gpu"),
     path("delete_booking/<int:id>/", delete_booking, name="delete_booking"),
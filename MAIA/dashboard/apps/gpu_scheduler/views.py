@@ -9,16 +9,25 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from .models import GPUBooking
 from django.conf import settings
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from .forms import GPUBookingForm
+from .archive import get_archived_booking_days
+from .availability import get_gpu_availability_index
 from MAIA.kubernetes_utils import get_namespaces, label_pod_for_deletion
-from MAIA.dashboard_utils import verify_gpu_booking_policy, get_project, verify_gpu_availability
+from MAIA.dashboard_utils import (
+    GPU_BOOKING_COOLDOWN_DAYS,
+    GPU_BOOKING_MAX_DAYS,
+    get_gpu_booking_cooldown,
+    verify_gpu_booking_policy,
+    get_project,
+    verify_gpu_availability,
+)
+from MAIA.gpu_availability import BOOKING_TIME_FORMAT, parse_booking_time
 from MAIA.maia_fn import convert_username_to_jupyterhub_username
 from django import forms
 from MAIA.kubernetes_utils import generate_kubeconfig
-from pathlib import Path
+from MAIA.kube_clients import kube_context
 import os
-import yaml
 
 if settings.MONGO_DB_ENABLED:
     from apps.mongodb_models import MAIAProject
@@ -44,16 +53,17 @@ class GPUSchedulabilityAPIView(APIView):
         except Exception as e:
             return Response({"error": str(e)}, status=400)
         overlapping_time_slots, gpu_availability_per_slot, total_replicas = verify_gpu_availability(
-            global_existing_bookings=GPUBooking.objects.all().values(),
+            global_existing_bookings=None,
             new_booking=request.data.get("booking"),
             gpu_specs=settings.GPU_SPECS,
+            availability_index=get_gpu_availability_index(),
         )
         return Response(
             {
                 "overlapping_time_slots": overlapping_time_slots,
                 "gpu_availability_per_slot": gpu_availability_per_slot,
                 "total_replicas": total_replicas,
-                "EXISTING_BOOKINGS": GPUBooking.objects.all().values(),
+                "EXISTING_BOOKINGS": GPUBooking.objects.filter(end_date__gt=datetime.now(timezone.utc)).values(),
             },
             status=200,
         )
@@ -74,13 +84,17 @@ class GPUSchedulabilityAPIView(APIView):
             if "booking" in request.data:
                 booking_data = request.data["booking"]
                 gpu = booking_data["gpu"]
-                # Calculate the total number of days for existing bookings
-                existing_bookings = GPUBooking.objects.filter(user_email=user_email)
+                # Bookings that ended before the cooldown window cannot affect the booking policy
+                existing_bookings = GPUBooking.objects.filter(
+                    user_email=user_email,
+                    end_date__gte=datetime.now(timezone.utc) - timedelta(days=GPU_BOOKING_COOLDOWN_DAYS),
+                )
                 is_bookable, err_msg = verify_gpu_booking_policy(
                     existing_bookings,
                     booking_data,
-                    global_existing_bookings=GPUBooking.objects.all().values(),
+                    global_existing_bookings=None,
                     gpu_specs=settings.GPU_SPECS,
+                    availability_index=get_gpu_availability_index(),
                 )
 
                 if not is_bookable:
@@ -96,11 +110,11 @@ class GPUSchedulabilityAPIView(APIView):
                 return Response({"message": "Booking created successfully"})
 
             try:
-                user_statuses = GPUBooking.objects.filter(user_email=user_email)
+                current_time = datetime.now(timezone.utc)
+                user_statuses = GPUBooking.objects.filter(user_email=user_email, end_date__gte=current_time)
 
                 is_schedulable = False
 
-                current_time = datetime.now(timezone.utc)
                 is_schedulable = any(
                     status.start_date <= current_time
                     and status.end_date >= current_time
@@ -123,6 +137,66 @@ class GPUSchedulabilityAPIView(APIView):
             return JsonResponse({"error": str(e)}, status=400)
 
 
+@method_decorator(csrf_exempt, name="dispatch")
+class GPUSlotSearchAPIView(APIView):
+    """
+    Search the next booking windows satisfying both the GPU capacity and the booking policy of the user.
+
+    Query parameters: ``gpu`` and ``duration_days`` (required), ``earliest_start`` (in ``BOOKING_TIME_FORMAT``,
+    defaults to now), ``user_email`` (to apply the cooldown between bookings) and ``max_windows`` (default 5, at most 50).
+    """
+
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            gpu = request.query_params.get("gpu")
+            if gpu not in [gpu_spec["name"] for gpu_spec in settings.GPU_SPECS]:
+                return Response({"error": "Invalid gpu"}, status=400)
+            duration_days = int(request.query_params.get("duration_days", 0))
+            if duration_days <= 0 or duration_days > GPU_BOOKING_MAX_DAYS:
+                return Response({"error": f"duration_days must be between 1 and {GPU_BOOKING_MAX_DAYS}"}, status=400)
+            max_windows = min(int(request.query_params.get("max_windows", 5)), 50)
+            if max_windows <= 0:
+                return Response({"error": "max_windows must be at least 1"}, status=400)
+            now = datetime.now(timezone.utc)
+            earliest_start = request.query_params.get("earliest_start")
+            earliest_start = max(parse_booking_time(earliest_start), now) if earliest_start else now
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        user_email = request.query_params.get("user_email")
+        if user_email:
+            # Bookings ending before the cooldown window cannot constrain a new booking.
+            user_bookings = GPUBooking.objects.filter(
+                user_email=user_email, end_date__gte=now - timedelta(days=GPU_BOOKING_COOLDOWN_DAYS)
+            )
+            cooldown_end, err_msg = get_gpu_booking_cooldown(user_bookings, now=now)
+            if err_msg:
+                return Response({"error": err_msg, "windows": []}, status=200)
+            if cooldown_end is not None:
+                earliest_start = max(earliest_start, cooldown_end)
+
+        duration = timedelta(days=duration_days)
+        slots = get_gpu_availability_index().feasible_slots(gpu, duration, not_before=earliest_start, max_slots=max_windows)
+        return Response(
+            {
+                "gpu": gpu,
+                "duration_days": duration_days,
+                "earliest_start": earliest_start.strftime(BOOKING_TIME_FORMAT),
+                "windows": [
+                    {
+                        "starting_time": start.strftime(BOOKING_TIME_FORMAT),
+                        "ending_time": (start + duration).strftime(BOOKING_TIME_FORMAT),
+                        "available_gpus": free_gpus,
+                    }
+                    for start, free_gpus in slots
+                ],
+            },
+            status=200,
+        )
+
+
 @login_required(login_url="/maia/login/")
 def admin_delete_booking(request, id):
 
@@ -138,12 +212,8 @@ def admin_delete_booking(request, id):
     _, cluster_id = get_project(booking.namespace, settings=settings, maia_project_model=MAIAProject, return_only_cluster_id=True)
     local_kubeconfig_dict = generate_kubeconfig(id_token, request.user.username, "default", cluster_id, settings=settings)
 
-    with open(Path("/tmp").joinpath("kubeconfig-project-local"), "w") as f:
-        yaml.dump(local_kubeconfig_dict, f)
-
-        os.environ["KUBECONFIG_LOCAL"] = str(Path("/tmp").joinpath("kubeconfig-project-local"))
-
-    label_pod_for_deletion(booking.namespace.lower().replace("_", "-"), pod_name=pod_name)
+    with kube_context(local_kubeconfig_dict):
+        label_pod_for_deletion(booking.namespace.lower().replace("_", "-"), pod_name=pod_name)
     return redirect("/maia/gpu-booking/my-bookings/")
 
 
@@ -170,12 +240,8 @@ def delete_booking(request, id):
     _, cluster_id = get_project(booking.namespace, settings=settings, maia_project_model=MAIAProject, return_only_cluster_id=True)
     local_kubeconfig_dict = generate_kubeconfig(id_token, request.user.username, "default", cluster_id, settings=settings)
 
-    with open(Path("/tmp").joinpath("kubeconfig-project-local"), "w") as f:
-        yaml.dump(local_kubeconfig_dict, f)
-
-        os.environ["KUBECONFIG_LOCAL"] = str(Path("/tmp").joinpath("kubeconfig-project-local"))
-
-    label_pod_for_deletion(booking.namespace.lower().replace("_", "-"), pod_name=pod_name)
+    with kube_context(local_kubeconfig_dict):
+        label_pod_for_deletion(booking.namespace.lower().replace("_", "-"), pod_name=pod_name)
     return redirect("/maia/gpu-booking/my-bookings/")
 
 
@@ -271,7 +337,8 @@ def gpu_booking_info(request):
         bookings = GPUBooking.objects.filter(user_email=request.user.email)
 
     bookings_dict = []
-    total_days = 0
+    # Archived bookings are only kept as a number of days, for reporting
+    total_days = get_archived_booking_days(user_email=None if request.user.is_superuser else request.user.email)
 
     for booking in bookings:
         if booking.start_date <= datetime.now(timezone.utc) and booking.end_date >= datetime.now(timezone.utc):
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Populate the indexed `namespaces` array of the MongoDB users from their comma-joined `namespace` field."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Number of users updated per bulk write.")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many users would be updated.")
+
+    def handle(self, *args, **options):
+        if not settings.MONGO_DB_ENABLED:
+            raise CommandError("The `namespaces` array is only stored by the MongoDB backend (DB_ENGINE=mongodb).")
+
+        from apps.mongodb_models import backfill_user_namespaces
+
+        updated = backfill_user_namespaces(batch_size=options["batch_size"], dry_run=options["dry_run"])
+        if options["dry_run"]:
+            self.stdout.write(f"{updated} users would be updated.")
+        else:
+            self.stdout.write(f"{updated} users updated.")
@@ -1,6 +1,7 @@
 # apps/documents.py
 import hashlib
 import os
+import re
 import threading
 from datetime import date, datetime, time, timezone
 from django.conf import settings
@@ -21,9 +22,66 @@ def get_collection():
                 # indexes
                 _col.create_index("email", unique=True)
                 _col.create_index("username", unique=True, sparse=True)
+                # multikey index serving the group-membership lookups
+                _col.create_index("namespaces")
     return _col
 
 
+def split_namespaces(namespace):
+    """
+    Split the comma-joined ``namespace`` string of a user into the list stored in the indexed ``namespaces`` field.
+
+    Surrounding spaces and empty entries are dropped, duplicates are kept only once.
+    """
+    if not namespace:
+        return []
+    return list(dict.fromkeys(entry.strip() for entry in namespace.split(",") if entry.strip()))
+
+
+def _with_namespaces(fields):
+    """Add the ``namespaces`` array matching ``fields["namespace"]`` to a ``$set`` document, if the string is set."""
+    if "namespace" in fields:
+        fields["namespaces"] = split_namespaces(fields["namespace"])
+    return fields
+
+
+def backfill_user_namespaces(batch_size=1000, dry_run=False):
+    """
+    Populate the ``namespaces`` array of the users stored before it was introduced, or out of sync with ``namespace``.
+
+    Parameters
+    ----------
+    batch_size : int, optional
+        Number of users updated per bulk write.
+    dry_run : bool, optional
+        Only count the users to update.
+
+    Returns
+    -------
+    int
+        The number of users updated (or to update, with ``dry_run``).
+    """
+    from pymongo import UpdateOne
+
+    col = get_collection()
+    updated = 0
+    ops = []
+    for doc in col.find({}, {"namespace": 1, "namespaces": 1}):
+        namespaces = split_namespaces(doc.get("namespace"))
+        if doc.get("namespaces") == namespaces:
+            continue
+        updated += 1
+        if dry_run:
+            continue
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"namespaces": namespaces}}))
+        if len(ops) >= batch_size:
+            col.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        col.bulk_write(ops, ordered=False)
+    return updated
+
+
 # ─── meta "mock" for Django compatibility ─────────────────────────────────────
 class _FakeField:
     """
@@ -138,6 +196,55 @@ class MultipleObjectsReturned(Exception):
     pass
 
 
+# ─── query helpers shared by the QuerySets ─────────────────────────────────────
+# They run on the server what Django's QuerySets run in SQL, without materializing model instances.
+def _find(col, qs, projection=None):
+    cursor = col.find(qs._query, projection if projection is not None else qs._projection)
+    if qs._sort:
+        cursor = cursor.sort(qs._sort)
+    if qs._skip_val:
+        cursor = cursor.skip(qs._skip_val)
+    if qs._limit_val:
+        cursor = cursor.limit(qs._limit_val)
+    return cursor
+
+
+def _values(col, qs, fields):
+    """Raw documents restricted to ``fields`` (server-side projection), without ``_id``."""
+    projection = {f: 1 for f in fields}
+    if "_id" not in fields:
+        projection["_id"] = 0
+    return [{k: v for k, v in doc.items() if k != "_id"} for doc in _find(col, qs, projection)]
+
+
+def _count(col, qs):
+    kwargs = {}
+    if qs._skip_val:
+        kwargs["skip"] = qs._skip_val
+    if qs._limit_val:
+        kwargs["limit"] = qs._limit_val
+    return col.count_documents(qs._query, **kwargs)
+
+
+def _exists(col, qs):
+    if qs._skip_val or qs._limit_val:
+        return _count(col, qs) > 0
+    return col.find_one(qs._query, {"_id": 1}) is not None
+
+
+def _nth(col, qs, index):
+    """The document at position ``index`` (>= 0) of the query set, fetched alone; IndexError if out of range."""
+    if qs._limit_val and index >= qs._limit_val:
+        raise IndexError("QuerySet index out of range")
+    cursor = col.find(qs._query, qs._projection)
+    if qs._sort:
+        cursor = cursor.sort(qs._sort)
+    doc = next(cursor.skip((qs._skip_val or 0) + index).limit(1), None)
+    if doc is None:
+        raise IndexError("QuerySet index out of range")
+    return doc
+
+
 # ─── QuerySet-like class ───────────────────────────────────────────────────────
 class MAIAUserQuerySet:
     def __init__(self, query=None, projection=None, sort=None, limit_val=None, skip_val=None, for_update=False):
@@ -160,28 +267,31 @@ class MAIAUserQuerySet:
             for_update=overrides.get("for_update", self._for_update),
         )
 
+    def _cursor(self):
+        return _find(get_collection(), self)
+
     def _fetch(self):
         if self._cache is None:
-            col = get_collection()
-            cursor = col.find(self._query, self._projection)
-            if self._sort:
-                cursor = cursor.sort(self._sort)
-            if self._skip_val:
-                cursor = cursor.skip(self._skip_val)
-            if self._limit_val:
-                cursor = cursor.limit(self._limit_val)
-            self._cache = [MAIAUser._from_doc(d) for d in cursor]
+            self._cache = [MAIAUser._from_doc(d) for d in self._cursor()]
         return self._cache
 
     # ── chaining ──────────────────────────────────────────────────────────────
     def filter(self, **kwargs):
-        q = {**self._query, **MAIAUser._build_query(kwargs)}
+        built = MAIAUser._build_query(kwargs)
+        q = dict(self._query)
+        if "$or" in q and "$or" in built:
+            # keep both alternatives, e.g. two chained namespaces__contains lookups
+            q["$and"] = q.get("$and", []) + [{"$or": built.pop("$or")}]
+        q.update(built)
         return self._clone(query=q)
 
     def exclude(self, **kwargs):
         q = dict(self._query)
         for k, v in MAIAUser._build_query(kwargs).items():
-            q[k] = {"$ne": v}
+            if k == "$or":
+                q["$nor"] = q.get("$nor", []) + v
+            else:
+                q[k] = {"$ne": v}
         return self._clone(query=q)
 
     def order_by(self, *fields):
@@ -207,9 +317,7 @@ class MAIAUserQuerySet:
         return get_collection().distinct(field, self._query)
 
     def values(self, *fields):
-        proj = {f: 1 for f in fields} if fields else None
-        cursor = get_collection().find(self._query, proj)
-        return [{k: v for k, v in doc.items() if k != "_id"} for doc in cursor]
+        return _values(get_collection(), self, fields)
 
     def values_list(self, *fields, flat=False):
         rows = self.values(*fields)
@@ -218,14 +326,20 @@ class MAIAUserQuerySet:
         return [tuple(r[f] for f in fields) for r in rows]
 
     def count(self):
-        return get_collection().count_documents(self._query)
+        if self._cache is not None:
+            return len(self._cache)
+        return _count(get_collection(), self)
 
     def exists(self):
-        return get_collection().count_documents(self._query, limit=1) > 0
+        if self._cache is not None:
+            return bool(self._cache)
+        return _exists(get_collection(), self)
 
     def first(self):
-        results = self._fetch()
-        return results[0] if results else None
+        if self._cache is not None:
+            return self._cache[0] if self._cache else None
+        doc = next(self._cursor().limit(1), None)
+        return MAIAUser._from_doc(doc) if doc is not None else None
 
     def last(self):
         results = self._fetch()
@@ -252,6 +366,9 @@ class MAIAUserQuerySet:
                 limit_val=(key.stop - (key.start or 0)) if key.stop else None,
             )
             return qs._fetch()
+        if self._cache is None and key >= 0:
+            doc = _nth(get_collection(), self, key)
+            return MAIAUser._from_doc(doc)
         return self._fetch()[key]
 
     def __iter__(self):
@@ -266,7 +383,8 @@ class MAIAUserQuerySet:
     # ── terminal ──────────────────────────────────────────────────────────────
     def get(self, **kwargs):
         qs = self.filter(**kwargs) if kwargs else self
-        results = qs._fetch()
+        # two documents are enough to detect a non-unique match
+        results = [MAIAUser._from_doc(d) for d in qs._cursor().limit(min(2, qs._limit_val or 2))]
         if len(results) == 0:
             raise MAIAUser.DoesNotExist("MAIAUser matching query does not exist.")
         if len(results) > 1:
@@ -287,7 +405,7 @@ class MAIAUserQuerySet:
     def update_or_create(self, defaults=None, **kwargs):
         col = get_collection()
         query = MAIAUser._build_query(kwargs)
-        update = {"$set": {**kwargs, **(defaults or {}), "updated_at": datetime.now(timezone.utc)}}
+        update = {"$set": _with_namespaces({**kwargs, **(defaults or {}), "updated_at": datetime.now(timezone.utc)})}
         result = col.find_one_and_update(query, update, upsert=True, return_document=True)
         return MAIAUser._from_doc(result), result is None
 
@@ -300,7 +418,7 @@ class MAIAUserQuerySet:
             # Nothing to update, simply return 0
             return 0
         kwargs["updated_at"] = datetime.now(timezone.utc)
-        update_result = get_collection().update_many(self._query, {"$set": kwargs})
+        update_result = get_collection().update_many(self._query, {"$set": _with_namespaces(kwargs)})
 
         # If no documents matched and nothing was modified, consider raising or logging
         if update_result.matched_count == 0:
@@ -324,7 +442,7 @@ class MAIAUserQuerySet:
     def bulk_update(self, users, fields):
         from pymongo import UpdateOne
 
-        ops = [UpdateOne({"_id": u.id}, {"$set": {f: getattr(u, f) for f in fields}}) for u in users]
+        ops = [UpdateOne({"_id": u.id}, {"$set": _with_namespaces({f: getattr(u, f) for f in fields})}) for u in users]
         return get_collection().bulk_write(ops).modified_count
 
     def in_bulk(self, id_list=None, field_name="id"):
@@ -338,9 +456,7 @@ class MAIAUserQuerySet:
         return {str(u.id): u for u in (MAIAUser._from_doc(d) for d in get_collection().find(query))}
 
     def iterator(self, chunk_size=100):
-        col = get_collection()
-        cursor = col.find(self._query).batch_size(chunk_size)
-        for doc in cursor:
+        for doc in self._cursor().batch_size(chunk_size):
             yield MAIAUser._from_doc(doc)
 
     def aggregate(self, pipeline):
@@ -392,6 +508,8 @@ class MAIAUser:
 
     REQUIRED_FIELDS = ["email", "username"]
     USERNAME_FIELD = "username"
+    # indexed array mirroring `namespace`, queried with `filter(namespaces__contains=<group>)`
+    NAMESPACES_FIELD = "namespaces"
 
     def __init__(
         self,
@@ -558,6 +676,7 @@ class MAIAUser:
         doc = {
             "email": self.email,
             "namespace": self.namespace,
+            "namespaces": split_namespaces(self.namespace),
             "password": self.password,
             "is_active": self.is_active,
             "is_staff": self.is_staff,
@@ -579,6 +698,8 @@ class MAIAUser:
     def _from_doc(cls, doc):
         d = dict(doc)
         id_val = d.pop("_id", None)
+        # derived from `namespace`, rebuilt on save
+        d.pop("namespaces", None)
         return cls(
             id=id_val,
             email=d.pop("email", ""),
@@ -615,7 +736,17 @@ class MAIAUser:
             op = parts[1] if len(parts) > 1 else None
             # If user searched by 'id', convert to MongoDB's '_id'
             mongo_field = "_id" if field == "id" else field
-            if op == "iexact" or op == "icontains":
+            if op == "contains" and field == cls.NAMESPACES_FIELD:
+                # array membership, served by the multikey index; users stored before the array was introduced
+                # (see backfill_user_namespaces) are matched on the comma-joined string
+                query["$or"] = [
+                    {mongo_field: value},
+                    {
+                        mongo_field: {"$exists": False},
+                        "namespace": {"$regex": rf"(^|,)\s*{re.escape(value)}\s*(,|$)"},
+                    },
+                ]
+            elif op == "iexact" or op == "icontains":
                 query[mongo_field] = {"$regex": value, "$options": "i"}
             elif op == "contains":
                 query[mongo_field] = {"$regex": value}
@@ -757,17 +888,12 @@ class MAIAProjectQuerySet:
             skip_val=overrides.get("skip_val", self._skip_val),
         )
 
+    def _cursor(self):
+        return _find(get_projects_collection(), self)
+
     def _fetch(self):
         if self._cache is None:
-            col = get_projects_collection()
-            cursor = col.find(self._query, self._projection)
-            if self._sort:
-                cursor = cursor.sort(self._sort)
-            if self._skip_val:
-                cursor = cursor.skip(self._skip_val)
-            if self._limit_val:
-                cursor = cursor.limit(self._limit_val)
-            self._cache = [MAIAProject._from_doc(d) for d in cursor]
+            self._cache = [MAIAProject._from_doc(d) for d in self._cursor()]
         return self._cache
 
     def filter(self, **kwargs):
@@ -787,22 +913,30 @@ class MAIAProjectQuerySet:
         return self._clone(sort=sort)
 
     def values(self, *fields):
-        proj = {f: 1 for f in fields} if fields else None
-        cursor = get_projects_collection().find(self._query, proj)
-        return [{k: v for k, v in doc.items() if k != "_id"} for doc in cursor]
+        return _values(get_projects_collection(), self, fields)
 
     def first(self):
-        results = self._fetch()
-        return results[0] if results else None
+        if self._cache is not None:
+            return self._cache[0] if self._cache else None
+        doc = next(self._cursor().limit(1), None)
+        return MAIAProject._from_doc(doc) if doc is not None else None
 
     def all(self):
         return self._clone()
 
     def exists(self):
-        return get_projects_collection().count_documents(self._query, limit=1) > 0
+        if self._cache is not None:
+            return bool(self._cache)
+        return _exists(get_projects_collection(), self)
 
     def count(self):
-        return get_projects_collection().count_documents(self._query)
+        if self._cache is not None:
+            return len(self._cache)
+        return _count(get_projects_collection(), self)
+
+    def iterator(self, chunk_size=100):
+        for doc in self._cursor().batch_size(chunk_size):
+            yield MAIAProject._from_doc(doc)
 
     def update(self, **kwargs):
         if not kwargs:
@@ -817,7 +951,8 @@ class MAIAProjectQuerySet:
 
     def get(self, **kwargs):
         qs = self.filter(**kwargs) if kwargs else self
-        results = qs._fetch()
+        # two documents are enough to detect a non-unique match
+        results = [MAIAProject._from_doc(d) for d in qs._cursor().limit(min(2, qs._limit_val or 2))]
         if len(results) == 0:
             raise MAIAProject.DoesNotExist("MAIAProject matching query does not exist.")
         if len(results) > 1:
@@ -857,6 +992,9 @@ class MAIAProjectQuerySet:
                 limit_val=(key.stop - (key.start or 0)) if key.stop else None,
             )
             return qs._fetch()
+        if self._cache is None and key >= 0:
+            doc = _nth(get_projects_collection(), self, key)
+            return MAIAProject._from_doc(doc)
         return self._fetch()[key]
 
 
@@ -2,6 +2,7 @@ from asyncio import sleep
 from django.shortcuts import render
 from .forms import ResourceRequestForm
 from MAIA.kubernetes_utils import get_namespaces, get_available_resources, get_filtered_available_nodes
+from MAIA.cluster_cache import get_cluster_state_cache
 from django.http import HttpResponse, JsonResponse
 from django.template import loader
 from django.shortcuts import redirect
@@ -22,7 +23,17 @@ def get_resources_status(request):
             cluster_names=settings.CLUSTER_NAMES,
             private_clusters=settings.PRIVATE_CLUSTERS,
         )
-        return JsonResponse({"gpu": gpu_dict, "cpu": cpu_dict, "ram": ram_dict, "gpu_allocations": gpu_allocations}, status=200)
+        cluster_state_cache = get_cluster_state_cache()
+        return JsonResponse(
+            {
+                "gpu": gpu_dict,
+                "cpu": cpu_dict,
+                "ram": ram_dict,
+                "gpu_allocations": gpu_allocations,
+                "cache": cluster_state_cache.status() if cluster_state_cache is not None else {},
+            },
+            status=200,
+        )
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
 
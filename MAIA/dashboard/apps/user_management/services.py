@@ -11,6 +11,7 @@ from MAIA.keycloak_utils import (
     register_users_in_group_in_keycloak,
     delete_group_in_keycloak,
     remove_user_from_group_in_keycloak,
+    update_group_members_in_keycloak,
     get_list_of_users_requesting_a_group,
     get_groups_for_user,
     delete_user_in_keycloak,
@@ -279,6 +280,35 @@ def delete_user(email, force=False):
     return {"message": "User deleted successfully", "status": 200}
 
 
+def _remove_users_from_group_in_keycloak(emails, group_id):
+    """
+    Remove users from a group in Keycloak, with a single bulk membership update.
+
+    Users already not in the group, or not registered in Keycloak, are skipped.
+
+    Args:
+        emails (list): Email addresses of the users to remove.
+        group_id (str): Group ID to remove the users from.
+
+    Returns:
+        dict: The outcome for each email address, as returned by update_group_members_in_keycloak.
+
+    Raises:
+        KeycloakDeleteError: If some users could not be removed from the group.
+    """
+    results = update_group_members_in_keycloak(group_id, settings, emails_to_remove=emails)
+    for email, outcome in results.items():
+        if outcome == "unchanged":
+            logger.warning(f"User {email} was already not in group {group_id} in Keycloak")
+        elif outcome == "not_found":
+            logger.warning(f"User {email} could not be removed from group {group_id}: not found in Keycloak")
+    failed = [email for email, outcome in results.items() if outcome == "failed"]
+    if failed:
+        logger.error(f"Error removing users from group {group_id} in Keycloak.")
+        raise KeycloakDeleteError(error_message=f"Could not remove {', '.join(failed)} from group {group_id}")
+    return results
+
+
 @transaction.atomic
 def sync_list_of_users_for_group(group_id, email_list):
     """
@@ -365,24 +395,8 @@ def sync_list_of_users_for_group(group_id, email_list):
                     MAIAUser.objects.bulk_update(admin_users_to_update, ["is_superuser", "is_staff"])
 
         # Clean up Keycloak groups
-        for user_email in emails_to_remove:
-            try:
-                remove_user_from_group_in_keycloak(
-                    email=user_email,
-                    group_id=group_id,
-                    settings=settings,
-                )
-            except KeycloakDeleteError as e:
-                if getattr(e, "response_code", 0) == 409:
-                    logger.warning(f"User was already not in group {group_id}")
-                    # Already not in group, so continue
-                    continue
-                elif getattr(e, "response_code", 0) == 404:
-                    logger.warning(f"User does not exist in Keycloak and could not be removed from group {group_id}")
-                    continue
-                else:
-                    logger.error(f"Error removing user from group {group_id}.")
-                    raise
+        if emails_to_remove:
+            _remove_users_from_group_in_keycloak(emails_to_remove, group_id)
 
     return {"message": "List of users synchronized successfully", "status": 200}
 
@@ -535,37 +549,16 @@ def delete_group(namespace):
         return {"message": "Group is a reserved group and cannot be deleted", "status": 403}
     if not MAIAProject.objects.filter(namespace=namespace).exists():
         return {"message": "Group does not exist", "status": 400}
-    # Remove all users from the group in Keycloak
+    # Remove all users from the group in Keycloak, then from the namespace field in MAIAUser. Users already
+    # removed from the group, or missing in Keycloak, are removed from the namespace field as well.
     users_in_group = get_list_of_users_requesting_a_group(group_id=namespace, maia_user_model=MAIAUser)
-    for user_email in users_in_group:
-        maia_users = MAIAUser.objects.filter(email=user_email)
-        try:
-            remove_user_from_group_in_keycloak(email=user_email, group_id=namespace, settings=settings)
-        except KeycloakDeleteError as e:
-            if getattr(e, "response_code", 0) == 409:
-                logger.warning(f"User was already not in group {namespace} in Keycloak")
-                # Even if the user was already not in the group in Keycloak,
-                # ensure the namespace field in MAIAUser is updated.
-                for maia_user in maia_users:
-                    maia_user.namespace = _remove_group_from_namespace(maia_user.namespace, namespace)
-                MAIAUser.objects.bulk_update(maia_users, ["namespace"])
-                continue
-            elif getattr(e, "response_code", 0) == 404:
-                logger.warning(f"User does not exist in Keycloak and could not be removed from group {namespace}")
-                # If the user does not exist in Keycloak, still remove the group
-                # from the namespace field in MAIAUser.
-                for maia_user in maia_users:
-                    maia_user.namespace = _remove_group_from_namespace(maia_user.namespace, namespace)
-                MAIAUser.objects.bulk_update(maia_users, ["namespace"])
-                continue
-            else:
-                logger.error(f"Error removing user from group {namespace} in Keycloak.")
-                raise
-        # On successful removal from the group in Keycloak, also update the
-        # namespace field in MAIAUser to remove the group.
+    if users_in_group:
+        _remove_users_from_group_in_keycloak(users_in_group, namespace)
+        maia_users = list(MAIAUser.objects.filter(email__in=users_in_group))
         for maia_user in maia_users:
             maia_user.namespace = _remove_group_from_namespace(maia_user.namespace, namespace)
-        MAIAUser.objects.bulk_update(maia_users, ["namespace"])
+        if maia_users:
+            MAIAUser.objects.bulk_update(maia_users, ["namespace"])
     try:
         delete_group_in_keycloak(group_id=namespace, settings=settings)
     except KeycloakDeleteError as e:
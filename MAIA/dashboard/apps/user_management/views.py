@@ -32,6 +32,7 @@ from MAIA.dashboard_utils import (
     upload_env_file_to_minio,
 )
 from MAIA.kubernetes_utils import create_namespace, create_namespace_from_context, create_maia_rbac_from_context, create_maia_rbac
+from MAIA.kube_clients import kube_context
 from rest_framework.response import Response
 from types import SimpleNamespace
 from MAIA.notifications import send_email_user_registration_to_group
@@ -632,10 +633,7 @@ class ProjectChartValuesAPIView(APIView):
                     settings=env_settings,
                     in_local_cluster_token=os.environ.get("MAIA_DASHBOARD_OIDC_AUTHENTICATION", False),
                 )
-                config.load_kube_config_from_dict(kubeconfig_dict)
-                with open(Path("/tmp").joinpath("kubeconfig-ns"), "w") as f:
-                    yaml.dump(kubeconfig_dict, f)
-                    os.environ["KUBECONFIG"] = str(Path("/tmp").joinpath("kubeconfig-ns"))
+                with kube_context(kubeconfig_dict):
                     if (
                         "env" in project_configuration
                         and "DEPLOY_KUBEFLOW" in project_configuration["env"]
@@ -1102,15 +1100,8 @@ def deploy_project(
     local_kubeconfig_dict = generate_kubeconfig(
         id_token, username, "default", cluster_id, settings=env_settings, in_local_cluster_token=use_in_local_cluster_token
     )
-    config.load_kube_config_from_dict(kubeconfig_dict)
-
-    with open(Path("/tmp").joinpath("kubeconfig-project"), "w") as f:
-        yaml.dump(kubeconfig_dict, f)
-    with open(Path("/tmp").joinpath("kubeconfig-project-local"), "w") as f:
-        yaml.dump(local_kubeconfig_dict, f)
-        os.environ["KUBECONFIG"] = str(Path("/tmp").joinpath("kubeconfig-project"))
-        os.environ["KUBECONFIG_LOCAL"] = str(Path("/tmp").joinpath("kubeconfig-project-local"))
 
+    with kube_context(kubeconfig_dict, local_kubeconfig_dict):
         cluster_config_dict = yaml.safe_load(Path(cluster_config_path).joinpath(cluster_id + ".yaml").read_text())
         # maia_config_dict = yaml.safe_load(Path(maia_config_file).read_text())
 
@@ -1178,8 +1169,6 @@ def deploy_project(
             #    json.dump(json_key, f)
             os.environ["JSON_KEY_PATH"] = str(credentials_file)
 
-        config.load_kube_config_from_dict(kubeconfig_dict)
-        os.environ["KUBECONFIG"] = str(Path("/tmp").joinpath("kubeconfig-project"))
         msg = deploy_maia_toolkit_api(
             project_form_dict=project_form_dict,
             # maia_config_dict=maia_config_dict,
@@ -0,0 +1,60 @@
+"""
+Production serving profile of the MAIA dashboard.
+
+Usage:
+    gunicorn --config python:core.gunicorn_conf core.wsgi
+
+Every setting can be overridden with the corresponding ``GUNICORN_*`` environment variable.
+"""
+
+import os
+
+
+def _cpu_count():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+# Deadline of the fan-out queries to the cluster API servers (see ``MAIA.kubernetes_utils``).
+CLUSTER_API_TIMEOUT = float(os.environ.get("CLUSTER_API_TIMEOUT", "10"))
+
+# The cluster-state cache (``MAIA.cluster_cache``) lives in the memory of each process: every worker would open its own
+# watch connections to the API servers (one per cached cluster and resource kind) and keep its own copy of the cluster
+# state, multiplying both by the number of workers. It is off by default under gunicorn, and the views query the
+# clusters directly. Set ``CLUSTER_STATE_CACHE=True`` to serve them from memory at that cost, preferably with few
+# workers and more threads each.
+os.environ.setdefault("CLUSTER_STATE_CACHE", "False")
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5005")
+
+# The views mostly wait on Keycloak and the API servers: a few processes with a pool of threads each keep serving the
+# other users while some requests are blocked upstream.
+worker_class = "gthread"
+workers = int(os.environ.get("GUNICORN_WORKERS", str(min(_cpu_count() + 1, 8))))
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+
+# With gthread workers, ``timeout`` only restarts a worker whose main loop is stuck (slow requests, such as project
+# deployments, are not killed). It is a few fan-out deadlines, so that a page querying the clusters more than once
+# never trips it, and restarts wait as long for the in-flight requests to complete.
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", str(int(max(30, 3 * CLUSTER_API_TIMEOUT)))))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", str(timeout)))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "5"))
+
+# Load Django once in the master and fork the workers from it. The process-wide clients (Keycloak admin, Kubernetes
+# API clients, cluster API session) are recreated in each worker on first use.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "True") == "True"
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+
+accesslog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+capture_output = True
+enable_stdio_inheritance = True
+
+
+def post_fork(server, worker):
+    """Drop the database connections inherited from the master, each worker opens its own."""
+    from django.db import connections
+
+    connections.close_all()
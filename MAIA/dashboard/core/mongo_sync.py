@@ -10,7 +10,7 @@ def main():
     """
     Export project documents from a MongoDB instance into per-project JSON files in a local Projects/ directory.
 
-    Connects to the database using credentials from environment variables, loads all projects and users, builds a filtered project object for each project (including only users whose namespace lists include the project's namespace and a selected set of metadata fields), normalizes `date` values to `YYYY-MM-DD` when possible, sanitizes the project `namespace` for a safe filename, and writes each filtered project to Projects/<safe_namespace>.json.
+    Connects to the database using credentials from environment variables, loads all projects and users, builds a filtered project object for each project (including only users whose namespace lists include the project's namespace, grouped by namespace in a single pass over the users, and a selected set of metadata fields), normalizes `date` values to `YYYY-MM-DD` when possible, sanitizes the project `namespace` for a safe filename, and writes each filtered project to Projects/<safe_namespace>.json.
 
     Raises:
         ValueError: If the sanitized project namespace is empty or would allow path traversal (unsafe filename).
@@ -31,8 +31,19 @@ def main():
     db = client[db_name]
     collection = db["maia_projects"]
     user_collection = db["maia_users"]
-    cursor = user_collection.find({})
-    users = list(cursor)
+    # Emails of the users of each namespace, collected in a single pass over the users
+    users_by_namespace = {}
+    for user in user_collection.find({}, {"email": 1, "namespace": 1, "namespaces": 1}):
+        user_email = user.get("email")
+        if not user_email:
+            continue
+        user_namespaces = user.get("namespaces")
+        if user_namespaces is None:
+            # user stored before the `namespaces` array was introduced
+            user_namespace_value = user.get("namespace") or ""
+            user_namespaces = [namespace.strip() for namespace in user_namespace_value.split(",") if namespace.strip()]
+        for namespace in dict.fromkeys(user_namespaces):
+            users_by_namespace.setdefault(namespace, []).append(user_email)
 
     # Fetch all documents
     cursor = collection.find({})
@@ -64,14 +75,7 @@ def main():
 
     filtered_table = []
     for project in projects:
-        filtered_project = {"users": []}
-        for user in users:
-            user_namespace_value = user.get("namespace") or ""
-            user_namespaces = [namespace.strip() for namespace in user_namespace_value.split(",") if namespace.strip()]
-            if project["namespace"] in user_namespaces:
-                user_email = user.get("email")
-                if user_email:
-                    filtered_project["users"].append(user_email)
+        filtered_project = {"users": list(users_by_namespace.get(project.get("namespace"), []))}
         for k, v in project.items():
 
             if k in metadata:
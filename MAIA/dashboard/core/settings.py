@@ -367,6 +367,13 @@ for root, dirs, files in os.walk(MOUNT_DIR):
                         if gpu not in GPU_SPECS:
                             GPU_SPECS.append(gpu)
 
+# Number of days after their end before GPU bookings are moved to the history table (see archive_gpu_bookings)
+GPU_BOOKING_RETENTION_DAYS = env.int("GPU_BOOKING_RETENTION_DAYS", default=90)
+
+# In-memory cluster-state cache fed by Kubernetes watches, used for the clusters accessed with a dashboard token (off by
+# default under gunicorn, see core/gunicorn_conf.py)
+CLUSTER_STATE_CACHE = env.bool("CLUSTER_STATE_CACHE", default=True)
+
 if "GLOBAL_NAMESPACES" in os.environ:
     GLOBAL_NAMESPACES = os.getenv("GLOBAL_NAMESPACES").split(",")
 else:
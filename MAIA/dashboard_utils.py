@@ -5,25 +5,32 @@ import email
 import os
 import smtplib
 import ssl
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from pathlib import Path
 
 import requests
-import yaml
-from bs4 import BeautifulSoup
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import padding, rsa
-from keycloak import KeycloakAdmin, KeycloakOpenIDConnection
-from kubernetes import config
 from loguru import logger
-from minio import Minio
-from pyhelm3 import Client
 
-from MAIA.keycloak_utils import get_groups_in_keycloak
+from MAIA.gpu_availability import GPUAvailabilityIndex
+from MAIA.keycloak_utils import (
+    get_groups_in_keycloak,
+    get_keycloak_admin,
+    get_keycloak_membership_snapshot,
+    get_list_of_users_requesting_a_group,
+)
+from MAIA.kube_clients import get_kubeconfig_path, kube_context
 from MAIA.kubernetes_utils import generate_kubeconfig, get_namespaces, get_minio_shareable_link
-from MAIA_scripts.MAIA_install_project_toolkit import verify_installed_maia_toolkit
+from MAIA.lazy_imports import LazyImport
+
+BeautifulSoup = LazyImport("bs4", "BeautifulSoup")
+Minio = LazyImport("minio", "Minio")
+Client = LazyImport("pyhelm3", "Client")
+# The project toolkit installer pulls Hydra and Helm in: only import it to check a deployment.
+verify_installed_maia_toolkit = LazyImport("MAIA_scripts.MAIA_install_project_toolkit", "verify_installed_maia_toolkit")
 
 
 def upload_env_file_to_minio(env_file, namespace, settings):
@@ -64,7 +71,11 @@ def upload_env_file_to_minio(env_file, namespace, settings):
     return filename, True
 
 
-def verify_gpu_availability(global_existing_bookings, new_booking, gpu_specs):
+GPU_BOOKING_COOLDOWN_DAYS = 14
+GPU_BOOKING_MAX_DAYS = 14
+
+
+def verify_gpu_availability(global_existing_bookings, new_booking, gpu_specs, availability_index=None):
     """
     Verify GPU availability for a new booking.
 
@@ -72,116 +83,37 @@ def verify_gpu_availability(global_existing_bookings, new_booking, gpu_specs):
     ----------
     global_existing_bookings : list of dict
         A list of existing bookings where each booking is represented as a dictionary
-        with keys "gpu", "start_date", and "end_date".
+        with keys "gpu", "start_date", and "end_date". Ignored if ``availability_index`` is provided.
     new_booking : dict
-        A dictionary representing the new booking with keys "gpu", "start_date", and "end_date".
+        A dictionary representing the new booking with keys "gpu", "starting_time", and "ending_time".
     gpu_specs : list of dict
         A list of GPU specifications where each specification is represented as a dictionary
         with keys "name", "replicas", and "count".
+    availability_index : GPUAvailabilityIndex, optional
+        An up-to-date availability index of the existing bookings. If not provided, one is built from
+        ``global_existing_bookings``.
 
     Returns
     -------
     overlapping_time_points : list of datetime
-        A list of time points where bookings overlap.
+        The boundaries of the time slots between the start and the end of the new booking.
     gpu_availability_per_slot : list of int
-        A list of available GPU counts for each overlapping time slot.
+        A list of available GPU counts for each time slot.
     total_gpus : int
         The total number of GPUs available for the specified GPU type.
     """
+    if availability_index is None:
+        availability_index = GPUAvailabilityIndex(gpu_specs, global_existing_bookings)
 
     gpu_name = new_booking["gpu"]
+    overlapping_time_points, gpu_availability_per_slot = availability_index.availability(
+        gpu_name, new_booking["starting_time"], new_booking["ending_time"]
+    )
 
-    gpu_count = 0
-    gpu_replicas = 0
-
-    for gpu_spec in gpu_specs:
-        if gpu_spec["name"] == gpu_name:
-
-            gpu_replicas = gpu_spec["replicas"]
-            gpu_count = gpu_spec["count"]
-
-    overlapping_allocations = []
-    for existing_booking in global_existing_bookings:
-        if existing_booking["gpu"] == gpu_name:
-            if isinstance(existing_booking["start_date"], str):
-                existing_booking_start = datetime.strptime(existing_booking["start_date"], "%Y-%m-%d %H:%M:%S")
-            else:
-                existing_booking_start = existing_booking["start_date"]
-
-            if isinstance(existing_booking["end_date"], str):
-                existing_booking_end = datetime.strptime(existing_booking["end_date"], "%Y-%m-%d %H:%M:%S")
-            else:
-                existing_booking_end = existing_booking["end_date"]
-
-            new_booking_start = datetime.strptime(new_booking["starting_time"], "%Y-%m-%d %H:%M:%S").replace(
-                tzinfo=existing_booking_start.tzinfo
-            )
-            new_booking_end = datetime.strptime(new_booking["ending_time"], "%Y-%m-%d %H:%M:%S").replace(
-                tzinfo=existing_booking_end.tzinfo
-            )
-
-            if new_booking_start >= existing_booking_end or new_booking_end <= existing_booking_start:
-                continue
-            if new_booking_start <= existing_booking_start and new_booking_end >= existing_booking_start:
-                overlapping_allocations.append([existing_booking_start, existing_booking_end])
-            elif new_booking_start <= existing_booking_start and new_booking_end <= existing_booking_end:
-                overlapping_allocations.append([existing_booking_start, new_booking_end])
-            elif new_booking_start >= existing_booking_start and new_booking_end >= existing_booking_end:
-                overlapping_allocations.append([new_booking_start, existing_booking_end])
-            elif new_booking_start >= existing_booking_start and new_booking_end <= existing_booking_end:
-                overlapping_allocations.append([new_booking_start, new_booking_end])
-
-    overlapping_time_points = []
-    gpu_availability_per_slot = []
-    for overlapping_allocation in overlapping_allocations:
-        overlapping_time_points.append(overlapping_allocation[0])
-        overlapping_time_points.append(overlapping_allocation[1])
-
-    if len(global_existing_bookings) == 0:
-        overlapping_time_points.append(datetime.strptime(new_booking["starting_time"], "%Y-%m-%d %H:%M:%S"))
-        overlapping_time_points.append(datetime.strptime(new_booking["ending_time"], "%Y-%m-%d %H:%M:%S"))
-    else:
-        overlapping_time_points.append(
-            datetime.strptime(new_booking["starting_time"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=new_booking_start.tzinfo)
-        )
-        overlapping_time_points.append(
-            datetime.strptime(new_booking["ending_time"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=new_booking_end.tzinfo)
-        )
-    overlapping_time_points = sorted(set(overlapping_time_points))
-
-    for overlapping_time_point in overlapping_time_points[:-1]:
-        overlapping_window = [
-            overlapping_time_point,
-            overlapping_time_points[overlapping_time_points.index(overlapping_time_point) + 1],
-        ]
-        overlapping_window_start = overlapping_window[0]
-        overlapping_window_end = overlapping_window[1]
-
-        available_gpus = gpu_replicas * gpu_count
-        gpu_availability_per_slot.append(available_gpus)
-        for existing_booking in global_existing_bookings:
-            if isinstance(existing_booking["start_date"], str):
-                existing_booking_start = datetime.strptime(existing_booking["start_date"], "%Y-%m-%d %H:%M:%S").replace(
-                    tzinfo=new_booking_start.tzinfo
-                )
-            else:
-                existing_booking_start = existing_booking["start_date"]
-
-            if isinstance(existing_booking["end_date"], str):
-                existing_booking_end = datetime.strptime(existing_booking["end_date"], "%Y-%m-%d %H:%M:%S").replace(
-                    tzinfo=new_booking_end.tzinfo
-                )
-            else:
-                existing_booking_end = existing_booking["end_date"]
-
-            if existing_booking_start < overlapping_window_end and existing_booking_end > overlapping_window_start:
-                available_gpus -= 1
-        gpu_availability_per_slot[-1] = available_gpus
-
-    return overlapping_time_points, gpu_availability_per_slot, gpu_replicas * gpu_count
+    return overlapping_time_points, gpu_availability_per_slot, availability_index.capacity.get(gpu_name, 0)
 
 
-def verify_gpu_booking_policy(existing_bookings, new_booking, global_existing_bookings, gpu_specs):
+def verify_gpu_booking_policy(existing_bookings, new_booking, global_existing_bookings, gpu_specs, availability_index=None):
     """
     Verify GPU booking policy to ensure the new booking does not exceed the allowed days and GPU availability.
 
@@ -192,9 +124,12 @@ def verify_gpu_booking_policy(existing_bookings, new_booking, global_existing_bo
     new_booking : dict
         A dictionary containing the `starting_time` and `ending_time` of the new booking in "%Y-%m-%d %H:%M:%S" format.
     global_existing_bookings : list
-        A list of all existing bookings globally.
+        A list of all existing bookings globally. Ignored if ``availability_index`` is provided.
     gpu_specs : dict
         A dictionary containing the specifications of the GPUs.
+    availability_index : GPUAvailabilityIndex, optional
+        An up-to-date availability index of the existing bookings. If not provided, one is built from
+        ``global_existing_bookings``.
 
     Returns
     -------
@@ -220,11 +155,11 @@ def verify_gpu_booking_policy(existing_bookings, new_booking, global_existing_bo
                 starting_time_tz = starting_time.replace(tzinfo=booking.end_date.tzinfo)
             else:
                 starting_time_tz = starting_time
-            if (starting_time_tz - booking.end_date).days < 14:
+            if (starting_time_tz - booking.end_date).days < GPU_BOOKING_COOLDOWN_DAYS:
                 return (
                     False,
                     "The time between your old booking and the new booking must be at least 14 days. You can start a new booking on {}.".format(
-                        booking.end_date + timedelta(days=14)
+                        booking.end_date + timedelta(days=GPU_BOOKING_COOLDOWN_DAYS)
                     ),
                 )
         if booking.start_date >= datetime.now(tz=booking.start_date.tzinfo) and booking.end_date >= datetime.now(
@@ -239,18 +174,24 @@ def verify_gpu_booking_policy(existing_bookings, new_booking, global_existing_bo
     if new_booking_days <= 0:
         return False, "The booking must be at least one day long."
 
-    if new_booking_days > 14:
+    if new_booking_days > GPU_BOOKING_MAX_DAYS:
         return False, "The booking cannot exceed 14 days."
     # Verify that the sum of existing bookings and the new booking does not exceed 60 days
     # if total_days + new_booking_days > 60:
     #    return False, "The total number of days for all bookings cannot exceed 60 days."
 
-    overlapping_time_slots, gpu_availability_per_slot, total_replicas = verify_gpu_availability(
-        global_existing_bookings=global_existing_bookings, new_booking=new_booking, gpu_specs=gpu_specs
+    if availability_index is None:
+        availability_index = GPUAvailabilityIndex(gpu_specs, global_existing_bookings)
+
+    if availability_index.min_free(new_booking["gpu"], starting_time, ending_time) > 0:
+        return True, None
+
+    overlapping_time_slots, gpu_availability_per_slot, _ = verify_gpu_availability(
+        global_existing_bookings=None, new_booking=new_booking, gpu_specs=gpu_specs, availability_index=availability_index
     )
 
     for idx, gpu_availability in enumerate(gpu_availability_per_slot):
-        if gpu_availability == 0:
+        if gpu_availability <= 0:
             error_msg = "GPU not available between the selected time slots: {} - {}".format(
                 overlapping_time_slots[idx], overlapping_time_slots[idx + 1]
             )
@@ -259,6 +200,43 @@ def verify_gpu_booking_policy(existing_bookings, new_booking, global_existing_bo
     return True, None
 
 
+def get_gpu_booking_cooldown(existing_bookings, now=None):
+    """
+    Compute the earliest start of a new GPU booking allowed for a user, according to the booking policy.
+
+    A user cannot book while another booking is active or planned, and a new booking must start at least
+    ``GPU_BOOKING_COOLDOWN_DAYS`` days after the end of the previous one.
+
+    Parameters
+    ----------
+    existing_bookings : list
+        The bookings of the user, with `start_date` and `end_date` attributes. Bookings that ended more than
+        ``GPU_BOOKING_COOLDOWN_DAYS`` days ago can be omitted.
+    now : datetime, optional
+        The current time. Defaults to now.
+
+    Returns
+    -------
+    datetime or None
+        The earliest allowed start of a new booking, or None if there is no constraint.
+    str or None
+        An error message if the user cannot book at all, None otherwise.
+    """
+    now = now or datetime.now(timezone.utc)
+    earliest_start = None
+    for booking in existing_bookings:
+        if booking.start_date <= now and booking.end_date >= now:
+            return None, "There is an active booking, you cannot book a new one while another is active."
+        if booking.start_date >= now:
+            return None, "You already have a planned booking [{} - {}], you cannot book a new one.".format(
+                booking.start_date, booking.end_date
+            )
+        cooldown_end = booking.end_date + timedelta(days=GPU_BOOKING_COOLDOWN_DAYS)
+        if earliest_start is None or cooldown_end > earliest_start:
+            earliest_start = cooldown_end
+    return earliest_start, None
+
+
 def send_maia_info_email(receiver_email, register_project_url, register_user_url, support_link):
     """
     Send an email with registration information for the MAIA platform.
@@ -458,22 +436,12 @@ def get_user_table(settings, maia_user_model, maia_project_model):
         - users_to_remove_from_group (dict): Users to be removed from Keycloak groups.
     """
 
-    keycloak_connection = KeycloakOpenIDConnection(
-        server_url=settings.OIDC_SERVER_URL,
-        username=settings.OIDC_USERNAME,
-        password="",
-        realm_name=settings.OIDC_REALM_NAME,
-        client_id=settings.OIDC_RP_CLIENT_ID,
-        client_secret_key=settings.OIDC_RP_CLIENT_SECRET,
-        verify=getattr(settings, "OIDC_CA_BUNDLE", True),
-    )
-
-    keycloak_admin = KeycloakAdmin(connection=keycloak_connection)
+    keycloak_admin = get_keycloak_admin(settings)
     users_to_register_in_group = {}
 
-    groups = keycloak_admin.get_groups()
+    snapshot = get_keycloak_membership_snapshot(settings, keycloak_admin=keycloak_admin)
 
-    maia_groups = {group["id"]: group["name"][len("MAIA:") :] for group in groups if group["name"].startswith("MAIA:")}
+    maia_groups = snapshot.maia_groups
 
     pending_projects = get_pending_projects(settings=settings, maia_project_model=maia_project_model)
 
@@ -496,7 +464,7 @@ def get_user_table(settings, maia_user_model, maia_project_model):
             getattr(settings, "ADMIN_GROUP", "admin"),
         ):
             continue
-        users = keycloak_admin.get_group_members(group_id=maia_group)
+        users = snapshot.get_group_members(maia_groups[maia_group])
 
         admin_users = []
         env_files = []
@@ -555,11 +523,7 @@ def get_user_table(settings, maia_user_model, maia_project_model):
         if len(env_files) == 0:
             env_files.append("N/A")
 
-        users = []
-
-        for user in maia_user_model.objects.all():
-            if user.namespace and pending_project in user.namespace.split(","):
-                users.append(user.email)
+        users = get_list_of_users_requesting_a_group(maia_user_model, pending_project)
 
         project = maia_project_model.objects.filter(namespace=pending_project).first()
         maia_group_dict[pending_project] = {
@@ -590,18 +554,8 @@ def get_user_table(settings, maia_user_model, maia_project_model):
     users_to_remove_from_group = {}
 
     for user in maia_user_model.objects.all():
-        user_groups = []
-        user_in_keycloak = False
-        for keycloak_user in keycloak_admin.get_users():
-
-            if "email" in keycloak_user:
-                if keycloak_user["email"] == user.email:
-                    user_in_keycloak = True
-                    user_keycloak_groups = keycloak_admin.get_user_groups(user_id=keycloak_user["id"])
-                    for user_keycloak_group in user_keycloak_groups:
-                        if user_keycloak_group["name"].startswith("MAIA:"):
-                            user_groups.append(user_keycloak_group["name"][len("MAIA:") :])
-        if not user_in_keycloak:
+        user_groups = snapshot.get_groups_for_user(user.email)
+        if snapshot.get_user(user.email) is None:
             users_to_register_in_keycloak.append(user.email)
 
         requested_namespaces = user.namespace.split(",") if user.namespace else []
@@ -646,18 +600,8 @@ def register_cluster_for_project_in_db(project_model, settings, namespace, clust
     None
     """
 
-    keycloak_connection = KeycloakOpenIDConnection(
-        server_url=settings.OIDC_SERVER_URL,
-        username=settings.OIDC_USERNAME,
-        password="",
-        realm_name=settings.OIDC_REALM_NAME,
-        client_id=settings.OIDC_RP_CLIENT_ID,
-        client_secret_key=settings.OIDC_RP_CLIENT_SECRET,
-        verify=getattr(settings, "OIDC_CA_BUNDLE", True),
-    )
-
     group_id = namespace
-    keycloak_admin = KeycloakAdmin(connection=keycloak_connection)
+    keycloak_admin = get_keycloak_admin(settings)
     groups = keycloak_admin.get_groups()
 
     maia_groups = {group["id"]: group["name"][len("MAIA:") :] for group in groups if group["name"].startswith("MAIA:")}
@@ -774,17 +718,7 @@ def get_project(group_id, settings, maia_project_model, is_namespace_style=False
     for project in maia_project_model.objects.all():
         if is_namespace_style:
             if str(project.namespace).lower().replace("_", "-") == group_id:
-                keycloak_connection = KeycloakOpenIDConnection(
-                    server_url=settings.OIDC_SERVER_URL,
-                    username=settings.OIDC_USERNAME,
-                    password="",
-                    realm_name=settings.OIDC_REALM_NAME,
-                    client_id=settings.OIDC_RP_CLIENT_ID,
-                    client_secret_key=settings.OIDC_RP_CLIENT_SECRET,
-                    verify=getattr(settings, "OIDC_CA_BUNDLE", True),
-                )
-
-                keycloak_admin = KeycloakAdmin(connection=keycloak_connection)
+                keycloak_admin = get_keycloak_admin(settings)
                 groups = keycloak_admin.get_groups()
 
                 maia_groups = {
@@ -842,17 +776,7 @@ def get_project(group_id, settings, maia_project_model, is_namespace_style=False
                 return namespace_form, cluster_id
         else:
             if project.namespace == group_id:
-                keycloak_connection = KeycloakOpenIDConnection(
-                    server_url=settings.OIDC_SERVER_URL,
-                    username=settings.OIDC_USERNAME,
-                    password="",
-                    realm_name=settings.OIDC_REALM_NAME,
-                    client_id=settings.OIDC_RP_CLIENT_ID,
-                    client_secret_key=settings.OIDC_RP_CLIENT_SECRET,
-                    verify=getattr(settings, "OIDC_CA_BUNDLE", True),
-                )
-
-                keycloak_admin = KeycloakAdmin(connection=keycloak_connection)
+                keycloak_admin = get_keycloak_admin(settings)
                 groups = keycloak_admin.get_groups()
 
                 maia_groups = {
@@ -966,7 +890,7 @@ async def get_list_of_deployed_projects():
     """
     if "BACKEND" in os.environ and os.environ["BACKEND"] == "compose":
         return [os.environ["PROJECT_NAME"]]
-    client = Client(kubeconfig=os.environ["KUBECONFIG"])
+    client = Client(kubeconfig=get_kubeconfig_path())
 
     releases = await client.list_releases(namespace="argocd")
 
@@ -1009,15 +933,11 @@ def get_project_argo_status_and_user_table(request, settings, maia_user_model, m
         username = "in-local-cluster-token"
 
     if argocd_cluster_id is None or argocd_cluster_id == "N/A":
-        ...
+        kubeconfig_dict = None
     else:
         kubeconfig_dict = generate_kubeconfig(
             id_token, username, "default", argocd_cluster_id, settings=settings, in_local_cluster_token=in_local_cluster_token
         )
-        config.load_kube_config_from_dict(kubeconfig_dict)
-        with open(Path("/tmp").joinpath("kubeconfig-argo"), "w") as f:
-            yaml.dump(kubeconfig_dict, f)
-            os.environ["KUBECONFIG"] = str(Path("/tmp").joinpath("kubeconfig-argo"))
 
     to_register_in_groups, to_register_in_keycloak, maia_groups_dict, users_to_remove_from_group = get_user_table(
         settings=settings, maia_user_model=maia_user_model, maia_project_model=maia_project_model
@@ -1026,7 +946,8 @@ def get_project_argo_status_and_user_table(request, settings, maia_user_model, m
 
     namespaces = get_namespaces(id_token, api_urls=settings.API_URL, private_clusters=settings.PRIVATE_CLUSTERS)
 
-    deployed_projects = asyncio.run(get_list_of_deployed_projects())
+    with kube_context(kubeconfig_dict):
+        deployed_projects = asyncio.run(get_list_of_deployed_projects())
     for project_id in maia_groups_dict:
         if project_id.lower().replace("_", "-") in deployed_projects:
             project_argo_status[project_id] = 1
@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from datetime import date, datetime, time, timezone
+
+BOOKING_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def parse_booking_time(value):
+    """
+    Convert a booking time to a timezone-aware UTC datetime.
+
+    Parameters
+    ----------
+    value : str, date or datetime
+        A datetime, a date (meaning midnight) or a string in ``BOOKING_TIME_FORMAT``. Naive values are interpreted
+        as UTC.
+
+    Returns
+    -------
+    datetime
+        The booking time, in UTC.
+    """
+    if isinstance(value, str):
+        value = datetime.strptime(value, BOOKING_TIME_FORMAT)
+    elif not isinstance(value, datetime) and isinstance(value, date):
+        value = datetime.combine(value, time())
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+class _GPUTimeline:
+    """
+    Number of concurrent bookings of one GPU type over time.
+
+    The booking boundaries are kept as sorted breakpoints; segment ``i`` is the interval ``[times[i], times[i + 1])``.
+    The usage of the segments is stored in a segment tree with lazy range updates, answering range-max queries in
+    O(log n). Adding or removing a booking whose boundaries are already breakpoints is an O(log n) range update;
+    a booking introducing new breakpoints rebuilds the timeline in O(n log n).
+    """
+
+    def __init__(self, intervals=()):
+        self._intervals = Counter(intervals)
+        self._rebuild()
+
+    def _rebuild(self):
+        self._breakpoints = Counter()
+        for (start, end), multiplicity in self._intervals.items():
+            self._breakpoints[start] += multiplicity
+            self._breakpoints[end] += multiplicity
+        self.times = sorted(self._breakpoints)
+        self._index = {boundary: i for i, boundary in enumerate(self.times)}
+        self._unreferenced = 0
+        self._size = max(len(self.times) - 1, 1)
+
+        deltas = [0] * (self._size + 1)
+        for (start, end), multiplicity in self._intervals.items():
+            deltas[self._index[start]] += multiplicity
+            deltas[self._index[end]] -= multiplicity
+        usage = []
+        running = 0
+        for delta in deltas[: self._size]:
+            running += delta
+            usage.append(running)
+
+        self._max = [0] * (4 * self._size)
+        self._lazy = [0] * (4 * self._size)
+        self._build(1, 0, self._size - 1, usage)
+
+    def _build(self, node, left, right, usage):
+        if left == right:
+            self._max[node] = usage[left]
+            return
+        middle = (left + right) // 2
+        self._build(2 * node, left, middle, usage)
+        self._build(2 * node + 1, middle + 1, right, usage)
+        self._max[node] = max(self._max[2 * node], self._max[2 * node + 1])
+
+    def _update(self, node, left, right, first, last, value):
+        if last < left or right < first:
+            return
+        if first <= left and right <= last:
+            self._max[node] += value
+            self._lazy[node] += value
+            return
+        middle = (left + right) // 2
+        self._update(2 * node, left, middle, first, last, value)
+        self._update(2 * node + 1, middle + 1, right, first, last, value)
+        self._max[node] = max(self._max[2 * node], self._max[2 * node + 1]) + self._lazy[node]
+
+    def _query(self, node, left, right, first, last):
+        if last < left or right < first:
+            return 0
+        if first <= left and right <= last:
+            return self._max[node]
+        middle = (left + right) // 2
+        return (
+            max(
+                self._query(2 * node, left, middle, first, last),
+                self._query(2 * node + 1, middle + 1, right, first, last),
+            )
+            + self._lazy[node]
+        )
+
+    def add(self, start, end, multiplicity=1):
+        if start >= end:
+            return
+        self._intervals[(start, end)] += multiplicity
+        if start in self._index and end in self._index:
+            self._breakpoints[start] += multiplicity
+            self._breakpoints[end] += multiplicity
+            self._update(1, 0, self._size - 1, self._index[start], self._index[end] - 1, multiplicity)
+        else:
+            self._rebuild()
+
+    def remove(self, start, end):
+        if self._intervals.get((start, end), 0) <= 0:
+            return
+        self._intervals[(start, end)] -= 1
+        if self._intervals[(start, end)] == 0:
+            del self._intervals[(start, end)]
+        self._update(1, 0, self._size - 1, self._index[start], self._index[end] - 1, -1)
+        for boundary in (start, end):
+            self._breakpoints[boundary] -= 1
+            if self._breakpoints[boundary] == 0:
+                self._unreferenced += 1
+        # Unreferenced breakpoints only split segments of equal usage; drop them once they dominate the timeline.
+        if self._unreferenced > len(self.times) // 2:
+            self._rebuild()
+
+    def max_usage(self, start, end):
+        """Return the maximum number of concurrent bookings over ``[start, end)``."""
+        if len(self.times) < 2 or start >= end:
+            return 0
+        first = max(bisect_right(self.times, start) - 1, 0)
+        last = min(bisect_left(self.times, end) - 1, self._size - 1)
+        if first > last:
+            return 0
+        return self._query(1, 0, self._size - 1, first, last)
+
+    def breakpoints(self, start, end):
+        """Return the breakpoints strictly inside ``(start, end)``."""
+        return self.times[bisect_right(self.times, start) : bisect_left(self.times, end)]
+
+
+class GPUAvailabilityIndex:
+    """
+    Availability of each GPU type over time, given the GPU specifications and the existing bookings.
+
+    Each booking reserves one GPU of its type over ``[start_date, end_date)``. The index is built in O(n log n) and
+    answers "minimum number of free GPUs over a time window" in O(log n). Bookings can be added, updated and
+    removed incrementally, by key. The index is thread-safe.
+
+    Parameters
+    ----------
+    gpu_specs : list of dict
+        GPU specifications, with keys "name", "replicas" and "count". The capacity of a GPU type is
+        ``replicas * count``.
+    bookings : iterable of dict, optional
+        Existing bookings, with keys "gpu", "start_date", "end_date" and optionally "id", used as booking key.
+    """
+
+    def __init__(self, gpu_specs, bookings=()):
+        self.capacity = {}
+        for gpu_spec in gpu_specs:
+            self.capacity[gpu_spec["name"]] = gpu_spec.get("replicas", 0) * gpu_spec.get("count", 0)
+        self._bookings = {}
+        intervals = defaultdict(list)
+        for position, booking in enumerate(bookings):
+            key = booking.get("id", ("booking", position))
+            interval = (parse_booking_time(booking["start_date"]), parse_booking_time(booking["end_date"]))
+            self._bookings[key] = (booking["gpu"], *interval)
+            if interval[0] < interval[1]:
+                intervals[booking["gpu"]].append(interval)
+        self._timelines = {gpu: _GPUTimeline(gpu_intervals) for gpu, gpu_intervals in intervals.items()}
+        self._lock = threading.RLock()
+
+    def _timeline(self, gpu):
+        if gpu not in self._timelines:
+            self._timelines[gpu] = _GPUTimeline()
+        return self._timelines[gpu]
+
+    def add_booking(self, key, gpu, start_date, end_date):
+        """
+        Add a booking to the index, replacing any booking with the same key.
+
+        Parameters
+        ----------
+        key : hashable
+            The booking key, e.g. the ID of the ``GPUBooking`` row.
+        gpu : str
+            The booked GPU type.
+        start_date : str or datetime
+            The start of the booking.
+        end_date : str or datetime
+            The end of the booking.
+        """
+        start, end = parse_booking_time(start_date), parse_booking_time(end_date)
+        with self._lock:
+            self.remove_booking(key)
+            self._bookings[key] = (gpu, start, end)
+            self._timeline(gpu).add(start, end)
+
+    def remove_booking(self, key):
+        """Remove the booking with the given key from the index, if present."""
+        with self._lock:
+            booking = self._bookings.pop(key, None)
+            if booking is not None:
+                gpu, start, end = booking
+                self._timeline(gpu).remove(start, end)
+
+    def min_free(self, gpu, start, end):
+        """
+        Return the minimum number of free GPUs of a type over ``[start, end)``.
+
+        Parameters
+        ----------
+        gpu : str
+            The GPU type.
+        start : str or datetime
+            The start of the time window.
+        end : str or datetime
+            The end of the time window.
+
+        Returns
+        -------
+        int
+            The minimum number of free GPUs over the time window.
+        """
+        start, end = parse_booking_time(start), parse_booking_time(end)
+        with self._lock:
+            return self.capacity.get(gpu, 0) - self._timeline(gpu).max_usage(start, end)
+
+    def availability(self, gpu, start, end):
+        """
+        Return the number of free GPUs of a type in each slot of ``[start, end)``.
+
+        Parameters
+        ----------
+        gpu : str
+            The GPU type.
+        start : str or datetime
+            The start of the time window.
+        end : str or datetime
+            The end of the time window.
+
+        Returns
+        -------
+        time_points : list of datetime
+            The slot boundaries: the window start, the booking boundaries inside the window and the window end.
+        free_per_slot : list of int
+            The number of free GPUs between consecutive time points.
+        """
+        start, end = parse_booking_time(start), parse_booking_time(end)
+        with self._lock:
+            timeline = self._timeline(gpu)
+            capacity = self.capacity.get(gpu, 0)
+            time_points = [start, *timeline.breakpoints(start, end), end]
+            free_per_slot = [
+                capacity - timeline.max_usage(slot_start, slot_end)
+                for slot_start, slot_end in zip(time_points[:-1], time_points[1:])
+            ]
+        return time_points, free_per_slot
+
+    def feasible_slots(self, gpu, duration, count=1, not_before=None, max_slots=1):
+        """
+        Return the earliest start times at which ``count`` GPUs of a type are free for ``duration``.
+
+        Usage only decreases at booking boundaries, so the candidate start times are ``not_before`` and the
+        breakpoints after it. They are scanned in a single pass, in chronological order, with one O(log n)
+        range query per candidate.
+
+        Parameters
+        ----------
+        gpu : str
+            The GPU type.
+        duration : timedelta
+            The length of the requested slot.
+        count : int, optional
+            The number of GPUs requested (default is 1).
+        not_before : str or datetime, optional
+            The earliest acceptable start time. Defaults to now.
+        max_slots : int, optional
+            The maximum number of start times to return (default is 1).
+
+        Returns
+        -------
+        list of tuple
+            ``(start, free_gpus)`` tuples, where ``free_gpus`` is the minimum number of free GPUs over
+            ``[start, start + duration)``. Empty if the GPU type does not have ``count`` GPUs.
+        """
+        not_before = parse_booking_time(not_before if not_before is not None else datetime.now(timezone.utc))
+        slots = []
+        with self._lock:
+            capacity = self.capacity.get(gpu, 0)
+            if capacity < count:
+                return slots
+            timeline = self._timeline(gpu)
+            for candidate in [not_before, *timeline.breakpoints(not_before, datetime.max.replace(tzinfo=timezone.utc))]:
+                free_gpus = capacity - timeline.max_usage(candidate, candidate + duration)
+                if free_gpus >= count:
+                    slots.append((candidate, free_gpus))
+                    if len(slots) >= max_slots:
+                        break
+        return slots
+
+    def earliest_slot(self, gpu, duration, count=1, not_before=None):
+        """
+        Return the earliest start time at which ``count`` GPUs of a type are free for ``duration``.
+
+        Parameters
+        ----------
+        gpu : str
+            The GPU type.
+        duration : timedelta
+            The length of the requested slot.
+        count : int, optional
+            The number of GPUs requested (default is 1).
+        not_before : str or datetime, optional
+            The earliest acceptable start time. Defaults to now.
+
+        Returns
+        -------
+        datetime or None
+            The earliest start time, or None if the GPU type does not have ``count`` GPUs.
+        """
+        slots = self.feasible_slots(gpu, duration, count=count, not_before=not_before)
+        return slots[0][0] if slots else None
@@ -0,0 +1,464 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from MAIA.kube_clients import get_kube_subprocess_env
+
+# Directory of the chart cache: the archives under ``blobs/sha256/<digest>``, indexed by (repo, chart, version) in
+# ``index.json``. The processes sharing the cache serialize their updates of the index with a lock on ``index.lock``.
+HELM_CHART_CACHE_DIR = os.environ.get("MAIA_HELM_CHART_CACHE_DIR", str(Path.home().joinpath(".cache", "maia", "helm-charts")))
+# Size limit (in MiB) of the chart cache, above which the least recently used charts are evicted.
+HELM_CHART_CACHE_MAX_SIZE = int(os.environ.get("MAIA_HELM_CHART_CACHE_MAX_SIZE", "1024"))
+# In offline mode, charts missing from the cache are taken from HELM_CHARTS_DIR instead of being pulled.
+HELM_OFFLINE = os.environ.get("MAIA_HELM_OFFLINE", "False").lower() in ("true", "1", "yes")
+# Directory of the packaged charts (``<chart>-<version>.tgz``) used in offline mode.
+HELM_CHARTS_DIR = os.environ.get("MAIA_HELM_CHARTS_DIR", str(Path(__file__).resolve().parents[1].joinpath("helm_charts")))
+# Maximum number of Helm releases installed or upgraded at the same time.
+MAX_PARALLEL_RELEASES = int(os.environ.get("MAIA_MAX_PARALLEL_RELEASES", "4"))
+
+_helm_chart_cache = None
+_helm_chart_cache_lock = threading.Lock()
+
+
+def read_registry_credentials(json_key_path):
+    """
+    Read the credentials of a Helm OCI registry.
+
+    Parameters
+    ----------
+    json_key_path : str
+        Path to either a JSON file with ``username`` and ``password``, or to a service account JSON key, which is used
+        as the password of the ``_json_key`` user.
+
+    Returns
+    -------
+    tuple
+        The username and the password.
+    """
+    with open(json_key_path, "r") as f:
+        docker_credentials = f.read()
+    try:
+        credentials = json.loads(docker_credentials)
+        if "username" in credentials and "password" in credentials:
+            return credentials["username"], credentials["password"]
+    except ValueError:
+        pass
+    return "_json_key", docker_credentials
+
+
+def is_oci_repo(repo):
+    """Return True if a Helm repo is an OCI registry, i.e. neither an HTTP repository nor a local directory."""
+    return not repo.startswith("http") and not Path(repo).exists()
+
+
+def get_oci_registry(repo):
+    """Return an OCI registry without its ``oci://`` scheme."""
+    return repo[len("oci://") :] if repo.startswith("oci://") else repo
+
+
+def get_file_digest(path):
+    """Return the SHA-256 digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class HelmChartCache:
+    """
+    Content-addressed on-disk cache of packaged Helm charts.
+
+    Each archive is stored once under its SHA-256 digest and verified against it when read, so that a truncated or
+    corrupted archive is pulled again instead of being installed. An index maps each (repo, chart, version) to its
+    digest and last use. When the cache grows beyond ``max_size`` MiB, the least recently used archives are evicted.
+
+    Parameters
+    ----------
+    cache_dir : str, optional
+        The cache directory. Defaults to ``HELM_CHART_CACHE_DIR``.
+    max_size : int, optional
+        The size limit of the cache, in MiB. Defaults to ``HELM_CHART_CACHE_MAX_SIZE``.
+    """
+
+    def __init__(self, cache_dir=None, max_size=None):
+        self.cache_dir = Path(cache_dir or HELM_CHART_CACHE_DIR)
+        self.max_size = (max_size or HELM_CHART_CACHE_MAX_SIZE) * 1024 * 1024
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(repo, chart, version):
+        return f"{get_oci_registry(repo)}|{chart}|{version}"
+
+    def _blob(self, digest):
+        return self.cache_dir.joinpath("blobs", "sha256", digest)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """
+        Hold the cache for a read-modify-write of the index: the lock of the instance for the threads of this
+        process, and an exclusive ``flock`` on ``index.lock`` for the other processes sharing the cache (gunicorn
+        workers, the CLI).
+        """
+        with self._lock:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.cache_dir.joinpath("index.lock"), "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_index(self):
+        try:
+            with open(self.cache_dir.joinpath("index.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index):
+        # A temporary file of its own, so that a crashed writer never leaves a partial index behind.
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix="index.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(index, f, indent=2)
+            os.replace(tmp_path, self.cache_dir.joinpath("index.json"))
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def get(self, repo, chart, version):
+        """
+        Return the cached archive of a chart version, or None if it is not cached or fails verification.
+
+        Parameters
+        ----------
+        repo : str
+            The Helm repository URL or OCI registry the chart is pulled from.
+        chart : str
+            The chart name.
+        version : str
+            The chart version.
+
+        Returns
+        -------
+        Path or None
+            The path of the chart archive.
+        """
+        key = self._key(repo, chart, version)
+        with self._locked():
+            index = self._load_index()
+            entry = index.get(key)
+            if entry is None:
+                return None
+            blob = self._blob(entry["digest"])
+            if not blob.exists() or get_file_digest(blob) != entry["digest"]:
+                logger.warning(f"Cached chart {chart} {version} from {repo} is missing or corrupted, discarding it")
+                blob.unlink(missing_ok=True)
+                del index[key]
+                self._save_index(index)
+                return None
+            entry["last_used"] = time.time()
+            self._save_index(index)
+            return blob
+
+    def put(self, repo, chart, version, archive):
+        """
+        Move a chart archive into the cache, and evict the least recently used archives beyond the size limit.
+
+        Parameters
+        ----------
+        repo : str
+            The Helm repository URL or OCI registry the chart was pulled from.
+        chart : str
+            The chart name.
+        version : str
+            The chart version.
+        archive : str or Path
+            The pulled chart archive, moved into the cache.
+
+        Returns
+        -------
+        Path
+            The path of the cached chart archive.
+        """
+        digest = get_file_digest(archive)
+        blob = self._blob(digest)
+        with self._locked():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(archive, blob)
+            index = self._load_index()
+            index[self._key(repo, chart, version)] = {"digest": digest, "size": blob.stat().st_size, "last_used": time.time()}
+            self._evict(index, keep=digest)
+            self._save_index(index)
+        return blob
+
+    def _evict(self, index, keep):
+        # Archives shared by several keys are evicted together, once none of these keys was used more recently.
+        blobs = {}
+        for key, entry in index.items():
+            size, last_used, keys = blobs.get(entry["digest"], (entry["size"], 0, []))
+            blobs[entry["digest"]] = (size, max(last_used, entry["last_used"]), keys + [key])
+        total = sum(size for size, _, _ in blobs.values())
+        for digest, (size, _, keys) in sorted(blobs.items(), key=lambda item: item[1][1]):
+            if total <= self.max_size:
+                break
+            if digest == keep:
+                continue
+            logger.debug(f"Evicting {', '.join(keys)} from the Helm chart cache")
+            self._blob(digest).unlink(missing_ok=True)
+            for key in keys:
+                del index[key]
+            total -= size
+
+
+def get_helm_chart_cache():
+    """Return the process-wide Helm chart cache."""
+    global _helm_chart_cache
+    with _helm_chart_cache_lock:
+        if _helm_chart_cache is None:
+            _helm_chart_cache = HelmChartCache()
+        return _helm_chart_cache
+
+
+async def run_helm(args, input=None):
+    """
+    Run a Helm command without blocking the event loop.
+
+    Parameters
+    ----------
+    args : list
+        The Helm arguments, without the ``helm`` executable.
+    input : str, optional
+        Text written to the standard input of the command.
+
+    Returns
+    -------
+    tuple
+        The exit status, the standard output and the standard error of the command.
+    """
+    process = await asyncio.create_subprocess_exec(
+        "helm",
+        *args,
+        stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env=get_kube_subprocess_env(),
+    )
+    stdout, stderr = await process.communicate(input.encode() if input is not None else None)
+    return process.returncode, stdout.decode(), stderr.decode()
+
+
+async def registry_login(registry, json_key_path, insecure=False):
+    """
+    Log into a Helm OCI registry.
+
+    Parameters
+    ----------
+    registry : str
+        The OCI registry, without the ``oci://`` scheme.
+    json_key_path : str
+        Credentials of the registry, see ``read_registry_credentials``.
+    insecure : bool, optional
+        Allow connections to a registry without a trusted certificate.
+
+    Raises
+    ------
+    RuntimeError
+        If the login fails.
+    """
+    username, password = read_registry_credentials(json_key_path)
+    args = ["registry", "login", registry, "--username", username, "--password-stdin"] + (["--insecure"] if insecure else [])
+    logger.debug(f"helm {' '.join(args)}")
+    returncode, _, stderr = await run_helm(args, input=password)
+    if returncode != 0:
+        raise RuntimeError(f"Helm registry login to {registry} failed: {stderr.strip()}")
+
+
+async def fetch_chart(repo, chart, version, json_key_path=None, insecure=False, cache=None, login=None):
+    """
+    Return a local archive of a chart version, pulling it only if it is not in the chart cache.
+
+    In offline mode (``MAIA_HELM_OFFLINE``), charts missing from the cache are taken from ``HELM_CHARTS_DIR``.
+
+    Parameters
+    ----------
+    repo : str
+        The Helm repository URL, or the OCI registry (with or without the ``oci://`` scheme).
+    chart : str
+        The chart name.
+    version : str
+        The chart version.
+    json_key_path : str, optional
+        Credentials of the OCI registry, see ``read_registry_credentials``.
+    insecure : bool, optional
+        Allow connections to a registry without a trusted certificate.
+    cache : HelmChartCache, optional
+        The chart cache. Defaults to the process-wide cache.
+    login : coroutine function, optional
+        Called with the registry instead of logging in with ``json_key_path``, to share logins between pulls.
+
+    Returns
+    -------
+    Path
+        The path of the chart archive.
+
+    Raises
+    ------
+    RuntimeError
+        If the chart cannot be pulled, or is not available offline.
+    """
+    cache = cache or get_helm_chart_cache()
+    chart_path = await asyncio.get_running_loop().run_in_executor(None, cache.get, repo, chart, version)
+    if chart_path is not None:
+        return chart_path
+    if HELM_OFFLINE:
+        chart_path = Path(HELM_CHARTS_DIR).joinpath(f"{chart}-{version}.tgz")
+        if not chart_path.exists():
+            raise RuntimeError(f"Chart {chart} {version} is neither cached nor in {HELM_CHARTS_DIR}, and Helm is offline")
+        return chart_path
+    if is_oci_repo(repo):
+        registry = get_oci_registry(repo)
+        await (login(registry) if login is not None else registry_login(registry, json_key_path, insecure=insecure))
+        args = ["pull", f"oci://{registry}/{chart}", "--version", version]
+    else:
+        args = ["pull", chart, "--repo", repo, "--version", version]
+    if insecure:
+        args.append("--insecure-skip-tls-verify")
+    cache.cache_dir.mkdir(parents=True, exist_ok=True)
+    # Pull into a scratch directory, so that a partial archive never reaches the cache
+    with tempfile.TemporaryDirectory(dir=cache.cache_dir) as destination:
+        logger.debug(f"helm {' '.join(args)} --destination {destination}")
+        returncode, _, stderr = await run_helm(args + ["--destination", destination])
+        if returncode != 0:
+            raise RuntimeError(f"Helm pull of {chart} {version} from {repo} failed: {stderr.strip()}")
+        archive = Path(destination).joinpath(f"{chart}-{version}.tgz")
+        return await asyncio.get_running_loop().run_in_executor(None, cache.put, repo, chart, version, archive)
+
+
+class HelmRollout:
+    """
+    Install or upgrade a set of independent Helm releases concurrently.
+
+    Each OCI registry is logged into once and each (repo, chart, version) is pulled once into the local chart cache, no
+    matter how many releases use it. The releases then run with at most ``max_parallel`` Helm processes at a time.
+
+    Parameters
+    ----------
+    json_key_path : str, optional
+        Credentials of the OCI registries, see ``read_registry_credentials``.
+    max_parallel : int, optional
+        Maximum number of releases installed at the same time. Defaults to ``MAX_PARALLEL_RELEASES``.
+    cache : HelmChartCache, optional
+        The chart cache. Defaults to the process-wide cache.
+    """
+
+    def __init__(self, json_key_path=None, max_parallel=None, cache=None):
+        self.json_key_path = json_key_path
+        self.max_parallel = max_parallel or MAX_PARALLEL_RELEASES
+        self.cache = cache or get_helm_chart_cache()
+        self._logins = {}
+        self._pulls = {}
+
+    async def login(self, registry):
+        """Log into an OCI registry, once per rollout."""
+        if registry not in self._logins:
+            self._logins[registry] = asyncio.ensure_future(registry_login(registry, self.json_key_path))
+        await self._logins[registry]
+
+    async def pull(self, repo, chart, version):
+        """
+        Fetch a chart version from the chart cache, pulling it once per rollout if it is not there.
+
+        Parameters
+        ----------
+        repo : str
+            The Helm repository URL or OCI registry.
+        chart : str
+            The chart name.
+        version : str
+            The chart version.
+
+        Returns
+        -------
+        Path
+            The path of the chart archive.
+        """
+        key = (repo, chart, version)
+        if key not in self._pulls:
+            self._pulls[key] = asyncio.ensure_future(fetch_chart(repo, chart, version, cache=self.cache, login=self.login))
+        return await self._pulls[key]
+
+    async def install(self, helm_command, semaphore):
+        """
+        Install or upgrade one release.
+
+        Parameters
+        ----------
+        helm_command : dict
+            The release, as returned by the ``MAIA.maia_fn`` value generators: ``release``, ``namespace``, ``chart``,
+            ``repo``, ``version`` and ``values``.
+        semaphore : asyncio.Semaphore
+            Bounds the number of concurrent Helm processes.
+
+        Returns
+        -------
+        dict
+            ``release``, ``namespace``, ``returncode``, ``seconds`` and, on failure, ``error``.
+        """
+        result = {"release": helm_command["release"], "namespace": helm_command["namespace"]}
+        start = time.monotonic()
+        try:
+            async with semaphore:
+                args = ["upgrade", "--install", "-n", helm_command["namespace"], helm_command["release"]]
+                if Path(helm_command["repo"]).exists():
+                    args += [helm_command["chart"], "--repo", helm_command["repo"], "--version", helm_command["version"]]
+                else:
+                    args.append(str(await self.pull(helm_command["repo"], helm_command["chart"], helm_command["version"])))
+                args += ["--values", helm_command["values"]]
+                logger.debug(f"Helm command: helm {' '.join(args)}")
+                returncode, _, stderr = await run_helm(args)
+        except RuntimeError as e:
+            returncode, stderr = 1, str(e)
+        result["returncode"] = returncode
+        result["seconds"] = time.monotonic() - start
+        if returncode != 0:
+            result["error"] = stderr.strip()
+            logger.error(f"Helm release {result['release']} failed after {result['seconds']:.1f}s: {result['error']}")
+        else:
+            logger.info(f"Helm release {result['release']} deployed in {result['seconds']:.1f}s")
+        return result
+
+    async def run(self, helm_commands):
+        """
+        Install or upgrade all the releases concurrently.
+
+        Parameters
+        ----------
+        helm_commands : list of dict
+            The releases, see ``install``.
+
+        Returns
+        -------
+        list of dict
+            The result of each release, in the order of ``helm_commands``.
+        """
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        return await asyncio.gather(*(self.install(helm_command, semaphore) for helm_command in helm_commands))
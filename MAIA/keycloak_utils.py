@@ -1,9 +1,26 @@
 from __future__ import annotations
 
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 from keycloak import KeycloakAdmin, KeycloakOpenIDConnection
+from keycloak.exceptions import KeycloakError
+from loguru import logger
 from typing import Any
 import requests
 
+# Page size used when listing users, groups and group members in bulk.
+KEYCLOAK_PAGE_SIZE = int(os.environ.get("KEYCLOAK_PAGE_SIZE", "500"))
+# Maximum number of keep-alive connections kept open to the Keycloak server by the shared admin client.
+KEYCLOAK_POOL_MAXSIZE = int(os.environ.get("KEYCLOAK_POOL_MAXSIZE", "16"))
+# Maximum number of concurrent requests sent to the Keycloak server by the bulk membership updates.
+KEYCLOAK_MAX_WORKERS = int(os.environ.get("KEYCLOAK_MAX_WORKERS", "8"))
+
+_keycloak_admins = {}
+_keycloak_admins_lock = threading.Lock()
+_keycloak_admins_pid = os.getpid()
+
 
 def get_access_token(keycloak_url, keycloak_client_secret, ca_cert):
     """
@@ -86,6 +103,82 @@ def get_id_token(keycloak_url, keycloak_client_secret, username, password, ca_ce
     return r.json()
 
 
+class _SharedKeycloakOpenIDConnection(KeycloakOpenIDConnection):
+    """
+    Keycloak connection that can be shared between threads.
+
+    The access token is reused until it reaches 90% of its lifetime (the ``KeycloakOpenIDConnection`` default) and
+    requests go through the pooled keep-alive session of the connection. Token refreshes are serialized, so that
+    concurrent callers hitting an expired token trigger a single token exchange.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._token_lock = threading.RLock()
+        super().__init__(*args, **kwargs)
+
+    def _refresh_if_required(self) -> None:
+        with self._token_lock:
+            super()._refresh_if_required()
+
+    def refresh_token(self) -> None:
+        with self._token_lock:
+            super().refresh_token()
+
+    def get_token(self) -> None:
+        with self._token_lock:
+            super().get_token()
+
+
+def get_keycloak_admin(settings) -> KeycloakAdmin:
+    """
+    Return the process-wide Keycloak admin client for the given settings.
+
+    Clients are created on first use and cached per Keycloak server, realm and client credentials, so that the
+    admin token and the HTTP connections are reused across calls. The cache is reset after a fork.
+
+    Parameters
+    ----------
+    settings : object
+        An object containing the Keycloak server settings (OIDC_SERVER_URL, OIDC_USERNAME, OIDC_REALM_NAME,
+        OIDC_RP_CLIENT_ID, OIDC_RP_CLIENT_SECRET and optionally OIDC_CA_BUNDLE).
+
+    Returns
+    -------
+    KeycloakAdmin
+        The shared Keycloak admin client.
+    """
+    global _keycloak_admins_pid
+    verify = getattr(settings, "OIDC_CA_BUNDLE", True)
+    key = (
+        settings.OIDC_SERVER_URL,
+        settings.OIDC_REALM_NAME,
+        settings.OIDC_USERNAME,
+        settings.OIDC_RP_CLIENT_ID,
+        settings.OIDC_RP_CLIENT_SECRET,
+        str(verify),
+    )
+    with _keycloak_admins_lock:
+        if _keycloak_admins_pid != os.getpid():
+            # Connection pools must not be shared with a parent process (e.g. gunicorn preloading the app).
+            _keycloak_admins.clear()
+            _keycloak_admins_pid = os.getpid()
+        keycloak_admin = _keycloak_admins.get(key)
+        if keycloak_admin is None:
+            keycloak_connection = _SharedKeycloakOpenIDConnection(
+                server_url=settings.OIDC_SERVER_URL,
+                username=settings.OIDC_USERNAME,
+                password="",
+                realm_name=settings.OIDC_REALM_NAME,
+                client_id=settings.OIDC_RP_CLIENT_ID,
+                client_secret_key=settings.OIDC_RP_CLIENT_SECRET,
+                verify=verify,
+                pool_maxsize=KEYCLOAK_POOL_MAXSIZE,
+            )
+            keycloak_admin = KeycloakAdmin(connection=keycloak_connection)
+            _keycloak_admins[key] = keycloak_admin
+        return keycloak_admin
+
+
 def get_group_id_in_keycloak(group_name, settings) -> str:
     """
     Retrieve the ID of a group in Keycloak.
@@ -98,16 +191,7 @@ def get_group_id_in_keycloak(group_name, settings) -> str:
         An object containing the Keycloak server settings. It should have the following attributes:
         - OIDC_SERVER_URL: str, the URL of the Keycloak server.
     """
-    keycloak_connection = KeycloakOpenIDConnection(
-        server_url=settings.OIDC_SERVER_URL,
-        username=settings.OIDC_USERNAME,
-        password="",
-        realm_name=settings.OIDC_REALM_NAME,
-        client_id=settings.OIDC_RP_CLIENT_ID,
-        client_secret_key=settings.OIDC_RP_CLIENT_SECRET,
-        verify=getattr(settings, "OIDC_CA_BUNDLE", True),
-    )
-    keycloak_admin = KeycloakAdmin(connection=keycloak_connection)
+    keycloak_admin = get_keycloak_admin(settings)
     groups = keycloak_admin.get_groups()
     for group in groups:
         if group["name"] == group_name:
@@ -136,20 +220,126 @@ def get_users_in_group_in_keycloak(group_id, settings) -> list[str]:
     list[str]
         A list of email addresses of users in the group.
     """
-    keycloak_connection = KeycloakOpenIDConnection(
-        server_url=settings.OIDC_SERVER_URL,
-        username=settings.OIDC_USERNAME,
-        password="",
-        realm_name=settings.OIDC_REALM_NAME,
-        client_id=settings.OIDC_RP_CLIENT_ID,
-        client_secret_key=settings.OIDC_RP_CLIENT_SECRET,
-        verify=getattr(settings, "OIDC_CA_BUNDLE", True),
-    )
-    keycloak_admin = KeycloakAdmin(connection=keycloak_connection)
+    keycloak_admin = get_keycloak_admin(settings)
     users = keycloak_admin.get_group_members(group_id=group_id)
     return [user["email"] for user in users if "email" in user]
 
 
+def _fetch_all_pages(fetch, page_size=None, **kwargs) -> list[dict[str, Any]]:
+    """
+    Call a paginated Keycloak admin listing until the last page is reached.
+
+    Parameters
+    ----------
+    fetch : callable
+        A ``KeycloakAdmin`` listing method accepting a ``query`` dictionary, e.g. ``keycloak_admin.get_users``.
+    page_size : int, optional
+        Number of entries requested per page. Defaults to ``KEYCLOAK_PAGE_SIZE``.
+    **kwargs
+        Additional keyword arguments passed to ``fetch``.
+
+    Returns
+    -------
+    list
+        The concatenation of all the pages.
+    """
+    page_size = page_size or KEYCLOAK_PAGE_SIZE
+    results = []
+    first = 0
+    while True:
+        page = fetch(query={"first": first, "max": page_size}, **kwargs)
+        results.extend(page)
+        if len(page) < page_size:
+            return results
+        first += page_size
+
+
+class KeycloakMembershipSnapshot:
+    """
+    In-memory view of the Keycloak users, the MAIA groups and their memberships.
+
+    The snapshot is built with one paginated listing of the users, one of the groups and one paginated listing of
+    the members of each MAIA group, instead of querying Keycloak once per user. Group names are stored without the
+    "MAIA:" prefix.
+
+    Attributes
+    ----------
+    users : list
+        All the Keycloak users.
+    users_by_email : dict
+        Keycloak users indexed by email address. Users without an email address are not indexed.
+    maia_groups : dict
+        MAIA group names, indexed by Keycloak group ID.
+    group_ids : dict
+        Keycloak group IDs, indexed by MAIA group name.
+    members : dict
+        Members (Keycloak user representations) of each MAIA group, indexed by group name. Empty if the snapshot
+        was built without memberships.
+    groups_by_email : dict
+        MAIA groups of each user, indexed by email address. Empty if the snapshot was built without memberships.
+    """
+
+    def __init__(self, users, groups, members):
+        self.users = users
+        self.users_by_email = {user["email"]: user for user in users if "email" in user}
+        self.maia_groups = {group["id"]: group["name"][len("MAIA:") :] for group in groups if group["name"].startswith("MAIA:")}
+        self.group_ids = {group_name: group_id for group_id, group_name in self.maia_groups.items()}
+        self.members = {}
+        self.groups_by_email = {}
+        for group_id, group_members in members.items():
+            group_name = self.maia_groups[group_id]
+            self.members[group_name] = group_members
+            for member in group_members:
+                if "email" in member:
+                    self.groups_by_email.setdefault(member["email"], []).append(group_name)
+
+    def get_user(self, email):
+        """Return the Keycloak user with the given email address, or None if it is not registered."""
+        return self.users_by_email.get(email)
+
+    def get_groups_for_user(self, email):
+        """Return the MAIA groups (without the "MAIA:" prefix) the user with the given email address belongs to."""
+        return self.groups_by_email.get(email, [])
+
+    def get_group_members(self, group_name):
+        """Return the members of a MAIA group, given its name without the "MAIA:" prefix."""
+        return self.members.get(group_name, [])
+
+
+def get_keycloak_membership_snapshot(settings, include_memberships=True, keycloak_admin=None) -> KeycloakMembershipSnapshot:
+    """
+    Fetch users, MAIA groups and their memberships from Keycloak in bulk.
+
+    Parameters
+    ----------
+    settings : object
+        An object containing the Keycloak server settings (OIDC_SERVER_URL, OIDC_USERNAME, OIDC_REALM_NAME,
+        OIDC_RP_CLIENT_ID, OIDC_RP_CLIENT_SECRET).
+    include_memberships : bool, optional
+        Whether to list the members of every MAIA group (default is True). Callers only looking up users and
+        groups can skip it.
+    keycloak_admin : KeycloakAdmin, optional
+        An existing Keycloak admin client. Defaults to the shared client returned by ``get_keycloak_admin``.
+
+    Returns
+    -------
+    KeycloakMembershipSnapshot
+        The snapshot of users, groups and memberships.
+    """
+    if keycloak_admin is None:
+        keycloak_admin = get_keycloak_admin(settings)
+
+    users = _fetch_all_pages(keycloak_admin.get_users)
+    groups = keycloak_admin.get_groups()
+    members = {}
+    if include_memberships:
+        for group in groups:
+            if group["name"].startswith("MAIA:"):
+                members[group["id"]] = _fetch_all_pages(keycloak_admin.get_group_members, group_id=group["id"])
+
+    return KeycloakMembershipSnapshot(users, groups, members)
+
+
 def get_user_ids(settings):
     """
     Retrieve user IDs and their associated MAIA groups from Keycloak.
@@ -170,51 +360,18 @@ def get_user_ids(settings):
         A dictionary where the keys are user email addresses and the values are lists of MAIA groups the user belongs to.
     """
 
-    keycloak_connection = KeycloakOpenIDConnection(
-        server_url=settings.OIDC_SERVER_URL,
-        username=settings.OIDC_USERNAME,
-        password="",
-        realm_name=settings.OIDC_REALM_NAME,
-        client_id=settings.OIDC_RP_CLIENT_ID,
-        client_secret_key=settings.OIDC_RP_CLIENT_SECRET,
-        verify=getattr(settings, "OIDC_CA_BUNDLE", True),
-    )
-
-    keycloak_admin = KeycloakAdmin(connection=keycloak_connection)
-
-    users = keycloak_admin.get_users()
-
-    user_list = {}
-    groups = keycloak_admin.get_groups()
-    maia_groups = {group["id"]: group["name"][len("MAIA:") :] for group in groups if group["name"].startswith("MAIA:")}
-
-    for maia_group in maia_groups:
+    keycloak_admin = get_keycloak_admin(settings)
 
-        users = keycloak_admin.get_group_members(group_id=maia_group)
-        emails = [user["email"] for user in users if "email" in user]
-        for email in emails:
-            if email in user_list:
-                user_list[email] += [maia_groups[maia_group]]
-            else:
-                user_list[email] = [maia_groups[maia_group]]
+    snapshot = get_keycloak_membership_snapshot(settings, keycloak_admin=keycloak_admin)
 
-    return user_list
+    return {email: list(groups) for email, groups in snapshot.groups_by_email.items()}
 
 
 def get_user_username_from_email(email, settings):
     """
     Retrieve the username for a user from Keycloak.
     """
-    keycloak_connection = KeycloakOpenIDConnection(
-        server_url=settings.OIDC_SERVER_URL,
-        username=settings.OIDC_USERNAME,
-        password="",
-        realm_name=settings.OIDC_REALM_NAME,
-        client_id=settings.OIDC_RP_CLIENT_ID,
-        client_secret_key=settings.OIDC_RP_CLIENT_SECRET,
-        verify=getattr(settings, "OIDC_CA_BUNDLE", True),
-    )
-    keycloak_admin = KeycloakAdmin(connection=keycloak_connection)
+    keycloak_admin = get_keycloak_admin(settings)
     users = keycloak_admin.get_users()
     for user in users:
         if "email" in user and user["email"] == email:
@@ -244,16 +401,7 @@ def get_groups_for_user(email, settings):
         A list of MAIA groups that the user is associated with.
     """
 
-    keycloak_connection = KeycloakOpenIDConnection(
-        server_url=settings.OIDC_SERVER_URL,
-        username=settings.OIDC_USERNAME,
-        password="",
-        realm_name=settings.OIDC_REALM_NAME,
-        client_id=settings.OIDC_RP_CLIENT_ID,
-        client_secret_key=settings.OIDC_RP_CLIENT_SECRET,
-        verify=getattr(settings, "OIDC_CA_BUNDLE", True),
-    )
-    keycloak_admin = KeycloakAdmin(connection=keycloak_connection)
+    keycloak_admin = get_keycloak_admin(settings)
     groups = keycloak_admin.get_groups()
     maia_groups = {group["id"]: group["name"][len("MAIA:") :] for group in groups if group["name"].startswith("MAIA:")}
 
@@ -290,16 +438,7 @@ def remove_user_from_group_in_keycloak(email, group_id, settings) -> None:
     None
     """
 
-    keycloak_connection = KeycloakOpenIDConnection(
-        server_url=settings.OIDC_SERVER_URL,
-        username=settings.OIDC_USERNAME,
-        password="",
-        realm_name=settings.OIDC_REALM_NAME,
-        client_id=settings.OIDC_RP_CLIENT_ID,
-        client_secret_key=settings.OIDC_RP_CLIENT_SECRET,
-        verify=getattr(settings, "OIDC_CA_BUNDLE", True),
-    )
-    keycloak_admin = KeycloakAdmin(connection=keycloak_connection)
+    keycloak_admin = get_keycloak_admin(settings)
     groups = keycloak_admin.get_groups()
     maia_groups = {group["id"]: group["name"][len("MAIA:") :] for group in groups if group["name"].startswith("MAIA:")}
 
@@ -313,6 +452,141 @@ def remove_user_from_group_in_keycloak(email, group_id, settings) -> None:
     return None
 
 
+def _map_concurrently(function, items, max_workers=None) -> list:
+    """Apply ``function`` to each item with at most ``max_workers`` concurrent calls, preserving the order."""
+    items = list(items)
+    if len(items) <= 1:
+        return [function(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(len(items), max_workers or KEYCLOAK_MAX_WORKERS)) as executor:
+        return list(executor.map(function, items))
+
+
+def _get_maia_group_ids(keycloak_admin) -> dict[str, str]:
+    """Return the Keycloak IDs of the MAIA groups, indexed by group name without the "MAIA:" prefix."""
+    return {
+        group["name"][len("MAIA:") :]: group["id"] for group in keycloak_admin.get_groups() if group["name"].startswith("MAIA:")
+    }
+
+
+def get_users_by_email_in_keycloak(emails, settings, keycloak_admin=None, max_workers=None) -> dict[str, dict | None]:
+    """
+    Look up Keycloak users by email address, without listing all the users of the realm.
+
+    Each email address is resolved with a targeted ``get_users`` query; the queries are sent concurrently.
+
+    Parameters
+    ----------
+    emails : list
+        The email addresses to look up.
+    settings : object
+        An object containing the Keycloak server settings (OIDC_SERVER_URL, OIDC_USERNAME, OIDC_REALM_NAME,
+        OIDC_RP_CLIENT_ID, OIDC_RP_CLIENT_SECRET).
+    keycloak_admin : KeycloakAdmin, optional
+        An existing Keycloak admin client. Defaults to the shared client returned by ``get_keycloak_admin``.
+    max_workers : int, optional
+        Maximum number of concurrent queries. Defaults to ``KEYCLOAK_MAX_WORKERS``.
+
+    Returns
+    -------
+    dict
+        The Keycloak user representation of each email address, or None if no user is registered with it.
+    """
+    if keycloak_admin is None:
+        keycloak_admin = get_keycloak_admin(settings)
+
+    def _lookup(email):
+        # The email query matches substrings unless "exact" is supported, and Keycloak stores emails in lowercase.
+        for user in keycloak_admin.get_users(query={"email": email, "exact": True}):
+            if user.get("email", "").lower() == email.lower():
+                return user
+        return None
+
+    emails = list(dict.fromkeys(emails))
+    return dict(zip(emails, _map_concurrently(_lookup, emails, max_workers)))
+
+
+def update_group_members_in_keycloak(
+    group_id, settings, emails_to_add=(), emails_to_remove=(), keycloak_admin=None, max_workers=None
+) -> dict[str, str]:
+    """
+    Add and remove members of a MAIA group in bulk.
+
+    The group and its current members are fetched once, so that users already in (or already out of) the group
+    are left untouched and the users to remove need no lookup. The users to add are resolved with targeted,
+    concurrent lookups (see ``get_users_by_email_in_keycloak``), and the membership changes are then applied
+    concurrently. A failed change does not stop the others: it is logged and reported in the results.
+
+    Parameters
+    ----------
+    group_id : str
+        The name of the MAIA group, without the "MAIA:" prefix.
+    settings : object
+        An object containing the Keycloak server settings (OIDC_SERVER_URL, OIDC_USERNAME, OIDC_REALM_NAME,
+        OIDC_RP_CLIENT_ID, OIDC_RP_CLIENT_SECRET).
+    emails_to_add : list, optional
+        Email addresses of the users to add to the group.
+    emails_to_remove : list, optional
+        Email addresses of the users to remove from the group. An email address listed in both lists is added.
+    keycloak_admin : KeycloakAdmin, optional
+        An existing Keycloak admin client. Defaults to the shared client returned by ``get_keycloak_admin``.
+    max_workers : int, optional
+        Maximum number of concurrent requests. Defaults to ``KEYCLOAK_MAX_WORKERS``.
+
+    Returns
+    -------
+    dict
+        The outcome for each email address: "added", "removed", "unchanged" (already in, or already out of, the
+        group), "not_found" (no such user, or no such group in Keycloak) or "failed".
+    """
+    if keycloak_admin is None:
+        keycloak_admin = get_keycloak_admin(settings)
+
+    emails_to_add = list(dict.fromkeys(emails_to_add))
+    emails_to_remove = [email for email in dict.fromkeys(emails_to_remove) if email not in emails_to_add]
+    results = {email: "unchanged" for email in emails_to_add + emails_to_remove}
+    if not results:
+        return results
+
+    keycloak_group_id = _get_maia_group_ids(keycloak_admin).get(group_id)
+    if keycloak_group_id is None:
+        logger.warning(f"Group {group_id} does not exist in Keycloak")
+        return {email: "not_found" for email in results}
+
+    members = {
+        member["email"].lower(): member["id"]
+        for member in _fetch_all_pages(keycloak_admin.get_group_members, group_id=keycloak_group_id)
+        if "email" in member
+    }
+
+    changes = [(email, members[email.lower()], "removed") for email in emails_to_remove if email.lower() in members]
+    users = get_users_by_email_in_keycloak(
+        [email for email in emails_to_add if email.lower() not in members], settings, keycloak_admin, max_workers
+    )
+    for email, user in users.items():
+        if user is None:
+            results[email] = "not_found"
+        else:
+            changes.append((email, user["id"], "added"))
+
+    def _apply(change):
+        email, user_id, outcome = change
+        try:
+            if outcome == "added":
+                keycloak_admin.group_user_add(user_id, keycloak_group_id)
+            else:
+                keycloak_admin.group_user_remove(user_id, keycloak_group_id)
+        except KeycloakError as e:
+            if getattr(e, "response_code", 0) == 404:
+                return "not_found"
+            logger.error(f"Error updating the membership of {email} in group {group_id}: {e}")
+            return "failed"
+        return outcome
+
+    for (email, _, _), outcome in zip(changes, _map_concurrently(_apply, changes, max_workers)):
+        results[email] = outcome
+    return results
+
+
 def delete_user_in_keycloak(email, settings) -> None:
     """
     Delete a user in Keycloak
@@ -333,16 +607,7 @@ def delete_user_in_keycloak(email, settings) -> None:
     -------
     None
     """
-    keycloak_connection = KeycloakOpenIDConnection(
-        server_url=settings.OIDC_SERVER_URL,
-        username=settings.OIDC_USERNAME,
-        password="",
-        realm_name=settings.OIDC_REALM_NAME,
-        client_id=settings.OIDC_RP_CLIENT_ID,
-        client_secret_key=settings.OIDC_RP_CLIENT_SECRET,
-        verify=getattr(settings, "OIDC_CA_BUNDLE", True),
-    )
-    keycloak_admin = KeycloakAdmin(connection=keycloak_connection)
+    keycloak_admin = get_keycloak_admin(settings)
     users = keycloak_admin.get_users(query={"email": email})
     if users:
         keycloak_admin.delete_user(users[0]["id"])
@@ -369,16 +634,7 @@ def delete_group_in_keycloak(group_id, settings) -> None:
     None
     """
 
-    keycloak_connection = KeycloakOpenIDConnection(
-        server_url=settings.OIDC_SERVER_URL,
-        username=settings.OIDC_USERNAME,
-        password="",
-        realm_name=settings.OIDC_REALM_NAME,
-        client_id=settings.OIDC_RP_CLIENT_ID,
-        client_secret_key=settings.OIDC_RP_CLIENT_SECRET,
-        verify=getattr(settings, "OIDC_CA_BUNDLE", True),
-    )
-    keycloak_admin = KeycloakAdmin(connection=keycloak_connection)
+    keycloak_admin = get_keycloak_admin(settings)
     groups = keycloak_admin.get_groups()
     maia_groups = {group["id"]: group["name"][len("MAIA:") :] for group in groups if group["name"].startswith("MAIA:")}
 
@@ -415,17 +671,7 @@ def get_groups_in_keycloak(settings) -> dict[str, str]:
         A dictionary where the keys are group IDs and the values are group names
         (with the "MAIA:" prefix removed) for groups that start with "MAIA:".
     """
-    keycloak_connection = KeycloakOpenIDConnection(
-        server_url=settings.OIDC_SERVER_URL,
-        username=settings.OIDC_USERNAME,
-        password="",
-        realm_name=settings.OIDC_REALM_NAME,
-        client_id=settings.OIDC_RP_CLIENT_ID,
-        client_secret_key=settings.OIDC_RP_CLIENT_SECRET,
-        verify=getattr(settings, "OIDC_CA_BUNDLE", True),
-    )
-
-    keycloak_admin = KeycloakAdmin(connection=keycloak_connection)
+    keycloak_admin = get_keycloak_admin(settings)
 
     groups = keycloak_admin.get_groups()
 
@@ -468,17 +714,7 @@ def register_user_in_keycloak(email, settings, username=None, temp_password="Mai
     -------
     None
     """
-    keycloak_connection = KeycloakOpenIDConnection(
-        server_url=settings.OIDC_SERVER_URL,
-        username=settings.OIDC_USERNAME,
-        password="",
-        realm_name=settings.OIDC_REALM_NAME,
-        client_id=settings.OIDC_RP_CLIENT_ID,
-        client_secret_key=settings.OIDC_RP_CLIENT_SECRET,
-        verify=getattr(settings, "OIDC_CA_BUNDLE", True),
-    )
-
-    keycloak_admin = KeycloakAdmin(connection=keycloak_connection)
+    keycloak_admin = get_keycloak_admin(settings)
 
     keycloak_username = username if username is not None and str(username).strip() else email
 
@@ -521,17 +757,7 @@ def register_group_in_keycloak(group_id, settings) -> None:
     -------
     None
     """
-    keycloak_connection = KeycloakOpenIDConnection(
-        server_url=settings.OIDC_SERVER_URL,
-        username=settings.OIDC_USERNAME,
-        password="",
-        realm_name=settings.OIDC_REALM_NAME,
-        client_id=settings.OIDC_RP_CLIENT_ID,
-        client_secret_key=settings.OIDC_RP_CLIENT_SECRET,
-        verify=getattr(settings, "OIDC_CA_BUNDLE", True),
-    )
-
-    keycloak_admin = KeycloakAdmin(connection=keycloak_connection)
+    keycloak_admin = get_keycloak_admin(settings)
 
     payload = {
         "name": f"MAIA:{group_id}",
@@ -545,7 +771,7 @@ def register_group_in_keycloak(group_id, settings) -> None:
     keycloak_admin.create_group(payload)
 
 
-def register_users_in_group_in_keycloak(emails, group_id, settings) -> None:
+def register_users_in_group_in_keycloak(emails, group_id, settings, snapshot=None) -> None:
     """
     Registers users in a specified Keycloak group.
 
@@ -567,39 +793,47 @@ def register_users_in_group_in_keycloak(emails, group_id, settings) -> None:
         The client ID for Keycloak.
     - OIDC_RP_CLIENT_SECRET : str
         The client secret for Keycloak.
+    snapshot : KeycloakMembershipSnapshot, optional
+        A snapshot already fetched by the caller, used to look up users and groups. If it includes memberships,
+        users already in a group are not added again. If not provided, the users are looked up by email address
+        and added concurrently.
 
     Returns
     -------
     None
     """
-    keycloak_connection = KeycloakOpenIDConnection(
-        server_url=settings.OIDC_SERVER_URL,
-        username=settings.OIDC_USERNAME,
-        password="",
-        realm_name=settings.OIDC_REALM_NAME,
-        client_id=settings.OIDC_RP_CLIENT_ID,
-        client_secret_key=settings.OIDC_RP_CLIENT_SECRET,
-        verify=getattr(settings, "OIDC_CA_BUNDLE", True),
-    )
+    keycloak_admin = get_keycloak_admin(settings)
 
-    keycloak_admin = KeycloakAdmin(connection=keycloak_connection)
+    if snapshot is None:
+        # Resolve the few users to add with targeted lookups instead of listing all the users of the realm.
+        group_ids = _get_maia_group_ids(keycloak_admin)
+        users = [user for user in get_users_by_email_in_keycloak(emails, settings, keycloak_admin).values() if user]
 
-    groups = keycloak_admin.get_groups()
+        def _add(user):
+            if group_id in group_ids:
+                keycloak_admin.group_user_add(user["id"], group_ids[group_id])
+            if settings.USERS_GROUP in group_ids:
+                try:
+                    keycloak_admin.group_user_add(user["id"], group_ids[settings.USERS_GROUP])
+                except KeycloakError:
+                    ...
 
-    users = keycloak_admin.get_users()
-    for user in users:
-        if "email" in user and user["email"] in emails:
-            uid = user["id"]
-            for group in groups:
-                if group["name"] == "MAIA:" + group_id:
-                    gid = group["id"]
-                    keycloak_admin.group_user_add(uid, gid)
-                elif group["name"] == "MAIA:" + settings.USERS_GROUP:
-                    try:
-                        gid = group["id"]
-                        keycloak_admin.group_user_add(uid, gid)
-                    except Exception:
-                        ...
+        _map_concurrently(_add, users)
+        return
+
+    for email in dict.fromkeys(emails):
+        user = snapshot.get_user(email)
+        if user is None:
+            continue
+        uid = user["id"]
+        user_groups = snapshot.get_groups_for_user(email)
+        if group_id in snapshot.group_ids and group_id not in user_groups:
+            keycloak_admin.group_user_add(uid, snapshot.group_ids[group_id])
+        if settings.USERS_GROUP in snapshot.group_ids and settings.USERS_GROUP not in user_groups:
+            try:
+                keycloak_admin.group_user_add(uid, snapshot.group_ids[settings.USERS_GROUP])
+            except Exception:
+                ...
 
 
 def get_list_of_groups_requesting_a_user(email, user_model) -> list[str]:
@@ -638,10 +872,11 @@ def get_list_of_users_requesting_a_group(maia_user_model, group_id) -> list[str]
 
     Parameters
     ----------
+    maia_user_model : object
+        The user model to query. Models exposing ``NAMESPACES_FIELD`` (the MongoDB backend) are queried on their
+        indexed array of namespaces, or on the namespace string for users stored before the array was introduced.
     group_id : str
         The ID of the group to check for user requests.
-    settings : object
-        A settings object that contains configuration parameters, including DEBUG and LOCAL_DB_PATH.
 
     Returns
     -------
@@ -661,8 +896,15 @@ def get_list_of_users_requesting_a_group(maia_user_model, group_id) -> list[str]
     When settings.DEBUG is False, a MySQL database is used with connection parameters from environment variables.
     """
 
+    namespaces_field = getattr(maia_user_model, "NAMESPACES_FIELD", None)
+    if isinstance(namespaces_field, str):
+        # Indexed array of the requested namespaces (MongoDB backend), with a fallback on the comma-joined string for
+        # the users not backfilled yet.
+        return [user.email for user in maia_user_model.objects.filter(**{f"{namespaces_field}__contains": group_id})]
+
+    # The substring filter runs in the database, the exact match on the comma-joined string in Python.
     users = []
-    for user in maia_user_model.objects.all():
+    for user in maia_user_model.objects.filter(namespace__contains=group_id):
         requested_namespaces = user.namespace.split(",")
         if group_id in requested_namespaces:
             users.append(user.email)
@@ -695,32 +937,18 @@ def get_maia_users_from_keycloak(settings) -> list[dict[str, Any]]:
         A list of dictionaries containing user information for all users in MAIA groups.
         Each dictionary contains user details like email, username, and groups.
     """
-    keycloak_connection = KeycloakOpenIDConnection(
-        server_url=settings.OIDC_SERVER_URL,
-        username=settings.OIDC_USERNAME,
-        password="",
-        realm_name=settings.OIDC_REALM_NAME,
-        client_id=settings.OIDC_RP_CLIENT_ID,
-        client_secret_key=settings.OIDC_RP_CLIENT_SECRET,
-        verify=getattr(settings, "OIDC_CA_BUNDLE", True),
-    )
-
-    keycloak_admin = KeycloakAdmin(connection=keycloak_connection)
+    keycloak_admin = get_keycloak_admin(settings)
 
-    # Get all groups that start with "MAIA:"
-    # groups = keycloak_admin.get_groups()
-    # maia_groups = {group["id"]: group["name"] for group in groups if group["name"].startswith("MAIA:")}
+    snapshot = get_keycloak_membership_snapshot(settings, keycloak_admin=keycloak_admin)
 
-    # Get all users and filter those who are in MAIA groups
+    # Filter the users who are in MAIA groups
     maia_users = []
-    all_users = keycloak_admin.get_users()
 
-    for user in all_users:
+    for user in snapshot.users:
         if "email" not in user:
             continue
 
-        user_groups = keycloak_admin.get_user_groups(user_id=user["id"])
-        user_maia_groups = [group["name"] for group in user_groups if group["name"].startswith("MAIA:")]
+        user_maia_groups = ["MAIA:" + group for group in snapshot.get_groups_for_user(user["email"])]
 
         if user_maia_groups:
             maia_users.append(
@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import contextvars
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+import kubernetes
+import yaml
+from kubernetes import client, config
+
+# Maximum number of Kubernetes API clients kept alive, one per (cluster, identity).
+KUBE_CLIENT_CACHE_SIZE = int(os.environ.get("KUBE_CLIENT_CACHE_SIZE", "32"))
+# Maximum number of keep-alive connections of each API client to its API server.
+KUBE_CLIENT_POOL_MAXSIZE = int(os.environ.get("KUBE_CLIENT_POOL_MAXSIZE", "8"))
+
+_api_clients = OrderedDict()
+_api_clients_lock = threading.Lock()
+_api_clients_pid = os.getpid()
+_kube_context = contextvars.ContextVar("kube_context", default=None)
+
+
+def get_kubeconfig_identity(kubeconfig_dict):
+    """
+    Return a key identifying the cluster and the user of the current context of a kubeconfig.
+
+    Parameters
+    ----------
+    kubeconfig_dict : dict
+        The kubeconfig.
+
+    Returns
+    -------
+    str
+        A digest of the cluster (server, certificate authority) and user (credentials) entries of the current context.
+    """
+    contexts = {context["name"]: context["context"] for context in kubeconfig_dict.get("contexts", [])}
+    current = contexts.get(kubeconfig_dict.get("current-context"))
+    if current is None:
+        identity = kubeconfig_dict
+    else:
+        clusters = {cluster["name"]: cluster.get("cluster") for cluster in kubeconfig_dict.get("clusters", [])}
+        users = {user["name"]: user.get("user") for user in kubeconfig_dict.get("users", [])}
+        identity = [clusters.get(current.get("cluster")), users.get(current.get("user"))]
+    return hashlib.sha256(json.dumps(identity, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def get_api_client(kubeconfig_dict):
+    """
+    Return an API client for a kubeconfig, without touching the global Kubernetes configuration.
+
+    The clients are cached per (cluster, identity), so that their connection pool is reused across requests, and the
+    least recently used clients are dropped beyond ``KUBE_CLIENT_CACHE_SIZE``.
+
+    Parameters
+    ----------
+    kubeconfig_dict : dict
+        The kubeconfig.
+
+    Returns
+    -------
+    kubernetes.client.ApiClient
+        The API client.
+    """
+    global _api_clients_pid
+    key = get_kubeconfig_identity(kubeconfig_dict)
+    with _api_clients_lock:
+        if _api_clients_pid != os.getpid():
+            # Connection pools must not be shared with a parent process (e.g. gunicorn preloading the app).
+            _api_clients.clear()
+            _api_clients_pid = os.getpid()
+        if key in _api_clients:
+            _api_clients.move_to_end(key)
+            return _api_clients[key]
+    configuration = client.Configuration()
+    config.load_kube_config_from_dict(kubeconfig_dict, client_configuration=configuration)
+    configuration.connection_pool_maxsize = KUBE_CLIENT_POOL_MAXSIZE
+    api_client = client.ApiClient(configuration)
+    with _api_clients_lock:
+        api_client = _api_clients.setdefault(key, api_client)
+        _api_clients.move_to_end(key)
+        while len(_api_clients) > KUBE_CLIENT_CACHE_SIZE:
+            _api_clients.popitem(last=False)
+    return api_client
+
+
+class KubeContext:
+    """
+    The Kubernetes clusters a request works on.
+
+    Parameters
+    ----------
+    kubeconfig_dict : dict
+        Kubeconfig of the main cluster, i.e. the one running ArgoCD (what ``KUBECONFIG`` points to).
+    local_kubeconfig_dict : dict, optional
+        Kubeconfig of the cluster hosting the project (what ``KUBECONFIG_LOCAL`` points to). Defaults to the main one.
+    """
+
+    def __init__(self, kubeconfig_dict, local_kubeconfig_dict=None):
+        self.kubeconfigs = {False: kubeconfig_dict, True: local_kubeconfig_dict or kubeconfig_dict}
+        self._paths = {}
+
+    def api_client(self, local=False):
+        """Return the API client of the main (or the local) cluster."""
+        return get_api_client(self.kubeconfigs[local])
+
+    def kubeconfig_path(self, local=False):
+        """Return a private kubeconfig file of the main (or the local) cluster, for Helm and pyhelm3."""
+        if local not in self._paths:
+            fd, path = tempfile.mkstemp(prefix="kubeconfig-", suffix=".yaml")
+            with os.fdopen(fd, "w") as f:
+                yaml.dump(self.kubeconfigs[local], f)
+            self._paths[local] = path
+        return self._paths[local]
+
+    def close(self):
+        """Remove the kubeconfig files written for this context."""
+        for path in self._paths.values():
+            Path(path).unlink(missing_ok=True)
+        self._paths = {}
+
+
+@contextmanager
+def kube_context(kubeconfig_dict, local_kubeconfig_dict=None):
+    """
+    Run a block against the given clusters, isolated from the other requests and threads.
+
+    The ``*_from_context`` helpers and the deployment functions called within the block use the API clients and
+    kubeconfig files of this context instead of the global Kubernetes configuration and ``os.environ``.
+
+    Parameters
+    ----------
+    kubeconfig_dict : dict or None
+        Kubeconfig of the main cluster. If None, the active context (if any) is kept.
+    local_kubeconfig_dict : dict, optional
+        Kubeconfig of the cluster hosting the project. Defaults to the main one.
+
+    Yields
+    ------
+    KubeContext or None
+        The active context.
+    """
+    if kubeconfig_dict is None:
+        yield _kube_context.get()
+        return
+    context = KubeContext(kubeconfig_dict, local_kubeconfig_dict)
+    token = _kube_context.set(context)
+    try:
+        yield context
+    finally:
+        _kube_context.reset(token)
+        context.close()
+
+
+def get_kube_context():
+    """Return the active ``KubeContext``, or None outside of ``kube_context``."""
+    return _kube_context.get()
+
+
+def get_kube_api_client(local=False):
+    """
+    Return the API client of the main (or the local) cluster of the active context.
+
+    Outside of ``kube_context``, as in the command-line scripts, the local client is built from the
+    ``KUBECONFIG_LOCAL`` (or ``KUBECONFIG``) file, and None is returned for the main cluster so that the global
+    Kubernetes configuration is used.
+
+    Parameters
+    ----------
+    local : bool, optional
+        Return the client of the cluster hosting the project instead of the main cluster.
+
+    Returns
+    -------
+    kubernetes.client.ApiClient or None
+        The API client, to be passed to the ``kubernetes.client`` APIs.
+    """
+    context = _kube_context.get()
+    if context is not None:
+        return context.api_client(local)
+    if not local:
+        return None
+    kubeconfig_dict = get_kubeconfig_dict(local=True)
+    return get_api_client(kubeconfig_dict) if kubeconfig_dict is not None else None
+
+
+@contextmanager
+def kube_api_client(local=False):
+    """
+    Drop-in replacement for ``with kubernetes.client.ApiClient() as api_client``, honouring the active context.
+
+    The shared client of the active context is not closed on exit, so that its connection pool is reused.
+
+    Parameters
+    ----------
+    local : bool, optional
+        Use the cluster hosting the project instead of the main cluster.
+
+    Yields
+    ------
+    kubernetes.client.ApiClient
+        The API client.
+    """
+    api_client = get_kube_api_client(local)
+    if api_client is not None:
+        yield api_client
+        return
+    with kubernetes.client.ApiClient() as api_client:
+        yield api_client
+
+
+def get_kubeconfig_path(local=False):
+    """
+    Return a kubeconfig file of the main (or the local) cluster, for the tools that need a file (Helm, pyhelm3).
+
+    Parameters
+    ----------
+    local : bool, optional
+        Return the kubeconfig of the cluster hosting the project instead of the main cluster.
+
+    Returns
+    -------
+    str or None
+        The path of the kubeconfig file of the active context, or ``KUBECONFIG`` (``KUBECONFIG_LOCAL``) outside of it.
+    """
+    context = _kube_context.get()
+    if context is not None:
+        return context.kubeconfig_path(local)
+    if local and "KUBECONFIG_LOCAL" in os.environ:
+        return os.environ["KUBECONFIG_LOCAL"]
+    return os.environ.get("KUBECONFIG")
+
+
+def get_kubeconfig_dict(local=False):
+    """
+    Return the kubeconfig of the main (or the local) cluster.
+
+    Parameters
+    ----------
+    local : bool, optional
+        Return the kubeconfig of the cluster hosting the project instead of the main cluster.
+
+    Returns
+    -------
+    dict or None
+        The kubeconfig of the active context, or the content of ``KUBECONFIG`` (``KUBECONFIG_LOCAL``) outside of it.
+    """
+    context = _kube_context.get()
+    if context is not None:
+        return context.kubeconfigs[local]
+    kubeconfig_path = get_kubeconfig_path(local)
+    return yaml.safe_load(Path(kubeconfig_path).read_text()) if kubeconfig_path is not None else None
+
+
+def get_kube_subprocess_env(local=False):
+    """Return the environment of a Helm subprocess, with ``KUBECONFIG`` pointing at the active context (None outside)."""
+    if _kube_context.get() is None:
+        return None
+    return {**os.environ, "KUBECONFIG": get_kubeconfig_path(local)}
@@ -1,21 +1,249 @@
 from __future__ import annotations
 
 import base64
+import hashlib
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from pathlib import Path
-from minio import Minio
 import kubernetes
 import requests
-import yaml
 from kubernetes import config, client
 from kubernetes.client.rest import ApiException
+from kubernetes.utils import parse_quantity
 from loguru import logger
 import urllib3
 
+from MAIA.kube_clients import get_kube_api_client, get_kube_context, kube_api_client, kube_context
+from MAIA.lazy_imports import LazyImport
+
+Minio = LazyImport("minio", "Minio")
+
 CLUSTER_OFFLINE_MARKER = "Cluster API Not Reachable"
 
+# Per-cluster deadline (in seconds) applied when querying the Kubernetes API servers of the federated clusters.
+# Clusters not answering within the deadline are reported as offline instead of stalling the caller.
+CLUSTER_API_TIMEOUT = float(os.environ.get("CLUSTER_API_TIMEOUT", "10"))
+CLUSTER_API_MAX_WORKERS = int(os.environ.get("CLUSTER_API_MAX_WORKERS", "16"))
+
+GIBIBYTE = 1024.0**3
+
+# Lifetime (in seconds) of the ingresses and services listings cached by ``get_namespace_details``. The listings of
+# the global namespaces (XNAT, Kubeflow) are shared across all the users, the others are cached per user token.
+NAMESPACE_DETAILS_CACHE_TTL = float(os.environ.get("NAMESPACE_DETAILS_CACHE_TTL", "15"))
+
+_cluster_api_session = None
+_cluster_api_session_lock = threading.Lock()
+_cluster_api_session_pid = None
+
+
+def get_cluster_api_session():
+    """
+    Return the process-wide HTTP session used to query the cluster API servers.
+
+    The session keeps a pool of keep-alive connections per API server, so that repeated queries
+    (and concurrent queries from the fan-out engine) reuse the TLS connections instead of opening a new one per request.
+
+    Returns
+    -------
+    requests.Session
+        The shared HTTP session.
+    """
+    global _cluster_api_session, _cluster_api_session_pid
+    if _cluster_api_session is None or _cluster_api_session_pid != os.getpid():
+        with _cluster_api_session_lock:
+            # Connection pools must not be shared with a parent process (e.g. gunicorn preloading the app).
+            if _cluster_api_session is None or _cluster_api_session_pid != os.getpid():
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=CLUSTER_API_MAX_WORKERS, pool_maxsize=CLUSTER_API_MAX_WORKERS
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.verify = False
+                _cluster_api_session = session
+                _cluster_api_session_pid = os.getpid()
+    return _cluster_api_session
+
+
+def get_cluster_token(api_url, id_token, private_clusters=None):
+    """
+    Return the bearer token to use for the given cluster API URL.
+
+    Parameters
+    ----------
+    api_url : str
+        The API URL of the cluster.
+    id_token : str
+        The ID token of the user, used for public clusters.
+    private_clusters : dict, optional
+        A dictionary mapping private cluster API URLs to their tokens. Defaults to {}.
+
+    Returns
+    -------
+    str
+        The token for the cluster.
+    """
+    if private_clusters is not None and api_url in private_clusters:
+        return private_clusters[api_url]
+    return id_token
+
+
+def _get_cluster_resource(api_url, path, token, timeout):
+    response = get_cluster_api_session().get(
+        api_url + path, headers={"Authorization": "Bearer {}".format(token)}, verify=False, timeout=timeout
+    )
+    return json.loads(response.text)
+
+
+def fetch_from_clusters(id_token, queries, private_clusters=None, timeout=None):
+    """
+    Query the Kubernetes API servers of several clusters in parallel.
+
+    Queries served by the cluster-state cache (see ``MAIA.cluster_cache``), when enabled, are answered from memory.
+    The other queries are issued concurrently on a shared, keep-alive HTTP session. The whole fan-out is bounded by
+    ``timeout``: queries that fail, return an invalid JSON body or do not complete within the deadline are
+    reported as ``None``, so that a single slow or unreachable cluster does not delay the others.
+
+    Parameters
+    ----------
+    id_token : str
+        The ID token used for authorization when accessing public clusters.
+    queries : list
+        A list of ``(api_url, path)`` tuples, e.g. ``("https://api.cluster", "/api/v1/nodes")``.
+    private_clusters : dict, optional
+        A dictionary mapping private cluster API URLs to their tokens. Defaults to {}.
+    timeout : float, optional
+        Deadline in seconds for the whole fan-out. Defaults to ``CLUSTER_API_TIMEOUT``.
+
+    Returns
+    -------
+    dict
+        A dictionary mapping each ``(api_url, path)`` query to the decoded JSON response, or ``None`` if the
+        cluster could not be reached in time.
+    """
+    from MAIA.cluster_cache import get_cluster_state_cache
+
+    if timeout is None:
+        timeout = CLUSTER_API_TIMEOUT
+    results = {query: None for query in queries}
+    cluster_state_cache = get_cluster_state_cache()
+    if cluster_state_cache is not None and private_clusters:
+        for api_url, path in results:
+            if api_url in private_clusters:
+                results[(api_url, path)] = cluster_state_cache.get(api_url, path, private_clusters[api_url])
+    pending = [query for query, body in results.items() if body is None]
+    if len(pending) == 0:
+        return results
+
+    executor = ThreadPoolExecutor(max_workers=min(len(pending), CLUSTER_API_MAX_WORKERS))
+    futures = {
+        executor.submit(_get_cluster_resource, api_url, path, get_cluster_token(api_url, id_token, private_clusters), timeout): (
+            api_url,
+            path,
+        )
+        for api_url, path in pending
+    }
+    done, not_done = wait(futures, timeout=timeout)
+    # Late requests are abandoned: the connection timeout passed to requests bounds their lifetime.
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    for future in done:
+        api_url, path = futures[future]
+        try:
+            results[(api_url, path)] = future.result()
+        except Exception as e:
+            logger.debug(f"Error querying {api_url}{path}: {e}")
+    for future in not_done:
+        api_url, path = futures[future]
+        logger.warning(f"Cluster API {api_url} did not answer {path} within {timeout} s, marking it as offline")
+    return results
+
+
+@lru_cache(maxsize=4096)
+def parse_kubernetes_quantity(quantity):
+    """
+    Parse a Kubernetes resource quantity into a float expressed in base units.
+
+    Supports binary (Ki, Mi, Gi, Ti, Pi, Ei) and decimal (n, u, m, k, M, G, T, P, E) suffixes as well as
+    exponent notation, e.g. ``"500m"`` -> 0.5 cores, ``"4Gi"`` -> 4294967296 bytes, ``"1e3"`` -> 1000.
+
+    Parameters
+    ----------
+    quantity : str or int or float
+        The quantity, as found in the ``resources`` or ``allocatable`` fields of a pod or node.
+
+    Returns
+    -------
+    float
+        The quantity in base units (cores for CPU, bytes for memory).
+    """
+    return float(parse_quantity(quantity))
+
+
+def _effective_container_requests(container):
+    resources = container.get("resources") or {}
+    # As done by the Kubernetes scheduler, a resource with a limit but no request is requested at its limit.
+    return {**(resources.get("limits") or {}), **(resources.get("requests") or {})}
+
+
+def get_pod_resource_requests(pod):
+    """
+    Compute the effective GPU, CPU and memory requests of a pod.
+
+    The requests of the regular containers are summed, and, following the Kubernetes scheduling rules, the pod requests
+    are at least the largest request of any of its init containers.
+
+    Parameters
+    ----------
+    pod : dict
+        The pod, as returned by the Kubernetes API.
+
+    Returns
+    -------
+    tuple
+        A tuple ``(gpu, cpu, memory)`` with the number of GPUs, the CPU cores and the memory in bytes requested by the pod.
+    """
+    gpu, cpu, memory = 0, 0.0, 0.0
+    for container in pod["spec"].get("containers", []):
+        req = _effective_container_requests(container)
+        gpu += int(req.get("nvidia.com/gpu", 0))
+        cpu += parse_kubernetes_quantity(req.get("cpu", 0))
+        memory += parse_kubernetes_quantity(req.get("memory", 0))
+    for container in pod["spec"].get("initContainers", []):
+        req = _effective_container_requests(container)
+        gpu = max(gpu, int(req.get("nvidia.com/gpu", 0)))
+        cpu = max(cpu, parse_kubernetes_quantity(req.get("cpu", 0)))
+        memory = max(memory, parse_kubernetes_quantity(req.get("memory", 0)))
+    return gpu, cpu, memory
+
+
+def index_running_pods_by_node(pods):
+    """
+    Group the running pods by the node they are scheduled on, in a single pass over the pod list.
+
+    Parameters
+    ----------
+    pods : dict
+        The pod list, as returned by the Kubernetes API.
+
+    Returns
+    -------
+    dict
+        A dictionary mapping node names to the list of running pods scheduled on them.
+    """
+    pods_by_node = {}
+    for pod in pods["items"]:
+        node_name = pod["spec"].get("nodeName")
+        if node_name is None or pod["status"].get("phase") != "Running":
+            continue
+        pods_by_node.setdefault(node_name, []).append(pod)
+    return pods_by_node
+
 
 def get_minio_shareable_link(object_name, bucket_name, settings):
     try:
@@ -71,13 +299,6 @@ def label_pod_for_deletion(namespace, pod_name):
         If there is an error labeling the pod for deletion.
     """
 
-    # Load Kubernetes configuration
-    # config.load_incluster_config()  # Use in-cluster config
-    if "KUBECONFIG_LOCAL" not in os.environ:
-        os.environ["KUBECONFIG_LOCAL"] = os.environ["KUBECONFIG"]
-    kubeconfig = yaml.safe_load(Path(os.environ["KUBECONFIG_LOCAL"]).read_text())
-    config.load_kube_config_from_dict(kubeconfig)
-
     # Label the pod for deletion
     body = {
         "metadata": {
@@ -85,7 +306,7 @@ def label_pod_for_deletion(namespace, pod_name):
         }
     }
     try:
-        with kubernetes.client.ApiClient() as api_client:
+        with kube_api_client(local=True) as api_client:
             api_instance = kubernetes.client.CoreV1Api(api_client)
             api_instance.patch_namespaced_pod(name=pod_name, namespace=namespace, body=body)
             logger.info(f"Pod {pod_name} labeled for deletion")
@@ -93,7 +314,7 @@ def label_pod_for_deletion(namespace, pod_name):
         logger.error(f"Error labeling pod {pod_name} for deletion: {e}")
 
 
-def get_namespaces(id_token, api_urls, private_clusters=None):
+def get_namespaces(id_token, api_urls, private_clusters=None, timeout=None):
     """
     Retrieves a list of unique namespaces from multiple API URLs.
 
@@ -105,6 +326,8 @@ def get_namespaces(id_token, api_urls, private_clusters=None):
         A list of API URLs to query for namespaces.
     private_clusters : dict, optional
         A dictionary where keys are API URLs of private clusters and values are their respective tokens. Defaults to an empty dict.
+    timeout : float, optional
+        Deadline in seconds for the cluster queries. Defaults to ``CLUSTER_API_TIMEOUT``.
 
     Returns
     -------
@@ -113,33 +336,18 @@ def get_namespaces(id_token, api_urls, private_clusters=None):
     """
     if "BACKEND" in os.environ and os.environ["BACKEND"] == "compose":
         return [os.environ["PROJECT_NAME"]]
-    if private_clusters is None:
-        private_clusters = {}
     namespace_list = []
-    for api_url in api_urls:
-        if api_url in private_clusters:
-            token = private_clusters[api_url]
-            try:
-                response = requests.get(
-                    api_url + "/api/v1/namespaces", headers={"Authorization": "Bearer {}".format(token)}, verify=False
-                )
-            except Exception:
-                continue
-        else:
-            try:
-                response = requests.get(
-                    api_url + "/api/v1/namespaces", headers={"Authorization": "Bearer {}".format(id_token)}, verify=False
-                )
-            except Exception:
-                continue
-        namespaces = json.loads(response.text)
-        if "items" in namespaces:
+    responses = fetch_from_clusters(
+        id_token, [(api_url, "/api/v1/namespaces") for api_url in api_urls], private_clusters=private_clusters, timeout=timeout
+    )
+    for namespaces in responses.values():
+        if namespaces is not None and "items" in namespaces:
             for namespace in namespaces["items"]:
                 namespace_list.append(namespace["metadata"]["name"])
     return sorted(set(namespace_list))
 
 
-def get_cluster_status(id_token, api_urls, cluster_names, private_clusters=None):
+def get_cluster_status(id_token, api_urls, cluster_names, private_clusters=None, timeout=None):
     """
     Retrieve the status of clusters and their nodes.
 
@@ -153,6 +361,9 @@ def get_cluster_status(id_token, api_urls, cluster_names, private_clusters=None)
         A dictionary mapping API URLs to cluster names.
     private_clusters : dict, optional
         A dictionary mapping private cluster API URLs to their tokens. Defaults to {}.
+    timeout : float, optional
+        Deadline in seconds for the cluster queries. Clusters not answering in time are reported as offline.
+        Defaults to ``CLUSTER_API_TIMEOUT``.
 
     Returns
     -------
@@ -161,49 +372,17 @@ def get_cluster_status(id_token, api_urls, cluster_names, private_clusters=None)
             - node_status_dict (dict): A dictionary mapping node names to their status and schedulability.
             - cluster_dict (dict): A dictionary mapping cluster names to their node names.
     """
-    if private_clusters is None:
-        private_clusters = {}
     cluster_dict = {}
     node_status_dict = {}
+    responses = fetch_from_clusters(
+        id_token,
+        [(api_url, "/api/v1/nodes") for api_url in api_urls if not api_url.endswith("None")],
+        private_clusters=private_clusters,
+        timeout=timeout,
+    )
     for api_url in api_urls:
-
-        if api_url in private_clusters:
-            token = private_clusters[api_url]
-            try:
-                response = requests.get(
-                    api_url + "/api/v1/nodes", headers={"Authorization": "Bearer {}".format(token)}, verify=False
-                )
-            except Exception:
-
-                cluster = cluster_names[api_url]
-                cluster_dict[cluster] = [CLUSTER_OFFLINE_MARKER]
-                node_status_dict[CLUSTER_OFFLINE_MARKER] = ["API"]
-                continue
-        else:
-            if api_url.endswith("None"):
-                cluster = cluster_names[api_url]
-                cluster_dict[cluster] = [CLUSTER_OFFLINE_MARKER]
-                node_status_dict[CLUSTER_OFFLINE_MARKER] = ["API"]
-                continue
-            else:
-                try:
-                    response = requests.get(
-                        api_url + "/api/v1/nodes", headers={"Authorization": "Bearer {}".format(id_token)}, verify=False
-                    )
-                except Exception:
-                    cluster = cluster_names[api_url]
-                    cluster_dict[cluster] = [CLUSTER_OFFLINE_MARKER]
-                    node_status_dict[CLUSTER_OFFLINE_MARKER] = ["API"]
-                    continue
-        try:
-            nodes = json.loads(response.text)
-        except json.JSONDecodeError:
-            cluster = cluster_names[api_url]
-            cluster_dict[cluster] = [CLUSTER_OFFLINE_MARKER]
-            node_status_dict[CLUSTER_OFFLINE_MARKER] = ["API"]
-            continue
-
-        if "items" not in nodes:
+        nodes = responses.get((api_url, "/api/v1/nodes"))
+        if nodes is None or "items" not in nodes:
             cluster = cluster_names[api_url]
             cluster_dict[cluster] = [CLUSTER_OFFLINE_MARKER]
             node_status_dict[CLUSTER_OFFLINE_MARKER] = ["API"]
@@ -227,7 +406,7 @@ def get_cluster_status(id_token, api_urls, cluster_names, private_clusters=None)
     return node_status_dict, cluster_dict
 
 
-def get_available_resources(id_token, api_urls, cluster_names, private_clusters=None):
+def get_available_resources(id_token, api_urls, cluster_names, private_clusters=None, timeout=None):
     """
     Retrieves available GPU, CPU, and RAM resources from multiple Kubernetes clusters.
 
@@ -241,6 +420,9 @@ def get_available_resources(id_token, api_urls, cluster_names, private_clusters=
         Dictionary mapping API URLs to cluster names.
     private_clusters : list, optional
         List of private clusters with their tokens. Defaults to {}.
+    timeout : float, optional
+        Deadline in seconds for the cluster queries. Clusters not answering in time are skipped.
+        Defaults to ``CLUSTER_API_TIMEOUT``.
 
     Returns
     -------
@@ -251,44 +433,23 @@ def get_available_resources(id_token, api_urls, cluster_names, private_clusters=
             - ram_dict (dict): Dictionary with RAM availability information for each node.
             - gpu_allocations (dict): Dictionary with GPU allocation details for each pod.
     """
-    if private_clusters is None:
-        private_clusters = {}
     gpu_dict = {}
     cpu_dict = {}
     ram_dict = {}
     gpu_allocations = {}
 
+    responses = fetch_from_clusters(
+        id_token,
+        [(api_url, path) for api_url in api_urls for path in ("/api/v1/pods", "/api/v1/nodes")],
+        private_clusters=private_clusters,
+        timeout=timeout,
+    )
     for api_url in api_urls:
         cluster_name = cluster_names[api_url]
-        if api_url in private_clusters:
-            token = private_clusters[api_url]
-            try:
-                response = requests.get(
-                    api_url + "/api/v1/pods", headers={"Authorization": "Bearer {}".format(token)}, verify=False
-                )
-                pods = json.loads(response.text)
-                response = requests.get(
-                    api_url + "/api/v1/nodes", headers={"Authorization": "Bearer {}".format(token)}, verify=False
-                )
-
-                nodes = json.loads(response.text)
-
-            except Exception:
-                continue
-
-        else:
-            try:
-                response = requests.get(
-                    api_url + "/api/v1/pods", headers={"Authorization": "Bearer {}".format(id_token)}, verify=False
-                )
-                pods = json.loads(response.text)
-                response = requests.get(
-                    api_url + "/api/v1/nodes", headers={"Authorization": "Bearer {}".format(id_token)}, verify=False
-                )
-
-                nodes = json.loads(response.text)
-            except Exception:
-                continue
+        pods = responses[(api_url, "/api/v1/pods")]
+        nodes = responses[(api_url, "/api/v1/nodes")]
+        if pods is None or nodes is None or "items" not in pods or "items" not in nodes:
+            continue
 
         node_status_dict = {}
 
@@ -307,6 +468,8 @@ def get_available_resources(id_token, api_urls, cluster_names, private_clusters=
             else:
                 node_status_dict[node_name].append(False)
 
+        pods_by_node = index_running_pods_by_node(pods)
+
         for node in nodes["items"]:
 
             node_name = "{}/{}".format(cluster_name, node["metadata"]["name"])
@@ -325,94 +488,41 @@ def get_available_resources(id_token, api_urls, cluster_names, private_clusters=
                 n_gpu_allocatable = int(node["status"]["allocatable"]["nvidia.com/gpu"])
             else:
                 n_gpu_allocatable = 0
-            n_cpu_allocatable = int(node["status"]["allocatable"]["cpu"])
-            ram_allocatable = float(int(node["status"]["allocatable"]["memory"][:-2]) / (1024.0 * 1024.0))
+            n_cpu_allocatable = parse_kubernetes_quantity(node["status"]["allocatable"]["cpu"])
+            if n_cpu_allocatable.is_integer():
+                n_cpu_allocatable = int(n_cpu_allocatable)
+            ram_allocatable = parse_kubernetes_quantity(node["status"]["allocatable"]["memory"]) / GIBIBYTE
 
             n_gpu_requested = 0
             n_cpus_requested = 0
             ram_requested = 0
-            for pod in pods["items"]:
-                if "nodeName" not in pod["spec"]:
-                    continue
-                if pod["spec"]["nodeName"] != node_name.split("/")[1]:
-                    continue
-                if pod["status"].get("phase") != "Running":
-                    continue
-                containers = pod["spec"]["containers"]
-                for container in containers:
-                    resources = container["resources"]
-
-                    cpu = 0
-                    ram = 0
-                    if "requests" in resources:
-                        req = resources["requests"]
-                        if "nvidia.com/gpu" in req:
-
-                            pod_name = pod["metadata"]["name"]
-                            if pod_name.startswith("jupyter"):
-                                pod_name = pod_name.replace("-2d", "-").replace("-40", "@").replace("-2e", ".")[len("jupyter-") :]
-                            gpu_allocations[pod_name + ", " + pod["metadata"]["namespace"]] = {
-                                "node": node_name.split("/")[1],
-                                "cluster": cluster_name,
-                                "namespace": pod["metadata"]["namespace"],
-                                "gpu": req["nvidia.com/gpu"],
-                                "gpu_name": gpu_name,
-                                "gpu_size": gpu_size,
-                                "expiration": pod["metadata"]["annotations"].get("terminate-at", "N/A"),
-                            }
-                            if "terminate-at" in pod["metadata"]["annotations"]:
-                                expiry_time = datetime.strptime(
-                                    pod["metadata"]["annotations"].get("terminate-at"), "%Y-%m-%dT%H:%M:%SZ"
-                                )
-                                if datetime.utcnow() > expiry_time:
-                                    gpu_allocations[pod_name + ", " + pod["metadata"]["namespace"]]["is_expired"] = True
-
-                            n_gpu_requested += int(req["nvidia.com/gpu"])
-                        if "cpu" in req:
-                            container_cpu = req["cpu"]
-                            if container_cpu[-1] == "m":
-                                container_cpu = container_cpu[:-1]
-                                container_cpu = int(container_cpu) / 1000.0
-                            else:
-                                container_cpu = int(container_cpu)
-                            if container_cpu > cpu:
-                                cpu = container_cpu
-                        if "memory" in req:
-                            if req["memory"][-2:] == "Mi":
-                                container_memory = int(req["memory"][:-2]) / 1024.0
-                            elif req["memory"][-2:] == "Gi":
-                                container_memory = int(req["memory"][:-2])
-
-                            elif req["memory"][-1:] == "M":
-                                container_memory = int(req["memory"][:-1]) / 1024.0
-                            elif req["memory"][-1:] == "G":
-                                container_memory = int(req["memory"][:-1])
-                            else:
-
-                                container_memory = int(req["memory"]) / (1024 * 1024 * 1024)
-                            if container_memory > ram:
-                                ram = container_memory
-
-                    # if 'limits' in resources:
-                    #    lim = resources['limits']
-                    #    if 'cpu' in lim:
-                    #        container_cpu = lim['cpu']
-                    #        if container_cpu[-1] == 'm':
-                    #            container_cpu = container_cpu[:-1]
-                    #            container_cpu = int(container_cpu)/1000.
-                    #        else:
-                    #            container_cpu = int(container_cpu)
-                    #        if container_cpu > cpu:
-                    #            cpu = container_cpu
-                    #    if 'memory' in lim:
-                    #        if lim['memory'][-2:] == "Mi":
-                    #            container_memory = int(lim['memory'][:-2]) / 1024.
-                    #        elif lim['memory'][-2:] == "Gi":
-                    #            container_memory = int(lim['memory'][:-2])
-                    #        if container_memory > ram:
-                    #            ram = container_memory
-                    n_cpus_requested += cpu
-                    ram_requested += ram
+            for pod in pods_by_node.get(node["metadata"]["name"], []):
+                pod_gpu, pod_cpu, pod_memory = get_pod_resource_requests(pod)
+                n_gpu_requested += pod_gpu
+                n_cpus_requested += pod_cpu
+                ram_requested += pod_memory / GIBIBYTE
+
+                for container in pod["spec"]["containers"]:
+                    req = _effective_container_requests(container)
+                    if "nvidia.com/gpu" not in req:
+                        continue
+                    pod_name = pod["metadata"]["name"]
+                    if pod_name.startswith("jupyter"):
+                        pod_name = pod_name.replace("-2d", "-").replace("-40", "@").replace("-2e", ".")[len("jupyter-") :]
+                    annotations = pod["metadata"].get("annotations", {})
+                    gpu_allocations[pod_name + ", " + pod["metadata"]["namespace"]] = {
+                        "node": node["metadata"]["name"],
+                        "cluster": cluster_name,
+                        "namespace": pod["metadata"]["namespace"],
+                        "gpu": req["nvidia.com/gpu"],
+                        "gpu_name": gpu_name,
+                        "gpu_size": gpu_size,
+                        "expiration": annotations.get("terminate-at", "N/A"),
+                    }
+                    if "terminate-at" in annotations:
+                        expiry_time = datetime.strptime(annotations["terminate-at"], "%Y-%m-%dT%H:%M:%SZ")
+                        if datetime.utcnow() > expiry_time:
+                            gpu_allocations[pod_name + ", " + pod["metadata"]["namespace"]]["is_expired"] = True
 
             gpu_dict[node_name] = []
 
@@ -581,6 +691,128 @@ def generate_kubeconfig(id_token, user_id, namespace, cluster_id, settings, in_l
     return kube_config
 
 
+class _TTLCache:
+    """Thread-safe mapping whose entries expire ``ttl`` seconds after being stored."""
+
+    def __init__(self, ttl, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                return None
+            return entry[1]
+
+    def set(self, key, value):
+        if self.ttl <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) >= self.maxsize:
+                for expired in [key for key, (expiry, _) in self._entries.items() if expiry < now]:
+                    del self._entries[expired]
+                while len(self._entries) >= self.maxsize:
+                    del self._entries[next(iter(self._entries))]
+            self._entries[key] = (now + self.ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_namespace_resources_cache = _TTLCache(NAMESPACE_DETAILS_CACHE_TTL)
+
+
+def _fetch_namespace_resources(id_token, api_urls, namespaces, private_clusters, shared=False):
+    """
+    Fetch the ingresses and services of some namespaces on some clusters, through the namespace details cache.
+
+    The listings missing from the cache are fetched concurrently with ``fetch_from_clusters``. Listings fetched with
+    the ID token of the user are cached for that token only, unless ``shared`` is set.
+
+    Returns
+    -------
+    dict
+        A ``(ingresses, services)`` tuple of list responses for each ``(api_url, namespace)``, with None for the
+        listings that could not be fetched.
+    """
+    results = {}
+    keys = {}
+    for api_url in api_urls:
+        for namespace in namespaces:
+            key = (api_url, namespace)
+            if not shared:
+                token = get_cluster_token(api_url, id_token, private_clusters)
+                key += (hashlib.sha256(str(token).encode()).hexdigest(),)
+            keys[(api_url, namespace)] = key
+            results[(api_url, namespace)] = _namespace_resources_cache.get(key)
+
+    pending = [query for query, resources in results.items() if resources is None]
+    if len(pending) == 0:
+        return results
+    paths = {
+        namespace: (
+            f"/apis/networking.k8s.io/v1/namespaces/{namespace}/ingresses",
+            f"/api/v1/namespaces/{namespace}/services",
+        )
+        for namespace in namespaces
+    }
+    responses = fetch_from_clusters(
+        id_token,
+        [(api_url, path) for api_url, namespace in pending for path in paths[namespace]],
+        private_clusters=private_clusters,
+    )
+    for api_url, namespace in pending:
+        ingresses_path, services_path = paths[namespace]
+        resources = (responses[(api_url, ingresses_path)], responses[(api_url, services_path)])
+        results[(api_url, namespace)] = resources
+        # Only list responses are cached: an error status (e.g. a 403 for a user without access) is not shared.
+        if all(isinstance(resource, dict) and "items" in resource for resource in resources):
+            _namespace_resources_cache.set(keys[(api_url, namespace)], resources)
+    return results
+
+
+# Workspace applications exposed by the ingresses of a project namespace, indexed by the backend service name.
+_NAMESPACE_BACKENDS = {
+    "proxy-public": "hub",
+    "{namespace}-orthanc-svc": "orthanc",
+    "{namespace}-mlflow-mkg": "mlflow",
+    "{namespace}-filebrowser-maia-filebrowser": "filebrowser",
+}
+# Applications exposed by the ingresses of the global namespaces, indexed by the backend service name.
+_GLOBAL_NAMESPACE_BACKENDS = {"maia-xnat": "xnat", "istio-ingressgateway": "kubeflow"}
+MONAI_LABEL_SERVICE_SUFFIX = "-maia-monailabel"
+
+
+@lru_cache(maxsize=256)
+def _namespace_backend_rules(namespace):
+    """Return the backend service names of the workspace applications of a namespace, mapped to the application."""
+    return {service_name.format(namespace=namespace): app for service_name, app in _NAMESPACE_BACKENDS.items()}
+
+
+def _ingress_paths(ingresses, default_host):
+    """Yield ``(ingress, backend service, url)`` for every path of every rule of the listed ingresses."""
+    for ingress in ingresses.get("items", []):
+        for rule in ingress["spec"]["rules"]:
+            host = rule.get("host", default_host)
+            for path in rule["http"]["paths"]:
+                yield ingress, path["backend"]["service"], "https://" + host + path["path"]
+
+
+def _with_trailing_slash(url):
+    return url if url.endswith("/") else url + "/"
+
+
+def _decode_jupyter_user(service_name, suffix=""):
+    """Return the user of a JupyterHub single-user service, e.g. ``jupyter-jane-2edoe-40maia-2eorg`` -> ``jane.doe@maia.org``."""
+    user = service_name[len("jupyter-") : len(service_name) - len(suffix)]
+    return user.replace("-2d", "-").replace("-40", "@").replace("-2e", ".")
+
+
 def get_namespace_details(settings, id_token, namespace, user_id, is_admin=False):
     """
     Retrieve details about the namespace including workspace applications, remote desktops, SSH ports, MONAI models,
@@ -618,216 +850,80 @@ def get_namespace_details(settings, id_token, namespace, user_id, is_admin=False
     deployed_clusters = []
     nvflare_dashboards = []
 
+    backend_rules = _namespace_backend_rules(namespace)
+    namespace_resources = _fetch_namespace_resources(id_token, settings.API_URL, [namespace], settings.PRIVATE_CLUSTERS)
     for api_url in settings.API_URL:
-        if api_url in settings.PRIVATE_CLUSTERS:
-            token = settings.PRIVATE_CLUSTERS[api_url]
-            response = requests.get(
-                api_url + "/apis/networking.k8s.io/v1/namespaces/{}/ingresses".format(namespace),
-                headers={"Authorization": "Bearer {}".format(token)},
-                verify=False,
-            )
-        else:
-            response = requests.get(
-                api_url + "/apis/networking.k8s.io/v1/namespaces/{}/ingresses".format(namespace),
-                headers={"Authorization": "Bearer {}".format(id_token)},
-                verify=False,
-            )
-        ingresses = json.loads(response.text)
-
-        if api_url in settings.PRIVATE_CLUSTERS:
-            token = settings.PRIVATE_CLUSTERS[api_url]
-            try:
-                response = requests.get(
-                    api_url + "/api/v1/namespaces/{}/services".format(namespace),
-                    headers={"Authorization": "Bearer {}".format(token)},
-                    verify=False,
-                )
-            except Exception:
-                continue
-        else:
-            try:
-                response = requests.get(
-                    api_url + "/api/v1/namespaces/{}/services".format(namespace),
-                    headers={"Authorization": "Bearer {}".format(id_token)},
-                    verify=False,
-                )
-            except Exception:
-                continue
-        services = json.loads(response.text)
-
-        if "code" in services:
-            if services["code"] == 403:
-                ...
-
-        if "items" in ingresses:
-            if "items" in services:
-                if len(ingresses["items"]) > 0 or len(services["items"]) > 0:
-                    deployed_clusters.append(settings.CLUSTER_NAMES[api_url])
-
-                for ingress in ingresses["items"]:
-                    for rule in ingress["spec"]["rules"]:
-                        if "host" not in rule:
-                            rule["host"] = settings.DEFAULT_INGRESS_HOST
-                        for path in rule["http"]["paths"]:
-                            if path["backend"]["service"]["name"].endswith("-maia-monailabel"):
-                                monai_models[path["backend"]["service"]["name"][: -len("-maia-monailabel")]] = {
-                                    "monai_label": "https://" + rule["host"] + path["path"]
-                                }
-                            if path["backend"]["service"]["name"] == "proxy-public":
-                                maia_workspace_apps["hub"] = "https://" + rule["host"] + path["path"]
-                            if path["backend"]["service"]["name"] == namespace + "-orthanc-svc":
-
-                                maia_workspace_apps["orthanc"] = "https://" + rule["host"] + path["path"]
-                                if not path["path"].endswith("/"):
-                                    maia_workspace_apps["orthanc"] += "/"
-                                maia_workspace_apps["ohif"] = "https://" + rule["host"] + path["path"] + "/ohif/"
-
-                            if "port" in path["backend"]["service"] and "name" in path["backend"]["service"]["port"]:
-                                if path["backend"]["service"]["port"]["name"] == "orthanc":
-                                    orthanc_list.append(
-                                        {
-                                            "name": ingress["metadata"]["name"],
-                                            "dicom_port": "",
-                                            "url": "https://" + rule["host"] + path["path"] + "/dicom-web/",
-                                        }
-                                    )
-                            if (
-                                "labels" in ingress["metadata"]
-                                and "app.kubernetes.io/name" in ingress["metadata"]["labels"]
-                                and ingress["metadata"]["labels"]["app.kubernetes.io/name"] == "maia-nvflare-dashboard"
-                            ):
-                                nvflare_dashboards.append(
-                                    {
-                                        "name": ingress["metadata"]["name"][: -len("-nvflare-dashboard")],
-                                        "url": "https://" + rule["host"] + path["path"],
-                                    }
-                                )
-                            if path["backend"]["service"]["name"] == namespace + "-mlflow-mkg" and path["path"].endswith(
-                                "mlflow"
-                            ):
-                                maia_workspace_apps["mlflow"] = "https://" + rule["host"] + path["path"]
-                                if not path["path"].endswith("/"):
-                                    maia_workspace_apps["mlflow"] += "/"
-                            if path["backend"]["service"]["name"] == namespace + "-mlflow-mkg" and path["path"].endswith(
-                                "minio-console-" + namespace
-                            ):
-                                maia_workspace_apps["minio_console"] = "https://" + rule["host"] + path["path"]
-                                if not path["path"].endswith("/"):
-                                    maia_workspace_apps["minio_console"] += "/"
-                            if path["backend"]["service"]["name"] == namespace + "-filebrowser-maia-filebrowser":
-                                maia_workspace_apps["filebrowser"] = "https://" + rule["host"] + path["path"]
-                                if not path["path"].endswith("/"):
-                                    maia_workspace_apps["filebrowser"] += "/"
-
-                for service in services["items"]:
-                    for port in service["spec"]["ports"]:
-                        if "name" in port and port["name"] == "remote-desktop-port":
-                            if "hub" in maia_workspace_apps:
-                                hub_url = maia_workspace_apps["hub"]
-                                user = (
-                                    service["metadata"]["name"][len("jupyter-") :]
-                                    .replace("-2d", "-")
-                                    .replace("-40", "@")
-                                    .replace("-2e", ".")
-                                )
-                                url = f"{hub_url}/user/{user}/proxy/80/desktop/{user}/"
-                                if user_id == user or is_admin:
-                                    remote_desktop_dict[user] = url
-                            else:
-                                hub_url = "KUBEFLOW"
-                                user = (
-                                    service["metadata"]["name"][len("jupyter-") :]
-                                    .replace("-2d", "-")
-                                    .replace("-40", "@")
-                                    .replace("-2e", ".")
-                                )
-                                try:
-                                    app_name = service["spec"]["selector"]["app"]
-                                except Exception:
-                                    app_name = service["metadata"]["name"][len("jupyter-") :]
-                                url = f"{hub_url}/notebook/{namespace}/{app_name}/proxy/80/desktop/{user}/"
-                                if user_id == user or is_admin:
-                                    remote_desktop_dict[user] = url
-
-                        if "name" in port and port["name"] == "ssh":
-                            # Backward compatibility
-                            if service["metadata"]["name"].endswith("-ssh"):
-                                user = (
-                                    service["metadata"]["name"][len("jupyter-") : -len("-ssh")]
-                                    .replace("-2d", "-")
-                                    .replace("-40", "@")
-                                    .replace("-2e", ".")
-                                )
-                                if user_id == user or is_admin:
-                                    ssh_ports[user] = port["port"]
-                            else:
-                                user = (
-                                    service["metadata"]["name"][len("jupyter-") :]
-                                    .replace("-2d", "-")
-                                    .replace("-40", "@")
-                                    .replace("-2e", ".")
-                                )
-                                if user_id == user or is_admin:
-                                    ssh_ports[user] = port["port"]
-
-                        if "name" in port and port["name"] == "orthanc-dicom":
-                            for orthanc in orthanc_list:
-                                if orthanc["name"] == service["metadata"]["labels"]["app"] + "-orthanc":
-                                    if service["spec"]["type"] == "NodePort":
-                                        orthanc["dicom_port"] = port["nodePort"]
-                                    elif service["spec"]["type"] == "LoadBalancer":
-                                        orthanc["dicom_port"] = port["port"]
-        if settings.CLUSTER_NAMES[api_url] not in deployed_clusters:
+        ingresses, services = namespace_resources[(api_url, namespace)]
+        ingresses = ingresses or {}
+        if services is None or "items" not in ingresses or "items" not in services:
             continue
-        if hasattr(settings, "GLOBAL_NAMESPACES") and settings.GLOBAL_NAMESPACES is not None:
-            for global_namespace in settings.GLOBAL_NAMESPACES:
-                if api_url in settings.PRIVATE_CLUSTERS:
-                    token = settings.PRIVATE_CLUSTERS[api_url]
-                    response = requests.get(
-                        api_url + "/apis/networking.k8s.io/v1/namespaces/{}/ingresses".format(global_namespace),
-                        headers={"Authorization": "Bearer {}".format(token)},
-                        verify=False,
-                    )
-                else:
-                    response = requests.get(
-                        api_url + "/apis/networking.k8s.io/v1/namespaces/{}/ingresses".format(global_namespace),
-                        headers={"Authorization": "Bearer {}".format(id_token)},
-                        verify=False,
-                    )
-                ingresses = json.loads(response.text)
-
-                if api_url in settings.PRIVATE_CLUSTERS:
-                    token = settings.PRIVATE_CLUSTERS[api_url]
-                    try:
-                        response = requests.get(
-                            api_url + "/api/v1/namespaces/{}/services".format(global_namespace),
-                            headers={"Authorization": "Bearer {}".format(token)},
-                            verify=False,
-                        )
-                    except Exception:
-                        continue
-                else:
-                    try:
-                        response = requests.get(
-                            api_url + "/api/v1/namespaces/{}/services".format(global_namespace),
-                            headers={"Authorization": "Bearer {}".format(id_token)},
-                            verify=False,
-                        )
-                    except Exception:
-                        continue
-                services = json.loads(response.text)
-
-                if "items" in ingresses:
-                    if "items" in services:
-                        for ingress in ingresses["items"]:
-                            for rule in ingress["spec"]["rules"]:
-                                if "host" not in rule:
-                                    rule["host"] = settings.DEFAULT_INGRESS_HOST
-                                for path in rule["http"]["paths"]:
-                                    if path["backend"]["service"]["name"] == "maia-xnat":
-                                        maia_workspace_apps["xnat"] = "https://" + rule["host"] + path["path"]
-                                    if path["backend"]["service"]["name"] == "istio-ingressgateway":
-                                        maia_workspace_apps["kubeflow"] = "https://" + rule["host"] + path["path"]
+        if len(ingresses["items"]) > 0 or len(services["items"]) > 0:
+            deployed_clusters.append(settings.CLUSTER_NAMES[api_url])
+
+        for ingress, backend, url in _ingress_paths(ingresses, settings.DEFAULT_INGRESS_HOST):
+            app = backend_rules.get(backend["name"])
+            if app == "hub":
+                maia_workspace_apps["hub"] = url
+            elif app == "orthanc":
+                maia_workspace_apps["orthanc"] = _with_trailing_slash(url)
+                maia_workspace_apps["ohif"] = url + "/ohif/"
+            elif app == "mlflow":
+                if url.endswith("mlflow"):
+                    maia_workspace_apps["mlflow"] = _with_trailing_slash(url)
+                elif url.endswith("minio-console-" + namespace):
+                    maia_workspace_apps["minio_console"] = _with_trailing_slash(url)
+            elif app == "filebrowser":
+                maia_workspace_apps["filebrowser"] = _with_trailing_slash(url)
+            elif backend["name"].endswith(MONAI_LABEL_SERVICE_SUFFIX):
+                monai_models[backend["name"][: -len(MONAI_LABEL_SERVICE_SUFFIX)]] = {"monai_label": url}
+
+            if backend.get("port", {}).get("name") == "orthanc":
+                orthanc_list.append({"name": ingress["metadata"]["name"], "dicom_port": "", "url": url + "/dicom-web/"})
+            if ingress["metadata"].get("labels", {}).get("app.kubernetes.io/name") == "maia-nvflare-dashboard":
+                nvflare_dashboards.append({"name": ingress["metadata"]["name"][: -len("-nvflare-dashboard")], "url": url})
+
+        for service in services["items"]:
+            service_name = service["metadata"]["name"]
+            for port in service["spec"]["ports"]:
+                port_name = port.get("name")
+                if port_name == "remote-desktop-port":
+                    user = _decode_jupyter_user(service_name)
+                    if "hub" in maia_workspace_apps:
+                        url = f"{maia_workspace_apps['hub']}/user/{user}/proxy/80/desktop/{user}/"
+                    else:
+                        # Kubeflow notebook, the Kubeflow URL is filled in below
+                        app_name = (service["spec"].get("selector") or {}).get("app", service_name[len("jupyter-") :])
+                        url = f"KUBEFLOW/notebook/{namespace}/{app_name}/proxy/80/desktop/{user}/"
+                    if user_id == user or is_admin:
+                        remote_desktop_dict[user] = url
+                elif port_name == "ssh":
+                    # Backward compatibility with the "-ssh" services
+                    user = _decode_jupyter_user(service_name, "-ssh" if service_name.endswith("-ssh") else "")
+                    if user_id == user or is_admin:
+                        ssh_ports[user] = port["port"]
+                elif port_name == "orthanc-dicom":
+                    for orthanc in orthanc_list:
+                        if orthanc["name"] == service["metadata"]["labels"]["app"] + "-orthanc":
+                            if service["spec"]["type"] == "NodePort":
+                                orthanc["dicom_port"] = port["nodePort"]
+                            elif service["spec"]["type"] == "LoadBalancer":
+                                orthanc["dicom_port"] = port["port"]
+
+    global_namespaces = getattr(settings, "GLOBAL_NAMESPACES", None) or []
+    deployed_api_urls = [api_url for api_url in settings.API_URL if settings.CLUSTER_NAMES[api_url] in deployed_clusters]
+    if global_namespaces and deployed_api_urls:
+        global_resources = _fetch_namespace_resources(
+            id_token, deployed_api_urls, global_namespaces, settings.PRIVATE_CLUSTERS, shared=True
+        )
+        for api_url in deployed_api_urls:
+            for global_namespace in global_namespaces:
+                ingresses, services = global_resources[(api_url, global_namespace)]
+                if ingresses is None or services is None or "items" not in ingresses or "items" not in services:
+                    continue
+                for _, backend, url in _ingress_paths(ingresses, settings.DEFAULT_INGRESS_HOST):
+                    app = _GLOBAL_NAMESPACE_BACKENDS.get(backend["name"])
+                    if app is not None:
+                        maia_workspace_apps[app] = url
 
     if "hub" not in maia_workspace_apps:
         maia_workspace_apps["hub"] = "N/A"
@@ -863,9 +959,9 @@ def create_kubeflow_profile_resources(namespace: str, owner: str, uid: str):
     for a Kubeflow profile namespace.
     """
     # Initialize K8s API clients
-    core_api = client.CoreV1Api()
-    rbac_api = client.RbacAuthorizationV1Api()
-    custom_api = client.CustomObjectsApi()
+    core_api = client.CoreV1Api(get_kube_api_client())
+    rbac_api = client.RbacAuthorizationV1Api(get_kube_api_client())
+    custom_api = client.CustomObjectsApi(get_kube_api_client())
 
     # Define the common owner reference linking these to the Kubeflow Profile
     owner_ref = [
@@ -1019,7 +1115,7 @@ def create_kubeflow_profile(namespace: str, owner: str):
         },
     }
     try:
-        custom_api = client.CustomObjectsApi()
+        custom_api = client.CustomObjectsApi(get_kube_api_client())
         custom_api.create_cluster_custom_object(
             group="kubeflow.org",
             version="v1",
@@ -1047,7 +1143,7 @@ def get_profile_uid(profile_name: str) -> str:
         str: The UID of the resource, or None if not found/error.
     """
     # 2. Initialize the CustomObjectsApi
-    custom_api = client.CustomObjectsApi()
+    custom_api = client.CustomObjectsApi(get_kube_api_client())
 
     # 3. Define the CRD target parameters
     group = "kubeflow.org"
@@ -1094,7 +1190,7 @@ def create_namespace_from_context(namespace_id, kubeflow_namespace=False, owner_
     """
     # Check if the namespace already exists before trying to create it
     skip_creation = False
-    with kubernetes.client.ApiClient() as api_client:
+    with kube_api_client() as api_client:
         api_instance = kubernetes.client.CoreV1Api(api_client)
         try:
             api_instance.read_namespace(name=namespace_id)
@@ -1105,7 +1201,7 @@ def create_namespace_from_context(namespace_id, kubeflow_namespace=False, owner_
                 logger.error(f"Exception when checking for existing namespace: {e}")
                 raise
     if not skip_creation:
-        with kubernetes.client.ApiClient() as api_client:
+        with kube_api_client() as api_client:
             api_instance = kubernetes.client.CoreV1Api(api_client)
             body = kubernetes.client.V1Namespace(metadata=kubernetes.client.V1ObjectMeta(name=namespace_id))
             try:
@@ -1119,7 +1215,7 @@ def create_namespace_from_context(namespace_id, kubeflow_namespace=False, owner_
     # Wait until the namespace is observable in the cluster before proceeding
     namespace_ready = False
     for _ in range(15):  # Retry for up to ~15 seconds
-        with kubernetes.client.ApiClient() as api_client:
+        with kube_api_client() as api_client:
             api_instance = kubernetes.client.CoreV1Api(api_client)
             try:
                 ns = api_instance.read_namespace(name=namespace_id)
@@ -1163,7 +1259,7 @@ def create_namespace_from_context(namespace_id, kubeflow_namespace=False, owner_
                 ],
             }
         }
-        with kubernetes.client.ApiClient() as api_client:
+        with kube_api_client() as api_client:
             api_instance = kubernetes.client.CoreV1Api(api_client)
             try:
                 api_instance.patch_namespace(name=namespace_id, body=body)
@@ -1202,11 +1298,7 @@ def create_namespace(request, settings, namespace_id, cluster_id, kubeflow_names
     """
     id_token = request.session.get("oidc_id_token")
     kubeconfig_dict = generate_kubeconfig(id_token, request.user.username, "default", cluster_id, settings=settings)
-    config.load_kube_config_from_dict(kubeconfig_dict)
-    with open(Path("/tmp").joinpath("kubeconfig-ns"), "w") as f:
-        yaml.dump(kubeconfig_dict, f)
-        os.environ["KUBECONFIG"] = str(Path("/tmp").joinpath("kubeconfig-ns"))
-
+    with kube_context(kubeconfig_dict):
         create_namespace_from_context(namespace_id, kubeflow_namespace=kubeflow_namespace, owner_email=owner_email)
 
 
@@ -1238,7 +1330,7 @@ def create_cifs_secret_from_context(namespace, user_id, username, password, publ
     """
     from MAIA.dashboard_utils import encrypt_string
 
-    with kubernetes.client.ApiClient() as api_client:
+    with kube_api_client() as api_client:
         api_instance = kubernetes.client.CoreV1Api(api_client)
         secret = kubernetes.client.V1Secret()
         secret.metadata = kubernetes.client.V1ObjectMeta(name=f"{user_id}-cifs", namespace=namespace)
@@ -1294,11 +1386,7 @@ def create_cifs_secret(request, cluster_id, settings, namespace, user_id, userna
     """
     id_token = request.session.get("oidc_id_token")
     kubeconfig_dict = generate_kubeconfig(id_token, request.user.username, "default", cluster_id, settings=settings)
-    config.load_kube_config_from_dict(kubeconfig_dict)
-    with open(Path("/tmp").joinpath("kubeconfig-ns"), "w") as f:
-        yaml.dump(kubeconfig_dict, f)
-        os.environ["KUBECONFIG"] = str(Path("/tmp").joinpath("kubeconfig-ns"))
-
+    with kube_context(kubeconfig_dict):
         create_cifs_secret_from_context(namespace, user_id, username, password, public_key)
 
 
@@ -1343,12 +1431,13 @@ def create_helm_repo_secret_from_context(repo_name, helm_repo_config, argocd_nam
     name = helm_repo_config["name"]
     enable_oci = helm_repo_config["enableOCI"]
 
-    kubeconfig = os.environ.get("DEPLOY_KUBECONFIG", None)
-    if kubeconfig is None:
-        kubeconfig = os.environ.get("KUBECONFIG", None)
-    config.load_kube_config(config_file=kubeconfig)
+    if get_kube_context() is None:
+        kubeconfig = os.environ.get("DEPLOY_KUBECONFIG", None)
+        if kubeconfig is None:
+            kubeconfig = os.environ.get("KUBECONFIG", None)
+        config.load_kube_config(config_file=kubeconfig)
     # If secret already exists, delete it before creating a new one
-    with kubernetes.client.ApiClient() as api_client:
+    with kube_api_client() as api_client:
         api_instance = kubernetes.client.CoreV1Api(api_client)
         try:
             api_instance.delete_namespaced_secret(name=f"repo-{repo_name}", namespace=argocd_namespace)
@@ -1357,7 +1446,7 @@ def create_helm_repo_secret_from_context(repo_name, helm_repo_config, argocd_nam
             # otherwise, raise the exception
             if e.status != 404:
                 raise
-    with kubernetes.client.ApiClient() as api_client:
+    with kube_api_client() as api_client:
         api_instance = kubernetes.client.CoreV1Api(api_client)
         secret = kubernetes.client.V1Secret()
         secret.metadata = kubernetes.client.V1ObjectMeta(
@@ -1432,7 +1521,7 @@ def create_docker_registry_secret_from_context(docker_credentials, namespace, se
             }
         }
     }
-    with kubernetes.client.ApiClient() as api_client:
+    with kube_api_client() as api_client:
         api_instance = kubernetes.client.CoreV1Api(api_client)
         secret = kubernetes.client.V1Secret()
         secret.metadata = kubernetes.client.V1ObjectMeta(name=secret_name, namespace=namespace)
@@ -1477,7 +1566,7 @@ def retrieve_json_key_for_maia_registry_authentication_from_context(namespace, s
     kubernetes.client.exceptions.ApiException
         If there is an error while reading the Kubernetes secret.
     """
-    with kubernetes.client.ApiClient() as api_client:
+    with kube_api_client() as api_client:
         api_instance = kubernetes.client.CoreV1Api(api_client)
 
         try:
@@ -1526,32 +1615,22 @@ def retrieve_json_key_for_maia_registry_authentication(request, cluster_id, sett
     ------
     KeyError
         If the `oidc_id_token` is not found in the session.
-    FileNotFoundError
-        If there is an issue writing the kubeconfig file to the temporary directory.
     """
     id_token = request.session.get("oidc_id_token")
     kubeconfig_dict = generate_kubeconfig(id_token, request.user.username, "default", cluster_id, settings=settings)
-    config.load_kube_config_from_dict(kubeconfig_dict)
-    with open(Path("/tmp").joinpath("kubeconfig-ns"), "w") as f:
-        yaml.dump(kubeconfig_dict, f)
-        os.environ["KUBECONFIG"] = str(Path("/tmp").joinpath("kubeconfig-ns"))
-
+    with kube_context(kubeconfig_dict):
         return retrieve_json_key_for_maia_registry_authentication_from_context(namespace, secret_name, registry_url)
 
 
 def create_maia_rbac(request, cluster_id, settings, namespace):
     id_token = request.session.get("oidc_id_token")
     kubeconfig_dict = generate_kubeconfig(id_token, request.user.username, "default", cluster_id, settings=settings)
-    config.load_kube_config_from_dict(kubeconfig_dict)
-    with open(Path("/tmp").joinpath("kubeconfig-ns"), "w") as f:
-        yaml.dump(kubeconfig_dict, f)
-        os.environ["KUBECONFIG"] = str(Path("/tmp").joinpath("kubeconfig-ns"))
-
+    with kube_context(kubeconfig_dict):
         return create_maia_rbac_from_context(namespace)
 
 
 def create_maia_rbac_from_context(namespace):
-    rbac_api = client.RbacAuthorizationV1Api()
+    rbac_api = client.RbacAuthorizationV1Api(get_kube_api_client())
     role = client.V1Role(
         metadata=client.V1ObjectMeta(name="maia-namespace-role", namespace=namespace),
         rules=[
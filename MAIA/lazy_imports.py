@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import importlib
+import threading
+
+
+class LazyImport:
+    """
+    Stand-in for a module, or for an attribute of a module, imported on first use.
+
+    The heavy dependencies (Helm, MinIO, Hydra, OmegaConf, NLTK) are only needed by some of the functions of a module:
+    binding them with ``LazyImport`` keeps the import of the module, hence the startup of the dashboard and of the
+    command-line scripts, from paying for them.
+
+    Parameters
+    ----------
+    module_name : str
+        The module to import, e.g. ``"pyhelm3"``.
+    attribute : str, optional
+        The attribute of the module to stand in for, e.g. ``"Client"``. Defaults to the module itself.
+
+    Examples
+    --------
+    >>> OmegaConf = LazyImport("omegaconf", "OmegaConf")
+    >>> OmegaConf.to_yaml({"a": 1})  # omegaconf is imported here
+    'a: 1\\n'
+    """
+
+    def __init__(self, module_name, attribute=None):
+        self._module_name = module_name
+        self._attribute = attribute
+        self._target = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    target = importlib.import_module(self._module_name)
+                    if self._attribute is not None:
+                        target = getattr(target, self._attribute)
+                    self._target = target
+        return self._target
+
+    def __getattr__(self, name):
+        if name in ("_module_name", "_attribute", "_target", "_lock"):
+            raise AttributeError(name)
+        return getattr(self._load(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __repr__(self):
+        name = self._module_name if self._attribute is None else f"{self._module_name}.{self._attribute}"
+        return f"<LazyImport {name}>"
@@ -8,9 +8,10 @@ from pathlib import Path
 import requests
 from loguru import logger
 import yaml
-from omegaconf import OmegaConf
-from pyhelm3 import Client
 
+from MAIA.helm_rollout import fetch_chart
+from MAIA.kube_clients import get_kube_subprocess_env, get_kubeconfig_path
+from MAIA.lazy_imports import LazyImport
 from MAIA.maia_fn import generate_human_memorable_password
 from MAIA.maia_k8s_distros import get_api_port
 from MAIA.versions import (
@@ -19,23 +20,29 @@ from MAIA.versions import (
     define_docker_image_versions,
 )
 
-maia_workspace_notebook_ssh_addons_image_version = define_docker_image_versions()["maia-workspace-notebook-ssh-addons"]
-maia_workspace_notebook_ssh_addons_image_name = define_docker_image_versions()["maia-workspace-notebook-ssh-addons-image-name"]
-maia_workspace_base_notebook_ssh_image_version = define_docker_image_versions()["maia-workspace-base-notebook-ssh"]
-maia_workspace_base_notebook_ssh_image_name = define_docker_image_versions()["maia-workspace-base-notebook-ssh-image-name"]
-maia_project_chart_version = define_maia_project_versions()["maia_project_chart_version"]
-maia_orthanc_image_version = define_docker_image_versions()["maia-orthanc"]
-admin_toolkit_chart_version = define_maia_admin_versions()["admin_toolkit_chart_version"]
-admin_toolkit_chart_type = define_maia_admin_versions()["admin_toolkit_chart_type"]
-rancher_chart_version = define_maia_admin_versions()["rancher_chart_version"]
-harbor_chart_version = define_maia_admin_versions()["harbor_chart_version"]
-keycloak_chart_version = define_maia_admin_versions()["keycloak_chart_version"]
-maia_dashboard_chart_version = define_maia_admin_versions()["maia_dashboard_chart_version"]
-maia_dashboard_image_version = define_maia_admin_versions()["maia_dashboard_image_version"]
-maia_dashboard_dev_tag_suffix = define_maia_admin_versions()["maia_dashboard_dev_tag_suffix"]
-maia_dashboard_chart_type = define_maia_admin_versions()["maia_dashboard_chart_type"]
-mysql_image = define_docker_image_versions()["mysql_image"]
-mysql_image_version = define_docker_image_versions()["mysql"]
+OmegaConf = LazyImport("omegaconf", "OmegaConf")
+Client = LazyImport("pyhelm3", "Client")
+
+_image_versions = define_docker_image_versions()
+_project_versions = define_maia_project_versions()
+_admin_versions = define_maia_admin_versions()
+maia_workspace_notebook_ssh_addons_image_version = _image_versions["maia-workspace-notebook-ssh-addons"]
+maia_workspace_notebook_ssh_addons_image_name = _image_versions["maia-workspace-notebook-ssh-addons-image-name"]
+maia_workspace_base_notebook_ssh_image_version = _image_versions["maia-workspace-base-notebook-ssh"]
+maia_workspace_base_notebook_ssh_image_name = _image_versions["maia-workspace-base-notebook-ssh-image-name"]
+maia_project_chart_version = _project_versions["maia_project_chart_version"]
+maia_orthanc_image_version = _image_versions["maia-orthanc"]
+admin_toolkit_chart_version = _admin_versions["admin_toolkit_chart_version"]
+admin_toolkit_chart_type = _admin_versions["admin_toolkit_chart_type"]
+rancher_chart_version = _admin_versions["rancher_chart_version"]
+harbor_chart_version = _admin_versions["harbor_chart_version"]
+keycloak_chart_version = _admin_versions["keycloak_chart_version"]
+maia_dashboard_chart_version = _admin_versions["maia_dashboard_chart_version"]
+maia_dashboard_image_version = _admin_versions["maia_dashboard_image_version"]
+maia_dashboard_dev_tag_suffix = _admin_versions["maia_dashboard_dev_tag_suffix"]
+maia_dashboard_chart_type = _admin_versions["maia_dashboard_chart_type"]
+mysql_image = _image_versions["mysql_image"]
+mysql_image_version = _image_versions["mysql"]
 
 
 def get_maia_toolkit_apps(group_id, password, argo_cd_host):
@@ -140,7 +147,7 @@ async def install_maia_project(
     Exception
         If there is an error during the installation or upgrade process.
     """
-    client = Client(kubeconfig=os.environ["KUBECONFIG"])
+    client = Client(kubeconfig=get_kubeconfig_path())
     chart_name = group_id.lower().replace("_", "-")
     if chart_name[-1] == "-":
         chart_name = chart_name[:-1]
@@ -148,39 +155,14 @@ async def install_maia_project(
         chart_name = chart_name[1:]
 
     if not project_repo.startswith("http") and not Path(project_repo).exists() and not project_repo.startswith("git+"):
-        chart = str("/tmp/" + project_chart + "-" + project_version + ".tgz")
-        project_chart = "oci://" + project_repo + "/" + project_chart
-
         try:
-            try:
-                with open(json_key_path, "r") as f:
-                    docker_credentials = json.load(f)
-                    username = docker_credentials.get("username")
-                    password = docker_credentials.get("password")
-            except Exception:
-                with open(json_key_path, "r") as f:
-                    docker_credentials = f.read()
-                    username = "_json_key"
-                    password = docker_credentials
-            logger.debug(f"helm registry login {project_repo} --insecure -u {username} --password-stdin")
-            result = subprocess.run(
-                ["helm", "registry", "login", project_repo, "--insecure", "-u", username, "--password-stdin"],
-                input=password.encode(),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                check=True,
+            chart = str(
+                await fetch_chart(project_repo, project_chart, project_version, json_key_path=json_key_path, insecure=True)
             )
-            logger.info("✅ Helm registry login successful.")
-            logger.debug(result.stdout.decode())
-        except subprocess.CalledProcessError as e:
-            logger.error("❌ Helm registry login failed.")
-            logger.error("STDOUT:", e.stdout.decode())
-            logger.error("STDERR:", e.stderr.decode())
+        except RuntimeError as e:
+            logger.error(f"❌ {e}")
             await asyncio.sleep(1)
-            return "Deployment failed: Helm registry login failed."
-        subprocess.run(
-            ["helm", "pull", project_chart, "-d", "/tmp", "--insecure-skip-tls-verify", "--version", project_version], check=True
-        )
+            return "Deployment failed: Helm chart could not be fetched."
         subprocess.run(
             [
                 "helm",
@@ -195,6 +177,7 @@ async def install_maia_project(
                 "--wait",
             ],
             check=True,
+            env=get_kube_subprocess_env(),
         )
         await asyncio.sleep(1)
         return ""
@@ -205,7 +188,7 @@ async def install_maia_project(
     elif not project_repo.startswith("http"):
         chart = await client.get_chart(project_chart, repo=project_repo, version=project_version, insecure=True)
     else:
-        chart = await client.get_chart(project_chart, repo=project_repo, version=project_version)
+        chart = await client.get_chart(str(await fetch_chart(project_repo, project_chart, project_version)))
     with open(values_file) as f:
         values = yaml.safe_load(f)
 
@@ -224,6 +207,7 @@ async def install_maia_project(
                 "--wait",
             ],
             check=True,
+            env=get_kube_subprocess_env(),
         )
     else:
         revision = await client.install_or_upgrade_release(chart_name, chart, values, namespace=argo_cd_namespace, wait=True)
@@ -5,34 +5,37 @@ from pathlib import Path
 
 import requests
 from kubernetes import client, config
-from omegaconf import OmegaConf
 import loguru
 from MAIA.versions import define_maia_core_versions
 from secrets import token_urlsafe
 from MAIA.maia_k8s_distros import get_api_port
 from MAIA.maia_k8s_distros import get_gpu_operator_toolkit, get_storage_class
-
-prometheus_chart_version = define_maia_core_versions()["prometheus_chart_version"]
-loki_chart_version = define_maia_core_versions()["loki_chart_version"]
-tempo_chart_version = define_maia_core_versions()["tempo_chart_version"]
-core_toolkit_chart_version = define_maia_core_versions()["core_toolkit_chart_version"]
-core_toolkit_chart_type = define_maia_core_versions()["core_toolkit_chart_type"]
-traefik_chart_version = define_maia_core_versions()["traefik_chart_version"]
-metallb_chart_version = define_maia_core_versions()["metallb_chart_version"]
-cert_manager_chart_version = define_maia_core_versions()["cert_manager_chart_version"]
-gpu_operator_chart_version = define_maia_core_versions()["gpu_operator_chart_version"]
-ingress_nginx_chart_version = define_maia_core_versions()["ingress_nginx_chart_version"]
-nfs_server_provisioner_chart_version = define_maia_core_versions()["nfs_server_provisioner_chart_version"]
-metrics_server_chart_version = define_maia_core_versions()["metrics_server_chart_version"]
-gpu_booking_chart_version = define_maia_core_versions()["gpu_booking_chart_version"]
-gpu_booking_chart_type = define_maia_core_versions()["gpu_booking_chart_type"]
-local_path_chart_version = define_maia_core_versions()["local_path_chart_version"]
-local_path_chart_type = define_maia_core_versions()["local_path_chart_type"]
-loginapp_chart_version = define_maia_core_versions()["loginapp_chart_version"]
-minio_operator_chart_version = define_maia_core_versions()["minio_operator_chart_version"]
-kubeflow_chart_version = define_maia_core_versions()["kubeflow_chart_version"]
-kubeflow_chart_type = define_maia_core_versions()["kubeflow_chart_type"]
-nvidia_dra_chart_version = define_maia_core_versions()["nvidia_dra_chart_version"]
+from MAIA.lazy_imports import LazyImport
+
+OmegaConf = LazyImport("omegaconf", "OmegaConf")
+
+_core_versions = define_maia_core_versions()
+prometheus_chart_version = _core_versions["prometheus_chart_version"]
+loki_chart_version = _core_versions["loki_chart_version"]
+tempo_chart_version = _core_versions["tempo_chart_version"]
+core_toolkit_chart_version = _core_versions["core_toolkit_chart_version"]
+core_toolkit_chart_type = _core_versions["core_toolkit_chart_type"]
+traefik_chart_version = _core_versions["traefik_chart_version"]
+metallb_chart_version = _core_versions["metallb_chart_version"]
+cert_manager_chart_version = _core_versions["cert_manager_chart_version"]
+gpu_operator_chart_version = _core_versions["gpu_operator_chart_version"]
+ingress_nginx_chart_version = _core_versions["ingress_nginx_chart_version"]
+nfs_server_provisioner_chart_version = _core_versions["nfs_server_provisioner_chart_version"]
+metrics_server_chart_version = _core_versions["metrics_server_chart_version"]
+gpu_booking_chart_version = _core_versions["gpu_booking_chart_version"]
+gpu_booking_chart_type = _core_versions["gpu_booking_chart_type"]
+local_path_chart_version = _core_versions["local_path_chart_version"]
+local_path_chart_type = _core_versions["local_path_chart_type"]
+loginapp_chart_version = _core_versions["loginapp_chart_version"]
+minio_operator_chart_version = _core_versions["minio_operator_chart_version"]
+kubeflow_chart_version = _core_versions["kubeflow_chart_version"]
+kubeflow_chart_type = _core_versions["kubeflow_chart_type"]
+nvidia_dra_chart_version = _core_versions["nvidia_dra_chart_version"]
 logger = loguru.logger
 
 
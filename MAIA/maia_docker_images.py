@@ -1,14 +1,30 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
 import os
+import subprocess
+import time
 from pathlib import Path
 
 import yaml
+from loguru import logger
 
+from MAIA.helm_rollout import fetch_chart
 from MAIA.versions import define_maia_docker_versions
 
-kaniko_chart_version = define_maia_docker_versions()["kaniko_chart_version"]
-kaniko_chart_type = define_maia_docker_versions()["kaniko_chart_type"]
+_docker_versions = define_maia_docker_versions()
+kaniko_chart_version = _docker_versions["kaniko_chart_version"]
+kaniko_chart_type = _docker_versions["kaniko_chart_type"]
+
+# Maximum number of Kaniko builds running at the same time, and Helm timeout of a single build.
+MAX_PARALLEL_BUILDS = int(os.environ.get("MAIA_MAX_PARALLEL_BUILDS", "4"))
+KANIKO_BUILD_TIMEOUT = os.environ.get("MAIA_KANIKO_BUILD_TIMEOUT", "3h")
+# Manifest of the last successful build of each release, stored in the project configuration folder.
+BUILD_CACHE_MANIFEST = "build_cache_manifest.json"
+# Timeout (in seconds) of the git commands resolving the commit of the Kaniko build context.
+GIT_COMMAND_TIMEOUT = float(os.environ.get("MAIA_GIT_COMMAND_TIMEOUT", "30"))
 
 
 def deploy_maia_kaniko(
@@ -61,7 +77,8 @@ def deploy_maia_kaniko(
     -------
     dict
         A dictionary containing deployment details including namespace, release name,
-        chart name, repo URL, chart version, and values file path.
+        chart name, repo URL, chart version, and values file path, and the build details (destination image,
+        custom Git context, context subpath and build arguments) used by ``run_image_build_graph``.
     """
 
     kaniko_values = {
@@ -148,4 +165,333 @@ def deploy_maia_kaniko(
         "values": str(
             Path(config_folder).joinpath(project_id, f"{release_name_values}_values", f"{release_name_values}_values.yaml")
         ),
+        "image": f"{registry_complete_url}/{image_name}:{image_tag}",
+        "context": git_repo_url,
+        "subpath": subpath,
+        "build_args": list(build_args or []),
     }
+
+
+def get_image_build_graph(builds):
+    """
+    Derive the build dependencies between Kaniko builds from their build arguments.
+
+    A build depends on another one when one of its build arguments (e.g. ``BASE_IMAGE=<registry>/<image>:<tag>``)
+    is the destination image of the other build.
+
+    Parameters
+    ----------
+    builds : list of dict
+        The builds, as returned by ``deploy_maia_kaniko``.
+
+    Returns
+    -------
+    dict
+        The releases of the builds, in topological order (bases first), mapped to the set of releases they depend on.
+
+    Raises
+    ------
+    ValueError
+        If two builds push the same image, or if the dependencies contain a cycle.
+    """
+    releases_by_image = {}
+    for build in builds:
+        if build["image"] in releases_by_image:
+            raise ValueError(
+                f"Image {build['image']} is built by both {releases_by_image[build['image']]} and {build['release']}"
+            )
+        releases_by_image[build["image"]] = build["release"]
+
+    dependencies = {}
+    for build in builds:
+        # Destination images are pushed without the Docker Hub URL prefix, see deploy_maia_kaniko.
+        values = [build_arg.partition("=")[2].replace("https://index.docker.io/v1/", "") for build_arg in build["build_args"]]
+        dependencies[build["release"]] = {releases_by_image[value] for value in values if value in releases_by_image}
+
+    # Kahn's algorithm, keeping the original order among independent builds.
+    ordered = {}
+    remaining = dict(dependencies)
+    while remaining:
+        ready = [release for release, deps in remaining.items() if deps.issubset(ordered)]
+        if not ready:
+            raise ValueError(f"Circular build dependencies between: {', '.join(sorted(remaining))}")
+        for release in ready:
+            ordered[release] = remaining.pop(release)
+    return ordered
+
+
+def get_build_context_digest(context_dir):
+    """
+    Return the SHA-256 digest of a build context directory: the relative path and content of every file.
+
+    Parameters
+    ----------
+    context_dir : str or Path
+        The build context directory.
+
+    Returns
+    -------
+    str or None
+        The hex digest, or None if the directory does not exist.
+    """
+    context_dir = Path(context_dir)
+    if not context_dir.is_dir():
+        return None
+    digest = hashlib.sha256()
+    for path in sorted(context_dir.rglob("*")):
+        if not path.is_file() or "__pycache__" in path.parts or ".git" in path.parts:
+            continue
+        digest.update(path.relative_to(context_dir).as_posix().encode() + b"\0")
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _git(*args, cwd=None):
+    """Run a git command and return its stripped output, or None if it fails."""
+    try:
+        result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True, timeout=GIT_COMMAND_TIMEOUT, check=True)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip()
+
+
+def resolve_git_context_commit(git_context):
+    """
+    Resolve the commit built by Kaniko from a Git build context, ``<repo>[#<ref>[#<commit>]]``.
+
+    A pinned commit is returned as is, otherwise the ref (HEAD by default) is resolved with ``git ls-remote``.
+
+    Parameters
+    ----------
+    git_context : str
+        The Kaniko Git context, e.g. ``git://github.com/minnelab/MAIA.git#refs/heads/master``.
+
+    Returns
+    -------
+    str or None
+        The commit, or None if it cannot be resolved.
+    """
+    repo, _, fragment = git_context.partition("#")
+    ref, _, commit = fragment.partition("#")
+    if commit:
+        return commit
+    if repo.startswith("git://"):
+        # Kaniko clones git:// contexts over HTTPS
+        repo = "https://" + repo[len("git://") :]
+    output = _git("ls-remote", repo, ref or "HEAD")
+    return output.split()[0] if output else None
+
+
+def get_image_build_keys(builds, graph, context_root=None):
+    """
+    Compute a content address for each build: its Git context, the digest of its context directory, its build
+    arguments and its base builds.
+
+    A change in a base image context therefore changes the key of every image built on top of it. The context
+    directory is read from a local checkout, which is only trusted when it is at the commit Kaniko builds (the commit
+    pinned in the Git context, or the current commit of its ref) and has no local changes in the context directory.
+
+    Parameters
+    ----------
+    builds : list of dict
+        The builds, as returned by ``deploy_maia_kaniko``.
+    graph : dict
+        The build dependencies, as returned by ``get_image_build_graph``.
+    context_root : str or Path, optional
+        Local checkout of the Git repository used as build context. Defaults to ``MAIA_BUILD_CONTEXT_ROOT``, or to
+        the repository containing the MAIA package.
+
+    Returns
+    -------
+    dict
+        The build keys, by release. The key is None (always rebuild) when the local checkout does not match the Git
+        context of the build (or its commit cannot be resolved), or when a base build has no key.
+    """
+    if context_root is None:
+        context_root = os.environ.get("MAIA_BUILD_CONTEXT_ROOT", str(Path(__file__).resolve().parents[1]))
+    head = _git("rev-parse", "HEAD", cwd=context_root) if Path(context_root).is_dir() else None
+    builds_by_release = {build["release"]: build for build in builds}
+    commits = {}
+    keys = {}
+    for release, dependencies in graph.items():
+        build = builds_by_release[release]
+        # The context passed to Kaniko, see deploy_maia_kaniko.
+        git_context = build.get("context") or os.environ.get("MAIA_GIT_REPO_URL")
+        context_digest = None
+        if git_context and head:
+            if git_context not in commits:
+                commits[git_context] = resolve_git_context_commit(git_context)
+            commit = commits[git_context]
+            if (
+                commit
+                and head.startswith(commit)
+                and _git("status", "--porcelain", "--", build["subpath"], cwd=context_root) == ""
+            ):
+                context_digest = get_build_context_digest(Path(context_root).joinpath(build["subpath"]))
+        base_keys = sorted(keys[dependency] for dependency in dependencies if keys[dependency] is not None)
+        if context_digest is None or len(base_keys) < len(dependencies):
+            keys[release] = None
+            continue
+        content = {
+            "image": build["image"],
+            "git_context": git_context,
+            "context": context_digest,
+            "build_args": build["build_args"],
+            "bases": base_keys,
+        }
+        keys[release] = hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+    return keys
+
+
+def load_build_cache(cache_path):
+    """Load the build cache manifest (release -> key and image of the last successful build), if any."""
+    if cache_path is None or not Path(cache_path).exists():
+        return {}
+    with open(cache_path, "r") as f:
+        return json.load(f)
+
+
+def save_build_cache(cache_path, cache):
+    """Write the build cache manifest atomically."""
+    tmp_path = Path(str(cache_path) + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, cache_path)
+
+
+async def install_kaniko_build(build, timeout=KANIKO_BUILD_TIMEOUT):
+    """
+    Run one Kaniko build with Helm and wait for its Job to complete.
+
+    Parameters
+    ----------
+    build : dict
+        The build, as returned by ``deploy_maia_kaniko``.
+    timeout : str, optional
+        Helm timeout for the build Job to complete.
+
+    Raises
+    ------
+    RuntimeError
+        If the build Job fails or does not complete within the timeout.
+    """
+    if kaniko_chart_type != "helm_repo":
+        raise ValueError("Kaniko builds can only be installed directly with Helm when kaniko_chart_type is helm_repo")
+
+    # The Job of a previous build cannot be updated in place: delete it, Helm recreates it on upgrade.
+    await asyncio.get_running_loop().run_in_executor(None, delete_kaniko_build_job, build)
+
+    chart = await fetch_chart(build["repo"], build["chart"], build["version"])
+    # Each release gets its own registry Secret, as a Secret cannot be owned by several Helm releases.
+    registry_secret_name = f"{build['release']}-registry"
+    cmd = [
+        "helm",
+        "upgrade",
+        "--install",
+        "--wait",
+        "--wait-for-jobs",
+        "--timeout",
+        timeout,
+        "-n",
+        build["namespace"],
+        build["release"],
+        str(chart),
+        "--values",
+        build["values"],
+        "--set",
+        f"dockerRegistrySecretName={registry_secret_name}",
+        "--set",
+        f"docker_registry_secret={registry_secret_name}",
+    ]
+    logger.debug(f"Helm command: {' '.join(cmd)}")
+    process = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+    output, _ = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"Build {build['release']} failed: {output.decode(errors='replace')[-2000:]}")
+
+
+def delete_kaniko_build_job(build, timeout=120):
+    """Delete the Job left by a previous build of a release, and wait until it is gone."""
+    from kubernetes import client
+
+    batch_v1 = client.BatchV1Api()
+    label_selector = f"app.kubernetes.io/instance={build['release']}"
+    batch_v1.delete_collection_namespaced_job(build["namespace"], label_selector=label_selector, propagation_policy="Foreground")
+    deadline = time.monotonic() + timeout
+    while batch_v1.list_namespaced_job(build["namespace"], label_selector=label_selector).items:
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"The previous Job of {build['release']} was not deleted within {timeout} s")
+        time.sleep(2)
+
+
+async def run_image_build_graph(builds, build_image=install_kaniko_build, max_parallel=None, cache_path=None, force=False):
+    """
+    Run the Kaniko builds in dependency order, with maximum parallelism across independent branches.
+
+    Each build starts as soon as all its base builds are done, with at most ``max_parallel`` builds running at the
+    same time. Builds whose key (see ``get_image_build_keys``) matches the last successful build in the cache
+    manifest are skipped. When a build fails, the builds depending on it are skipped; the other branches go on.
+
+    Parameters
+    ----------
+    builds : list of dict
+        The builds, as returned by ``deploy_maia_kaniko``.
+    build_image : callable, optional
+        Coroutine function running one build. Defaults to ``install_kaniko_build``.
+    max_parallel : int, optional
+        Maximum number of concurrent builds. Defaults to ``MAIA_MAX_PARALLEL_BUILDS``.
+    cache_path : str or Path, optional
+        Path of the build cache manifest. If None, no build is skipped.
+    force : bool, optional
+        Rebuild every image, ignoring the cache manifest (default is False).
+
+    Returns
+    -------
+    dict
+        The status of each build, by release: "built", "cached", "failed" or "skipped" (a base build failed).
+    """
+    graph = get_image_build_graph(builds)
+    keys = get_image_build_keys(builds, graph)
+    builds_by_release = {build["release"]: build for build in builds}
+    cache = load_build_cache(cache_path)
+    semaphore = asyncio.Semaphore(max_parallel or MAX_PARALLEL_BUILDS)
+    tasks = {}
+
+    async def run(release):
+        dependency_statuses = await asyncio.gather(*(tasks[dependency] for dependency in graph[release]))
+        if any(status in ("failed", "skipped") for status in dependency_statuses):
+            logger.warning(f"Skipping {release}: a base image failed to build")
+            return "skipped"
+        build = builds_by_release[release]
+        cached = cache.get(release, {})
+        if (
+            not force
+            and keys[release] is not None
+            and cached.get("key") == keys[release]
+            and cached.get("image") == build["image"]
+        ):
+            logger.info(f"{build['image']} is up to date, skipping {release}")
+            return "cached"
+        async with semaphore:
+            logger.info(f"Building {build['image']} ({release})")
+            start = time.monotonic()
+            try:
+                await build_image(build)
+            except Exception as e:
+                logger.error(f"Failed to build {build['image']}: {e}")
+                return "failed"
+        logger.info(f"Built {build['image']} in {time.monotonic() - start:.0f} s")
+        if keys[release] is not None and cache_path is not None:
+            # Saved after each build, so that an interrupted run does not lose the completed builds.
+            cache[release] = {"key": keys[release], "image": build["image"]}
+            save_build_cache(cache_path, cache)
+        return "built"
+
+    # The graph is in topological order, so the tasks of the base builds exist before their dependents await them.
+    for release in graph:
+        tasks[release] = asyncio.ensure_future(run(release))
+    statuses = await asyncio.gather(*tasks.values())
+    return dict(zip(tasks, statuses))
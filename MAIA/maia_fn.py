@@ -10,41 +10,48 @@ from secrets import token_urlsafe
 from typing import Dict, List
 
 import kubernetes
-import nltk
 import toml
 import yaml
-from kubernetes import client, config
+from kubernetes import client
 from kubernetes.client.rest import ApiException
 from loguru import logger
-from nltk.corpus import words
-from omegaconf import OmegaConf
 
 from MAIA.helm_values import read_config_dict_and_generate_helm_values_dict
+from MAIA.kube_clients import get_api_client, get_kube_api_client, get_kubeconfig_dict
+from MAIA.lazy_imports import LazyImport
+from MAIA.port_allocator import allocate_service_ports, find_free_ports, list_service_ports
 
 from MAIA.versions import define_docker_image_versions, define_maia_docker_versions, define_maia_project_versions
 from MAIA_scripts.MAIA_create_JupyterHub_config import create_jupyterhub_config_api
 
-mysql_image = define_docker_image_versions()["mysql_image"]
-mysql_image_version = define_docker_image_versions()["mysql"]
-mkg_chart_version = define_maia_docker_versions()["mkg_chart_version"]
-mkg_chart_type = define_maia_docker_versions()["mkg_chart_type"]
-maia_mlflow_image_version = define_docker_image_versions()["maia-mlflow"]
-maia_orthanc_image_version = define_docker_image_versions()["maia-orthanc"]
-maia_orthanc_image = define_docker_image_versions()["maia-orthanc-image"]
-maia_orthanc_chart_version = define_maia_project_versions()["maia-orthanc-chart_version"]
-maia_orthanc_chart_type = define_maia_project_versions()["maia-orthanc-chart_type"]
-maia_namespace_chart_version = define_maia_project_versions()["maia_namespace_chart_version"]
-maia_namespace_chart_type = define_maia_project_versions()["maia_namespace_chart_type"]
-maia_filebrowser_image_version = define_docker_image_versions()["maia-filebrowser"]
-maia_filebrowser_chart_version = define_maia_project_versions()["maia_filebrowser_chart_version"]
-maia_filebrowser_chart_type = define_maia_project_versions()["maia_filebrowser_chart_type"]
-maia_kubeflow_chart_version = define_maia_project_versions()["maia-kubeflow-chart_version"]
-maia_kubeflow_chart_type = define_maia_project_versions()["maia-kubeflow-chart_type"]
-maia_nvflare_dashboard_chart_version = define_maia_project_versions()["maia-nvflare-dashboard-chart_version"]
-maia_nvflare_dashboard_chart_type = define_maia_project_versions()["maia-nvflare-dashboard-chart_type"]
-maia_nvflare_dashboard_image_version = define_docker_image_versions()["maia-nvflare-dashboard"]
-maia_lab_pro_image_version = define_docker_image_versions()["maia-lab-pro"]
-maia_lab_image_version = define_docker_image_versions()["maia-lab"]
+nltk = LazyImport("nltk")
+words = LazyImport("nltk.corpus", "words")
+OmegaConf = LazyImport("omegaconf", "OmegaConf")
+
+_image_versions = define_docker_image_versions()
+_docker_versions = define_maia_docker_versions()
+_project_versions = define_maia_project_versions()
+mysql_image = _image_versions["mysql_image"]
+mysql_image_version = _image_versions["mysql"]
+mkg_chart_version = _docker_versions["mkg_chart_version"]
+mkg_chart_type = _docker_versions["mkg_chart_type"]
+maia_mlflow_image_version = _image_versions["maia-mlflow"]
+maia_orthanc_image_version = _image_versions["maia-orthanc"]
+maia_orthanc_image = _image_versions["maia-orthanc-image"]
+maia_orthanc_chart_version = _project_versions["maia-orthanc-chart_version"]
+maia_orthanc_chart_type = _project_versions["maia-orthanc-chart_type"]
+maia_namespace_chart_version = _project_versions["maia_namespace_chart_version"]
+maia_namespace_chart_type = _project_versions["maia_namespace_chart_type"]
+maia_filebrowser_image_version = _image_versions["maia-filebrowser"]
+maia_filebrowser_chart_version = _project_versions["maia_filebrowser_chart_version"]
+maia_filebrowser_chart_type = _project_versions["maia_filebrowser_chart_type"]
+maia_kubeflow_chart_version = _project_versions["maia-kubeflow-chart_version"]
+maia_kubeflow_chart_type = _project_versions["maia-kubeflow-chart_type"]
+maia_nvflare_dashboard_chart_version = _project_versions["maia-nvflare-dashboard-chart_version"]
+maia_nvflare_dashboard_chart_type = _project_versions["maia-nvflare-dashboard-chart_type"]
+maia_nvflare_dashboard_image_version = _image_versions["maia-nvflare-dashboard"]
+maia_lab_pro_image_version = _image_versions["maia-lab-pro"]
+maia_lab_image_version = _image_versions["maia-lab"]
 
 
 def generate_random_password(length=12):
@@ -70,11 +77,7 @@ def copy_certificate_authority_secret(
     cert_name="tls.crt",
     key_name="tls.key",
 ):
-    if "KUBECONFIG_LOCAL" not in os.environ:
-        os.environ["KUBECONFIG_LOCAL"] = os.environ["KUBECONFIG"]
-    kubeconfig = yaml.safe_load(Path(os.environ["KUBECONFIG_LOCAL"]).read_text())
-    config.load_kube_config_from_dict(kubeconfig)
-    api = client.CoreV1Api()
+    api = client.CoreV1Api(get_kube_api_client(local=True))
     try:
         secret = api.read_namespaced_secret(name=source_secret_name, namespace=source_namespace)
     except ApiException as e:
@@ -118,7 +121,6 @@ def create_config_map_from_data(
     kubeconfig_dict : dict
         Kube Configuration dictionary for Kubernetes cluster authentication.
     """
-    config.load_kube_config_from_dict(kubeconfig_dict)
     metadata = kubernetes.client.V1ObjectMeta(name=config_map_name, namespace=namespace)
 
     if isinstance(data_key, list) and isinstance(data, list):
@@ -128,15 +130,14 @@ def create_config_map_from_data(
     else:
         configmap = kubernetes.client.V1ConfigMap(api_version="v1", kind="ConfigMap", data={data_key: data}, metadata=metadata)
 
-    with kubernetes.client.ApiClient() as api_client:
-        api_instance = kubernetes.client.CoreV1Api(api_client)
+    api_instance = kubernetes.client.CoreV1Api(get_api_client(kubeconfig_dict))
 
-        pretty = "true"
-        try:
-            api_response = api_instance.create_namespaced_config_map(namespace, configmap, pretty=pretty)
-            logger.debug(f"ConfigMap created: {api_response}")
-        except ApiException as e:
-            logger.error(f"Exception when calling CoreV1Api->delete_namespaced_config_map: {e}")
+    pretty = "true"
+    try:
+        api_response = api_instance.create_namespaced_config_map(namespace, configmap, pretty=pretty)
+        logger.debug(f"ConfigMap created: {api_response}")
+    except ApiException as e:
+        logger.error(f"Exception when calling CoreV1Api->delete_namespaced_config_map: {e}")
 
 
 def get_ssh_port_dict(port_type, namespace, port_range, maia_metallb_ip=None):
@@ -160,48 +161,10 @@ def get_ssh_port_dict(port_type, namespace, port_range, maia_metallb_ip=None):
         A list of dictionaries with service names as keys and their corresponding used SSH ports as values.
         Returns None if an exception occurs.
     """
-    if "KUBECONFIG_LOCAL" not in os.environ:
-        os.environ["KUBECONFIG_LOCAL"] = os.environ["KUBECONFIG"]
-    kubeconfig = yaml.safe_load(Path(os.environ["KUBECONFIG_LOCAL"]).read_text())
-    config.load_kube_config_from_dict(kubeconfig)
-
-    v1 = client.CoreV1Api()
 
     try:
-        used_port = []
-        services = v1.list_service_for_all_namespaces(watch=False)
-        for svc in services.items:
-            if port_type == "LoadBalancer":
-                if svc.status.load_balancer.ingress is not None:
-                    if svc.spec.type == "LoadBalancer" and svc.status.load_balancer.ingress[0].ip == maia_metallb_ip:
-                        for port in svc.spec.ports:
-                            # if (port.name == "ssh" and svc.metadata.namespace == namespace) or (
-                            #    port.name == "orthanc-dicom" and svc.metadata.namespace == namespace
-                            # ):
-                            if svc.metadata.name.endswith("-ssh"):
-                                used_port.append({svc.metadata.name[: -len("-ssh")]: int(port.port)})
-                            else:
-                                used_port.append({svc.metadata.name: int(port.port)})
-            elif port_type == "NodePort":
-                if svc.spec.type == "NodePort" and svc.metadata.namespace == namespace:
-                    for port in svc.spec.ports:
-                        if port.node_port >= port_range[0] and port.node_port <= port_range[1]:
-                            if svc.metadata.name.endswith("-ssh"):
-                                used_port.append({svc.metadata.name[: -len("-ssh")]: int(port.node_port)})
-                            else:
-                                used_port.append({svc.metadata.name: int(port.node_port)})
-                if svc.spec.type == "LoadBalancer" and svc.metadata.namespace == namespace:
-                    for port in svc.spec.ports:
-                        if port.node_port is None:
-                            continue
-                        if port.node_port >= port_range[0] and port.node_port <= port_range[1]:
-                            if svc.metadata.name.endswith("-ssh"):
-                                used_port.append({svc.metadata.name[: -len("-ssh")]: int(port.node_port)})
-                            else:
-                                used_port.append({svc.metadata.name: int(port.node_port)})
-
-        logger.debug(f"Used ports: {used_port}")
-        return used_port
+        service_ports = list_service_ports(port_type, namespace, port_range, maia_metallb_ip=maia_metallb_ip)
+        return [{name: port} for name, port in service_ports.assigned.items()]
     except ApiException:
         logger.error("Exception when calling CoreV1Api->list_service_for_all_namespaces")
         return None
@@ -229,43 +192,10 @@ def get_ssh_ports(n_requested_ports, port_type, ip_range, maia_metallb_ip=None):
     None
         If an error occurs during the process.
     """
-    if "KUBECONFIG_LOCAL" not in os.environ:
-        os.environ["KUBECONFIG_LOCAL"] = os.environ["KUBECONFIG"]
-    kubeconfig = yaml.safe_load(Path(os.environ["KUBECONFIG_LOCAL"]).read_text())
-    config.load_kube_config_from_dict(kubeconfig)
-
-    v1 = client.CoreV1Api()
 
     try:
-        used_port = []
-        services = v1.list_service_for_all_namespaces(watch=False)
-        for svc in services.items:
-            if port_type == "LoadBalancer":
-                if svc.status.load_balancer.ingress is not None:
-                    if svc.spec.type == "LoadBalancer" and svc.status.load_balancer.ingress[0].ip == maia_metallb_ip:
-                        for port in svc.spec.ports:
-                            # if port.name == "ssh" or port.name == "orthanc-dicom":
-                            used_port.append(int(port.port))
-            elif port_type == "NodePort":
-                if svc.spec.type == "NodePort":
-                    for port in svc.spec.ports:
-                        used_port.append(int(port.node_port))
-                if svc.spec.type == "LoadBalancer":
-                    for port in svc.spec.ports:
-                        if port.node_port is None:
-                            continue
-                        used_port.append(int(port.node_port))
-        logger.debug(f"Used ports: {used_port}")
-        ports = []
-
-        for _ in range(n_requested_ports):
-            for port in range(ip_range[0], ip_range[1]):
-                if port not in used_port:
-                    ports.append(port)
-                    used_port.append(port)
-                    break
-
-        return ports
+        service_ports = list_service_ports(port_type, None, ip_range, maia_metallb_ip=maia_metallb_ip)
+        return find_free_ports(n_requested_ports, ip_range, service_ports.used)
     except ApiException:
         logger.error("Exception when calling CoreV1Api->list_service_for_all_namespaces")
         return None
@@ -467,9 +397,7 @@ def deploy_mysql(cluster_config, user_config, config_folder, mysql_configs):
         chart name, repository URL, version, and values file path.
     """
     namespace = user_config["group_ID"].lower().replace("_", "-")
-    if "KUBECONFIG_LOCAL" not in os.environ:
-        os.environ["KUBECONFIG_LOCAL"] = os.environ["KUBECONFIG"]
-    kubeconfig = yaml.safe_load(Path(os.environ["KUBECONFIG_LOCAL"]).read_text())
+    kubeconfig = get_kubeconfig_dict(local=True)
 
     if "MYSQL_MEMORY_REQUEST_" + namespace in os.environ:
         memory_request = os.environ["MYSQL_MEMORY_REQUEST_" + namespace]
@@ -562,10 +490,7 @@ def deploy_mlflow(cluster_config, user_config, config_folder, mysql_config=None,
         chart name, repository URL, chart version, and path to the values file.
     """
     namespace = user_config["group_ID"].lower().replace("_", "-")
-    if "KUBECONFIG_LOCAL" not in os.environ:
-        os.environ["KUBECONFIG_LOCAL"] = os.environ["KUBECONFIG"]
-    kubeconfig = yaml.safe_load(Path(os.environ["KUBECONFIG_LOCAL"]).read_text())
-    config.load_kube_config_from_dict(kubeconfig)
+    kubeconfig = get_kubeconfig_dict(local=True)
 
     default_registry = os.environ.get("MAIA_REGISTRY", "ghcr.io/minnelab")
     docker_image = os.environ.get("MAIA_PRIVATE_REGISTRY", default_registry) + "/maia-mlflow"
@@ -676,7 +601,7 @@ def deploy_mlflow(cluster_config, user_config, config_folder, mysql_config=None,
     }
 
 
-def deploy_orthanc(cluster_config, user_config, config_folder, project_config_dict=None):
+def deploy_orthanc(cluster_config, user_config, config_folder, project_config_dict=None, snapshot=None):
     """
     Deploys Orthanc using the provided configuration.
     Parameters
@@ -687,6 +612,8 @@ def deploy_orthanc(cluster_config, user_config, config_folder, project_config_di
         Dictionary containing the user configuration.
     config_folder : str or Path
         Path to the configuration folder.
+    snapshot : ProjectResourceSnapshot, optional
+        The resources of the project namespace, used to reuse the existing Orthanc configuration.
     Returns
     -------
     dict
@@ -697,7 +624,7 @@ def deploy_orthanc(cluster_config, user_config, config_folder, project_config_di
         namespace_values = yaml.safe_load(f)
         orthanc_port = namespace_values["orthanc"]["port"]
     namespace = user_config["group_ID"].lower().replace("_", "-")
-    orthanc_configs = generate_orthanc_configs(namespace, project_config_dict)
+    orthanc_configs = generate_orthanc_configs(namespace, project_config_dict, snapshot=snapshot)
     ae_title = orthanc_configs["ae_title"]
     mysql_password = orthanc_configs["mysql_password"]
     private_registry = os.environ.get("MAIA_PRIVATE_REGISTRY", None)
@@ -945,12 +872,8 @@ def deploy_kubeflow_project(cluster_config, user_config, config_folder, project_
         extra_resource_limits[k] = v
 
     namespace = user_config["group_ID"].lower().replace("_", "-")
-    if "KUBECONFIG_LOCAL" not in os.environ:
-        os.environ["KUBECONFIG_LOCAL"] = os.environ["KUBECONFIG"]
-    kubeconfig = yaml.safe_load(Path(os.environ["KUBECONFIG_LOCAL"]).read_text())
-    config.load_kube_config_from_dict(kubeconfig)
 
-    v1 = client.CoreV1Api()
+    v1 = client.CoreV1Api(get_kube_api_client(local=True))
     podCIDR = []
     nodes = v1.list_node(watch=False)
     for node in nodes.items:
@@ -1018,10 +941,7 @@ def gpu_list_from_nodes():
         containing the GPU product and GPU count.
     """
 
-    kubeconfig = yaml.safe_load(Path(os.environ["KUBECONFIG"]).read_text())
-    config.load_kube_config_from_dict(kubeconfig)
-
-    v1 = client.CoreV1Api()
+    v1 = client.CoreV1Api(get_api_client(get_kubeconfig_dict()))
 
     nodes = v1.list_node(watch=False)
     gpu_dict = {}
@@ -1046,7 +966,63 @@ def edit_orthanc_configuration(orthanc_config_template, orthanc_edit_dict):
     return orthanc_config
 
 
-def generate_minio_configs(namespace, project_config_dict=None):
+class ProjectResourceSnapshot:
+    """
+    Secrets, pods and ConfigMaps of a project namespace, shared by the configuration generators of a deployment.
+
+    Each kind of resource is listed once, on first use, instead of once per generator. Secret values are
+    base64-decoded when a secret is first accessed. If the namespace cannot be listed (401, 403 or 404, e.g. for a
+    project that is not deployed yet) the error is logged and the listing is empty.
+
+    Parameters
+    ----------
+    namespace : str
+        The project namespace (or group ID).
+    core_api : kubernetes.client.CoreV1Api, optional
+        The API used to list the resources. Defaults to the local cluster.
+    """
+
+    def __init__(self, namespace, core_api=None):
+        self.namespace = namespace.lower().replace("_", "-")
+        self._core_api = core_api
+        self._listings = {}
+        self._decoded_secrets = {}
+
+    def _list(self, kind):
+        if kind not in self._listings:
+            if self._core_api is None:
+                self._core_api = client.CoreV1Api(get_kube_api_client(local=True))
+            try:
+                items = getattr(self._core_api, f"list_namespaced_{kind}")(namespace=self.namespace).items
+            except ApiException as e:
+                if e.status not in (401, 403, 404):
+                    raise
+                logger.error(f"Error listing namespaced {kind}s: {e}")
+                items = []
+            self._listings[kind] = items
+        return self._listings[kind]
+
+    def get_secret(self, name):
+        """Return the decoded data of the secret with the given name, or None if it does not exist."""
+        if name not in self._decoded_secrets:
+            self._decoded_secrets[name] = None
+            for secret in self._list("secret"):
+                if secret.metadata.name == name:
+                    self._decoded_secrets[name] = {
+                        key: base64.b64decode(value).decode("ascii") for key, value in (secret.data or {}).items()
+                    }
+        return self._decoded_secrets[name]
+
+    def get_pods(self, name_prefix):
+        """Return the pods whose name starts with the given prefix."""
+        return [pod for pod in self._list("pod") if pod.metadata.name.startswith(name_prefix)]
+
+    def get_config_maps(self, name_prefix):
+        """Return the ConfigMaps whose name starts with the given prefix."""
+        return [config_map for config_map in self._list("config_map") if config_map.metadata.name.startswith(name_prefix)]
+
+
+def generate_minio_configs(namespace, project_config_dict=None, snapshot=None):
     """
     Generate configuration settings for MinIO.
 
@@ -1056,6 +1032,8 @@ def generate_minio_configs(namespace, project_config_dict=None):
         The unique identifier for the project.
     project_config_dict : dict, optional
         A dictionary containing the custom configuration for the MinIO.
+    snapshot : ProjectResourceSnapshot, optional
+        The resources of the project namespace, shared with the other configuration generators.
     Returns
     -------
     dict
@@ -1066,7 +1044,7 @@ def generate_minio_configs(namespace, project_config_dict=None):
         - console_secret_key (str): A base64 encoded secret key for console access.
     """
 
-    existing_minio_configs = get_minio_config_if_exists(namespace)
+    existing_minio_configs = get_minio_config_if_exists(namespace, snapshot=snapshot)
     minio_configs = {
         "access_key": "admin",
         "secret_key": (
@@ -1101,7 +1079,7 @@ def generate_minio_configs(namespace, project_config_dict=None):
     return minio_configs
 
 
-def get_minio_config_if_exists(project_id):
+def get_minio_config_if_exists(project_id, snapshot=None):
     """
     Retrieves MinIO configuration if it exists for the given project ID.
     This function loads the Kubernetes configuration from the environment,
@@ -1112,6 +1090,8 @@ def get_minio_config_if_exists(project_id):
     ----------
     project_id : str
         The ID of the project for which to retrieve the MinIO configuration.
+    snapshot : ProjectResourceSnapshot, optional
+        The resources of the project namespace. Defaults to a new snapshot.
 
     Returns
     -------
@@ -1123,41 +1103,24 @@ def get_minio_config_if_exists(project_id):
         - "console_secret_key": The console secret key, if found.
         - "secret_key": The MinIO root password, if found.
     """
-    if "KUBECONFIG_LOCAL" not in os.environ:
-        os.environ["KUBECONFIG_LOCAL"] = os.environ["KUBECONFIG"]
-    kubeconfig = yaml.safe_load(Path(os.environ["KUBECONFIG_LOCAL"]).read_text())
-    config.load_kube_config_from_dict(kubeconfig)
 
-    v1 = client.CoreV1Api()
+    if snapshot is None:
+        snapshot = ProjectResourceSnapshot(project_id)
     minio_configs = {"access_key": "admin"}
-    try:
-        secrets = v1.list_namespaced_secret(namespace=project_id.lower().replace("_", "-"))
-    except client.exceptions.ApiException as e:
-        if e.status == 404 or e.status == 401 or e.status == 403:
-            logger.error(f"Error listing namespaced secrets: {e}")
-            return minio_configs
-        else:
-            raise e
-    for secret in secrets.items:
-        if secret.metadata.name == "storage-user":
-            for item in secret.data:
-
-                decoded_value = base64.b64decode(secret.data[item]).decode("ascii")
-                if item == "CONSOLE_ACCESS_KEY":
-                    minio_configs["console_access_key"] = decoded_value
-                if item == "CONSOLE_SECRET_KEY":
-                    minio_configs["console_secret_key"] = decoded_value
-        if secret.metadata.name == "storage-configuration":
-            for _, value in secret.data.items():
-                decoded_value = base64.b64decode(value).decode("ascii")
-                for line in decoded_value.split("\n"):
-                    if line.startswith("export MINIO_ROOT_PASSWORD="):
-                        minio_configs["secret_key"] = line[len("export MINIO_ROOT_PASSWORD=") :]
+    storage_user = snapshot.get_secret("storage-user") or {}
+    if "CONSOLE_ACCESS_KEY" in storage_user:
+        minio_configs["console_access_key"] = storage_user["CONSOLE_ACCESS_KEY"]
+    if "CONSOLE_SECRET_KEY" in storage_user:
+        minio_configs["console_secret_key"] = storage_user["CONSOLE_SECRET_KEY"]
+    for value in (snapshot.get_secret("storage-configuration") or {}).values():
+        for line in value.split("\n"):
+            if line.startswith("export MINIO_ROOT_PASSWORD="):
+                minio_configs["secret_key"] = line[len("export MINIO_ROOT_PASSWORD=") :]
 
     return minio_configs
 
 
-def generate_mlflow_configs(namespace, project_config_dict=None):
+def generate_mlflow_configs(namespace, project_config_dict=None, snapshot=None):
     """
     Generate MLflow configuration dictionary with encoded user and password.
 
@@ -1168,12 +1131,14 @@ def generate_mlflow_configs(namespace, project_config_dict=None):
 
     project_config_dict : dict, optional
         A dictionary containing the custom configuration for the MLflow.
+    snapshot : ProjectResourceSnapshot, optional
+        The resources of the project namespace, shared with the other configuration generators.
     Returns
     -------
     dict
         A dictionary containing the encoded MLflow user and password.
     """
-    existing_mlflow_configs = get_mlflow_config_if_exists(namespace)
+    existing_mlflow_configs = get_mlflow_config_if_exists(namespace, snapshot=snapshot)
 
     mlflow_configs = {
         "mlflow_user": (
@@ -1197,7 +1162,7 @@ def generate_mlflow_configs(namespace, project_config_dict=None):
     return mlflow_configs
 
 
-def get_mlflow_config_if_exists(project_id):
+def get_mlflow_config_if_exists(project_id, snapshot=None):
     """
     Retrieve MLflow configuration from Kubernetes secrets if they exist.
 
@@ -1206,6 +1171,8 @@ def get_mlflow_config_if_exists(project_id):
     project_id : str
         The ID of the project for which to retrieve the MLflow configuration. This ID is used to
         locate the corresponding Kubernetes namespace and secrets.
+    snapshot : ProjectResourceSnapshot, optional
+        The resources of the project namespace. Defaults to a new snapshot.
 
     Returns
     -------
@@ -1222,36 +1189,20 @@ def get_mlflow_config_if_exists(project_id):
     kubernetes.client.exceptions.ApiException
         If there is an error communicating with the Kubernetes API.
     """
-    if "KUBECONFIG_LOCAL" not in os.environ:
-        os.environ["KUBECONFIG_LOCAL"] = os.environ["KUBECONFIG"]
-    kubeconfig = yaml.safe_load(Path(os.environ["KUBECONFIG_LOCAL"]).read_text())
-    config.load_kube_config_from_dict(kubeconfig)
 
-    v1 = client.CoreV1Api()
+    if snapshot is None:
+        snapshot = ProjectResourceSnapshot(project_id)
     mlflow_configs = {}
-    try:
-        secrets = v1.list_namespaced_secret(namespace=project_id.lower().replace("_", "-"))
-    except client.exceptions.ApiException as e:
-        if e.status == 404 or e.status == 401 or e.status == 403:
-            logger.error(f"Error listing namespaced secrets: {e}")
-            return mlflow_configs
-        else:
-            raise e
-    for secret in secrets.items:
-
-        if secret.metadata.name == project_id.lower().replace("_", "-"):
-            for item in secret.data:
-
-                decoded_value = base64.b64decode(secret.data[item]).decode("ascii")
-                if item == "user":
-                    mlflow_configs["mlflow_user"] = decoded_value
-                if item == "password":
-                    mlflow_configs["mlflow_password"] = decoded_value
+    mlflow_secret = snapshot.get_secret(snapshot.namespace) or {}
+    if "user" in mlflow_secret:
+        mlflow_configs["mlflow_user"] = mlflow_secret["user"]
+    if "password" in mlflow_secret:
+        mlflow_configs["mlflow_password"] = mlflow_secret["password"]
 
     return mlflow_configs
 
 
-def generate_mysql_configs(namespace, project_config_dict=None):
+def generate_mysql_configs(namespace, project_config_dict=None, snapshot=None):
     """
     Generate MySQL configuration dictionary.
 
@@ -1262,6 +1213,8 @@ def generate_mysql_configs(namespace, project_config_dict=None):
 
     project_config_dict : dict, optional
         A dictionary containing the custom configuration for the MySQL.
+    snapshot : ProjectResourceSnapshot, optional
+        The resources of the project namespace, shared with the other configuration generators.
 
     Returns
     -------
@@ -1269,7 +1222,7 @@ def generate_mysql_configs(namespace, project_config_dict=None):
         A dictionary containing MySQL user and password.
     """
 
-    existing_mysql_configs = get_mysql_config_if_exists(namespace)
+    existing_mysql_configs = get_mysql_config_if_exists(namespace, snapshot=snapshot)
 
     mysql_configs = {
         "mysql_user": namespace,
@@ -1290,7 +1243,7 @@ def generate_mysql_configs(namespace, project_config_dict=None):
     return mysql_configs
 
 
-def get_mysql_config_if_exists(project_id):
+def get_mysql_config_if_exists(project_id, snapshot=None):
     """
     Retrieves MySQL configuration from Kubernetes environment variables if they exist.
 
@@ -1299,6 +1252,8 @@ def get_mysql_config_if_exists(project_id):
     project_id : str
         The ID of the project for which to retrieve the MySQL configuration. This ID is used to
         identify the namespace and the MySQL deployment within the Kubernetes cluster.
+    snapshot : ProjectResourceSnapshot, optional
+        The resources of the project namespace. Defaults to a new snapshot.
 
     Returns
     -------
@@ -1314,68 +1269,38 @@ def get_mysql_config_if_exists(project_id):
     variable "KUBECONFIG" and that the MySQL deployment name starts with the project ID followed
     by "-mysql-mkg".
     """
-    if "KUBECONFIG_LOCAL" not in os.environ:
-        os.environ["KUBECONFIG_LOCAL"] = os.environ["KUBECONFIG"]
-    kubeconfig = yaml.safe_load(Path(os.environ["KUBECONFIG_LOCAL"]).read_text())
-    config.load_kube_config_from_dict(kubeconfig)
 
-    v1 = client.CoreV1Api()
-    mlflow_configs = {}
-    try:
-        deploy = v1.list_namespaced_pod(namespace=project_id.lower().replace("_", "-"))
-    except client.exceptions.ApiException as e:
-        if e.status == 404 or e.status == 401 or e.status == 403:
-            logger.error(f"Error listing namespaced pods: {e}")
-            return mlflow_configs
-        else:
-            raise e
+    if snapshot is None:
+        snapshot = ProjectResourceSnapshot(project_id)
+    mysql_configs = {}
+    for pod in snapshot.get_pods(snapshot.namespace + "-mysql-mkg"):
+        for env in pod.spec.containers[0].env:
+            if env.name == "MYSQL_USER":
+                mysql_configs["mysql_user"] = env.value
+            if env.name == "MYSQL_PASSWORD":
+                mysql_configs["mysql_password"] = env.value
 
-    for deployment in deploy.items:
-        if deployment.metadata.name.startswith(project_id.lower().replace("_", "-") + "-mysql-mkg"):
-            envs = deployment.spec.containers[0].env
-            for env in envs:
-                if env.name == "MYSQL_USER":
-                    mlflow_configs["mysql_user"] = env.value
-                if env.name == "MYSQL_PASSWORD":
-                    mlflow_configs["mysql_password"] = env.value
-
-    return mlflow_configs
+    return mysql_configs
 
 
-def get_orthanc_config_if_exists(project_id):
+def get_orthanc_config_if_exists(project_id, snapshot=None):
     """
-    Retrieves Orthanc configuration from Kubernetes environment variables if they exist.
+    Retrieves Orthanc configuration from the Orthanc ConfigMap of the project, if it exists.
     """
-    if "KUBECONFIG_LOCAL" not in os.environ:
-        os.environ["KUBECONFIG_LOCAL"] = os.environ["KUBECONFIG"]
-    kubeconfig = yaml.safe_load(Path(os.environ["KUBECONFIG_LOCAL"]).read_text())
-    config.load_kube_config_from_dict(kubeconfig)
-
-    v1 = client.CoreV1Api()
+    if snapshot is None:
+        snapshot = ProjectResourceSnapshot(project_id)
     orthanc_configs = {}
-    try:
-        # Get ConfigMaps in the given namespace (from project_id)
-        configmaps = v1.list_namespaced_config_map(namespace=project_id.lower().replace("_", "-"))
-    except client.exceptions.ApiException as e:
-        if e.status == 404 or e.status == 401 or e.status == 403:
-            logger.error(f"Error listing namespaced pods: {e}")
-            return orthanc_configs
-        else:
-            raise e
-
-    for configmap in configmaps.items:
-        if configmap.metadata.name.startswith(project_id.lower().replace("_", "-") + "-orthanc-orthanc-config"):
-            for key, value in configmap.data.items():
-                if key == "orthanc.json":
-                    orthanc_configs["orthanc_config"] = value
+    for configmap in snapshot.get_config_maps(snapshot.namespace + "-orthanc-orthanc-config"):
+        if "orthanc.json" in (configmap.data or {}):
+            orthanc_configs["orthanc_config"] = configmap.data["orthanc.json"]
     return orthanc_configs
 
 
-def generate_orthanc_configs(project_id, project_config_dict=None):
+def generate_orthanc_configs(project_id, project_config_dict=None, snapshot=None):
     """
     Generates Orthanc configuration dictionary.
     """
-    orthanc_configs = get_orthanc_config_if_exists(project_id)
+    orthanc_configs = get_orthanc_config_if_exists(project_id, snapshot=snapshot)
 
     if "orthanc_config" in orthanc_configs:
         orthanc_config_str = orthanc_configs["orthanc_config"]
@@ -1403,40 +1328,27 @@ def generate_orthanc_configs(project_id, project_config_dict=None):
     return orthanc_configs
 
 
-def get_nvflare_dashboard_config_if_exists(project_id):
+def get_nvflare_dashboard_config_if_exists(project_id, snapshot=None):
     """
     Retrieves NVFlare Dashboard configuration from Kubernetes environment variables if they exist.
     """
-    if "KUBECONFIG_LOCAL" not in os.environ:
-        os.environ["KUBECONFIG_LOCAL"] = os.environ["KUBECONFIG"]
-    kubeconfig = yaml.safe_load(Path(os.environ["KUBECONFIG_LOCAL"]).read_text())
-    config.load_kube_config_from_dict(kubeconfig)
-    v1 = client.CoreV1Api()
+    if snapshot is None:
+        snapshot = ProjectResourceSnapshot(project_id)
     nvflare_dashboard_configs = {}
-    try:
-        deploy = v1.list_namespaced_pod(namespace=project_id.lower().replace("_", "-"))
-    except client.exceptions.ApiException as e:
-        if e.status == 404 or e.status == 401 or e.status == 403:
-            logger.error(f"Error listing namespaced pods: {e}")
-            return nvflare_dashboard_configs
-        else:
-            raise e
-    for deploy in deploy.items:
-        if deploy.metadata.name.startswith(project_id.lower().replace("_", "-") + "-nvflare-dashboard"):
-            envs = deploy.spec.containers[0].env
-            for env in envs:
-                if env.name == "ADMIN_USERNAME":
-                    nvflare_dashboard_configs["admin_username"] = env.value
-                if env.name == "ADMIN_PASSWORD":
-                    nvflare_dashboard_configs["admin_password"] = env.value
+    for pod in snapshot.get_pods(snapshot.namespace + "-nvflare-dashboard"):
+        for env in pod.spec.containers[0].env:
+            if env.name == "ADMIN_USERNAME":
+                nvflare_dashboard_configs["admin_username"] = env.value
+            if env.name == "ADMIN_PASSWORD":
+                nvflare_dashboard_configs["admin_password"] = env.value
     return nvflare_dashboard_configs
 
 
-def generate_nvflare_dashboard_configs(project_id, project_config_dict=None):
+def generate_nvflare_dashboard_configs(project_id, project_config_dict=None, snapshot=None):
     """
     Generates NVFlare Dashboard configuration dictionary.
     """
-    nvflare_dashboard_configs = get_nvflare_dashboard_config_if_exists(project_id)
+    nvflare_dashboard_configs = get_nvflare_dashboard_config_if_exists(project_id, snapshot=snapshot)
     if "admin_username" in nvflare_dashboard_configs and "admin_password" in nvflare_dashboard_configs:
         return nvflare_dashboard_configs["admin_username"], nvflare_dashboard_configs["admin_password"]
     else:
@@ -1476,59 +1388,21 @@ def create_maia_namespace_values(namespace_config, cluster_config, config_folder
         and the path to the generated values file.
     """
 
-    maia_metallb_ip = cluster_config.get("maia_metallb_ip", None)
-    ssh_ports = get_ssh_ports(
-        len(namespace_config["users"]) + 1,
-        cluster_config["ssh_port_type"],
-        cluster_config["port_range"],
-        maia_metallb_ip=maia_metallb_ip,
-    )
-    ssh_port_list = get_ssh_port_dict(
+    namespace = namespace_config["group_ID"].lower().replace("_", "-")
+    jupyterhub_usernames = [convert_username_to_jupyterhub_username(user) for user in namespace_config["users"]]
+
+    # Existing services keep their port, the new ones get a reserved free port, from a single listing of the services.
+    service_ports = allocate_service_ports(
+        ["jupyter-" + username for username in jupyterhub_usernames] + [f"{namespace}-orthanc-svc-orthanc"],
         cluster_config["ssh_port_type"],
-        namespace_config["group_ID"].lower().replace("_", "-"),
+        namespace,
         cluster_config["port_range"],
-        maia_metallb_ip=maia_metallb_ip,
+        maia_metallb_ip=cluster_config.get("maia_metallb_ip", None),
     )
-
-    ssh_port_dict = {list(entry.keys())[0]: list(entry.values())[0] for entry in ssh_port_list}
-
-    users = []
-
-    if cluster_config["ssh_port_type"] == "LoadBalancer":
-        for user in namespace_config["users"]:
-            if "jupyter-" + convert_username_to_jupyterhub_username(user) in ssh_port_dict:
-                users.append(
-                    {
-                        "jupyterhub_username": convert_username_to_jupyterhub_username(user),
-                        "sshPort": ssh_port_dict["jupyter-" + convert_username_to_jupyterhub_username(user)],
-                    }
-                )
-            else:
-                users.append({"jupyterhub_username": convert_username_to_jupyterhub_username(user), "sshPort": ssh_ports.pop(0)})
-    else:
-        for ssh_port, user in zip(ssh_ports[:-1], namespace_config["users"]):
-            if "jupyter-" + convert_username_to_jupyterhub_username(user) in ssh_port_dict:
-                users.append(
-                    {
-                        "jupyterhub_username": convert_username_to_jupyterhub_username(user),
-                        "sshPort": ssh_port_dict["jupyter-" + convert_username_to_jupyterhub_username(user)],
-                    }
-                )
-            else:
-                users.append({"jupyterhub_username": convert_username_to_jupyterhub_username(user), "sshPort": ssh_port})
-
-    namespace = namespace_config["group_ID"].lower().replace("_", "-")
-
-    if cluster_config["ssh_port_type"] == "LoadBalancer":
-        if f"{namespace}-orthanc-svc-orthanc" in ssh_port_dict:
-            orthanc_ssh_port = ssh_port_dict[f"{namespace}-orthanc-svc-orthanc"]
-        else:
-            orthanc_ssh_port = ssh_ports.pop(0)
-    else:
-        if f"{namespace}-orthanc-svc-orthanc" in ssh_port_dict:
-            orthanc_ssh_port = ssh_port_dict[f"{namespace}-orthanc-svc-orthanc"]
-        else:
-            orthanc_ssh_port = ssh_ports[-1]
+    users = [
+        {"jupyterhub_username": username, "sshPort": service_ports["jupyter-" + username]} for username in jupyterhub_usernames
+    ]
+    orthanc_ssh_port = service_ports[f"{namespace}-orthanc-svc-orthanc"]
 
     maia_namespace_values = {
         "pvc": {"pvc_type": cluster_config["shared_storage_class"], "access_mode": "ReadWriteMany", "size": "10Gi"},
@@ -1880,13 +1754,14 @@ def create_filebrowser_values(namespace_config, cluster_config, config_folder, m
     }
 
 
-def create_nvflare_dashboard_values(namespace_config, cluster_config, config_folder):
+def create_nvflare_dashboard_values(namespace_config, cluster_config, config_folder, snapshot=None):
     """
     Create and write configuration values for deploying the MAIA NVFlare Dashboard Helm chart.
     This function generates a dictionary of configuration values required to deploy the MAIA NVFlare Dashboard
     application in a Kubernetes namespace. It handles image configuration, environment variables, volume
     mounts, CIFS volume setup, and ingress settings for both NGINX and Traefik ingress controllers. The
-    resulting configuration is written to a YAML file in the specified config folder.
+    resulting configuration is written to a YAML file in the specified config folder. The existing admin
+    credentials are read from ``snapshot`` (the resources of the project namespace), if given.
     """
     namespace_id = namespace_config["group_ID"].lower().replace("_", "-")
     maia_nvflare_dashboard_values = {
@@ -1915,7 +1790,9 @@ def create_nvflare_dashboard_values(namespace_config, cluster_config, config_fol
         )
         maia_nvflare_dashboard_values["path"] = "charts/maia-nvflare-dashboard"
 
-    admin_username, admin_password = generate_nvflare_dashboard_configs(namespace_config["group_ID"], namespace_config)
+    admin_username, admin_password = generate_nvflare_dashboard_configs(
+        namespace_config["group_ID"], namespace_config, snapshot=snapshot
+    )
     maia_nvflare_dashboard_values["env"] = [
         {"name": "ADMIN_USERNAME", "value": admin_username},
         {"name": "ADMIN_PASSWORD", "value": admin_password},
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+from loguru import logger
+
+from MAIA.kube_clients import get_kube_api_client
+
+# ConfigMap holding the ports reserved by the project deployments in progress, so that two concurrent deployments do
+# not allocate the same port before their services are created.
+PORT_RESERVATIONS_CONFIGMAP = os.environ.get("MAIA_PORT_RESERVATIONS_CONFIGMAP", "maia-port-reservations")
+PORT_RESERVATIONS_NAMESPACE = os.environ.get("MAIA_PORT_RESERVATIONS_NAMESPACE", "maia-dashboard")
+# Lifetime (in seconds) of a reservation: the deployment is expected to create its services within it.
+PORT_RESERVATION_TTL = float(os.environ.get("MAIA_PORT_RESERVATION_TTL", "900"))
+# Number of attempts to update the reservations when another deployment updates them at the same time.
+PORT_RESERVATION_RETRIES = int(os.environ.get("MAIA_PORT_RESERVATION_RETRIES", "10"))
+
+
+class ServicePorts:
+    """
+    Ports used by the services of a cluster, collected from a single listing of the services.
+
+    Attributes
+    ----------
+    used : set
+        The ports that are not available: the LoadBalancer ports on the MetalLB IP, or the node ports of the cluster.
+    assigned : dict
+        The ports already assigned to services, indexed by service name (without the "-ssh" suffix). With
+        NodePort services, only the services of the namespace and the ports within the port range are included.
+    """
+
+    def __init__(self, used=None, assigned=None):
+        self.used = used if used is not None else set()
+        self.assigned = assigned if assigned is not None else {}
+
+
+def _service_key(service_name):
+    return service_name[: -len("-ssh")] if service_name.endswith("-ssh") else service_name
+
+
+def list_service_ports(port_type, namespace, port_range, maia_metallb_ip=None, core_api=None) -> ServicePorts:
+    """
+    List the services of the cluster once and collect the used and the assigned ports.
+
+    Parameters
+    ----------
+    port_type : str
+        The type of the exposed ports ('LoadBalancer' or 'NodePort').
+    namespace : str
+        The namespace whose NodePort assignments are collected.
+    port_range : tuple
+        The range of the allocated ports (start, end).
+    maia_metallb_ip : str, optional
+        The IP address of the MetalLB load balancer, for 'LoadBalancer' ports.
+    core_api : kubernetes.client.CoreV1Api, optional
+        The API used to list the services. Defaults to the local cluster.
+
+    Returns
+    -------
+    ServicePorts
+        The used and the assigned ports.
+    """
+    if core_api is None:
+        core_api = client.CoreV1Api(get_kube_api_client(local=True))
+
+    service_ports = ServicePorts()
+    for svc in core_api.list_service_for_all_namespaces(watch=False).items:
+        if port_type == "LoadBalancer":
+            ingress = svc.status.load_balancer.ingress
+            if svc.spec.type == "LoadBalancer" and ingress is not None and ingress[0].ip == maia_metallb_ip:
+                for port in svc.spec.ports:
+                    service_ports.used.add(int(port.port))
+                    service_ports.assigned[_service_key(svc.metadata.name)] = int(port.port)
+        elif port_type == "NodePort" and svc.spec.type in ("NodePort", "LoadBalancer"):
+            for port in svc.spec.ports:
+                if port.node_port is None:
+                    continue
+                service_ports.used.add(int(port.node_port))
+                if svc.metadata.namespace == namespace and port_range[0] <= port.node_port <= port_range[1]:
+                    service_ports.assigned[_service_key(svc.metadata.name)] = int(port.node_port)
+    logger.debug(f"Used ports: {sorted(service_ports.used)}")
+    return service_ports
+
+
+def find_free_ports(n_ports, port_range, used) -> list[int]:
+    """
+    Return the first ``n_ports`` ports of ``range(*port_range)`` that are not in ``used``, in a single pass.
+
+    Fewer ports are returned if the range is exhausted.
+    """
+    ports = []
+    if n_ports <= 0:
+        return ports
+    for port in range(port_range[0], port_range[1]):
+        if port not in used:
+            ports.append(port)
+            if len(ports) == n_ports:
+                break
+    return ports
+
+
+def reserve_ports(owner, n_ports, port_range, used, core_api=None) -> list[int]:
+    """
+    Allocate free ports and reserve them in the port reservations ConfigMap.
+
+    The reservations are updated with optimistic concurrency (the ConfigMap resourceVersion): a deployment
+    reserving ports at the same time makes the update fail with a conflict, and the allocation is retried with its
+    reservations taken into account. Expired reservations, and reservations of ports now used by a service, are
+    dropped. The live reservations of ``owner`` are reused first, so that a retried deployment gets the same ports.
+    If the ConfigMap cannot be read or written, the ports are allocated without reservation.
+
+    Parameters
+    ----------
+    owner : str
+        The owner of the reservations, e.g. the project namespace.
+    n_ports : int
+        The number of ports to allocate.
+    port_range : tuple
+        The range of the allocated ports (start, end).
+    used : set
+        The ports used by the existing services, see ``list_service_ports``.
+    core_api : kubernetes.client.CoreV1Api, optional
+        The API used to read and update the reservations. Defaults to the local cluster.
+
+    Returns
+    -------
+    list
+        The allocated ports. Fewer ports are returned if the range is exhausted.
+    """
+    if n_ports <= 0:
+        return []
+    if core_api is None:
+        core_api = client.CoreV1Api(get_kube_api_client(local=True))
+
+    for _ in range(PORT_RESERVATION_RETRIES):
+        try:
+            config_map = core_api.read_namespaced_config_map(PORT_RESERVATIONS_CONFIGMAP, PORT_RESERVATIONS_NAMESPACE)
+        except ApiException as e:
+            if e.status != 404:
+                logger.warning(f"Cannot read the port reservations, allocating ports without reservation: {e.reason}")
+                return find_free_ports(n_ports, port_range, used)
+            config_map = None
+
+        now = time.time()
+        reservations = {}
+        for port, reservation in ((config_map.data or {}) if config_map is not None else {}).items():
+            reservation = json.loads(reservation)
+            if reservation["expires"] > now and int(port) not in used:
+                reservations[int(port)] = reservation
+
+        ports = sorted(
+            port
+            for port, reservation in reservations.items()
+            if reservation["owner"] == owner and port_range[0] <= port < port_range[1]
+        )[:n_ports]
+        ports += find_free_ports(n_ports - len(ports), port_range, used | reservations.keys())
+        for port in ports:
+            reservations[port] = {"owner": owner, "expires": now + PORT_RESERVATION_TTL}
+        data = {str(port): json.dumps(reservation) for port, reservation in sorted(reservations.items())}
+
+        try:
+            if config_map is None:
+                core_api.create_namespaced_config_map(
+                    PORT_RESERVATIONS_NAMESPACE,
+                    client.V1ConfigMap(
+                        metadata=client.V1ObjectMeta(name=PORT_RESERVATIONS_CONFIGMAP, namespace=PORT_RESERVATIONS_NAMESPACE),
+                        data=data,
+                    ),
+                )
+            else:
+                # The resourceVersion read above makes the update fail if the reservations changed in the meantime.
+                config_map.data = data
+                core_api.replace_namespaced_config_map(PORT_RESERVATIONS_CONFIGMAP, PORT_RESERVATIONS_NAMESPACE, config_map)
+        except ApiException as e:
+            if e.status == 409:
+                logger.debug("Port reservations updated concurrently, retrying")
+                continue
+            logger.warning(f"Cannot update the port reservations, allocating ports without reservation: {e.reason}")
+            return find_free_ports(n_ports, port_range, used | reservations.keys())
+        return ports
+
+    raise RuntimeError(f"Could not reserve {n_ports} ports after {PORT_RESERVATION_RETRIES} attempts")
+
+
+def allocate_service_ports(
+    service_names, port_type, namespace, port_range, maia_metallb_ip=None, reserve=True, core_api=None
+) -> dict[str, int]:
+    """
+    Allocate a port to each service of a project namespace.
+
+    The services of the cluster are listed once: services that already have a port keep it, and the other ones get
+    a new free port, reserved (see ``reserve_ports``) unless ``reserve`` is False.
+
+    Parameters
+    ----------
+    service_names : list
+        The names of the services (without the "-ssh" suffix), e.g. ``jupyter-<user>``.
+    port_type : str
+        The type of the exposed ports ('LoadBalancer' or 'NodePort').
+    namespace : str
+        The project namespace.
+    port_range : tuple
+        The range of the allocated ports (start, end).
+    maia_metallb_ip : str, optional
+        The IP address of the MetalLB load balancer, for 'LoadBalancer' ports.
+    reserve : bool, optional
+        Whether to reserve the new ports. Defaults to True.
+    core_api : kubernetes.client.CoreV1Api, optional
+        The API used to list the services and reserve the ports. Defaults to the local cluster.
+
+    Returns
+    -------
+    dict
+        The port of each service.
+
+    Raises
+    ------
+    RuntimeError
+        If the port range does not have enough free ports.
+    """
+    if core_api is None:
+        core_api = client.CoreV1Api(get_kube_api_client(local=True))
+
+    service_ports = list_service_ports(port_type, namespace, port_range, maia_metallb_ip=maia_metallb_ip, core_api=core_api)
+    ports = {name: service_ports.assigned[name] for name in service_names if name in service_ports.assigned}
+    missing = [name for name in dict.fromkeys(service_names) if name not in ports]
+    if reserve:
+        new_ports = reserve_ports(namespace, len(missing), port_range, service_ports.used, core_api=core_api)
+    else:
+        new_ports = find_free_ports(len(missing), port_range, service_ports.used)
+    if len(new_ports) < len(missing):
+        raise RuntimeError(f"Not enough free ports in the range {port_range[0]}-{port_range[1]} for {namespace}")
+    ports.update(zip(missing, new_ports))
+    return ports
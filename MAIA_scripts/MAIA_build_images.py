@@ -12,19 +12,21 @@ from textwrap import dedent
 
 import click
 import yaml
-from hydra import compose as hydra_compose
-from hydra import initialize_config_dir
 from kubernetes import config
 from loguru import logger
-from omegaconf import OmegaConf
 
 import MAIA
 from MAIA.kubernetes_utils import create_helm_repo_secret_from_context
+from MAIA.lazy_imports import LazyImport
 from MAIA.maia_admin import install_maia_project
-from MAIA.maia_docker_images import deploy_maia_kaniko
+from MAIA.maia_docker_images import BUILD_CACHE_MANIFEST, deploy_maia_kaniko, run_image_build_graph
 from MAIA.versions import define_maia_docker_versions, define_docker_image_versions, define_maia_admin_versions
 from MAIA.maia_k8s_distros import get_storage_class
 
+hydra_compose = LazyImport("hydra", "compose")
+initialize_config_dir = LazyImport("hydra", "initialize_config_dir")
+OmegaConf = LazyImport("omegaconf", "OmegaConf")
+
 kaniko_chart_type = define_maia_docker_versions()["kaniko_chart_type"]
 build_versions = define_docker_image_versions()
 maia_dashboard_dev_tag_suffix = define_maia_admin_versions()["maia_dashboard_dev_tag_suffix"]
@@ -88,6 +90,28 @@ def get_arg_parser():
         default=None,
         help="Build the custom images from the given YAML file.",
     )
+    pars.add_argument(
+        "--executor",
+        required=False,
+        default="dag",
+        choices=["dag", "argocd"],
+        help=(
+            "How to run the builds: 'dag' runs them with Helm in dependency order, in parallel, skipping the images"
+            " unchanged since their last build; 'argocd' deploys all of them at once as an ArgoCD project."
+        ),
+    )
+    pars.add_argument(
+        "--max-parallel-builds",
+        type=int,
+        required=False,
+        default=None,
+        help="Maximum number of concurrent builds with the 'dag' executor. Defaults to MAIA_MAX_PARALLEL_BUILDS (4).",
+    )
+    pars.add_argument(
+        "--force-rebuild",
+        action="store_true",
+        help="Rebuild every image with the 'dag' executor, ignoring the build cache manifest.",
+    )
     pars.add_argument("-v", "--version", action="version", version="%(prog)s " + version)
 
     return pars
@@ -100,6 +124,9 @@ def get_arg_parser():
 @click.option("--project-id", required=True, type=str)
 @click.option("--cluster-address", type=str, default="https://kubernetes.default.svc")
 @click.option("--build-custom-images", type=str, default=None)
+@click.option("--executor", type=click.Choice(["dag", "argocd"]), default="dag")
+@click.option("--max-parallel-builds", type=int, default=None)
+@click.option("--force-rebuild", is_flag=True, default=False)
 def main(
     cluster_config,
     config_folder,
@@ -107,6 +134,9 @@ def main(
     registry_path,
     cluster_address,
     build_custom_images,
+    executor,
+    max_parallel_builds,
+    force_rebuild,
 ):
     build_maia_images(
         cluster_config,
@@ -115,6 +145,9 @@ def main(
         registry_path,
         cluster_address,
         build_custom_images,
+        executor=executor,
+        max_parallel_builds=max_parallel_builds,
+        force_rebuild=force_rebuild,
     )
 
 
@@ -125,6 +158,9 @@ def build_maia_images(
     registry_path="",
     cluster_address="https://kubernetes.default.svc",
     build_custom_images=None,
+    executor="dag",
+    max_parallel_builds=None,
+    force_rebuild=False,
 ):
     cluster_config_dict = yaml.safe_load(Path(cluster_config).read_text())
 
@@ -557,24 +593,26 @@ def build_maia_images(
                     git_repo_url=custom_image["git_repo_url"],
                 )
             )
-    for helm_command in helm_commands:
-        cmd = [
-            "helm",
-            "upgrade",
-            "--install",
-            "--wait",
-            "-n",
-            helm_command["namespace"],
-            helm_command["release"],
-            helm_command["chart"],
-            "--repo",
-            helm_command["repo"],
-            "--version",
-            helm_command["version"],
-            "--values",
-            helm_command["values"],
-        ]
-        logger.debug(f"Helm command: {' '.join(cmd)}")
+    if executor == "dag" and kaniko_chart_type != "helm_repo":
+        logger.warning("The 'dag' executor requires kaniko_chart_type to be helm_repo, building with ArgoCD instead")
+        executor = "argocd"
+    if executor == "dag":
+        config.load_config()
+        statuses = asyncio.run(
+            run_image_build_graph(
+                helm_commands,
+                max_parallel=max_parallel_builds,
+                cache_path=Path(config_folder).joinpath(project_id, BUILD_CACHE_MANIFEST),
+                force=force_rebuild,
+            )
+        )
+        for status in ("built", "cached", "skipped", "failed"):
+            releases = [release for release, release_status in statuses.items() if release_status == status]
+            if releases:
+                logger.info(f"{status.capitalize()}: {', '.join(releases)}")
+        if any(status in ("failed", "skipped") for status in statuses.values()):
+            raise RuntimeError("Some MAIA images failed to build")
+        return
 
     values = {
         "defaults": ["_self_"],
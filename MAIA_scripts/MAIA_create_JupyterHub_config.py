@@ -13,14 +13,16 @@ from textwrap import dedent
 import click
 import yaml
 from loguru import logger
-from minio import Minio
-from omegaconf import OmegaConf
 from types import SimpleNamespace
 
 from MAIA.kubernetes_utils import get_minio_shareable_link
 import MAIA
+from MAIA.lazy_imports import LazyImport
 from MAIA.versions import define_docker_image_versions
 
+Minio = LazyImport("minio", "Minio")
+OmegaConf = LazyImport("omegaconf", "OmegaConf")
+
 version = MAIA.__version__
 
 
@@ -13,11 +13,7 @@ import json
 import subprocess
 from MAIA.kubernetes_utils import create_helm_repo_secret_from_context
 import yaml
-from hydra import compose as hydra_compose
-from hydra import initialize_config_dir
 from loguru import logger
-from omegaconf import OmegaConf
-from pyhelm3 import Client
 from MAIA.maia_k8s_distros import get_storage_class, get_ingress_class
 
 import MAIA
@@ -29,6 +25,12 @@ from MAIA.maia_admin import (
     install_maia_project,
     create_rancher_values,
 )
+from MAIA.lazy_imports import LazyImport
+
+hydra_compose = LazyImport("hydra", "compose")
+initialize_config_dir = LazyImport("hydra", "initialize_config_dir")
+OmegaConf = LazyImport("omegaconf", "OmegaConf")
+Client = LazyImport("pyhelm3", "Client")
 
 version = MAIA.__version__
 
@@ -12,11 +12,7 @@ from textwrap import dedent
 
 import click
 import yaml
-from hydra import compose as hydra_compose
-from hydra import initialize_config_dir
 from loguru import logger
-from omegaconf import OmegaConf
-from pyhelm3 import Client
 
 import MAIA
 from MAIA.kubernetes_utils import create_helm_repo_secret_from_context
@@ -43,6 +39,12 @@ from MAIA.maia_core import (
     create_kubeflow_values,
     create_nvidia_dra_values,
 )
+from MAIA.lazy_imports import LazyImport
+
+hydra_compose = LazyImport("hydra", "compose")
+initialize_config_dir = LazyImport("hydra", "initialize_config_dir")
+OmegaConf = LazyImport("omegaconf", "OmegaConf")
+Client = LazyImport("pyhelm3", "Client")
 
 version = MAIA.__version__
 
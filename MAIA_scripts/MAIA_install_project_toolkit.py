@@ -4,23 +4,21 @@ from __future__ import annotations
 
 import asyncio
 import datetime
-import json
 import os
-import subprocess
+import threading
+import time
 from argparse import ArgumentParser, RawTextHelpFormatter
 from pathlib import Path
 from textwrap import dedent
 
 import click
-import hydra
 import yaml
-from hydra import compose as hydra_compose
-from hydra import initialize_config_dir
 from loguru import logger
-from omegaconf import OmegaConf
-from pyhelm3 import Client
 
 import MAIA
+from MAIA.helm_rollout import HelmRollout
+from MAIA.kube_clients import get_kubeconfig_path
+from MAIA.lazy_imports import LazyImport
 from MAIA.maia_admin import (
     get_maia_toolkit_apps,
     install_maia_project,
@@ -34,17 +32,26 @@ from MAIA.maia_fn import (
     generate_minio_configs,
     generate_mlflow_configs,
     generate_mysql_configs,
+    ProjectResourceSnapshot,
     copy_certificate_authority_secret,
     deploy_kubeflow_project,
     create_nvflare_dashboard_values,
 )
 from MAIA_scripts.MAIA_create_JupyterHub_config import create_jupyterhub_config_api
 
+hydra = LazyImport("hydra")
+hydra_compose = LazyImport("hydra", "compose")
+initialize_config_dir = LazyImport("hydra", "initialize_config_dir")
+OmegaConf = LazyImport("omegaconf", "OmegaConf")
+Client = LazyImport("pyhelm3", "Client")
+
 version = MAIA.__version__
 
 
 TIMESTAMP = "{:%Y-%m-%d_%H-%M-%S}".format(datetime.datetime.now())
 
+_hydra_lock = threading.Lock()
+
 DESC = dedent("""
     Script to deploy a MAIA Project Toolkit to a Kubernetes cluster. The target cluster is specified by setting
     the corresponding ``--cluster-config``, while the project-related configuration is specified with
@@ -97,7 +104,7 @@ def get_arg_parser():
 
 
 async def verify_installed_maia_toolkit(project_id, namespace, get_chart_metadata=True):
-    client = Client(kubeconfig=os.environ["KUBECONFIG"])
+    client = Client(kubeconfig=get_kubeconfig_path())
 
     try:
         revision = await client.get_current_revision(project_id, namespace=namespace)
@@ -167,9 +174,9 @@ def deploy_maia_toolkit_api(
     # Override cluster config with project-specific configuration, if found
     namespace_id = project_form_dict["group_ID"].lower().replace("_", "-")
     # Unset all the environment variables ending with _namespace_id
-    for key in os.environ:
+    for key in list(os.environ):
         if key.endswith("_" + namespace_id):
-            os.environ.pop(key)
+            os.environ.pop(key, None)
     if "CLUSTER_CONFIG_PATH" in os.environ:
         cluster_config_path = os.environ["CLUSTER_CONFIG_PATH"]
         if Path(cluster_config_path).joinpath(f"{namespace_id}.yaml").exists():
@@ -203,15 +210,20 @@ def deploy_maia_toolkit_api(
 
     helm_commands = []
 
-    mlflow_configs = generate_mlflow_configs(namespace=group_id.lower().replace("_", "-"), project_config_dict=project_form_dict)
+    # The existing secrets, pods and ConfigMaps of the project are listed once, for all the configuration generators.
+    project_resources = ProjectResourceSnapshot(namespace)
+
+    mlflow_configs = generate_mlflow_configs(
+        namespace=group_id.lower().replace("_", "-"), project_config_dict=project_form_dict, snapshot=project_resources
+    )
 
     if not minimal:
         minio_configs = generate_minio_configs(
-            namespace=group_id.lower().replace("_", "-"), project_config_dict=project_form_dict
+            namespace=group_id.lower().replace("_", "-"), project_config_dict=project_form_dict, snapshot=project_resources
         )
 
         mysql_configs = generate_mysql_configs(
-            namespace=group_id.lower().replace("_", "-"), project_config_dict=project_form_dict
+            namespace=group_id.lower().replace("_", "-"), project_config_dict=project_form_dict, snapshot=project_resources
         )
 
         project_form_dict["minio_access_key"] = minio_configs["console_access_key"]
@@ -267,6 +279,7 @@ def deploy_maia_toolkit_api(
                 project_form_dict,
                 cluster_config_dict,
                 config_folder,
+                snapshot=project_resources,
             )
         )
     if deploy_kubeflow:
@@ -315,92 +328,28 @@ def deploy_maia_toolkit_api(
         )
 
         helm_commands.append(
-            deploy_orthanc(cluster_config_dict, project_form_dict, config_folder, project_config_dict=project_form_dict)
+            deploy_orthanc(
+                cluster_config_dict,
+                project_form_dict,
+                config_folder,
+                project_config_dict=project_form_dict,
+                snapshot=project_resources,
+            )
         )
 
     if "JSON_KEY_PATH_" + namespace_id in os.environ:
         json_key_path = os.environ["JSON_KEY_PATH_" + namespace_id]
     else:
         json_key_path = os.environ.get("JSON_KEY_PATH", None)
-    for helm_command in helm_commands:
-        if not helm_command["repo"].startswith("http") and not Path(helm_command["repo"]).exists() and not return_values_only:
-            original_repo = helm_command["repo"]
-            helm_command["repo"] = f"oci://{helm_command['repo']}"
-            try:
-                with open(json_key_path, "r") as f:
-                    docker_credentials = json.load(f)
-                    username = docker_credentials.get("username")
-                    password = docker_credentials.get("password")
-            except Exception:
-                with open(json_key_path, "r") as f:
-                    docker_credentials = f.read()
-                    username = "_json_key"
-                    password = docker_credentials
-
-            subprocess.run(
-                [
-                    "helm",
-                    "registry",
-                    "login",
-                    original_repo,
-                    "--username",
-                    username,
-                    "--password-stdin",
-                ],
-                input=password,
-                text=True,
-            )
-
-            logger.debug(f"Helm registry login {original_repo} --username {username} --password-stdin")
-            subprocess.run(
-                [
-                    "helm",
-                    "pull",
-                    helm_command["repo"] + "/" + helm_command["chart"],
-                    "--version",
-                    helm_command["version"],
-                    "--destination",
-                    "/tmp",
-                ]
-            )
-            logger.debug(
-                f"Helm pull command: helm pull {helm_command['repo']}/{helm_command['chart']} "
-                f"--version {helm_command['version']} --destination /tmp"
-            )
-
-            cmd = [
-                "helm",
-                "upgrade",
-                "--install",
-                # "--wait",
-                "-n",
-                helm_command["namespace"],
-                helm_command["release"],
-                "/tmp/" + helm_command["chart"] + "-" + helm_command["version"] + ".tgz",
-                "--values",
-                helm_command["values"],
-            ]
-            logger.debug(f"Helm command: {' '.join(cmd)}")
-        else:
-            cmd = [
-                "helm",
-                "upgrade",
-                "--install",
-                # "--wait",
-                "-n",
-                helm_command["namespace"],
-                helm_command["release"],
-                helm_command["chart"],
-                "--repo",
-                helm_command["repo"],
-                "--version",
-                helm_command["version"],
-                "--values",
-                helm_command["values"],
-            ]
-            logger.debug(f"Helm command: {' '.join(cmd)}")
-        if no_argocd and not return_values_only:
-            subprocess.Popen(cmd)
+    rollout_msg = ""
+    if no_argocd and not return_values_only:
+        # The releases are independent: run them concurrently, logging into each registry and pulling each chart once
+        start = time.monotonic()
+        results = asyncio.run(HelmRollout(json_key_path=json_key_path).run(helm_commands))
+        logger.info(f"Deployed {len(results)} Helm releases in {time.monotonic() - start:.1f}s")
+        failed = [result["release"] for result in results if result["returncode"] != 0]
+        if failed:
+            rollout_msg = f"Deployment failed: Helm releases {', '.join(failed)} failed."
 
     destination_cluster_address = cluster_config_dict["argocd_destination_cluster_address"]
 
@@ -439,12 +388,11 @@ def deploy_maia_toolkit_api(
     with open(Path(config_folder).joinpath(group_id, "values.yaml"), "w") as f:
         f.write(OmegaConf.to_yaml(values))
 
-    try:
-        initialize_config_dir(config_dir=str(Path(config_folder).joinpath(group_id)), job_name=group_id)
-    except Exception:
+    # GlobalHydra is process-wide: the dashboard threads compose the values of one project at a time.
+    with _hydra_lock:
         hydra.core.global_hydra.GlobalHydra.instance().clear()
-        initialize_config_dir(config_dir=str(Path(config_folder).joinpath(group_id)), job_name=group_id)
-    cfg = hydra_compose("values.yaml")
+        with initialize_config_dir(config_dir=str(Path(config_folder).joinpath(group_id)), job_name=group_id):
+            cfg = hydra_compose("values.yaml")
     OmegaConf.save(
         cfg,
         str(Path(config_folder).joinpath(group_id, f"{group_id}_values.yaml")),
@@ -458,7 +406,7 @@ def deploy_maia_toolkit_api(
             with open(Path(config_folder).joinpath(group_id, f"{group_id}_values.yaml")) as f:
                 return yaml.safe_load(f)
         else:
-            return
+            return rollout_msg
     revision = asyncio.run(verify_installed_maia_toolkit(project_id, os.environ["argocd_namespace"]))
 
     if revision == -1 or redeploy_enabled:
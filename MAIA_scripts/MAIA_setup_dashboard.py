@@ -8,14 +8,16 @@ It performs the following operations:
 - Runs Django migrations for gpu_scheduler app
 - Runs general Django migrations
 - Applies database migrations
-- Starts the Django development server
+- Starts the Django development server, or the production gunicorn server
 
 Usage:
-    MAIA_setup_dashboard [--host HOST] [--port PORT] [--no-server]
+    MAIA_setup_dashboard [--host HOST] [--port PORT] [--server {runserver,gunicorn}] [--no-server]
 
 Options:
     --host HOST         Bind address for the server (default: 0.0.0.0)
     --port PORT         Port number for the server (default: 8000)
+    --server SERVER     "runserver" (Django development server) or "gunicorn" (multi-worker, threaded
+                        production profile of core/gunicorn_conf.py) (default: runserver)
     --no-server         Only run migrations, don't start the server
     --background        Run server in background (detached mode)
 """
@@ -62,7 +64,7 @@ def run_command(command, cwd=None, background=False):
         sys.exit(1)
 
 
-def setup_dashboard(host="0.0.0.0", port=8000, skip_server=False, background=False):
+def setup_dashboard(host="0.0.0.0", port=8000, skip_server=False, background=False, server="runserver"):
     """
     Set up the MAIA dashboard by running migrations and optionally starting the server.
 
@@ -71,6 +73,7 @@ def setup_dashboard(host="0.0.0.0", port=8000, skip_server=False, background=Fal
         port: The port number to run the server on
         skip_server: If True, only run migrations without starting the server
         background: If True, run the server in background mode
+        server: "runserver" for the Django development server, "gunicorn" for the production profile
     """
     dashboard_path = get_dashboard_path()
     manage_py = dashboard_path / "manage.py"
@@ -99,9 +102,24 @@ def setup_dashboard(host="0.0.0.0", port=8000, skip_server=False, background=Fal
     run_command([sys.executable, "manage.py", "migrate"], cwd=dashboard_path)
 
     if not skip_server:
-        # Step 5: Start the development server
-        print(f"\n[5/5] Starting Django development server on {host}:{port}...")
-        server_command = [sys.executable, "manage.py", "runserver", f"{host}:{port}", "--insecure"]
+        # Step 5: Start the server
+        if server == "gunicorn":
+            # Without runserver --insecure, the static files are served by WhiteNoise from STATIC_ROOT
+            run_command([sys.executable, "manage.py", "collectstatic", "--noinput"], cwd=dashboard_path)
+            print(f"\n[5/5] Starting gunicorn server on {host}:{port}...")
+            server_command = [
+                sys.executable,
+                "-m",
+                "gunicorn",
+                "--config",
+                "python:core.gunicorn_conf",
+                "--bind",
+                f"{host}:{port}",
+                "core.wsgi",
+            ]
+        else:
+            print(f"\n[5/5] Starting Django development server on {host}:{port}...")
+            server_command = [sys.executable, "manage.py", "runserver", f"{host}:{port}", "--insecure"]
 
         if background:
             run_command(server_command, cwd=dashboard_path, background=True)
@@ -130,13 +148,20 @@ def main():
 
     parser.add_argument("--port", type=int, default=8000, help="Port number for the server (default: 8000)")
 
+    parser.add_argument(
+        "--server",
+        choices=["runserver", "gunicorn"],
+        default="runserver",
+        help="Django development server or multi-worker gunicorn server (default: runserver)",
+    )
+
     parser.add_argument("--no-server", action="store_true", help="Only run migrations, don't start the server")
 
     parser.add_argument("--background", action="store_true", help="Run server in background (detached mode)")
 
     args = parser.parse_args()
 
-    setup_dashboard(host=args.host, port=args.port, skip_server=args.no_server, background=args.background)
+    setup_dashboard(host=args.host, port=args.port, skip_server=args.no_server, background=args.background, server=args.server)
 
 
 if __name__ == "__main__":
@@ -3,9 +3,5 @@
 Copyright (c) 2019 - present AppSeed.us
 """
 
-bind = '0.0.0.0:5005'
-workers = 1
-accesslog = '-'
-loglevel = 'debug'
-capture_output = True
-enable_stdio_inheritance = True
+# The serving profile ships with the dashboard package, see ``MAIA/dashboard/core/gunicorn_conf.py``.
+from core.gunicorn_conf import *  # noqa: F403
@@ -0,0 +1,209 @@
+import importlib
+import json
+import os
+import threading
+import time
+from unittest.mock import patch
+
+from MAIA import cluster_cache, kubernetes_utils
+from MAIA.cluster_cache import ClusterStateCache, ResourceWatcher, parse_resource_path
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _pod(name, namespace, resource_version):
+    return {"metadata": {"name": name, "namespace": namespace, "resourceVersion": resource_version}}
+
+
+class _FakeResponse:
+    def __init__(self, body=None, lines=None, hold=None):
+        self.body = body
+        self.lines = lines or []
+        self.hold = hold
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+    def iter_lines(self):
+        yield from self.lines
+        if self.hold is not None:
+            # Keep the watch open, as an idle API server would.
+            self.hold.wait(5)
+
+
+class _FakeSession:
+    """Serve one list response, then a single watch stream that stays open until released."""
+
+    def __init__(self, list_body, events):
+        self.list_body = list_body
+        self.events = events
+        self.release = threading.Event()
+        self.watch_started = threading.Event()
+
+    def get(self, url, params=None, **kwargs):
+        if params is None:
+            return _FakeResponse(body=self.list_body)
+        self.watch_started.set()
+        return _FakeResponse(lines=[json.dumps(event).encode() for event in self.events], hold=self.release)
+
+
+def _wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+# ---------------------------------------------------------------------------
+# Path parsing
+# ---------------------------------------------------------------------------
+
+
+class TestParseResourcePath:
+    def test_cluster_wide_and_namespaced_lists(self):
+        assert parse_resource_path("/api/v1/nodes") == ("nodes", None)
+        assert parse_resource_path("/api/v1/namespaces") == ("namespaces", None)
+        assert parse_resource_path("/api/v1/namespaces/demo/services") == ("services", "demo")
+        assert parse_resource_path("/apis/networking.k8s.io/v1/namespaces/demo/ingresses") == ("ingresses", "demo")
+
+    def test_unsupported_paths(self):
+        assert parse_resource_path("/api/v1/namespaces/demo") is None
+        assert parse_resource_path("/api/v1/namespaces/demo/secrets") is None
+        assert parse_resource_path("/api/v1/ingresses") is None
+
+
+# ---------------------------------------------------------------------------
+# List + watch
+# ---------------------------------------------------------------------------
+
+
+class TestResourceWatcher:
+    def test_watch_events_are_applied_to_snapshot(self):
+        list_body = {"metadata": {"resourceVersion": "10"}, "items": [_pod("a", "ns1", "9"), _pod("b", "ns2", "10")]}
+        events = [
+            {"type": "ADDED", "object": _pod("c", "ns1", "11")},
+            {"type": "DELETED", "object": _pod("b", "ns2", "12")},
+            {"type": "BOOKMARK", "object": {"metadata": {"resourceVersion": "13"}}},
+        ]
+        session = _FakeSession(list_body, events)
+
+        with patch.object(cluster_cache, "get_cluster_api_session", return_value=session):
+            watcher = ResourceWatcher("https://api.cluster", "pods", "token")
+            watcher.start()
+            try:
+                assert _wait_for(lambda: watcher.resource_version == "13")
+                assert sorted(item["metadata"]["name"] for item in watcher.snapshot()["items"]) == ["a", "c"]
+                assert [item["metadata"]["name"] for item in watcher.snapshot(namespace="ns2")["items"]] == []
+                assert watcher.staleness() < 1
+            finally:
+                watcher.stop()
+                session.release.set()
+
+    def test_expired_resource_version_triggers_relist(self):
+        list_body = {"metadata": {"resourceVersion": "10"}, "items": []}
+        session = _FakeSession(list_body, [{"type": "ERROR", "object": {"code": 410, "message": "too old"}}])
+        lists = []
+        original_get = session.get
+
+        def _get(url, params=None, **kwargs):
+            if params is None:
+                lists.append(url)
+            return original_get(url, params=params, **kwargs)
+
+        session.get = _get
+        with patch.object(cluster_cache, "get_cluster_api_session", return_value=session):
+            watcher = ResourceWatcher("https://api.cluster", "nodes", "token")
+            watcher.start()
+            try:
+                assert _wait_for(lambda: len(lists) >= 2)
+            finally:
+                watcher.stop()
+                session.release.set()
+
+
+# ---------------------------------------------------------------------------
+# Integration with fetch_from_clusters
+# ---------------------------------------------------------------------------
+
+
+class TestClusterStateCache:
+    def test_unsynced_cache_falls_back_to_direct_read(self):
+        cache = ClusterStateCache()
+        with patch.object(ResourceWatcher, "start"), patch.object(cluster_cache, "_cluster_state_cache", cache), patch.object(
+            kubernetes_utils, "_get_cluster_resource", return_value={"items": ["direct"]}
+        ) as direct:
+            results = kubernetes_utils.fetch_from_clusters(
+                "id-token", [("https://api.private", "/api/v1/nodes")], private_clusters={"https://api.private": "token"}
+            )
+
+        assert results[("https://api.private", "/api/v1/nodes")] == {"items": ["direct"]}
+        direct.assert_called_once()
+        assert cache.status()["https://api.private"]["nodes"]["synced"] is False
+
+    def test_synced_cache_serves_private_clusters_only(self):
+        cache = ClusterStateCache()
+        with patch.object(ResourceWatcher, "start"):
+            watcher = cache._get_watcher("https://api.private", "services", "token")
+        watcher._objects = {("demo", "svc"): {"metadata": {"name": "svc", "namespace": "demo"}}}
+        watcher.resource_version = "5"
+        watcher.synced = True
+        watcher.last_sync = time.monotonic()
+
+        with patch.object(cluster_cache, "_cluster_state_cache", cache), patch.object(
+            kubernetes_utils, "_get_cluster_resource", return_value={"items": []}
+        ) as direct:
+            results = kubernetes_utils.fetch_from_clusters(
+                "id-token",
+                [
+                    ("https://api.private", "/api/v1/namespaces/demo/services"),
+                    ("https://api.public", "/api/v1/namespaces/demo/services"),
+                ],
+                private_clusters={"https://api.private": "token"},
+            )
+
+        assert [
+            item["metadata"]["name"] for item in results[("https://api.private", "/api/v1/namespaces/demo/services")]["items"]
+        ] == ["svc"]
+        direct.assert_called_once()
+        assert direct.call_args.args[0] == "https://api.public"
+
+    def test_stale_snapshot_is_not_served(self):
+        cache = ClusterStateCache(max_staleness=1)
+        with patch.object(ResourceWatcher, "start"):
+            watcher = cache._get_watcher("https://api.private", "nodes", "token")
+        watcher.synced = True
+        watcher.last_sync = time.monotonic() - 10
+
+        with patch.object(ResourceWatcher, "start"):
+            assert cache.get("https://api.private", "/api/v1/nodes", "token") is None
+
+
+# ---------------------------------------------------------------------------
+# Gunicorn profile
+# ---------------------------------------------------------------------------
+
+
+class TestGunicornProfile:
+    def test_cache_is_off_by_default_under_gunicorn(self):
+        with patch.dict(os.environ):
+            os.environ.pop("CLUSTER_STATE_CACHE", None)
+            importlib.reload(importlib.import_module("core.gunicorn_conf"))
+
+            assert os.environ["CLUSTER_STATE_CACHE"] == "False"
+
+    def test_cache_can_be_enabled_under_gunicorn(self):
+        with patch.dict(os.environ, {"CLUSTER_STATE_CACHE": "True"}):
+            importlib.reload(importlib.import_module("core.gunicorn_conf"))
+
+            assert os.environ["CLUSTER_STATE_CACHE"] == "True"
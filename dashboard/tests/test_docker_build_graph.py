@@ -0,0 +1,204 @@
+import asyncio
+import json
+import subprocess
+
+import pytest
+
+from MAIA.maia_docker_images import (
+    get_image_build_graph,
+    get_image_build_keys,
+    run_image_build_graph,
+)
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+REGISTRY = "registry.example.com/maia"
+
+
+def _build(name, subpath, base=None, build_args=()):
+    build_args = list(build_args)
+    if base is not None:
+        build_args.insert(0, f"BASE_IMAGE={REGISTRY}/{base}:1.0")
+    return {
+        "release": f"p-{name}",
+        "image": f"{REGISTRY}/{name}:1.0",
+        "context": None,
+        "subpath": subpath,
+        "build_args": build_args,
+    }
+
+
+def _builds():
+    # base -> notebook -> ssh -> {addons, lab}, and an independent kube -> dashboard branch.
+    return [
+        _build("lab", "lab", base="ssh"),
+        _build("dashboard", "dashboard", base="kube"),
+        _build("ssh", "ssh", base="notebook"),
+        _build("addons", "addons", base="ssh"),
+        _build("notebook", "notebook", base="base"),
+        _build("base", "base"),
+        _build("kube", "kube"),
+    ]
+
+
+def _commit(repo):
+    """Commit every change of the build context repository, as pushed to the Git context built by Kaniko."""
+    git = ["git", "-C", str(repo), "-c", "user.name=maia", "-c", "user.email=maia@example.com"]
+    subprocess.run([*git, "add", "-A"], check=True, capture_output=True)
+    subprocess.run([*git, "commit", "-q", "-m", "update"], check=True, capture_output=True)
+
+
+@pytest.fixture
+def context_root(tmp_path, monkeypatch):
+    repo = tmp_path / "repo"
+    for build in _builds():
+        repo.joinpath(build["subpath"]).mkdir(parents=True)
+        repo.joinpath(build["subpath"], "Dockerfile").write_text(f"FROM scratch\n# {build['subpath']}\n")
+    subprocess.run(["git", "init", "-q", "-b", "main", str(repo)], check=True, capture_output=True)
+    _commit(repo)
+    monkeypatch.setenv("MAIA_BUILD_CONTEXT_ROOT", str(repo))
+    # The local checkout doubles as the remote of the Git context.
+    monkeypatch.setenv("MAIA_GIT_REPO_URL", f"{repo}#refs/heads/main")
+    return repo
+
+
+class _FakeBuilder:
+    """Record the builds, their overlap and optionally fail some of them."""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.started = []
+        self.finished = []
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self, build):
+        self.started.append(build["release"])
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        if build["release"] in self.fail:
+            raise RuntimeError("build failed")
+        self.finished.append(build["release"])
+
+
+# ---------------------------------------------------------------------------
+# Graph and keys
+# ---------------------------------------------------------------------------
+
+
+class TestImageBuildGraph:
+    def test_dependencies_come_from_build_args(self):
+        graph = get_image_build_graph(_builds())
+
+        assert graph["p-lab"] == {"p-ssh"}
+        assert graph["p-base"] == set()
+        order = list(graph)
+        for release, dependencies in graph.items():
+            assert all(order.index(dependency) < order.index(release) for dependency in dependencies)
+
+    def test_cycles_and_duplicate_images_are_rejected(self):
+        with pytest.raises(ValueError, match="Circular"):
+            get_image_build_graph([_build("a", "a", base="b"), _build("b", "b", base="a")])
+        with pytest.raises(ValueError, match="built by both"):
+            get_image_build_graph([_build("a", "a"), {**_build("a", "b"), "release": "p-other"}])
+
+    def test_keys_change_with_the_context_of_a_base(self, context_root):
+        builds = _builds()
+        graph = get_image_build_graph(builds)
+        keys = get_image_build_keys(builds, graph)
+
+        context_root.joinpath("notebook", "Dockerfile").write_text("FROM scratch\nRUN true\n")
+        # Uncommitted changes are not in the Git context built by Kaniko.
+        assert get_image_build_keys(builds, graph)["p-notebook"] is None
+        assert get_image_build_keys(builds, graph)["p-kube"] == keys["p-kube"]
+        _commit(context_root)
+        changed = get_image_build_keys(builds, graph)
+
+        assert {release for release in keys if keys[release] != changed[release]} == {"p-notebook", "p-ssh", "p-lab", "p-addons"}
+
+    def test_builds_without_local_context_have_no_key(self, context_root, tmp_path):
+        custom_context = f"{tmp_path / 'missing'}.git"
+        builds = _builds() + [{**_build("custom", "custom", base="base"), "context": custom_context}]
+        keys = get_image_build_keys(builds, get_image_build_graph(builds))
+
+        assert keys["p-custom"] is None
+        assert keys["p-base"] is not None
+
+    def test_keys_follow_the_git_context(self, context_root, monkeypatch):
+        builds = _builds()
+        graph = get_image_build_graph(builds)
+        keys = get_image_build_keys(builds, graph)
+        head = subprocess.run(
+            ["git", "-C", str(context_root), "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+        # The same commit pinned in the context: the context is part of the key.
+        monkeypatch.setenv("MAIA_GIT_REPO_URL", f"{context_root}#refs/heads/main#{head}")
+        pinned = get_image_build_keys(builds, graph)
+        assert pinned["p-base"] is not None and pinned["p-base"] != keys["p-base"]
+
+        # The branch moves while the local checkout stays behind: nothing is reported as cached.
+        monkeypatch.setenv("MAIA_GIT_REPO_URL", f"{context_root}#refs/heads/main#{'0' * 40}")
+        assert set(get_image_build_keys(builds, graph).values()) == {None}
+        monkeypatch.delenv("MAIA_GIT_REPO_URL")
+        assert set(get_image_build_keys(builds, graph).values()) == {None}
+
+    def test_context_root_outside_a_checkout_has_no_key(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("MAIA_GIT_REPO_URL", "git://example.com/maia.git#refs/heads/main#" + "0" * 40)
+        builds = _builds()
+
+        assert set(get_image_build_keys(builds, get_image_build_graph(builds), context_root=tmp_path).values()) == {None}
+
+    def test_build_args_without_value(self):
+        builds = [_build("base", "base"), _build("custom", "custom", base="base", build_args=["NO_CACHE"])]
+
+        assert get_image_build_graph(builds) == {"p-base": set(), "p-custom": {"p-base"}}
+
+
+# ---------------------------------------------------------------------------
+# Executor
+# ---------------------------------------------------------------------------
+
+
+class TestRunImageBuildGraph:
+    def test_builds_run_in_dependency_order_in_parallel(self, context_root):
+        builder = _FakeBuilder()
+        statuses = asyncio.run(run_image_build_graph(_builds(), build_image=builder, max_parallel=4))
+
+        assert set(statuses.values()) == {"built"}
+        graph = get_image_build_graph(_builds())
+        for release, dependencies in graph.items():
+            assert all(builder.finished.index(dependency) < builder.started.index(release) for dependency in dependencies)
+        # The independent branches overlap: base and kube, then notebook and dashboard, then addons and lab.
+        assert builder.max_running == 2
+
+    def test_unchanged_images_are_skipped(self, context_root, tmp_path):
+        cache_path = tmp_path / "cache.json"
+        asyncio.run(run_image_build_graph(_builds(), build_image=_FakeBuilder(), cache_path=cache_path))
+        assert set(json.loads(cache_path.read_text())) == {build["release"] for build in _builds()}
+
+        context_root.joinpath("lab", "Dockerfile").write_text("FROM scratch\nRUN true\n")
+        _commit(context_root)
+        builder = _FakeBuilder()
+        statuses = asyncio.run(run_image_build_graph(_builds(), build_image=builder, cache_path=cache_path))
+
+        assert builder.started == ["p-lab"]
+        assert statuses["p-lab"] == "built"
+        assert statuses["p-ssh"] == "cached"
+
+        builder = _FakeBuilder()
+        asyncio.run(run_image_build_graph(_builds(), build_image=builder, cache_path=cache_path, force=True))
+        assert len(builder.started) == len(_builds())
+
+    def test_failure_skips_dependents_only(self, context_root, tmp_path):
+        builder = _FakeBuilder(fail={"p-notebook"})
+        statuses = asyncio.run(run_image_build_graph(_builds(), build_image=builder, cache_path=tmp_path / "cache.json"))
+
+        assert statuses["p-notebook"] == "failed"
+        assert {statuses[release] for release in ("p-ssh", "p-lab", "p-addons")} == {"skipped"}
+        assert statuses["p-dashboard"] == "built"
+        assert "p-notebook" not in json.loads((tmp_path / "cache.json").read_text())
@@ -0,0 +1,140 @@
+import random
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from MAIA.dashboard_utils import verify_gpu_availability, verify_gpu_booking_policy
+from MAIA.gpu_availability import GPUAvailabilityIndex, parse_booking_time
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+GPU_SPECS = [{"name": "A100", "replicas": 2, "count": 2}, {"name": "H100", "replicas": 1, "count": 1}, {"name": "NO"}]
+T0 = datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+
+def _day(offset):
+    return T0 + timedelta(days=offset)
+
+
+def _booking(booking_id, start, end, gpu="A100"):
+    return {"id": booking_id, "gpu": gpu, "start_date": _day(start), "end_date": _day(end)}
+
+
+def _brute_force_max_usage(bookings, gpu, start, end):
+    """Reference implementation: sample every hour of the window."""
+    usage = 0
+    time = start
+    while time < end:
+        usage = max(usage, sum(1 for b in bookings if b["gpu"] == gpu and b["start_date"] <= time < b["end_date"]))
+        time += timedelta(hours=1)
+    return usage
+
+
+def _random_bookings(rng, n):
+    bookings = []
+    for i in range(n):
+        start = rng.randrange(0, 60 * 24)
+        bookings.append(
+            {
+                "id": i,
+                "gpu": rng.choice(["A100", "H100"]),
+                "start_date": T0 + timedelta(hours=start),
+                "end_date": T0 + timedelta(hours=start + rng.randrange(1, 14 * 24)),
+            }
+        )
+    return bookings
+
+
+# ---------------------------------------------------------------------------
+# Availability index
+# ---------------------------------------------------------------------------
+
+
+class TestGPUAvailabilityIndex:
+    def test_parse_booking_time(self):
+        assert parse_booking_time("2030-01-01 00:00:00") == T0
+        assert parse_booking_time("2030-01-01  00:00:00") == T0
+        assert parse_booking_time(T0.date()) == T0
+        assert parse_booking_time(T0.astimezone(timezone(timedelta(hours=2)))) == T0
+
+    def test_min_free_matches_brute_force(self):
+        rng = random.Random(0)
+        bookings = _random_bookings(rng, 80)
+        index = GPUAvailabilityIndex(GPU_SPECS, bookings)
+
+        for _ in range(200):
+            gpu = rng.choice(["A100", "H100"])
+            start = T0 + timedelta(hours=rng.randrange(-48, 80 * 24))
+            end = start + timedelta(hours=rng.randrange(1, 20 * 24))
+            expected = index.capacity[gpu] - _brute_force_max_usage(bookings, gpu, start, end)
+            assert index.min_free(gpu, start, end) == expected
+
+    def test_incremental_updates_match_rebuild(self):
+        rng = random.Random(1)
+        bookings = _random_bookings(rng, 60)
+        index = GPUAvailabilityIndex(GPU_SPECS)
+        for booking in bookings:
+            index.add_booking(booking["id"], booking["gpu"], booking["start_date"], booking["end_date"])
+        removed = rng.sample(bookings, 40)
+        for booking in removed:
+            index.remove_booking(booking["id"])
+        # Updating a booking in place replaces its previous interval.
+        kept = [booking for booking in bookings if booking not in removed]
+        kept[0] = {**kept[0], "end_date": kept[0]["start_date"] + timedelta(hours=3)}
+        index.add_booking(kept[0]["id"], kept[0]["gpu"], kept[0]["start_date"], kept[0]["end_date"])
+
+        rebuilt = GPUAvailabilityIndex(GPU_SPECS, kept)
+        for day in range(-1, 80):
+            for gpu in ("A100", "H100"):
+                assert index.min_free(gpu, _day(day), _day(day + 1)) == rebuilt.min_free(gpu, _day(day), _day(day + 1))
+
+    def test_availability_profile(self):
+        index = GPUAvailabilityIndex(GPU_SPECS, [_booking(1, 1, 5), _booking(2, 3, 8), _booking(3, 0, 10, gpu="H100")])
+
+        time_points, free_per_slot = index.availability("A100", _day(0), _day(10))
+
+        assert time_points == [_day(0), _day(1), _day(3), _day(5), _day(8), _day(10)]
+        assert free_per_slot == [4, 3, 2, 3, 4]
+
+    def test_earliest_slot(self):
+        bookings = [_booking(i, 0, 10) for i in range(3)] + [_booking(3, 2, 6)]
+        index = GPUAvailabilityIndex(GPU_SPECS, bookings)
+
+        assert index.earliest_slot("A100", timedelta(days=3), not_before=_day(0)) == _day(6)
+        assert index.earliest_slot("A100", timedelta(days=3), count=2, not_before=_day(0)) == _day(10)
+        assert index.earliest_slot("A100", timedelta(days=1), not_before=_day(0)) == _day(0)
+        assert index.earliest_slot("H100", timedelta(days=1), count=2) is None
+        assert index.feasible_slots("A100", timedelta(days=3), not_before=_day(0), max_slots=5) == [(_day(6), 1), (_day(10), 4)]
+
+
+# ---------------------------------------------------------------------------
+# Booking verification
+# ---------------------------------------------------------------------------
+
+
+class TestBookingVerification:
+    def test_other_gpu_types_do_not_reduce_availability(self):
+        existing = [_booking(1, 0, 5, gpu="H100"), _booking(2, 0, 5)]
+        new_booking = {"gpu": "A100", "starting_time": "2030-01-02 00:00:00", "ending_time": "2030-01-04 00:00:00"}
+
+        time_points, free_per_slot, total = verify_gpu_availability(existing, new_booking, GPU_SPECS)
+
+        assert time_points == [_day(1), _day(3)]
+        assert free_per_slot == [3]
+        assert total == 4
+
+    def test_fully_booked_slot_is_reported(self):
+        existing = [_booking(1, 0, 3, gpu="H100")]
+        new_booking = {"gpu": "H100", "starting_time": "2030-01-02 00:00:00", "ending_time": "2030-01-06 00:00:00"}
+
+        is_bookable, err_msg = verify_gpu_booking_policy([], new_booking, existing, GPU_SPECS)
+        assert not is_bookable
+        assert err_msg == f"GPU not available between the selected time slots: {_day(1)} - {_day(3)}"
+
+        index = GPUAvailabilityIndex(GPU_SPECS, existing)
+        new_booking = {"gpu": "H100", "starting_time": "2030-01-04 00:00:00", "ending_time": "2030-01-08 00:00:00"}
+        past_booking = SimpleNamespace(
+            start_date=datetime(2020, 1, 1, tzinfo=timezone.utc), end_date=datetime(2020, 1, 5, tzinfo=timezone.utc)
+        )
+        assert verify_gpu_booking_policy([past_booking], new_booking, None, GPU_SPECS, availability_index=index) == (True, None)
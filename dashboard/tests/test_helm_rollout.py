@@ -0,0 +1,237 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import stat
+import time
+
+import pytest
+
+from MAIA import helm_rollout
+from MAIA.helm_rollout import (
+    HelmChartCache,
+    HelmRollout,
+    fetch_chart,
+    read_registry_credentials,
+)
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+# Fake helm executable: logs its arguments, writes the pulled chart and sleeps on upgrades.
+FAKE_HELM = """#!/bin/sh
+echo "$@" >> "$HELM_LOG"
+case "$1" in
+  pull)
+    while [ $# -gt 0 ]; do
+      case "$1" in
+        --destination) destination="$2"; shift ;;
+        --version) version="$2"; shift ;;
+        oci://*) chart="${1##*/}" ;;
+        pull|--repo) ;;
+        *) [ -z "$chart" ] && chart="$1" ;;
+      esac
+      shift
+    done
+    echo "$chart $version" > "$destination/$chart-$version.tgz"
+    ;;
+  upgrade)
+    sleep 0.2
+    case "$*" in *broken*) echo "release broken" >&2; exit 1 ;; esac
+    ;;
+esac
+"""
+
+
+@pytest.fixture
+def helm_log(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    helm = bin_dir / "helm"
+    helm.write_text(FAKE_HELM)
+    helm.chmod(helm.stat().st_mode | stat.S_IEXEC)
+    log = tmp_path / "helm.log"
+    log.touch()
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("HELM_LOG", str(log))
+    return log
+
+
+@pytest.fixture
+def json_key_path(tmp_path):
+    path = tmp_path / "credentials.json"
+    path.write_text(json.dumps({"username": "robot", "password": "secret"}))
+    return str(path)
+
+
+def _release(name, repo="registry.example.com/maia", chart="maia-namespace", version="1.0.0"):
+    return {"release": name, "namespace": "demo", "chart": chart, "repo": repo, "version": version, "values": "values.yaml"}
+
+
+def _calls(helm_log, command):
+    return [line.split() for line in helm_log.read_text().splitlines() if line.startswith(command)]
+
+
+# ---------------------------------------------------------------------------
+# Credentials and cache layout
+# ---------------------------------------------------------------------------
+
+
+class TestRegistryCredentials:
+    def test_username_and_password(self, json_key_path):
+        assert read_registry_credentials(json_key_path) == ("robot", "secret")
+
+    def test_service_account_json_key(self, tmp_path):
+        path = tmp_path / "key.json"
+        path.write_text(json.dumps({"type": "service_account"}))
+
+        assert read_registry_credentials(str(path)) == ("_json_key", path.read_text())
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return HelmChartCache(str(tmp_path / "cache"))
+
+
+def _archive(tmp_path, content, size=0):
+    path = tmp_path / f"archive-{len(list(tmp_path.glob('archive-*')))}.tgz"
+    path.write_bytes(content.encode() + b"\0" * size)
+    return path
+
+
+def _put_charts(cache_dir, archives_dir, worker, n_charts):
+    """Put charts into a cache shared with other processes."""
+    cache = HelmChartCache(cache_dir)
+    for i in range(n_charts):
+        archive = archives_dir / f"archive-{worker}-{i}.tgz"
+        archive.write_text(f"{worker}-{i}")
+        cache.put("https://a.example.com", f"chart-{worker}", f"1.0.{i}", archive)
+
+
+class TestHelmChartCache:
+    def test_charts_are_keyed_by_repo_chart_and_version(self, cache, tmp_path):
+        path = cache.put("oci://registry.example.com/maia", "maia-namespace", "1.0.0", _archive(tmp_path, "a"))
+
+        assert cache.get("registry.example.com/maia", "maia-namespace", "1.0.0") == path
+        assert path.read_text() == "a"
+        assert cache.get("registry.example.com/other", "maia-namespace", "1.0.0") is None
+        assert cache.get("registry.example.com/maia", "maia-namespace", "1.0.1") is None
+
+    def test_identical_archives_are_stored_once(self, cache, tmp_path):
+        first = cache.put("https://a.example.com", "chart", "1.0.0", _archive(tmp_path, "same"))
+        second = cache.put("https://b.example.com", "chart", "1.0.0", _archive(tmp_path, "same"))
+
+        assert first == second
+        assert len(list(first.parent.iterdir())) == 1
+
+    def test_corrupted_archives_are_discarded(self, cache, tmp_path):
+        path = cache.put("https://a.example.com", "chart", "1.0.0", _archive(tmp_path, "chart"))
+        path.write_text("truncated")
+
+        assert cache.get("https://a.example.com", "chart", "1.0.0") is None
+        assert not path.exists()
+
+    def test_least_recently_used_charts_are_evicted(self, tmp_path):
+        cache = HelmChartCache(str(tmp_path / "cache"), max_size=2)
+        half_mib = 512 * 1024
+        old = cache.put("https://a.example.com", "old", "1.0.0", _archive(tmp_path, "old", half_mib))
+        used = cache.put("https://a.example.com", "used", "1.0.0", _archive(tmp_path, "used", half_mib))
+        cache.put("https://a.example.com", "other", "1.0.0", _archive(tmp_path, "other", half_mib))
+        time.sleep(0.01)
+        assert cache.get("https://a.example.com", "old", "1.0.0") == old
+        time.sleep(0.01)
+        cache.put("https://a.example.com", "new", "1.0.0", _archive(tmp_path, "new", 2 * half_mib))
+
+        assert cache.get("https://a.example.com", "new", "1.0.0") is not None
+        assert cache.get("https://a.example.com", "old", "1.0.0") == old
+        assert cache.get("https://a.example.com", "used", "1.0.0") is None
+        assert not used.exists()
+
+    def test_processes_sharing_the_cache_keep_every_entry(self, tmp_path):
+        cache_dir = tmp_path / "cache"
+        context = multiprocessing.get_context("fork")
+        processes = [context.Process(target=_put_charts, args=(cache_dir, tmp_path, worker, 20)) for worker in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        index = json.loads((cache_dir / "index.json").read_text())
+        assert len(index) == 4 * 20
+        assert len(list((cache_dir / "blobs" / "sha256").iterdir())) == 4 * 20
+        assert not list(cache_dir.glob("*.tmp"))
+
+
+class TestFetchChart:
+    def test_redeploys_download_each_chart_once(self, helm_log, json_key_path, cache):
+        for _ in range(50):
+            asyncio.run(fetch_chart("registry.example.com/maia", "maia-project", "1.2.2", json_key_path, cache=cache))
+
+        assert len(_calls(helm_log, "pull")) == 1
+        assert len(_calls(helm_log, "registry login")) == 1
+
+    def test_insecure_registries(self, helm_log, json_key_path, cache):
+        asyncio.run(fetch_chart("registry.example.com/maia", "maia-project", "1.2.2", json_key_path, insecure=True, cache=cache))
+
+        assert "--insecure" in _calls(helm_log, "registry login")[0]
+        assert "--insecure-skip-tls-verify" in _calls(helm_log, "pull")[0]
+
+    def test_offline_mode_uses_the_packaged_charts(self, helm_log, cache, tmp_path, monkeypatch):
+        charts_dir = tmp_path / "helm_charts"
+        charts_dir.mkdir()
+        (charts_dir / "maia-project-1.2.2.tgz").write_text("packaged")
+        monkeypatch.setattr(helm_rollout, "HELM_OFFLINE", True)
+        monkeypatch.setattr(helm_rollout, "HELM_CHARTS_DIR", str(charts_dir))
+
+        path = asyncio.run(fetch_chart("https://minnelab.github.io/MAIA/", "maia-project", "1.2.2", cache=cache))
+
+        assert path.read_text() == "packaged"
+        assert helm_log.read_text() == ""
+        with pytest.raises(RuntimeError, match="offline"):
+            asyncio.run(fetch_chart("https://minnelab.github.io/MAIA/", "maia-project", "9.9.9", cache=cache))
+
+
+# ---------------------------------------------------------------------------
+# Rollout
+# ---------------------------------------------------------------------------
+
+
+class TestHelmRollout:
+    def test_logs_in_and_pulls_once(self, helm_log, json_key_path, cache):
+        releases = [_release("namespace"), _release("filebrowser"), _release("orthanc", chart="maia-orthanc")]
+        results = asyncio.run(HelmRollout(json_key_path, cache=cache).run(releases))
+
+        assert [result["returncode"] for result in results] == [0, 0, 0]
+        assert len(_calls(helm_log, "registry login")) == 1
+        assert sorted(call[1] for call in _calls(helm_log, "pull")) == [
+            "oci://registry.example.com/maia/maia-namespace",
+            "oci://registry.example.com/maia/maia-orthanc",
+        ]
+        cached = str(cache.get("registry.example.com/maia", "maia-namespace", "1.0.0"))
+        assert [call[5] for call in _calls(helm_log, "upgrade")].count(cached) == 2
+
+    def test_cached_charts_are_not_pulled_again(self, helm_log, json_key_path, tmp_path):
+        asyncio.run(HelmRollout(json_key_path, cache=HelmChartCache(str(tmp_path / "cache"))).run([_release("namespace")]))
+        asyncio.run(HelmRollout(json_key_path, cache=HelmChartCache(str(tmp_path / "cache"))).run([_release("namespace")]))
+
+        assert len(_calls(helm_log, "pull")) == 1
+        assert len(_calls(helm_log, "registry login")) == 1
+
+    def test_http_repos_are_pulled_without_login(self, helm_log, cache):
+        release = _release("jupyterhub", repo="https://hub.jupyter.org/helm-chart/", chart="jupyterhub", version="3.3.7")
+        asyncio.run(HelmRollout(cache=cache).run([release]))
+
+        assert _calls(helm_log, "registry login") == []
+        assert _calls(helm_log, "pull")[0][:4] == ["pull", "jupyterhub", "--repo", "https://hub.jupyter.org/helm-chart/"]
+
+    def test_releases_run_concurrently_and_report_failures(self, helm_log, json_key_path, cache):
+        releases = [_release(name) for name in ("namespace", "broken", "filebrowser", "mysql")]
+        start = time.monotonic()
+        results = asyncio.run(HelmRollout(json_key_path, max_parallel=4, cache=cache).run(releases))
+
+        assert time.monotonic() - start < 0.6
+        assert [result["release"] for result in results] == ["namespace", "broken", "filebrowser", "mysql"]
+        assert [result["returncode"] for result in results] == [0, 1, 0, 0]
+        assert results[1]["error"] == "release broken"
+        assert all(result["seconds"] >= 0.2 for result in results)
@@ -0,0 +1,304 @@
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from keycloak.exceptions import KeycloakDeleteError
+
+from MAIA import dashboard_utils, keycloak_utils
+from MAIA.keycloak_utils import (
+    get_keycloak_admin,
+    get_keycloak_membership_snapshot,
+    get_maia_users_from_keycloak,
+    get_user_ids,
+    get_users_by_email_in_keycloak,
+    register_users_in_group_in_keycloak,
+    update_group_members_in_keycloak,
+)
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+SETTINGS = SimpleNamespace(
+    OIDC_SERVER_URL="https://iam.example.com",
+    OIDC_USERNAME="admin",
+    OIDC_REALM_NAME="maia",
+    OIDC_RP_CLIENT_ID="maia",
+    OIDC_RP_CLIENT_SECRET="secret",
+    USERS_GROUP="users",
+    ADMIN_GROUP="admin",
+    MINIO_URL="minio.example.com",
+    MINIO_ACCESS_KEY="",
+    MINIO_SECRET_KEY="",
+    MINIO_SECURE=True,
+    BUCKET_NAME="envs",
+)
+
+
+class _FakeKeycloakAdmin:
+    """In-memory stand-in for KeycloakAdmin, serving paginated listings and counting the calls."""
+
+    def __init__(self, users, groups, memberships):
+        self.users = users
+        self.groups = groups
+        self.memberships = memberships
+        self.calls = []
+        self.added = []
+        self.removed = []
+        self.failing = set()
+
+    def _page(self, items, query):
+        query = query or {}
+        first = query.get("first", 0)
+        return items[first : first + query.get("max", len(items))]
+
+    def get_users(self, query=None):
+        self.calls.append("get_users")
+        if query and "email" in query:
+            return [user for user in self.users if user.get("email", "").lower() == query["email"].lower()]
+        return self._page(self.users, query)
+
+    def get_groups(self, query=None):
+        self.calls.append("get_groups")
+        return self.groups
+
+    def get_group_members(self, group_id, query=None):
+        self.calls.append("get_group_members")
+        members = [user for user in self.users if user["id"] in self.memberships.get(group_id, [])]
+        return self._page(members, query)
+
+    def group_user_add(self, user_id, group_id):
+        self.added.append((user_id, group_id))
+
+    def group_user_remove(self, user_id, group_id):
+        if user_id in self.failing:
+            raise KeycloakDeleteError(error_message="Internal Server Error", response_code=500)
+        self.removed.append((user_id, group_id))
+
+
+def _fake_admin(n_users=5):
+    users = [{"id": f"u{i}", "username": f"user{i}", "email": f"user{i}@example.com"} for i in range(n_users)]
+    users.append({"id": "svc", "username": "service-account"})
+    groups = [
+        {"id": "g-users", "name": "MAIA:users"},
+        {"id": "g-demo", "name": "MAIA:demo"},
+        {"id": "g-other", "name": "other"},
+    ]
+    memberships = {"g-users": ["u0", "u1", "u2"], "g-demo": ["u0", "u2"], "g-other": ["u3"]}
+    return _FakeKeycloakAdmin(users, groups, memberships)
+
+
+# ---------------------------------------------------------------------------
+# Shared admin client
+# ---------------------------------------------------------------------------
+
+
+class TestKeycloakAdminProvider:
+    def test_client_is_shared_per_realm_and_credentials(self):
+        other_realm = SimpleNamespace(**{**vars(SETTINGS), "OIDC_REALM_NAME": "other"})
+        with patch.dict(keycloak_utils._keycloak_admins, clear=True):
+            keycloak_admin = get_keycloak_admin(SETTINGS)
+
+            assert get_keycloak_admin(SimpleNamespace(**vars(SETTINGS))) is keycloak_admin
+            assert get_keycloak_admin(other_realm) is not keycloak_admin
+
+    def test_concurrent_callers_share_one_token_exchange(self):
+        def _token(*args, **kwargs):
+            time.sleep(0.05)
+            return {"access_token": "token", "refresh_token": None, "expires_in": 300}
+
+        with patch.dict(keycloak_utils._keycloak_admins, clear=True):
+            connection = get_keycloak_admin(SETTINGS).connection
+            with patch.object(connection.keycloak_openid, "token", side_effect=_token) as token:
+                threads = [threading.Thread(target=connection._refresh_if_required) for _ in range(8)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+        token.assert_called_once()
+        assert connection.headers["Authorization"] == "Bearer token"
+
+
+# ---------------------------------------------------------------------------
+# Snapshot
+# ---------------------------------------------------------------------------
+
+
+class TestKeycloakMembershipSnapshot:
+    def test_indexes_are_built_from_paginated_listings(self):
+        admin = _fake_admin()
+        with patch.object(keycloak_utils, "KEYCLOAK_PAGE_SIZE", 2):
+            snapshot = get_keycloak_membership_snapshot(SETTINGS, keycloak_admin=admin)
+
+        assert len(snapshot.users) == 6
+        assert snapshot.get_user("user4@example.com")["id"] == "u4"
+        assert snapshot.get_user("missing@example.com") is None
+        assert snapshot.maia_groups == {"g-users": "users", "g-demo": "demo"}
+        assert snapshot.group_ids == {"users": "g-users", "demo": "g-demo"}
+        assert snapshot.get_groups_for_user("user0@example.com") == ["users", "demo"]
+        assert snapshot.get_groups_for_user("user3@example.com") == []
+        assert [user["id"] for user in snapshot.get_group_members("demo")] == ["u0", "u2"]
+        # 6 users in pages of 2, then the MAIA groups only (3 + 2 members), and no per-user calls.
+        assert admin.calls.count("get_users") == 4
+        assert admin.calls.count("get_group_members") == 4
+        assert "get_user_groups" not in admin.calls
+
+    def test_memberships_can_be_skipped(self):
+        admin = _fake_admin()
+        snapshot = get_keycloak_membership_snapshot(SETTINGS, include_memberships=False, keycloak_admin=admin)
+
+        assert "get_group_members" not in admin.calls
+        assert snapshot.get_groups_for_user("user0@example.com") == []
+
+
+# ---------------------------------------------------------------------------
+# Callers
+# ---------------------------------------------------------------------------
+
+
+class TestSnapshotCallers:
+    def test_get_user_ids_and_maia_users(self):
+        admin = _fake_admin()
+        with patch.object(keycloak_utils, "get_keycloak_admin", return_value=admin):
+            user_ids = get_user_ids(SETTINGS)
+            maia_users = get_maia_users_from_keycloak(SETTINGS)
+
+        assert user_ids == {
+            "user0@example.com": ["users", "demo"],
+            "user1@example.com": ["users"],
+            "user2@example.com": ["users", "demo"],
+        }
+        assert maia_users[0] == {
+            "email": "user0@example.com",
+            "username": "user0",
+            "id": "u0",
+            "groups": ["MAIA:users", "MAIA:demo"],
+        }
+        assert [user["id"] for user in maia_users] == ["u0", "u1", "u2"]
+
+    def test_register_users_skips_existing_memberships(self):
+        admin = _fake_admin()
+        snapshot = get_keycloak_membership_snapshot(SETTINGS, keycloak_admin=admin)
+        with patch.object(keycloak_utils, "get_keycloak_admin", return_value=admin):
+            register_users_in_group_in_keycloak(
+                ["user1@example.com", "user4@example.com", "missing@example.com"], "demo", SETTINGS, snapshot=snapshot
+            )
+
+        assert admin.added == [("u1", "g-demo"), ("u4", "g-demo"), ("u4", "g-users")]
+
+    def test_user_table_uses_a_single_snapshot(self):
+        admin = _fake_admin()
+        maia_users = [
+            SimpleNamespace(email="user1@example.com", namespace="users,demo"),
+            SimpleNamespace(email="user2@example.com", namespace="users"),
+            SimpleNamespace(email="new@example.com", namespace="demo"),
+        ]
+        project = SimpleNamespace(
+            namespace="demo",
+            email="user0@example.com",
+            supervisor=None,
+            **{
+                field: None
+                for field in (
+                    "cpu_limit",
+                    "memory_limit",
+                    "date",
+                    "cluster",
+                    "gpu",
+                    "project_tier",
+                    "email_to_username_map",
+                    "memory_request",
+                    "cpu_request",
+                    "auto_deploy",
+                    "auto_deploy_apps",
+                    "project_configuration",
+                )
+            },
+        )
+        maia_user_model = MagicMock()
+        maia_user_model.objects.all.return_value = maia_users
+        maia_project_model = MagicMock()
+        maia_project_model.objects.filter.return_value.exists.return_value = True
+        maia_project_model.objects.filter.return_value.first.return_value = project
+
+        with patch.object(dashboard_utils, "get_keycloak_admin", return_value=admin), patch.object(
+            dashboard_utils, "get_pending_projects", return_value=[]
+        ), patch.object(dashboard_utils, "Minio", side_effect=Exception):
+            to_register, to_register_in_keycloak, group_dict, to_remove = dashboard_utils.get_user_table(
+                SETTINGS, maia_user_model, maia_project_model
+            )
+
+        assert to_register == {"user1@example.com": ["demo"], "new@example.com": ["demo"]}
+        assert to_register_in_keycloak == ["new@example.com"]
+        assert to_remove == {"user2@example.com": ["demo"]}
+        assert group_dict["demo"]["users"] == ["user0@example.com [Project Admin]", "user2@example.com"]
+        assert admin.calls.count("get_users") == 1
+        assert admin.calls.count("get_group_members") == 2
+
+
+# ---------------------------------------------------------------------------
+# Bulk membership updates
+# ---------------------------------------------------------------------------
+
+
+class TestGroupMembershipUpdates:
+    def test_users_are_looked_up_by_email(self):
+        admin = _fake_admin()
+        users = get_users_by_email_in_keycloak(["USER1@example.com", "missing@example.com"], SETTINGS, keycloak_admin=admin)
+
+        assert users["USER1@example.com"]["id"] == "u1"
+        assert users["missing@example.com"] is None
+        assert admin.calls == ["get_users", "get_users"]
+
+    def test_membership_diff_is_applied_once(self):
+        admin = _fake_admin()
+        results = update_group_members_in_keycloak(
+            "demo",
+            SETTINGS,
+            emails_to_add=["user0@example.com", "user1@example.com", "missing@example.com"],
+            emails_to_remove=["user2@example.com", "user3@example.com", "user1@example.com"],
+            keycloak_admin=admin,
+        )
+
+        assert results == {
+            "user0@example.com": "unchanged",
+            "user1@example.com": "added",
+            "missing@example.com": "not_found",
+            "user2@example.com": "removed",
+            "user3@example.com": "unchanged",
+        }
+        assert admin.added == [("u1", "g-demo")]
+        assert admin.removed == [("u2", "g-demo")]
+        # One group listing, one member listing, and lookups only for the users to add that are not members yet.
+        assert admin.calls.count("get_groups") == 1
+        assert admin.calls.count("get_group_members") == 1
+        assert admin.calls.count("get_users") == 2
+
+    def test_failures_are_reported_per_user(self):
+        admin = _fake_admin()
+        admin.failing.add("u0")
+        results = update_group_members_in_keycloak(
+            "users", SETTINGS, emails_to_remove=["user0@example.com", "user1@example.com"], keycloak_admin=admin
+        )
+
+        assert results == {"user0@example.com": "failed", "user1@example.com": "removed"}
+
+    def test_missing_group(self):
+        admin = _fake_admin()
+        results = update_group_members_in_keycloak("other", SETTINGS, emails_to_add=["user3@example.com"], keycloak_admin=admin)
+
+        assert results == {"user3@example.com": "not_found"}
+        assert admin.added == []
+
+    def test_register_users_without_snapshot_uses_targeted_lookups(self):
+        admin = _fake_admin()
+        with patch.object(keycloak_utils, "get_keycloak_admin", return_value=admin):
+            register_users_in_group_in_keycloak(
+                ["user1@example.com", "user4@example.com", "missing@example.com"], "demo", SETTINGS
+            )
+
+        assert sorted(admin.added) == [("u1", "g-demo"), ("u1", "g-users"), ("u4", "g-demo"), ("u4", "g-users")]
+        assert admin.calls.count("get_users") == 3
+        assert "get_group_members" not in admin.calls
@@ -0,0 +1,134 @@
+import os
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import yaml
+
+from MAIA import kube_clients, kubernetes_utils
+from MAIA.kube_clients import (
+    get_api_client,
+    get_kube_api_client,
+    get_kube_subprocess_env,
+    get_kubeconfig_path,
+    kube_context,
+)
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _kubeconfig(server="https://api.cluster-a:6443", token="token-a"):
+    return {
+        "apiVersion": "v1",
+        "kind": "Config",
+        "clusters": [{"name": "cluster", "cluster": {"server": server, "insecure-skip-tls-verify": True}}],
+        "users": [{"name": "user", "user": {"token": token}}],
+        "contexts": [{"name": "default", "context": {"cluster": "cluster", "user": "user"}}],
+        "current-context": "default",
+    }
+
+
+# ---------------------------------------------------------------------------
+# Client cache
+# ---------------------------------------------------------------------------
+
+
+class TestApiClientCache:
+    def test_clients_are_reused_per_cluster_and_identity(self):
+        client = get_api_client(_kubeconfig())
+
+        assert get_api_client(_kubeconfig()) is client
+        assert get_api_client(_kubeconfig(token="token-b")) is not client
+        assert get_api_client(_kubeconfig(server="https://api.cluster-b:6443")) is not client
+        assert client.configuration.host == "https://api.cluster-a:6443"
+        assert client.configuration.auth_settings()["BearerToken"]["value"] == "Bearer token-a"
+
+    def test_cache_is_bounded(self):
+        with patch.object(kube_clients, "KUBE_CLIENT_CACHE_SIZE", 2):
+            first = get_api_client(_kubeconfig(token="lru-1"))
+            get_api_client(_kubeconfig(token="lru-2"))
+            get_api_client(_kubeconfig(token="lru-3"))
+
+            assert len(kube_clients._api_clients) == 2
+            assert get_api_client(_kubeconfig(token="lru-1")) is not first
+
+    def test_global_configuration_is_untouched(self):
+        from kubernetes import client
+
+        get_api_client(_kubeconfig(server="https://api.isolated:6443"))
+
+        assert client.Configuration.get_default_copy().host != "https://api.isolated:6443"
+
+    def test_clients_are_not_shared_with_forked_workers(self):
+        client = get_api_client(_kubeconfig(token="forked"))
+        session = kubernetes_utils.get_cluster_api_session()
+
+        # Simulate a gunicorn worker forked from the master after the clients were created
+        with patch.object(os, "getpid", return_value=os.getpid() + 1):
+            assert get_api_client(_kubeconfig(token="forked")) is not client
+            assert kubernetes_utils.get_cluster_api_session() is not session
+
+
+# ---------------------------------------------------------------------------
+# Per-request contexts
+# ---------------------------------------------------------------------------
+
+
+class TestKubeContext:
+    def test_main_and_local_clusters(self):
+        main, local = _kubeconfig(), _kubeconfig(server="https://api.project:6443")
+        with kube_context(main, local):
+            assert get_kube_api_client().configuration.host == "https://api.cluster-a:6443"
+            assert get_kube_api_client(local=True).configuration.host == "https://api.project:6443"
+        with kube_context(main):
+            assert get_kube_api_client(local=True) is get_kube_api_client()
+
+    def test_concurrent_requests_are_isolated(self):
+        barrier = threading.Barrier(2)
+        seen = {}
+
+        def request(name):
+            with kube_context(_kubeconfig(server=f"https://api.{name}:6443")):
+                barrier.wait()
+                seen[name] = get_kube_api_client().configuration.host
+
+        threads = [threading.Thread(target=request, args=(name,)) for name in ("a", "b")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert seen == {"a": "https://api.a:6443", "b": "https://api.b:6443"}
+        assert get_kube_api_client() is None
+
+    def test_kubeconfig_files_are_private_and_removed(self):
+        with patch.dict(os.environ, {"KUBECONFIG": "/etc/kubeconfig"}):
+            with kube_context(_kubeconfig()):
+                path = get_kubeconfig_path()
+                assert yaml.safe_load(Path(path).read_text()) == _kubeconfig()
+                assert Path(path).stat().st_mode & 0o077 == 0
+                assert get_kube_subprocess_env()["KUBECONFIG"] == path
+                assert os.environ["KUBECONFIG"] == "/etc/kubeconfig"
+            assert not Path(path).exists()
+            assert get_kubeconfig_path() == "/etc/kubeconfig"
+            assert get_kube_subprocess_env() is None
+
+    def test_local_client_falls_back_to_the_kubeconfig_files(self, tmp_path):
+        kubeconfig = tmp_path / "kubeconfig.yaml"
+        kubeconfig.write_text(yaml.dump(_kubeconfig(server="https://api.cli:6443")))
+        with patch.dict(os.environ, {"KUBECONFIG": str(kubeconfig)}):
+            os.environ.pop("KUBECONFIG_LOCAL", None)
+
+            assert get_kube_api_client(local=True).configuration.host == "https://api.cli:6443"
+            assert "KUBECONFIG_LOCAL" not in os.environ
+
+    def test_helpers_use_the_context_client(self):
+        with patch.object(kubernetes_utils.kubernetes.client, "CoreV1Api") as core_v1:
+            core_v1.return_value = MagicMock()
+            with kube_context(_kubeconfig(server="https://api.project:6443")):
+                kubernetes_utils.label_pod_for_deletion("demo", "jupyter-user")
+
+        assert core_v1.call_args.args[0].configuration.host == "https://api.project:6443"
+        core_v1.return_value.patch_namespaced_pod.assert_called_once()
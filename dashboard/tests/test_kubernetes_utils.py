@@ -0,0 +1,309 @@
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from MAIA import kubernetes_utils
+from MAIA.kubernetes_utils import (
+    CLUSTER_OFFLINE_MARKER,
+    fetch_from_clusters,
+    get_available_resources,
+    get_cluster_status,
+    get_namespace_details,
+    get_namespaces,
+    get_pod_resource_requests,
+    parse_kubernetes_quantity,
+)
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+CLUSTER_NAMES = {"https://api.fast": "fast", "https://api.slow": "slow", "https://api.down": "down"}
+
+
+def _node(name, ready="True", unschedulable=None):
+    spec = {} if unschedulable is None else {"unschedulable": unschedulable}
+    return {"metadata": {"name": name}, "spec": spec, "status": {"conditions": [{"type": "Ready", "status": ready}]}}
+
+
+def _fake_cluster_resource(delays=None, bodies=None):
+    """Return a replacement for _get_cluster_resource serving canned bodies with optional delays."""
+    delays = delays or {}
+    bodies = bodies or {}
+
+    def _get(api_url, path, token, timeout):
+        time.sleep(delays.get(api_url, 0))
+        if api_url == "https://api.down":
+            raise ConnectionError("unreachable")
+        return bodies[(api_url, path)]
+
+    return _get
+
+
+# ---------------------------------------------------------------------------
+# Fan-out engine
+# ---------------------------------------------------------------------------
+
+
+class TestFetchFromClusters:
+    def test_private_cluster_token_is_used(self):
+        """Private clusters are queried with their own token, public ones with the ID token."""
+        seen = {}
+
+        def _get(api_url, path, token, timeout):
+            seen[api_url] = token
+            return {"items": []}
+
+        with patch.object(kubernetes_utils, "_get_cluster_resource", side_effect=_get):
+            fetch_from_clusters(
+                "id-token",
+                [("https://api.fast", "/api/v1/nodes"), ("https://api.slow", "/api/v1/nodes")],
+                private_clusters={"https://api.slow": "private-token"},
+            )
+
+        assert seen == {"https://api.fast": "id-token", "https://api.slow": "private-token"}
+
+    def test_failed_and_late_clusters_are_none(self):
+        """Unreachable clusters and clusters missing the deadline are reported as None."""
+        bodies = {("https://api.fast", "/api/v1/nodes"): {"items": []}}
+        fake = _fake_cluster_resource(delays={"https://api.slow": 2}, bodies=bodies)
+
+        with patch.object(kubernetes_utils, "_get_cluster_resource", side_effect=fake):
+            start = time.monotonic()
+            results = fetch_from_clusters("id-token", [(api_url, "/api/v1/nodes") for api_url in CLUSTER_NAMES], timeout=0.5)
+            elapsed = time.monotonic() - start
+
+        assert elapsed < 1.5
+        assert results[("https://api.fast", "/api/v1/nodes")] == {"items": []}
+        assert results[("https://api.slow", "/api/v1/nodes")] is None
+        assert results[("https://api.down", "/api/v1/nodes")] is None
+
+    def test_clusters_are_queried_concurrently(self):
+        """The fan-out latency is the slowest cluster, not the sum of all of them."""
+        api_urls = [f"https://api.cluster-{i}" for i in range(6)]
+        bodies = {(api_url, "/api/v1/namespaces"): {"items": []} for api_url in api_urls}
+        fake = _fake_cluster_resource(delays={api_url: 0.2 for api_url in api_urls}, bodies=bodies)
+
+        with patch.object(kubernetes_utils, "_get_cluster_resource", side_effect=fake):
+            start = time.monotonic()
+            fetch_from_clusters("id-token", list(bodies), timeout=5)
+            elapsed = time.monotonic() - start
+
+        assert elapsed < 0.2 * len(api_urls) / 2
+
+
+# ---------------------------------------------------------------------------
+# Callers
+# ---------------------------------------------------------------------------
+
+
+class TestClusterQueries:
+    def test_cluster_status_marks_late_cluster_offline(self):
+        bodies = {("https://api.fast", "/api/v1/nodes"): {"items": [_node("node-1"), _node("node-2", unschedulable=True)]}}
+        fake = _fake_cluster_resource(delays={"https://api.slow": 2}, bodies=bodies)
+
+        with patch.object(kubernetes_utils, "_get_cluster_resource", side_effect=fake):
+            status, cluster_dict = get_cluster_status("id-token", list(CLUSTER_NAMES), CLUSTER_NAMES, timeout=0.5)
+
+        assert cluster_dict["fast"] == ["node-1", "node-2"]
+        assert status["node-1"] == ["True", False]
+        assert status["node-2"] == ["True", True]
+        assert cluster_dict["slow"] == [CLUSTER_OFFLINE_MARKER]
+        assert cluster_dict["down"] == [CLUSTER_OFFLINE_MARKER]
+
+    def test_namespaces_are_merged_across_clusters(self):
+        bodies = {
+            ("https://api.fast", "/api/v1/namespaces"): {"items": [{"metadata": {"name": "b"}}, {"metadata": {"name": "a"}}]},
+            ("https://api.slow", "/api/v1/namespaces"): {"items": [{"metadata": {"name": "a"}}]},
+        }
+
+        with patch.object(kubernetes_utils, "_get_cluster_resource", side_effect=_fake_cluster_resource(bodies=bodies)):
+            namespaces = get_namespaces("id-token", list(CLUSTER_NAMES))
+
+        assert namespaces == ["a", "b"]
+
+
+def _ingress(name, service, path, port=None, host=None, labels=None):
+    backend = {"name": service, "port": {"name": port} if port else {"number": 80}}
+    rule = {"http": {"paths": [{"path": path, "backend": {"service": backend}}]}}
+    if host:
+        rule["host"] = host
+    return {"metadata": {"name": name, "labels": labels or {}}, "spec": {"rules": [rule]}}
+
+
+def _service(name, ports, **spec):
+    return {"metadata": {"name": name, "labels": {"app": "demo"}}, "spec": {"ports": ports, **spec}}
+
+
+NAMESPACE_SETTINGS = SimpleNamespace(
+    API_URL=["https://api.fast", "https://api.slow"],
+    CLUSTER_NAMES=CLUSTER_NAMES,
+    PRIVATE_CLUSTERS={},
+    DEFAULT_INGRESS_HOST="maia.example.com",
+    GLOBAL_NAMESPACES=["xnat"],
+)
+
+NAMESPACE_BODIES = {
+    ("https://api.fast", "/apis/networking.k8s.io/v1/namespaces/demo/ingresses"): {
+        "items": [
+            _ingress("hub", "proxy-public", "/demo-hub"),
+            _ingress("demo-orthanc", "demo-orthanc-svc", "/demo/orthanc", port="orthanc"),
+            _ingress("mlflow", "demo-mlflow-mkg", "/demo/mlflow", host="mlflow.example.com"),
+            _ingress("minio", "demo-mlflow-mkg", "/demo/minio-console-demo"),
+            _ingress("spleen", "spleen-maia-monailabel", "/demo/spleen"),
+            _ingress("fl-nvflare-dashboard", "fl", "/demo/fl", labels={"app.kubernetes.io/name": "maia-nvflare-dashboard"}),
+        ]
+    },
+    ("https://api.fast", "/api/v1/namespaces/demo/services"): {
+        "items": [
+            _service("jupyter-jane-2edoe-40maia-2eorg", [{"name": "remote-desktop-port", "port": 80}]),
+            _service("jupyter-john-40maia-2eorg-ssh", [{"name": "ssh", "port": 2022}]),
+            _service("demo-dicom", [{"name": "orthanc-dicom", "port": 4242, "nodePort": 30042}], type="NodePort"),
+        ]
+    },
+    ("https://api.slow", "/apis/networking.k8s.io/v1/namespaces/demo/ingresses"): {"items": []},
+    ("https://api.slow", "/api/v1/namespaces/demo/services"): {"items": []},
+    ("https://api.fast", "/apis/networking.k8s.io/v1/namespaces/xnat/ingresses"): {
+        "items": [_ingress("xnat", "maia-xnat", "/xnat")]
+    },
+    ("https://api.fast", "/api/v1/namespaces/xnat/services"): {"items": []},
+}
+
+
+class TestNamespaceDetails:
+    def setup_method(self):
+        kubernetes_utils._namespace_resources_cache.clear()
+
+    def test_workspace_applications_are_classified(self):
+        with patch.object(kubernetes_utils, "_get_cluster_resource", side_effect=_fake_cluster_resource(bodies=NAMESPACE_BODIES)):
+            apps, remote_desktops, ssh_ports, monai_models, orthanc_list, deployed_clusters, nvflare_dashboards = (
+                get_namespace_details(NAMESPACE_SETTINGS, "id-token", "demo", "jane.doe@maia.org", is_admin=True)
+            )
+
+        assert apps["hub"] == "https://maia.example.com/demo-hub"
+        assert apps["orthanc"] == "https://maia.example.com/demo/orthanc/"
+        assert apps["ohif"] == "https://maia.example.com/demo/orthanc/ohif/"
+        assert apps["mlflow"] == "https://mlflow.example.com/demo/mlflow/"
+        assert apps["minio_console"] == "https://maia.example.com/demo/minio-console-demo/"
+        assert apps["xnat"] == "https://maia.example.com/xnat"
+        assert apps["kubeflow"] == apps["filebrowser"] == "N/A"
+        assert remote_desktops == {
+            "jane.doe@maia.org": "https://maia.example.com/demo-hub/user/jane.doe@maia.org/proxy/80/desktop/jane.doe@maia.org/"
+        }
+        assert ssh_ports == {"john@maia.org": 2022}
+        assert monai_models == {"spleen": {"monai_label": "https://maia.example.com/demo/spleen"}}
+        assert orthanc_list == [
+            {"name": "demo-orthanc", "dicom_port": 30042, "url": "https://maia.example.com/demo/orthanc/dicom-web/"}
+        ]
+        assert deployed_clusters == ["fast"]
+        assert nvflare_dashboards == [{"name": "fl", "url": "https://maia.example.com/demo/fl"}]
+
+    def test_global_namespaces_are_cached_across_users(self):
+        calls = []
+        fake = _fake_cluster_resource(bodies=NAMESPACE_BODIES)
+
+        def _get(api_url, path, token, timeout):
+            calls.append((api_url, path, token))
+            return fake(api_url, path, token, timeout)
+
+        with patch.object(kubernetes_utils, "_get_cluster_resource", side_effect=_get):
+            for id_token in ("token-1", "token-2", "token-1"):
+                apps = get_namespace_details(NAMESPACE_SETTINGS, id_token, "demo", "jane.doe@maia.org")[0]
+                assert apps["xnat"] == "https://maia.example.com/xnat"
+
+        global_calls = [call for call in calls if "/xnat/" in call[1]]
+        # The global namespace is only listed on the cluster the project is deployed to, once for all users.
+        assert [(api_url, token) for api_url, _, token in global_calls] == [("https://api.fast", "token-1")] * 2
+        # The project namespace is listed once per user and cluster.
+        assert len(calls) - len(global_calls) == 2 * 2 * 2
+
+    def test_failed_listings_are_not_cached(self):
+        bodies = {key: body for key, body in NAMESPACE_BODIES.items() if key[0] != "https://api.fast"}
+
+        with patch.object(kubernetes_utils, "_get_cluster_resource", side_effect=_fake_cluster_resource(bodies=bodies)):
+            assert get_namespace_details(NAMESPACE_SETTINGS, "id-token", "demo", "jane.doe@maia.org")[5] == []
+        with patch.object(kubernetes_utils, "_get_cluster_resource", side_effect=_fake_cluster_resource(bodies=NAMESPACE_BODIES)):
+            assert get_namespace_details(NAMESPACE_SETTINGS, "id-token", "demo", "jane.doe@maia.org")[5] == ["fast"]
+
+    def test_forbidden_global_listings_are_not_shared(self):
+        calls = []
+        forbidden = {"kind": "Status", "status": "Failure", "reason": "Forbidden", "code": 403}
+        fake = _fake_cluster_resource(bodies=NAMESPACE_BODIES)
+
+        def _get(api_url, path, token, timeout):
+            calls.append((path, token))
+            if token == "token-1" and "/xnat/" in path:
+                return forbidden
+            return fake(api_url, path, token, timeout)
+
+        with patch.object(kubernetes_utils, "_get_cluster_resource", side_effect=_get):
+            assert get_namespace_details(NAMESPACE_SETTINGS, "token-1", "demo", "jane.doe@maia.org")[0]["xnat"] == "N/A"
+            apps = get_namespace_details(NAMESPACE_SETTINGS, "token-2", "demo", "jane.doe@maia.org")[0]
+
+        assert apps["xnat"] == "https://maia.example.com/xnat"
+        assert [token for path, token in calls if "/xnat/" in path] == ["token-1", "token-1", "token-2", "token-2"]
+
+
+# ---------------------------------------------------------------------------
+# Resource accounting
+# ---------------------------------------------------------------------------
+
+
+class TestResourceAccounting:
+    def test_parse_kubernetes_quantity(self):
+        assert parse_kubernetes_quantity("500m") == 0.5
+        assert parse_kubernetes_quantity("2") == 2
+        assert parse_kubernetes_quantity("1Ki") == 1024
+        assert parse_kubernetes_quantity("4Gi") == 4 * 1024**3
+        assert parse_kubernetes_quantity("1Ti") == 1024**4
+        assert parse_kubernetes_quantity("100M") == 100 * 1000**2
+        assert parse_kubernetes_quantity("1.5G") == 1.5 * 1000**3
+        assert parse_kubernetes_quantity("1e3") == 1000
+
+    def test_pod_requests_default_to_limits_and_init_containers(self):
+        pod = {
+            "spec": {
+                "containers": [
+                    {"resources": {"requests": {"cpu": "500m", "memory": "1Gi"}}},
+                    {"resources": {"limits": {"cpu": "1", "memory": "1Gi", "nvidia.com/gpu": "1"}}},
+                ],
+                "initContainers": [{"resources": {"requests": {"cpu": "4", "memory": "512Mi"}}}],
+            }
+        }
+
+        assert get_pod_resource_requests(pod) == (1, 4.0, 2 * 1024**3)
+
+    def test_available_resources_per_node(self):
+        node = _node("gpu-node")
+        node["metadata"]["labels"] = {"nvidia.com/gpu.product": "A100", "nvidia.com/gpu.memory": "40960"}
+        node["status"]["allocatable"] = {"cpu": "16", "memory": "64Gi", "nvidia.com/gpu": "4"}
+        pods = [
+            {
+                "metadata": {"name": "jupyter-alice-40example-2ecom", "namespace": "ns", "annotations": {}},
+                "spec": {
+                    "nodeName": "gpu-node",
+                    "containers": [{"resources": {"requests": {"cpu": "2", "memory": "8Gi", "nvidia.com/gpu": "1"}}}],
+                },
+                "status": {"phase": "Running"},
+            },
+            {
+                "metadata": {"name": "finished", "namespace": "ns"},
+                "spec": {"nodeName": "gpu-node", "containers": [{"resources": {"requests": {"cpu": "8"}}}]},
+                "status": {"phase": "Succeeded"},
+            },
+        ]
+        responses = {
+            ("https://api.fast", "/api/v1/nodes"): {"items": [node]},
+            ("https://api.fast", "/api/v1/pods"): {"items": pods},
+        }
+
+        with patch.object(kubernetes_utils, "fetch_from_clusters", return_value=responses):
+            gpu_dict, cpu_dict, ram_dict, gpu_allocations = get_available_resources(
+                "id-token", ["https://api.fast"], {"https://api.fast": "fast"}
+            )
+
+        assert gpu_dict["fast/gpu-node"] == [3, 4, "A100, 40 Gi"]
+        assert cpu_dict["fast/gpu-node"] == [14, 16, 87.5]
+        assert ram_dict["fast/gpu-node"] == [56, 64, 87.5]
+        assert gpu_allocations["alice@example.com, ns"]["gpu"] == "1"
+        assert gpu_allocations["alice@example.com, ns"]["node"] == "gpu-node"
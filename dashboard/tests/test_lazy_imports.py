@@ -0,0 +1,86 @@
+import subprocess
+import sys
+
+import pytest
+
+from MAIA import versions
+from MAIA.lazy_imports import LazyImport
+from MAIA.versions import (
+    define_docker_image_versions,
+    define_maia_core_versions,
+    get_maia_versions,
+)
+
+HEAVY_MODULES = ["bs4", "hydra", "minio", "nltk", "omegaconf", "pyhelm3"]
+
+
+def _imported_heavy_modules(statement):
+    """Run ``statement`` in a fresh interpreter and return the heavy modules it imported."""
+    code = f"import sys; {statement}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return [module for module in result.stdout.strip().split(",") if module]
+
+
+# ---------------------------------------------------------------------------
+# Lazy imports
+# ---------------------------------------------------------------------------
+
+
+class TestLazyImport:
+    def test_module_is_imported_on_first_use(self):
+        statement = "from MAIA.lazy_imports import LazyImport; OmegaConf = LazyImport('omegaconf', 'OmegaConf')"
+
+        assert _imported_heavy_modules(statement) == []
+        assert _imported_heavy_modules(statement + "; OmegaConf.create({})") == ["omegaconf"]
+
+    def test_proxies_modules_and_callables(self):
+        json = LazyImport("json")
+        path = LazyImport("pathlib", "Path")
+
+        assert json.dumps({"a": 1}) == '{"a": 1}'
+        assert path("/tmp").name == "tmp"
+        assert repr(path) == "<LazyImport pathlib.Path>"
+
+    def test_missing_attributes_are_reported(self):
+        assert not hasattr(LazyImport("json"), "not_a_function")
+
+    @pytest.mark.parametrize(
+        "module", ["MAIA.maia_fn", "MAIA.maia_admin", "MAIA.maia_core", "MAIA.dashboard_utils", "MAIA_scripts.MAIA_build_images"]
+    )
+    def test_heavy_dependencies_are_not_imported_with_the_modules(self, module):
+        assert _imported_heavy_modules(f"import {module}") == []
+
+
+# ---------------------------------------------------------------------------
+# Version resolution
+# ---------------------------------------------------------------------------
+
+
+class TestVersions:
+    def test_versions_are_resolved_once(self):
+        assert get_maia_versions() is get_maia_versions()
+
+    def test_environment_overrides(self, monkeypatch):
+        monkeypatch.delenv("MAIA_WORKSPACE_BASE_IMAGE_VERSION", raising=False)
+        monkeypatch.delenv("MAIA_LAB_IMAGE_VERSION", raising=False)
+        monkeypatch.setenv("PROMETHEUS_CHART_VERSION", "99.0.0")
+
+        assert define_maia_core_versions()["prometheus_chart_version"] == "99.0.0"
+        assert define_docker_image_versions()["maia-lab"] == "1.8.1"
+
+        monkeypatch.setenv("MAIA_WORKSPACE_BASE_IMAGE_VERSION", "2.0.0")
+
+        assert define_docker_image_versions()["maia-lab"] == "2.0.0"
+        monkeypatch.setenv("MAIA_LAB_IMAGE_VERSION", "2.1.0")
+        assert define_docker_image_versions()["maia-lab"] == "2.1.0"
+
+    def test_dashboard_dev_image(self, monkeypatch):
+        monkeypatch.setenv("MAIA_DASHBOARD_IMAGE_VERSION", "3.0.0")
+
+        assert define_docker_image_versions()["maia-dashboard-dev"] == "3.0.0-dev"
+        assert versions.define_maia_admin_versions()["maia_dashboard_image_version"] == "3.0.0"
+
+    def test_returned_versions_can_be_modified(self):
+        define_maia_core_versions()["prometheus_chart_version"] = "modified"
+
+        assert define_maia_core_versions()["prometheus_chart_version"] != "modified"
@@ -201,6 +201,22 @@ class TestUserNamespaceFiltering:
         result = json.loads((tmp_path / "Projects" / "trimmed.json").read_text())
         assert result["users"] == ["eve@example.com"]
 
+    def test_indexed_namespaces_array_preferred(self, tmp_path):
+        """The indexed `namespaces` array is used when present, the comma-separated string otherwise."""
+        projects = [{"namespace": "proj-a"}, {"namespace": "proj-b"}]
+        users = [
+            {"namespace": "proj-a,proj-b", "namespaces": ["proj-a", "proj-b"], "email": "frank@example.com"},
+            {"namespace": "proj-b", "email": "grace@example.com"},
+        ]
+
+        _run_main(projects, users, tmp_path=tmp_path)
+
+        assert json.loads((tmp_path / "Projects" / "proj-a.json").read_text())["users"] == ["frank@example.com"]
+        assert json.loads((tmp_path / "Projects" / "proj-b.json").read_text())["users"] == [
+            "frank@example.com",
+            "grace@example.com",
+        ]
+
 
 # ---------------------------------------------------------------------------
 # Date field processing
@@ -0,0 +1,195 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import mongomock
+import pytest
+from apps import mongodb_models
+from apps.mongodb_models import (
+    MAIAProject,
+    MAIAUser,
+    backfill_user_namespaces,
+    split_namespaces,
+)
+from django.conf import settings
+
+from MAIA.keycloak_utils import get_list_of_users_requesting_a_group
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _bulk_write(collection):
+    """mongomock cannot apply the ``UpdateOne`` operations of recent pymongo releases: apply them one by one."""
+
+    def bulk_write(requests, ordered=True):
+        modified = sum(collection.update_one(op._filter, op._doc).modified_count for op in requests)
+        return SimpleNamespace(modified_count=modified)
+
+    return bulk_write
+
+
+@pytest.fixture
+def users_collection(monkeypatch):
+    """Serve the MAIA users from an in-memory MongoDB."""
+    monkeypatch.setattr(settings, "MONGO_DB", mongomock.MongoClient()["maia"], raising=False)
+    monkeypatch.setattr(mongodb_models, "_col", None)
+    collection = mongodb_models.get_collection()
+    monkeypatch.setattr(collection, "bulk_write", _bulk_write(collection), raising=False)
+    return collection
+
+
+@pytest.fixture
+def projects_collection(monkeypatch):
+    """Serve the MAIA projects from an in-memory MongoDB."""
+    monkeypatch.setattr(settings, "MONGO_DB", mongomock.MongoClient()["maia"], raising=False)
+    monkeypatch.setattr(mongodb_models, "_projects_col", None)
+    return mongodb_models.get_projects_collection()
+
+
+def _create_users():
+    MAIAUser.objects.create(email="alice@example.com", username="alice", namespace="demo,users")
+    MAIAUser.objects.create(email="bob@example.com", username="bob", namespace="users")
+    MAIAUser.objects.create(email="carol@example.com", username="carol", namespace="demo-2, demo")
+
+
+# ---------------------------------------------------------------------------
+# Indexed namespaces
+# ---------------------------------------------------------------------------
+
+
+class TestUserNamespaces:
+    def test_split_namespaces(self):
+        assert split_namespaces("demo, users,,demo ") == ["demo", "users"]
+        assert split_namespaces(None) == []
+
+    def test_namespaces_array_is_indexed_and_stored(self, users_collection):
+        _create_users()
+
+        assert "namespaces_1" in users_collection.index_information()
+        assert users_collection.find_one({"email": "carol@example.com"})["namespaces"] == ["demo-2", "demo"]
+        assert not hasattr(MAIAUser.objects.get(email="carol@example.com"), "namespaces")
+
+    def test_membership_lookups(self, users_collection):
+        _create_users()
+
+        assert MAIAUser.objects.filter(namespaces__contains="demo").count() == 2
+        assert [u.email for u in MAIAUser.objects.exclude(namespaces__contains="demo")] == ["bob@example.com"]
+        assert get_list_of_users_requesting_a_group(MAIAUser, "demo") == ["alice@example.com", "carol@example.com"]
+        assert get_list_of_users_requesting_a_group(MAIAUser, "dem") == []
+
+    def test_updates_keep_the_array_in_sync(self, users_collection):
+        _create_users()
+
+        MAIAUser.objects.filter(email="bob@example.com").update(namespace="users,demo")
+        carol = MAIAUser.objects.get(email="carol@example.com")
+        carol.namespace = "demo-2"
+        MAIAUser.objects.bulk_update([carol], ["namespace"])
+        alice = MAIAUser.objects.get(email="alice@example.com")
+        alice.namespace = "users"
+        alice.save()
+
+        assert get_list_of_users_requesting_a_group(MAIAUser, "demo") == ["bob@example.com"]
+        assert get_list_of_users_requesting_a_group(MAIAUser, "demo-2") == ["carol@example.com"]
+
+    def test_backfill_of_legacy_users(self, users_collection):
+        _create_users()
+        users_collection.insert_one({"email": "legacy@example.com", "namespace": "demo"})
+        users_collection.update_one({"email": "bob@example.com"}, {"$unset": {"namespaces": ""}})
+
+        assert backfill_user_namespaces(dry_run=True) == 2
+        assert backfill_user_namespaces(batch_size=1) == 2
+        assert backfill_user_namespaces() == 0
+        assert get_list_of_users_requesting_a_group(MAIAUser, "demo") == [
+            "alice@example.com",
+            "carol@example.com",
+            "legacy@example.com",
+        ]
+        assert users_collection.find_one({"email": "bob@example.com"})["namespaces"] == ["users"]
+
+    def test_legacy_users_match_before_the_backfill(self, users_collection):
+        _create_users()
+        users_collection.insert_many(
+            [
+                {"email": "legacy@example.com", "namespace": "users, demo"},
+                {"email": "other@example.com", "namespace": "demo-2,xdemo"},
+            ]
+        )
+
+        assert get_list_of_users_requesting_a_group(MAIAUser, "demo") == [
+            "alice@example.com",
+            "carol@example.com",
+            "legacy@example.com",
+        ]
+        assert get_list_of_users_requesting_a_group(MAIAUser, "demo-2") == ["carol@example.com", "other@example.com"]
+        assert [u.email for u in MAIAUser.objects.exclude(namespaces__contains="demo")] == [
+            "bob@example.com",
+            "other@example.com",
+        ]
+        assert [u.email for u in MAIAUser.objects.filter(namespaces__contains="demo").filter(namespaces__contains="users")] == [
+            "alice@example.com",
+            "legacy@example.com",
+        ]
+
+
+# ---------------------------------------------------------------------------
+# Query sets
+# ---------------------------------------------------------------------------
+
+
+class TestQuerySets:
+    def test_terminal_methods_do_not_materialize_users(self, users_collection):
+        _create_users()
+        users = MAIAUser.objects.filter(namespaces__contains="demo")
+
+        with patch.object(MAIAUser, "_from_doc", wraps=MAIAUser._from_doc) as from_doc:
+            assert users.count() == 2
+            assert users.exists()
+            assert not MAIAUser.objects.filter(namespaces__contains="missing").exists()
+            assert users.values("email") == [{"email": "alice@example.com"}, {"email": "carol@example.com"}]
+            assert users.values_list("username", flat=True) == ["alice", "carol"]
+            assert from_doc.call_count == 0
+
+            assert users.order_by("-email").first().email == "carol@example.com"
+            assert users[1].email == "carol@example.com"
+            assert MAIAUser.objects.get(email="bob@example.com").username == "bob"
+            assert from_doc.call_count == 3
+
+    def test_slices_and_cached_results(self, users_collection):
+        _create_users()
+        users = MAIAUser.objects.order_by("email")
+
+        assert users.offset(1).count() == 2
+        assert users.limit(1).count() == 1
+        assert not users.offset(3).exists()
+        assert users.offset(1).values("email") == [{"email": "bob@example.com"}, {"email": "carol@example.com"}]
+        with pytest.raises(IndexError):
+            users.limit(2)[2]
+
+        cached = list(users)
+        users_collection.delete_many({})
+        assert users.count() == len(cached) == 3
+        assert users.first() == cached[0]
+
+    def test_iterator_follows_the_query_set(self, users_collection):
+        _create_users()
+
+        emails = [u.email for u in MAIAUser.objects.order_by("-email").offset(1).iterator(chunk_size=1)]
+        assert emails == ["bob@example.com", "alice@example.com"]
+        with pytest.raises(MAIAUser.MultipleObjectsReturned):
+            MAIAUser.objects.get(namespaces__contains="demo")
+
+    def test_projects(self, projects_collection):
+        for namespace in ("demo", "demo-2", "users"):
+            MAIAProject.objects.create(namespace=namespace, email="admin@example.com")
+        projects = MAIAProject.objects.filter(email="admin@example.com").order_by("-namespace")
+
+        with patch.object(MAIAProject, "_from_doc", wraps=MAIAProject._from_doc) as from_doc:
+            assert projects.count() == 3
+            assert projects.exists()
+            assert projects.values("namespace")[0] == {"namespace": "users"}
+            assert from_doc.call_count == 0
+
+            assert projects.first().namespace == "users"
+            assert [p.namespace for p in projects.iterator(chunk_size=2)] == ["users", "demo-2", "demo"]
+            assert from_doc.call_count == 4
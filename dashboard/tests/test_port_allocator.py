@@ -0,0 +1,164 @@
+import copy
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from kubernetes.client.rest import ApiException
+
+from MAIA import port_allocator
+from MAIA.port_allocator import (
+    allocate_service_ports,
+    find_free_ports,
+    list_service_ports,
+    reserve_ports,
+)
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+PORT_RANGE = (30000, 30010)
+
+
+def _service(name, namespace, service_type, ports, ip=None):
+    return SimpleNamespace(
+        metadata=SimpleNamespace(name=name, namespace=namespace),
+        spec=SimpleNamespace(
+            type=service_type, ports=[SimpleNamespace(port=port, node_port=node_port) for port, node_port in ports]
+        ),
+        status=SimpleNamespace(load_balancer=SimpleNamespace(ingress=[SimpleNamespace(ip=ip)] if ip else None)),
+    )
+
+
+class _FakeCoreV1Api:
+    """In-memory stand-in for CoreV1Api, serving a fixed service listing and a ConfigMap with resourceVersion checks."""
+
+    def __init__(self, services):
+        self.services = services
+        self.service_listings = 0
+        self.config_map = None
+        self.conflicts = 0
+        self._lock = threading.Lock()
+
+    def list_service_for_all_namespaces(self, watch=False):
+        self.service_listings += 1
+        return SimpleNamespace(items=self.services)
+
+    def read_namespaced_config_map(self, name, namespace):
+        with self._lock:
+            if self.config_map is None:
+                raise ApiException(status=404)
+            return copy.deepcopy(self.config_map)
+
+    def create_namespaced_config_map(self, namespace, body):
+        with self._lock:
+            if self.config_map is not None:
+                self.conflicts += 1
+                raise ApiException(status=409)
+            body.metadata.resource_version = "1"
+            self.config_map = copy.deepcopy(body)
+
+    def replace_namespaced_config_map(self, name, namespace, body):
+        with self._lock:
+            if body.metadata.resource_version != self.config_map.metadata.resource_version:
+                self.conflicts += 1
+                raise ApiException(status=409)
+            body.metadata.resource_version = str(int(body.metadata.resource_version) + 1)
+            self.config_map = copy.deepcopy(body)
+
+
+def _fake_api():
+    return _FakeCoreV1Api(
+        [
+            _service("jupyter-jane-ssh", "demo", "NodePort", [(2022, 30000)]),
+            _service("demo-orthanc-svc-orthanc", "demo", "NodePort", [(4242, 30002)]),
+            _service("jupyter-john-ssh", "other", "NodePort", [(2022, 30001)]),
+            _service("ingress", "ingress", "LoadBalancer", [(443, 30003), (80, None)], ip="10.0.0.1"),
+            _service("kubernetes", "default", "ClusterIP", [(443, None)]),
+        ]
+    )
+
+
+# ---------------------------------------------------------------------------
+# Allocation
+# ---------------------------------------------------------------------------
+
+
+class TestPortAllocation:
+    def test_used_and_assigned_ports(self):
+        node_ports = list_service_ports("NodePort", "demo", PORT_RANGE, core_api=_fake_api())
+        load_balancer_ports = list_service_ports("LoadBalancer", "demo", PORT_RANGE, "10.0.0.1", core_api=_fake_api())
+
+        assert node_ports.used == {30000, 30001, 30002, 30003}
+        assert node_ports.assigned == {"jupyter-jane": 30000, "demo-orthanc-svc-orthanc": 30002}
+        assert load_balancer_ports.used == {443, 80}
+        assert load_balancer_ports.assigned == {"ingress": 80}
+
+    def test_find_free_ports(self):
+        assert find_free_ports(3, PORT_RANGE, {30000, 30002}) == [30001, 30003, 30004]
+        assert find_free_ports(3, (30000, 30002), {30000}) == [30001]
+        assert find_free_ports(0, PORT_RANGE, set()) == []
+
+    def test_existing_assignments_are_kept_with_a_single_listing(self):
+        core_api = _fake_api()
+        ports = allocate_service_ports(
+            ["jupyter-jane", "jupyter-bob", "jupyter-alice", "demo-orthanc-svc-orthanc"],
+            "NodePort",
+            "demo",
+            PORT_RANGE,
+            core_api=core_api,
+        )
+
+        assert ports == {
+            "jupyter-jane": 30000,
+            "jupyter-bob": 30004,
+            "jupyter-alice": 30005,
+            "demo-orthanc-svc-orthanc": 30002,
+        }
+        assert core_api.service_listings == 1
+
+
+# ---------------------------------------------------------------------------
+# Reservations
+# ---------------------------------------------------------------------------
+
+
+class TestPortReservations:
+    def test_concurrent_deployments_get_distinct_ports(self):
+        core_api = _fake_api()
+        results = {}
+
+        def _deploy(namespace):
+            results[namespace] = reserve_ports(namespace, 2, PORT_RANGE, {30000, 30001}, core_api=core_api)
+
+        threads = [threading.Thread(target=_deploy, args=(f"project-{i}",)) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        ports = [port for namespace_ports in results.values() for port in namespace_ports]
+        assert sorted(ports) == list(range(30002, 30008))
+        assert len(core_api.config_map.data) == 6
+
+    def test_reservations_are_reused_by_their_owner(self):
+        core_api = _fake_api()
+
+        first = reserve_ports("demo", 2, PORT_RANGE, set(), core_api=core_api)
+        assert reserve_ports("other", 1, PORT_RANGE, set(), core_api=core_api) == [30002]
+        assert reserve_ports("demo", 2, PORT_RANGE, set(), core_api=core_api) == first == [30000, 30001]
+
+    def test_expired_and_bound_reservations_are_released(self):
+        core_api = _fake_api()
+        with patch.object(port_allocator, "PORT_RESERVATION_TTL", -1):
+            reserve_ports("demo", 2, PORT_RANGE, set(), core_api=core_api)
+
+        assert reserve_ports("other", 1, PORT_RANGE, set(), core_api=core_api) == [30000]
+        # The reserved port is now used by a service: the reservation is dropped.
+        assert reserve_ports("other", 1, PORT_RANGE, {30000}, core_api=core_api) == [30001]
+        assert list(core_api.config_map.data) == ["30001"]
+
+    def test_ports_are_allocated_without_reservation_if_forbidden(self):
+        core_api = _fake_api()
+        with patch.object(core_api, "read_namespaced_config_map", side_effect=ApiException(status=403)):
+            assert reserve_ports("demo", 2, PORT_RANGE, {30000}, core_api=core_api) == [30001, 30002]
@@ -0,0 +1,118 @@
+import base64
+from collections import Counter
+from types import SimpleNamespace
+
+from kubernetes.client.rest import ApiException
+
+from MAIA.maia_fn import (
+    ProjectResourceSnapshot,
+    generate_minio_configs,
+    generate_mlflow_configs,
+    generate_mysql_configs,
+    generate_nvflare_dashboard_configs,
+    generate_orthanc_configs,
+)
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _encode(value):
+    return base64.b64encode(value.encode("ascii")).decode("ascii")
+
+
+def _secret(name, data):
+    return SimpleNamespace(metadata=SimpleNamespace(name=name), data={key: _encode(value) for key, value in data.items()})
+
+
+def _pod(name, env):
+    containers = [SimpleNamespace(env=[SimpleNamespace(name=key, value=value) for key, value in env.items()])]
+    return SimpleNamespace(metadata=SimpleNamespace(name=name), spec=SimpleNamespace(containers=containers))
+
+
+class _FakeCoreV1Api:
+    """In-memory stand-in for CoreV1Api, serving the resources of a deployed project and counting the listings."""
+
+    def __init__(self, status=None):
+        self.status = status
+        self.calls = Counter()
+
+    def _items(self, kind, items):
+        self.calls[kind] += 1
+        if self.status is not None:
+            raise ApiException(status=self.status)
+        return SimpleNamespace(items=items)
+
+    def list_namespaced_secret(self, namespace):
+        return self._items(
+            "secret",
+            [
+                _secret("default-token", {"token": "token"}),
+                _secret("storage-user", {"CONSOLE_ACCESS_KEY": "console-access", "CONSOLE_SECRET_KEY": "console-secret"}),
+                _secret("storage-configuration", {"config.env": "export MINIO_ROOT_USER=admin\nexport MINIO_ROOT_PASSWORD=root"}),
+                _secret("demo", {"user": "demo", "password": "mlflow-password"}),
+            ],
+        )
+
+    def list_namespaced_pod(self, namespace):
+        return self._items(
+            "pod",
+            [
+                _pod("demo-mysql-mkg-0", {"MYSQL_USER": "demo", "MYSQL_PASSWORD": "mysql-password"}),
+                _pod("demo-nvflare-dashboard-0", {"ADMIN_USERNAME": "nvflare", "ADMIN_PASSWORD": "nvflare-password"}),
+            ],
+        )
+
+    def list_namespaced_config_map(self, namespace):
+        orthanc_config = '{"DicomModalities": {"DEMO": []}, "MySQL": {"Password": "orthanc-password"}}'
+        return self._items(
+            "config_map",
+            [
+                SimpleNamespace(
+                    metadata=SimpleNamespace(name="demo-orthanc-orthanc-config"), data={"orthanc.json": orthanc_config}
+                )
+            ],
+        )
+
+
+# ---------------------------------------------------------------------------
+# Snapshot
+# ---------------------------------------------------------------------------
+
+
+class TestProjectResourceSnapshot:
+    def test_generators_share_one_listing_per_kind(self):
+        core_api = _FakeCoreV1Api()
+        snapshot = ProjectResourceSnapshot("DEMO", core_api=core_api)
+
+        minio_configs = generate_minio_configs("demo", snapshot=snapshot)
+        mlflow_configs = generate_mlflow_configs("demo", snapshot=snapshot)
+        mysql_configs = generate_mysql_configs("demo", snapshot=snapshot)
+        orthanc_configs = generate_orthanc_configs("demo", snapshot=snapshot)
+        nvflare_credentials = generate_nvflare_dashboard_configs("demo", snapshot=snapshot)
+
+        assert minio_configs["secret_key"] == "root"
+        assert minio_configs["console_access_key"] == _encode("console-access")
+        assert minio_configs["console_secret_key"] == _encode("console-secret")
+        assert mlflow_configs == {"mlflow_user": _encode("demo"), "mlflow_password": _encode("mlflow_password")}
+        assert mysql_configs == {"mysql_user": "demo", "mysql_password": "mysqlpassword"}
+        assert orthanc_configs == {"ae_title": "DEMO", "mysql_password": "orthanc-password"}
+        assert nvflare_credentials == ("nvflare", "nvflare-password")
+        assert core_api.calls == {"secret": 1, "pod": 1, "config_map": 1}
+
+    def test_secrets_are_decoded_on_access(self):
+        snapshot = ProjectResourceSnapshot("demo", core_api=_FakeCoreV1Api())
+
+        assert snapshot.get_secret("demo") == {"user": "demo", "password": "mlflow-password"}
+        assert snapshot.get_secret("missing") is None
+        assert list(snapshot._decoded_secrets) == ["demo", "missing"]
+
+    def test_forbidden_namespace_is_empty(self):
+        core_api = _FakeCoreV1Api(status=403)
+        snapshot = ProjectResourceSnapshot("demo", core_api=core_api)
+
+        assert generate_mlflow_configs("demo", snapshot=snapshot)["mlflow_user"] == _encode("demo")
+        assert snapshot.get_secret("storage-user") is None
+        assert snapshot.get_pods("demo-mysql-mkg") == []
+        assert core_api.calls == {"secret": 1, "pod": 1}
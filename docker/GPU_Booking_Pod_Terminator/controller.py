@@ -1,9 +1,13 @@
+import heapq
+import os
+import queue
 import random
 from kubernetes import client, config, watch
+from kubernetes.client.exceptions import ApiException
 import time
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 import logging
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify
 import threading
 from flask import request
 
@@ -11,6 +15,21 @@ from flask import request
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
 logger = logging.getLogger(__name__)
 
+# Selectors restricting the pods tracked by the controller. Resource requests cannot be used in selectors, so GPU
+# pods are filtered in memory; a label selector (e.g. "component=singleuser-server") further reduces the watch.
+POD_LABEL_SELECTOR = os.environ.get("POD_LABEL_SELECTOR", "")
+POD_FIELD_SELECTOR = os.environ.get("POD_FIELD_SELECTOR", "status.phase=Running")
+# Server-side timeout of a single watch request; the watch is resumed from the last resourceVersion afterwards.
+WATCH_TIMEOUT_SECONDS = int(os.environ.get("WATCH_TIMEOUT_SECONDS", "300"))
+# Delete (and recreate without GPU) pods as soon as they expire, instead of waiting for /random-delete.
+AUTO_DELETE_EXPIRED_PODS = os.environ.get("AUTO_DELETE_EXPIRED_PODS", "false").lower() == "true"
+# Recreate pipeline: number of pods deleted and recreated concurrently, and retry policy of the recreation.
+RECREATE_WORKERS = int(os.environ.get("RECREATE_WORKERS", "4"))
+RECREATE_MAX_ATTEMPTS = int(os.environ.get("RECREATE_MAX_ATTEMPTS", "10"))
+RECREATE_BACKOFF_SECONDS = float(os.environ.get("RECREATE_BACKOFF_SECONDS", "1"))
+RECREATE_MAX_BACKOFF_SECONDS = float(os.environ.get("RECREATE_MAX_BACKOFF_SECONDS", "60"))
+DELETION_TIMEOUT_SECONDS = int(os.environ.get("DELETION_TIMEOUT_SECONDS", "300"))
+
 # Load Kubernetes configuration
 config.load_incluster_config()  # Use in-cluster config
 # config.load_kube_config()  # Uncomment for local testing
@@ -18,59 +37,182 @@ config.load_incluster_config()  # Use in-cluster config
 v1 = client.CoreV1Api()
 
 
-def find_all_expired_pods():
-    expired_pods = []
-    pods = v1.list_pod_for_all_namespaces(watch=False).items
-    for pod in pods:
+def parse_terminate_at(value):
+    """Parse a terminate-at annotation (e.g. 2025-01-01T08:00:00Z) into a naive UTC datetime."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
+    except ValueError:
+        expiry_time = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if expiry_time.tzinfo is not None:
+            expiry_time = expiry_time.astimezone(timezone.utc).replace(tzinfo=None)
+        return expiry_time
+
+
+def requests_gpu(pod):
+    return bool(pod.spec and pod.spec.containers) and any(
+        c.resources
+        and (
+            (c.resources.limits and "nvidia.com/gpu" in c.resources.limits)
+            or (c.resources.requests and "nvidia.com/gpu" in c.resources.requests)
+        )
+        for c in pod.spec.containers
+    )
+
+
+class ExpiryIndex:
+    """
+    Running GPU pods with a terminate-at annotation, in a priority queue ordered by expiry time.
+
+    The index is fed by the pod watch. A background thread sleeps until the next expiry and then moves the
+    expired pods to the expired set, which is what the HTTP endpoints serve.
+    """
+
+    def __init__(self, on_expired=None):
+        self._pods = {}  # (namespace, name) -> (expiry_time, generation, pod)
+        self._heap = []  # (expiry_time, generation, key); entries whose generation is outdated are skipped
+        self._expired = {}  # (namespace, name) -> pod
+        self._generation = 0
+        self._condition = threading.Condition()
+        self._on_expired = on_expired
+
+    @staticmethod
+    def key(pod):
+        return pod.metadata.namespace, pod.metadata.name
+
+    def _track(self, pod):
         annotations = pod.metadata.annotations or {}
-        if "terminate-at" in annotations:
-            try:
-                expiry_time = datetime.strptime(annotations["terminate-at"], "%Y-%m-%dT%H:%M:%SZ")
-                # Check if pod is expired and in Running phase
-                if (
-                    datetime.utcnow() > expiry_time
-                    and pod.status.phase == "Running"
-                    and pod.spec.containers
-                    and any(
-                        c.resources
-                        and (
-                            (c.resources.limits and "nvidia.com/gpu" in c.resources.limits)
-                            or (c.resources.requests and "nvidia.com/gpu" in c.resources.requests)
-                        )
-                        for c in pod.spec.containers
-                    )
-                ):
-                    expired_pods.append(pod)
-            except Exception as e:
-                logger.error(f"Error processing pod {pod.metadata.name}: {e}")
-    return expired_pods
+        if "terminate-at" not in annotations or not requests_gpu(pod):
+            return None
+        if pod.status and pod.status.phase != "Running":
+            return None
+        try:
+            return parse_terminate_at(annotations["terminate-at"])
+        except ValueError as e:
+            logger.error(f"Error processing pod {pod.metadata.name}: {e}")
+            return None
 
-def delete_expired_pod(pod):
-    try:
-        v1.delete_namespaced_pod(pod.metadata.name, pod.metadata.namespace)
-        recreate_pod(pod=pod)
-    except Exception as e:
-        logger.error(f"Error processing deletion for pod {pod.metadata.name}: {e}")
+    def _remove(self, key):
+        self._pods.pop(key, None)
+        self._expired.pop(key, None)
+
+    def upsert(self, pod):
+        with self._condition:
+            key = self.key(pod)
+            self._remove(key)
+            expiry_time = self._track(pod)
+            if expiry_time is None:
+                return
+            self._generation += 1
+            self._pods[key] = (expiry_time, self._generation, pod)
+            heapq.heappush(self._heap, (expiry_time, self._generation, key))
+            self._condition.notify()
 
+    def remove(self, pod):
+        with self._condition:
+            self._remove(self.key(pod))
 
-def delete_expired_pods():
-    while True:
-        pods = v1.list_pod_for_all_namespaces(watch=False).items
+    def replace_all(self, pods):
+        with self._condition:
+            self._pods, self._heap, self._expired = {}, [], {}
         for pod in pods:
-            annotations = pod.metadata.annotations or {}
-            if "terminate-at" in annotations:
-                try:
-                    expiry_time = datetime.strptime(annotations["terminate-at"], "%Y-%m-%dT%H:%M:%SZ")
-                    if datetime.utcnow() > expiry_time:
-                        logger.info(f"Deleting pod {pod.metadata.name} (expired)")
-                        v1.delete_namespaced_pod(pod.metadata.name, pod.metadata.namespace)
-                          # Wait 5 seconds before checking the next pod
-                        recreate_pod(pod=pod)
-                except Exception as e:
-                    logger.error(f"Error processing deletion for pod {pod.metadata.name}: {e}")
-        time.sleep(30)  # Check every 30 seconds
-
-def recreate_pod(pod):
+            self.upsert(pod)
+
+    def size(self):
+        with self._condition:
+            return len(self._pods)
+
+    def get(self, namespace, name):
+        with self._condition:
+            entry = self._pods.get((namespace, name))
+            return entry[2] if entry else None
+
+    def _promote(self, now):
+        """Move the pods whose expiry time has passed from the queue to the expired set."""
+        newly_expired = []
+        while self._heap and self._heap[0][0] <= now:
+            _, generation, key = heapq.heappop(self._heap)
+            entry = self._pods.get(key)
+            if entry is not None and entry[1] == generation:
+                self._expired[key] = entry[2]
+                newly_expired.append(entry[2])
+        return newly_expired
+
+    def expired(self):
+        with self._condition:
+            self._promote(datetime.utcnow())
+            return list(self._expired.values())
+
+    def is_expired(self, namespace, name):
+        with self._condition:
+            self._promote(datetime.utcnow())
+            return (namespace, name) in self._expired
+
+    def run(self, stop_event):
+        """Sleep until the next expiry, promote the expired pods and repeat."""
+        while not stop_event.is_set():
+            with self._condition:
+                newly_expired = self._promote(datetime.utcnow())
+                if not newly_expired:
+                    timeout = None
+                    if self._heap:
+                        timeout = max((self._heap[0][0] - datetime.utcnow()).total_seconds(), 0)
+                    # Woken up early by upsert() when an earlier expiry is added.
+                    self._condition.wait(timeout=min(timeout, 60) if timeout is not None else 60)
+                    continue
+            for pod in newly_expired:
+                logger.info(f"Pod {pod.metadata.name} in {pod.metadata.namespace} expired")
+                if self._on_expired is not None:
+                    self._on_expired(pod)
+
+
+def watch_pods(index, stop_event):
+    """List the pods once, then follow the watch stream, re-listing when the resourceVersion expires."""
+    resource_version = None
+    backoff = 1
+    while not stop_event.is_set():
+        try:
+            if resource_version is None:
+                pod_list = v1.list_pod_for_all_namespaces(
+                    label_selector=POD_LABEL_SELECTOR, field_selector=POD_FIELD_SELECTOR
+                )
+                index.replace_all(pod_list.items)
+                resource_version = pod_list.metadata.resource_version
+                logger.info(f"Listed {len(pod_list.items)} pods at resourceVersion {resource_version}")
+            for event in watch.Watch().stream(
+                v1.list_pod_for_all_namespaces,
+                label_selector=POD_LABEL_SELECTOR,
+                field_selector=POD_FIELD_SELECTOR,
+                resource_version=resource_version,
+                allow_watch_bookmarks=True,
+                timeout_seconds=WATCH_TIMEOUT_SECONDS,
+            ):
+                pod = event["object"]
+                resource_version = pod.metadata.resource_version
+                if event["type"] == "DELETED":
+                    index.remove(pod)
+                elif event["type"] in ("ADDED", "MODIFIED"):
+                    index.upsert(pod)
+                if stop_event.is_set():
+                    return
+            backoff = 1
+        except ApiException as e:
+            if e.status == 410:
+                logger.info("Pod watch expired, re-listing")
+                resource_version = None
+                continue
+            logger.error(f"Pod watch failed ({e}), retrying in {backoff} s")
+            resource_version = None
+            stop_event.wait(backoff)
+            backoff = min(backoff * 2, 60)
+        except Exception as e:
+            logger.error(f"Pod watch failed ({e}), retrying in {backoff} s")
+            resource_version = None
+            stop_event.wait(backoff)
+            backoff = min(backoff * 2, 60)
+
+
+def build_recreated_pod(pod):
+    """Return a copy of the pod spec without GPU resources and without the terminate-at annotation."""
     # Remove resource limits and requests for nvidia.com/gpu
     if pod.spec.containers:
         for container in pod.spec.containers:
@@ -79,7 +221,7 @@ def recreate_pod(pod):
                     del container.resources.limits["nvidia.com/gpu"]
                 if container.resources.requests and "nvidia.com/gpu" in container.resources.requests:
                     del container.resources.requests["nvidia.com/gpu"]
-            
+
             # Modify or add NVIDIA_VISIBLE_DEVICES environment variable
             env_vars = container.env or []
             found = False
@@ -97,7 +239,7 @@ def recreate_pod(pod):
     if "terminate-at" in annotations:
         del annotations["terminate-at"]
 
-    new_pod = client.V1Pod(
+    return client.V1Pod(
         metadata=client.V1ObjectMeta(
             name=pod.metadata.name,
             namespace=pod.metadata.namespace,
@@ -106,38 +248,193 @@ def recreate_pod(pod):
         ),
         spec=pod.spec
     )
-    
-    for attempt in range(10):
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with jitter: up to RECREATE_BACKOFF_SECONDS * 2^attempt, capped."""
+    return random.uniform(0.5, 1) * min(RECREATE_BACKOFF_SECONDS * 2 ** attempt, RECREATE_MAX_BACKOFF_SECONDS)
+
+
+def wait_for_deletion(name, namespace, timeout):
+    """Block until the pod is gone, following a watch on the pod instead of polling. Return False on timeout."""
+    try:
+        pod = v1.read_namespaced_pod(name, namespace)
+    except ApiException as e:
+        if e.status == 404:
+            return True
+        raise
+    deadline = time.monotonic() + timeout
+    resource_version = pod.metadata.resource_version
+    while time.monotonic() < deadline:
         try:
-            v1.create_namespaced_pod(namespace=pod.metadata.namespace, body=new_pod)
-            logger.info(f"Recreated pod {pod.metadata.name}")
-            break
-        except Exception as e:
-            logger.error(f"Error recreating pod {pod.metadata.name} (attempt {attempt + 1}/10): {e}")
-            time.sleep(5)  # Wait 5 seconds before retrying
-        
-    
+            for event in watch.Watch().stream(
+                v1.list_namespaced_pod,
+                namespace,
+                field_selector=f"metadata.name={name}",
+                resource_version=resource_version,
+                timeout_seconds=max(int(deadline - time.monotonic()), 1),
+            ):
+                if event["type"] == "DELETED":
+                    return True
+                resource_version = event["object"].metadata.resource_version
+        except ApiException as e:
+            if e.status != 410:
+                raise
+        # The watch ended or expired: check whether the pod was deleted in the meantime.
+        try:
+            resource_version = v1.read_namespaced_pod(name, namespace).metadata.resource_version
+        except ApiException as e:
+            if e.status == 404:
+                return True
+            raise
+    return False
+
+
+class RecreatePipeline:
+    """
+    Bounded pool of workers deleting expired pods, waiting for the deletion and recreating them without GPU.
+
+    Pods are queued by key, so a pod already queued or in progress is not submitted twice. Metrics on the queue
+    and on the time to recreate are exported in the Prometheus text format.
+    """
+
+    def __init__(self, workers):
+        self._queue = queue.Queue()
+        self._workers = workers
+        self._lock = threading.Lock()
+        self._pending = set()  # (namespace, name) of the queued and in-progress pods
+        self._in_progress = 0
+        self._counters = {"recreated": 0, "failed": 0, "create_retries": 0}
+        self._recreate_seconds_sum = 0.0
+        self._recreate_seconds_max = 0.0
+
+    def start(self):
+        for i in range(self._workers):
+            threading.Thread(target=self._work, name=f"recreate-worker-{i}", daemon=True).start()
+
+    def submit(self, pod):
+        """Queue a pod for deletion and recreation. Return False if it is already queued or in progress."""
+        key = ExpiryIndex.key(pod)
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+        # Stop tracking the pod, so that it is not selected twice while it is being recreated.
+        expiry_index.remove(pod)
+        self._queue.put((pod, time.monotonic()))
+        return True
+
+    def _work(self):
+        while True:
+            pod, queued_at = self._queue.get()
+            with self._lock:
+                self._in_progress += 1
+            try:
+                recreated = self._process(pod)
+            except Exception as e:
+                logger.error(f"Error processing deletion for pod {pod.metadata.name}: {e}")
+                recreated = False
+            elapsed = time.monotonic() - queued_at
+            with self._lock:
+                self._in_progress -= 1
+                self._pending.discard(ExpiryIndex.key(pod))
+                if recreated:
+                    self._counters["recreated"] += 1
+                    self._recreate_seconds_sum += elapsed
+                    self._recreate_seconds_max = max(self._recreate_seconds_max, elapsed)
+                else:
+                    self._counters["failed"] += 1
+            self._queue.task_done()
+
+    def _process(self, pod):
+        name, namespace = pod.metadata.name, pod.metadata.namespace
+        try:
+            v1.delete_namespaced_pod(name, namespace)
+        except ApiException as e:
+            if e.status != 404:
+                raise
+        if not wait_for_deletion(name, namespace, DELETION_TIMEOUT_SECONDS):
+            logger.error(f"Pod {name} in {namespace} was not deleted within {DELETION_TIMEOUT_SECONDS} s")
+            return False
+
+        new_pod = build_recreated_pod(pod)
+        for attempt in range(RECREATE_MAX_ATTEMPTS):
+            try:
+                v1.create_namespaced_pod(namespace=namespace, body=new_pod)
+                logger.info(f"Recreated pod {name}")
+                return True
+            except ApiException as e:
+                # 4xx errors other than conflicts and throttling will not be fixed by retrying.
+                if 400 <= e.status < 500 and e.status not in (409, 429):
+                    logger.error(f"Error recreating pod {name}: {e}")
+                    return False
+                error = e
+            except Exception as e:
+                error = e
+            delay = backoff_delay(attempt)
+            logger.error(f"Error recreating pod {name} (attempt {attempt + 1}/{RECREATE_MAX_ATTEMPTS}): {error}")
+            with self._lock:
+                self._counters["create_retries"] += 1
+            time.sleep(delay)
+        return False
+
+    def metrics(self):
+        with self._lock:
+            recreated = self._counters["recreated"]
+            lines = [
+                "# TYPE pod_terminator_queue_depth gauge",
+                f"pod_terminator_queue_depth {self._queue.qsize()}",
+                "# TYPE pod_terminator_in_progress gauge",
+                f"pod_terminator_in_progress {self._in_progress}",
+                "# TYPE pod_terminator_tracked_pods gauge",
+                f"pod_terminator_tracked_pods {expiry_index.size()}",
+                "# TYPE pod_terminator_expired_pods gauge",
+                f"pod_terminator_expired_pods {len(expiry_index.expired())}",
+                "# TYPE pod_terminator_recreated_total counter",
+                f"pod_terminator_recreated_total {recreated}",
+                "# TYPE pod_terminator_failed_total counter",
+                f"pod_terminator_failed_total {self._counters['failed']}",
+                "# TYPE pod_terminator_create_retries_total counter",
+                f"pod_terminator_create_retries_total {self._counters['create_retries']}",
+                "# TYPE pod_terminator_recreate_seconds summary",
+                f"pod_terminator_recreate_seconds_sum {self._recreate_seconds_sum}",
+                f"pod_terminator_recreate_seconds_count {recreated}",
+                "# TYPE pod_terminator_recreate_seconds_max gauge",
+                f"pod_terminator_recreate_seconds_max {self._recreate_seconds_max}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+recreate_pipeline = RecreatePipeline(RECREATE_WORKERS)
+expiry_index = ExpiryIndex(on_expired=recreate_pipeline.submit if AUTO_DELETE_EXPIRED_PODS else None)
+
+
+def start_controller():
+    stop_event = threading.Event()
+    threading.Thread(target=watch_pods, args=(expiry_index, stop_event), name="pod-watch", daemon=True).start()
+    threading.Thread(target=expiry_index.run, args=(stop_event,), name="expiry-timer", daemon=True).start()
+    recreate_pipeline.start()
+    return stop_event
+
 
 app = Flask(__name__)
 
 @app.route('/random-delete', methods=['POST'])
 def trigger_delete_expired_pods():
-    expired_pods = find_all_expired_pods()
+    expired_pods = expiry_index.expired()
     if not expired_pods:
         return jsonify({"status": "no expired pods found"}), 200
     logger.info(f"Found {len(expired_pods)} expired pods, starting deletion process.")
     # Randomly select one pod to delete
     pod_to_delete = random.choice(expired_pods)
-    # Run the pod deletion in a background thread to avoid blocking
+    # The deletion and recreation run in the recreate pipeline, to avoid blocking
     logger.info(f"Selected pod {pod_to_delete.metadata.name} from {pod_to_delete.metadata.namespace} for deletion.")
-    thread = threading.Thread(target=delete_expired_pod, args=(pod_to_delete,), daemon=True)
-    thread.start()
-    thread.join()
+    recreate_pipeline.submit(pod_to_delete)
     return jsonify({"status": "success", "deleted_pod": pod_to_delete.metadata.name}), 200
 
 @app.route('/get-expired-pods', methods=['GET'])
 def get_expired_pods():
-    expired_pods = find_all_expired_pods()
+    expired_pods = expiry_index.expired()
     if not expired_pods:
         return jsonify({"status": "no expired pods found"}), 200
     pod_names = [pod.metadata.name for pod in expired_pods]
@@ -151,23 +448,21 @@ def delete_expired_pod_endpoint():
     if not pod_name or not namespace:
         return jsonify({"status": "error", "message": "pod_name and namespace are required"}), 400
 
-    pod = None
-    pods = v1.list_namespaced_pod(namespace=namespace).items
-    for p in pods:
-        if p.metadata.name == pod_name:
-            pod = p
-            break
-    # Verify if the pod is expired
-    expired_pods = find_all_expired_pods()
-    if pod not in expired_pods:
-        return jsonify({"status": "error", "message": "Pod is not expired"}), 400
+    pod = expiry_index.get(namespace, pod_name)
     if not pod:
         return jsonify({"status": "error", "message": "Pod not found"}), 404
+    # Verify if the pod is expired
+    if not expiry_index.is_expired(namespace, pod_name):
+        return jsonify({"status": "error", "message": "Pod is not expired"}), 400
 
     logger.info(f"Deleting expired pod {pod.metadata.name} from {pod.metadata.namespace}.")
-    delete_expired_pod(pod)
+    recreate_pipeline.submit(pod)
     return jsonify({"status": "success", "deleted_pod": pod.metadata.name}), 200
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(recreate_pipeline.metrics(), mimetype="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
-    #delete_expired_pods()
+    start_controller()
     app.run(host="0.0.0.0", port=8080)
@@ -1,69 +1,319 @@
 #!/usr/bin/env python3
+import glob
 import time
 import os
-import subprocess
+import random
+import sqlite3
+import threading
 import json
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
 
-with open("/mnt/models.json", "r") as f:
-    models = json.load(f)
-while True:
-    for model, model_info in models.items():
-        QUEUE_FILE = f"/tmp/{model}_inference_queue.txt"
-        MONAI_LABEL_HOST = model_info["host"]
-        if os.path.exists(QUEUE_FILE):
-            with open(QUEUE_FILE, "r") as f:
-                uids = f.read().splitlines()
-            open(QUEUE_FILE, "w").close()  # clear queue
-
-            for studyUID in uids:
-                outputFile = f"/tmp/{model}_pred.dcm"
-                # Verify if Auth is enabled
-                auth = False
-                auth_enabled = requests.get(f"{MONAI_LABEL_HOST}/auth/")
-                if auth_enabled.status_code != 200:
-                    print(f"Auth is not enabled for {MONAI_LABEL_HOST}")
-                    continue
-                elif auth_enabled.json()["enabled"] == False:
-                    print(f"Auth is not enabled for {MONAI_LABEL_HOST}")
-                    continue
-                else:
-                    print(f"Auth is enabled for {MONAI_LABEL_HOST}")
-                    auth = True
-
-                if auth:
-                    username = os.environ.get("MONAI_LABEL_USERNAME", None)
-                    password = os.environ.get("MONAI_LABEL_PASSWORD", None)
-                    if username is None or password is None:
-                        print(f"Username or password is not set for {MONAI_LABEL_HOST}. Please set the MONAI_LABEL_USERNAME and MONAI_LABEL_PASSWORD environment variables.")
-                        continue
-                    token = requests.post(f"{MONAI_LABEL_HOST}/auth/token",
-                            data={"username": username, "password": password},
-                            )
-                    access_token = token.json()["access_token"]
-                    # Run inference with Authorization header
-                    subprocess.run([
-                        "curl", "-s", "-X", "POST", "-H", f"Authorization: Bearer {access_token}",
-                        f"{MONAI_LABEL_HOST}/infer/MONetBundle?image={studyUID}&output=dicom_seg",
-                        "-F", model_info["label_info"],
-                        "--output", outputFile
-                    ])
-                else:
-                    # Run inference
-                    subprocess.run([
-                        "curl", "-s", "-X", "POST",
-                        f"{MONAI_LABEL_HOST}/infer/MONetBundle?image={studyUID}&output=dicom_seg",
-                        "-F", model_info["label_info"],
-                        "--output", outputFile
-                    ])
-
-              
-                # Post result to Orthanc
-                subprocess.run([
-                    "curl", "-s", "-X", "POST",
-                    f"http://127.0.0.1:8042/instances",
-                    "--data-binary", f"@{outputFile}"
-                ])
-                print(f">>> Inference completed for {studyUID}")
-
-    time.sleep(2)  # check every 5 seconds
+MODELS_FILE = os.environ.get("MODELS_FILE", "/mnt/models.json")
+# Spool directory where send_to_remote.lua drops one <model>-<study>.job file per study, and where the SQLite
+# queue lives. It is on the Orthanc volume, so that queued studies survive a restart of the container.
+QUEUE_DIR = os.environ.get("INFERENCE_QUEUE_DIR", "/var/lib/orthanc/db/inference-queue")
+ORTHANC_URL = os.environ.get("ORTHANC_URL", "http://127.0.0.1:8042")
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "4"))
+# Default cap on the concurrent inferences sent to one MONAI Label server; "max_concurrency" in models.json overrides it.
+INFERENCE_CONCURRENCY_PER_MODEL = int(os.environ.get("INFERENCE_CONCURRENCY_PER_MODEL", "2"))
+INFERENCE_MAX_ATTEMPTS = int(os.environ.get("INFERENCE_MAX_ATTEMPTS", "5"))
+INFERENCE_BACKOFF_SECONDS = float(os.environ.get("INFERENCE_BACKOFF_SECONDS", "10"))
+INFERENCE_MAX_BACKOFF_SECONDS = float(os.environ.get("INFERENCE_MAX_BACKOFF_SECONDS", "600"))
+INFERENCE_TIMEOUT_SECONDS = int(os.environ.get("INFERENCE_TIMEOUT_SECONDS", "3600"))
+# Whether auth is enabled on a MONAI Label server is checked again after this many seconds.
+MONAI_LABEL_AUTH_CACHE_SECONDS = float(os.environ.get("MONAI_LABEL_AUTH_CACHE_SECONDS", "300"))
+# Lifetime assumed for access tokens returned without "expires_in".
+MONAI_LABEL_TOKEN_TTL_SECONDS = float(os.environ.get("MONAI_LABEL_TOKEN_TTL_SECONDS", "300"))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+POLL_SECONDS = float(os.environ.get("INFERENCE_POLL_SECONDS", "2"))
+# Completed jobs are kept for this long, then purged from the queue database.
+DONE_RETENTION_SECONDS = 7 * 24 * 3600
+
+
+class PermanentError(Exception):
+    """An inference failure that retrying will not fix."""
+
+
+class InferenceQueue:
+    """
+    Durable queue of (model, StudyInstanceUID) inference jobs, stored in SQLite.
+
+    A job is pending until a worker claims it (running), and is only marked done once the segmentation is uploaded
+    to Orthanc. Failed jobs go back to pending with an exponential backoff, up to ``INFERENCE_MAX_ATTEMPTS``.
+    Jobs left running by a crashed worker are re-queued at startup. A study already pending or running for a model
+    is not queued twice.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, model TEXT NOT NULL, study_uid TEXT NOT NULL, "
+            "status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, "
+            "next_attempt_at REAL NOT NULL DEFAULT 0, last_error TEXT, updated_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS jobs_active ON jobs (model, study_uid) "
+            "WHERE status IN ('pending', 'running')"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, model, next_attempt_at)")
+        with self._lock:
+            self._db.execute("UPDATE jobs SET status = 'pending' WHERE status = 'running'")
+
+    def enqueue(self, model, study_uids):
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT OR IGNORE INTO jobs (model, study_uid, updated_at) VALUES (?, ?, ?)",
+                [(model, study_uid, now) for study_uid in study_uids],
+            )
+            self._db.execute("COMMIT")
+
+    def claim(self, model, limit):
+        """Mark up to ``limit`` due jobs of a model as running and return them as (id, study_uid, attempts)."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            jobs = self._db.execute(
+                "SELECT id, study_uid, attempts FROM jobs WHERE status = 'pending' AND model = ? AND next_attempt_at <= ? "
+                "ORDER BY id LIMIT ?",
+                (model, now, limit),
+            ).fetchall()
+            self._db.executemany(
+                "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?", [(now, job[0]) for job in jobs]
+            )
+            self._db.execute("COMMIT")
+        return jobs
+
+    def ack(self, job_id):
+        with self._lock:
+            self._db.execute("UPDATE jobs SET status = 'done', updated_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def fail(self, job_id, attempts, error, permanent=False):
+        """Re-queue a failed job with a backoff, or mark it as failed once it is out of attempts."""
+        attempts += 1
+        now = time.time()
+        if permanent or attempts >= INFERENCE_MAX_ATTEMPTS:
+            status, next_attempt_at = "failed", now
+        else:
+            delay = min(INFERENCE_BACKOFF_SECONDS * 2 ** (attempts - 1), INFERENCE_MAX_BACKOFF_SECONDS)
+            status, next_attempt_at = "pending", now + random.uniform(0.5, 1) * delay
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, updated_at = ? "
+                "WHERE id = ?",
+                (status, attempts, next_attempt_at, str(error)[:1000], now, job_id),
+            )
+        return status
+
+    def purge_done(self):
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM jobs WHERE status = 'done' AND updated_at < ?", (time.time() - DONE_RETENTION_SECONDS,)
+            )
+
+
+def ingest_spool(inference_queue, models):
+    """Move the job files written by the Lua hook (and legacy queue files) into the queue, then remove them."""
+    for job_file in sorted(glob.glob(os.path.join(QUEUE_DIR, "*.job"))):
+        try:
+            with open(job_file, "r") as f:
+                job = json.load(f)
+            inference_queue.enqueue(job["model"], [job["study_uid"]])
+        except (ValueError, KeyError) as e:
+            print(f"Ignoring malformed job file {job_file}: {e}")
+        os.remove(job_file)
+
+    for model in models:
+        # Queue files appended to by previous versions of the Lua hook. Renaming is atomic, so a concurrent
+        # append either lands in the renamed file or creates a new queue file, and no StudyInstanceUID is lost.
+        legacy_file = f"/tmp/{model}_inference_queue.txt"
+        processing_file = f"{legacy_file}.processing"
+        # A processing file left over by a crash is drained before being replaced.
+        for drained_file in (processing_file, legacy_file):
+            if not os.path.exists(drained_file):
+                continue
+            if drained_file == legacy_file:
+                os.rename(legacy_file, processing_file)
+            with open(processing_file, "r") as f:
+                uids = [uid for uid in f.read().splitlines() if uid]
+            inference_queue.enqueue(model, uids)
+            os.remove(processing_file)
+
+
+def form_fields(label_info):
+    """Convert the label_info of a model (a dict of form fields, or a curl -F "name=value" string) to form fields."""
+    if isinstance(label_info, str):
+        name, _, value = label_info.partition("=")
+        label_info = {name: value}
+    return {
+        name: (None, value if isinstance(value, str) else json.dumps(value)) for name, value in label_info.items()
+    }
+
+
+def pooled_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=INFERENCE_WORKERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class MonaiLabelClient:
+    """
+    Persistent HTTP client for one MONAI Label server.
+
+    Connections are kept alive and shared by the inference workers. Whether auth is enabled is cached for
+    ``MONAI_LABEL_AUTH_CACHE_SECONDS``, and the access token is reused until shortly before it expires.
+    """
+
+    def __init__(self, host):
+        self.host = host
+        self.session = pooled_session()
+        self._lock = threading.Lock()
+        self._auth_enabled = None
+        self._auth_checked_at = 0
+        self._token = None
+        self._token_expires_at = 0
+
+    def _auth_headers(self, refresh=False):
+        with self._lock:
+            now = time.monotonic()
+            if self._auth_enabled is None or now - self._auth_checked_at > MONAI_LABEL_AUTH_CACHE_SECONDS:
+                auth_enabled = self.session.get(f"{self.host}/auth/", timeout=30)
+                self._auth_enabled = auth_enabled.status_code == 200 and auth_enabled.json().get("enabled", False)
+                self._auth_checked_at = now
+                print(f"Auth is {'enabled' if self._auth_enabled else 'not enabled'} for {self.host}")
+            if not self._auth_enabled:
+                return {}
+
+            if refresh or self._token is None or now >= self._token_expires_at:
+                username = os.environ.get("MONAI_LABEL_USERNAME", None)
+                password = os.environ.get("MONAI_LABEL_PASSWORD", None)
+                if username is None or password is None:
+                    raise PermanentError(
+                        f"Username or password is not set for {self.host}. Please set the MONAI_LABEL_USERNAME and "
+                        "MONAI_LABEL_PASSWORD environment variables."
+                    )
+                token = self.session.post(
+                    f"{self.host}/auth/token", data={"username": username, "password": password}, timeout=30
+                )
+                token.raise_for_status()
+                token = token.json()
+                self._token = token["access_token"]
+                expires_in = float(token.get("expires_in", MONAI_LABEL_TOKEN_TTL_SECONDS))
+                # Refresh the token before it expires, rather than having an inference rejected.
+                self._token_expires_at = now + max(expires_in - 30, 0)
+            return {"Authorization": f"Bearer {self._token}"}
+
+    def infer(self, study_uid, label_info):
+        """Run the inference for a study and return the response, with the DICOM SEG body not yet read."""
+        for attempt in range(2):
+            response = self.session.post(
+                f"{self.host}/infer/MONetBundle",
+                params={"image": study_uid, "output": "dicom_seg"},
+                headers=self._auth_headers(refresh=attempt > 0),
+                files=form_fields(label_info),
+                stream=True,
+                timeout=(30, INFERENCE_TIMEOUT_SECONDS),
+            )
+            # The cached token may have been revoked: fetch a new one and retry once.
+            if response.status_code == 401 and attempt == 0:
+                response.close()
+                continue
+            response.raise_for_status()
+            return response
+
+
+_monai_label_clients = {}
+_monai_label_clients_lock = threading.Lock()
+orthanc_session = pooled_session()
+
+
+def get_monai_label_client(host):
+    with _monai_label_clients_lock:
+        if host not in _monai_label_clients:
+            _monai_label_clients[host] = MonaiLabelClient(host)
+        return _monai_label_clients[host]
+
+
+def run_inference(model, model_info, study_uid):
+    """Run the MONAI Label inference for one study and upload the resulting DICOM SEG to Orthanc."""
+    client = get_monai_label_client(model_info["host"])
+    with client.infer(study_uid, model_info["label_info"]) as response:
+        # Post result to Orthanc, streaming the SEG from the inference response without buffering it on disk
+        upload = orthanc_session.post(
+            f"{ORTHANC_URL}/instances",
+            data=response.iter_content(chunk_size=UPLOAD_CHUNK_SIZE),
+            headers={"Content-Type": "application/dicom"},
+            timeout=(30, INFERENCE_TIMEOUT_SECONDS),
+        )
+        upload.raise_for_status()
+
+
+class InferenceWorker:
+    """Dispatch the queued jobs to a bounded thread pool, with a cap on the concurrent jobs of each model."""
+
+    def __init__(self, inference_queue, models):
+        self.queue = inference_queue
+        self.models = models
+        self._pool = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._running = {model: 0 for model in models}
+        self._wakeup = threading.Event()
+
+    def _model_capacity(self, model):
+        return int(self.models[model].get("max_concurrency", INFERENCE_CONCURRENCY_PER_MODEL))
+
+    def _run(self, model, job_id, study_uid, attempts):
+        try:
+            run_inference(model, self.models[model], study_uid)
+            self.queue.ack(job_id)
+            print(f">>> Inference completed for {study_uid}")
+        except Exception as e:
+            status = self.queue.fail(job_id, attempts, e, permanent=isinstance(e, PermanentError))
+            print(f">>> Inference failed for {study_uid} (attempt {attempts + 1}, {status}): {e}")
+        finally:
+            with self._lock:
+                self._running[model] -= 1
+            self._wakeup.set()
+
+    def dispatch(self):
+        for model in self.models:
+            with self._lock:
+                free_workers = INFERENCE_WORKERS - sum(self._running.values())
+                limit = min(self._model_capacity(model) - self._running[model], free_workers)
+            if limit <= 0:
+                continue
+            jobs = self.queue.claim(model, limit)
+            with self._lock:
+                self._running[model] += len(jobs)
+            for job_id, study_uid, attempts in jobs:
+                self._pool.submit(self._run, model, job_id, study_uid, attempts)
+
+    def run_forever(self):
+        last_purge = 0
+        while True:
+            try:
+                ingest_spool(self.queue, self.models)
+                self.dispatch()
+                if time.time() - last_purge > 3600:
+                    self.queue.purge_done()
+                    last_purge = time.time()
+            except Exception as e:
+                print(f"Error processing the inference queue: {e}")
+            self._wakeup.wait(POLL_SECONDS)
+            self._wakeup.clear()
+
+
+if __name__ == "__main__":
+    with open(MODELS_FILE, "r") as f:
+        models = json.load(f)
+    os.makedirs(QUEUE_DIR, exist_ok=True)
+    inference_queue = InferenceQueue(os.path.join(QUEUE_DIR, "queue.sqlite3"))
+    InferenceWorker(inference_queue, models).run_forever()
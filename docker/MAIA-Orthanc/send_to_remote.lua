@@ -1,15 +1,33 @@
+-- Parsed models file, re-read at most every MODELS_CACHE_SECONDS instead of on every stable study
+local MODELS_CACHE_SECONDS = 60
+local models_cache = nil
+local models_cache_time = 0
+
+local function GetModels()
+  local now = os.time()
+  if models_cache == nil or now - models_cache_time >= MODELS_CACHE_SECONDS then
+    local models_file = io.open(os.getenv("MODELS_FILE") or "/etc/models.json", "r")
+    local models_json = models_file:read("*a")
+    models_file:close()
+    models_cache = ParseJson(models_json)
+    models_cache_time = now
+  end
+  return models_cache
+end
+
 function OnStableStudy(studyId, tags, metadata)
 
-  local models_file = io.open("/etc/models.json", "r")
-  local models_json = models_file:read("*a")
-  models_file:close()
-  local models = ParseJson(models_json)
-  local study = ParseJson(RestApiGet('/studies/' .. studyId))
-  local studyUID = study['MainDicomTags']['StudyInstanceUID']
+  local models = GetModels()
+  local studyUID = tags and tags['StudyInstanceUID']
+  if studyUID == nil then
+    studyUID = ParseJson(RestApiGet('/studies/' .. studyId))['MainDicomTags']['StudyInstanceUID']
+  end
+
+  -- All the series of the study, with their main DICOM tags and instances, in a single call
+  local seriesList = ParseJson(RestApiGet('/studies/' .. studyId .. '/series'))
 
   -- Check if study already has a SEG series with description "MAIA-Segmentation-Portal"
-  for _, series in ipairs(study['Series'] or {}) do
-    local seriesDetails = ParseJson(RestApiGet('/series/' .. series))
+  for _, seriesDetails in ipairs(seriesList or {}) do
     local modality = seriesDetails['MainDicomTags']['Modality']
     local description = seriesDetails['MainDicomTags']['SeriesDescription']
     if modality == "SEG" and description == "MAIA-Segmentation-Portal" then
@@ -18,24 +36,28 @@ function OnStableStudy(studyId, tags, metadata)
     end
   end
 
-  -- Check each series and instance for MSP-Spleen
-  for _, series in ipairs(study['Series'] or {}) do
-    local seriesDetails = ParseJson(RestApiGet('/series/' .. series))
-    for _, instance in ipairs(seriesDetails['Instances'] or {}) do
-      local instanceTags = ParseJson(RestApiGet('/instances/' .. instance .. '/tags'))
-      if instanceTags and instanceTags['0020,4000'] then
-        local imageComments = instanceTags['0020,4000']['Value']
-        for model, model_info in pairs(models) do
-          if imageComments == model then
-            print(">>> Queuing " .. model .. " study: " .. studyUID)
-            -- Append UID to a queue file for external processing
-            local f = io.open("/tmp/" .. model .. "_inference_queue.txt", "a")
-            f:write(studyUID .. "\n")
-            f:close()
-            -- Stop processing further; job queued
-            return
-          end
+  -- ImageComments is set per series, so the tags of one representative instance per series are enough
+  for _, seriesDetails in ipairs(seriesList or {}) do
+    local instances = seriesDetails['Instances'] or {}
+    if #instances > 0 then
+      local instanceTags = ParseJson(RestApiGet('/instances/' .. instances[1] .. '/simplified-tags'))
+      local model = instanceTags and instanceTags['ImageComments']
+      if model ~= nil and models[model] ~= nil then
+        print(">>> Queuing " .. model .. " study: " .. studyUID)
+        -- Spool one job file per study for the inference worker (process_queue.py), renamed into place once
+        -- complete so that the worker never reads a partial job
+        local queue_dir = os.getenv("INFERENCE_QUEUE_DIR") or "/var/lib/orthanc/db/inference-queue"
+        local job_file = queue_dir .. "/" .. model .. "-" .. studyId .. ".job"
+        local f = io.open(job_file .. ".tmp", "w")
+        if f == nil then
+          print(">>> Could not queue study " .. studyUID .. " in " .. queue_dir)
+          return
         end
+        f:write(DumpJson({model = model, study_uid = studyUID}, true))
+        f:close()
+        os.rename(job_file .. ".tmp", job_file)
+        -- Stop processing further; job queued
+        return
       end
     end
   end
@@ -19,6 +19,7 @@ sed -i "s+INGRESS_PATH+$MONAI_LABEL_INGRESS_PATH+g" /workspace/MONAILabel/plugin
 sed -i "s+INGRESS_PATH+$MONAI_LABEL_INGRESS_PATH+g" /workspace/MONAILabel/plugins/ohifv3/run.sh
 sed -i "s+INGRESS_PATH+$MONAI_LABEL_INGRESS_PATH+g" /workspace/MONAILabel/plugins/ohifv3/config/monai_label.js
 
+mkdir -p "${INFERENCE_QUEUE_DIR:-/var/lib/orthanc/db/inference-queue}"
 python /etc/process_queue.py &
 
 exec "$@" 
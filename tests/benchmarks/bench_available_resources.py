@@ -0,0 +1,100 @@
+"""
+Benchmark of the per-node resource accounting in ``MAIA.kubernetes_utils.get_available_resources``.
+
+Synthetic node and pod lists are generated in memory and served in place of the cluster API, so the benchmark only
+measures the accounting itself. The single-pass pod indexing is compared against the previous approach, which
+re-scanned the whole pod list for every node.
+
+Usage:
+    python tests/benchmarks/bench_available_resources.py [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from unittest.mock import patch
+
+from MAIA import kubernetes_utils
+from MAIA.kubernetes_utils import get_available_resources, get_pod_resource_requests
+
+API_URL = "https://api.bench"
+CLUSTER_NAMES = {API_URL: "bench"}
+SIZES = [(10, 500), (20, 1500), (40, 3000), (80, 6000)]
+
+
+def make_cluster(n_nodes: int, n_pods: int) -> tuple[dict, dict]:
+    nodes = {
+        "items": [
+            {
+                "metadata": {"name": f"node-{i}", "labels": {"nvidia.com/gpu.product": "A100", "nvidia.com/gpu.memory": "40960"}},
+                "spec": {},
+                "status": {
+                    "conditions": [{"type": "Ready", "status": "True"}],
+                    "allocatable": {"cpu": "64", "memory": "527939880Ki", "nvidia.com/gpu": "8"},
+                },
+            }
+            for i in range(n_nodes)
+        ]
+    }
+    pods = {
+        "items": [
+            {
+                "metadata": {"name": f"pod-{j}", "namespace": "bench", "annotations": {}},
+                "spec": {
+                    "nodeName": f"node-{j % n_nodes}",
+                    "containers": [
+                        {"resources": {"requests": {"cpu": "250m", "memory": "512Mi"}}},
+                        {"resources": {"limits": {"cpu": "1", "memory": "1Gi"}}},
+                    ],
+                },
+                "status": {"phase": "Running"},
+            }
+            for j in range(n_pods)
+        ]
+    }
+    return nodes, pods
+
+
+def per_node_rescan(nodes: dict, pods: dict) -> dict:
+    """Reference O(nodes x pods) accounting, re-scanning every pod for each node."""
+    requested = {}
+    for node in nodes["items"]:
+        node_name = node["metadata"]["name"]
+        totals = [0, 0.0, 0.0]
+        for pod in pods["items"]:
+            if pod["spec"].get("nodeName") != node_name or pod["status"].get("phase") != "Running":
+                continue
+            for i, value in enumerate(get_pod_resource_requests(pod)):
+                totals[i] += value
+        requested[node_name] = totals
+    return requested
+
+
+def timeit(repeat: int, fn, *args) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'nodes':>6} {'pods':>6} {'rescan [ms]':>12} {'single-pass [ms]':>17} {'speed-up':>9}")
+    for n_nodes, n_pods in SIZES:
+        nodes, pods = make_cluster(n_nodes, n_pods)
+        responses = {(API_URL, "/api/v1/nodes"): nodes, (API_URL, "/api/v1/pods"): pods}
+
+        with patch.object(kubernetes_utils, "fetch_from_clusters", return_value=responses):
+            single_pass = timeit(args.repeat, get_available_resources, "token", [API_URL], CLUSTER_NAMES)
+        rescan = timeit(args.repeat, per_node_rescan, nodes, pods)
+        print(f"{n_nodes:>6} {n_pods:>6} {rescan * 1000:>12.1f} {single_pass * 1000:>17.1f} {rescan / single_pass:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Import-time budget of the MAIA command-line scripts and of the dashboard.
+
+Each target is started in a fresh interpreter with ``python -X importtime`` and the cumulative time of its top-level
+imports is compared against a budget, so that a heavy dependency imported at module level (Helm, Hydra, MinIO, NLTK,
+matplotlib, ...) instead of where it is used shows up as a regression. The dashboard cold start imports the WSGI
+application and the URL configuration, i.e. every view, with placeholder settings and a throw-away SQLite database.
+
+The best of ``--repeat`` runs is reported. The script exits with a non-zero status when a target exceeds its budget;
+``--budget-scale`` loosens (or tightens) all the budgets for slower (or faster) machines.
+
+Usage:
+    python tests/benchmarks/bench_import_time.py [--repeat 3] [--budget-scale 1.0]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DASHBOARD_DIR = REPO_ROOT / "MAIA" / "dashboard"
+
+# (name, python arguments, working directory, budget in ms)
+TARGETS = [
+    ("MAIA_deploy_helm_chart --help", ["-m", "MAIA_scripts.MAIA_deploy_helm_chart", "--help"], REPO_ROOT, 250),
+    ("MAIA_install_project_toolkit --help", ["-m", "MAIA_scripts.MAIA_install_project_toolkit", "--help"], REPO_ROOT, 700),
+    ("MAIA_build_images --help", ["-m", "MAIA_scripts.MAIA_build_images", "--help"], REPO_ROOT, 700),
+    ("dashboard cold start", ["-c", "import core.wsgi, core.urls"], DASHBOARD_DIR, 1300),
+]
+
+
+def parse_importtime(stderr: str) -> float:
+    """Return the cumulative import time, in ms, of the top-level imports reported by ``-X importtime``."""
+    total_us = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # Nested imports are indented below their importer, and already counted in its cumulative time
+        if not name[1:].startswith(" "):
+            total_us += int(cumulative)
+    return total_us / 1000
+
+
+def measure(args: list, cwd: Path, env: dict) -> float:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args], cwd=cwd, env=env, capture_output=True, text=True, check=False
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return parse_importtime(result.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget-scale", type=float, default=1.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as local_db_path:
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(filter(None, [str(REPO_ROOT), os.environ.get("PYTHONPATH")])),
+            # Placeholder dashboard settings
+            "DEBUG": "True",
+            "MINIO_URL": "localhost:9000",
+            "BUCKET_NAME": "maia",
+            "LOCAL_DB_PATH": local_db_path,
+        }
+        over_budget = []
+        print(f"{'target':<38} {'import [ms]':>12} {'budget [ms]':>12}")
+        for name, target_args, cwd, budget in TARGETS:
+            budget *= args.budget_scale
+            try:
+                elapsed = min(measure(target_args, cwd, env) for _ in range(args.repeat))
+            except RuntimeError as e:
+                print(f"{name:<38} {'error':>12} {budget:>12.0f}  {e}")
+                over_budget.append(name)
+                continue
+            flag = "" if elapsed <= budget else "  over budget"
+            if flag:
+                over_budget.append(name)
+            print(f"{name:<38} {elapsed:>12.1f} {budget:>12.0f}{flag}")
+
+    if over_budget:
+        sys.exit(f"Over the import-time budget: {', '.join(over_budget)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark of the MongoDB query sets of the dashboard (``apps.mongodb_models``).
+
+Users and projects are generated in an in-memory MongoDB (mongomock), so the benchmark measures the query-set layer
+rather than the network. The admin-page patterns (count, existence check, first user, projected values, membership
+lookup) are compared against materializing every matching document into model instances, which is what the query
+sets did before. mongomock copies the whole collection on every ``find``, so the gains of a limit or a projection
+(``first``, ``values``) are much smaller here than against a MongoDB server, which stops at the first document and
+only sends the projected fields.
+
+Usage:
+    python tests/benchmarks/bench_mongodb_querysets.py [--users 10000] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import mongomock
+from django.conf import settings
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "MAIA" / "dashboard"))
+settings.configure(MONGO_DB=mongomock.MongoClient()["maia_bench"])
+
+from apps.mongodb_models import (
+    MAIAProject,
+    MAIAUser,
+    get_collection,
+    get_projects_collection,
+)
+
+N_PROJECTS = 200
+
+
+def populate(n_users: int) -> None:
+    # The documents are inserted before the collections (and their unique indexes) are set up: mongomock checks the
+    # unique indexes of every insert against the whole collection.
+    settings.MONGO_DB["maia_users"].insert_many(
+        [
+            MAIAUser(
+                email=f"user{i}@example.com",
+                username=f"user{i}",
+                namespace=f"project-{i % N_PROJECTS},project-{(i * 7) % N_PROJECTS}",
+            )._to_doc()
+            for i in range(n_users)
+        ]
+    )
+    settings.MONGO_DB["maia_projects"].insert_many(
+        [MAIAProject(namespace=f"project-{j}", email=f"admin{j}@example.com")._to_doc() for j in range(N_PROJECTS)]
+    )
+    get_collection()
+    get_projects_collection()
+
+
+def materialized(qs) -> list:
+    """Reference behaviour: every matching document is turned into a model instance."""
+    return list(qs.all())
+
+
+def legacy_group_members(namespace: str) -> list:
+    return [u.email for u in materialized(MAIAUser.objects.all()) if namespace in u.namespace.split(",")]
+
+
+CASES = [
+    ("count", lambda: len(materialized(MAIAUser.objects.all())), lambda: MAIAUser.objects.count()),
+    ("exists", lambda: bool(materialized(MAIAUser.objects.all())), lambda: MAIAUser.objects.exists()),
+    ("first", lambda: materialized(MAIAUser.objects.all())[0], lambda: MAIAUser.objects.first()),
+    (
+        "values(email)",
+        lambda: [{"email": u.email} for u in materialized(MAIAUser.objects.all())],
+        lambda: MAIAUser.objects.values("email"),
+    ),
+    (
+        "group members",
+        lambda: legacy_group_members("project-7"),
+        lambda: [u.email for u in MAIAUser.objects.filter(namespaces__contains="project-7")],
+    ),
+    ("project count", lambda: len(materialized(MAIAProject.objects.all())), lambda: MAIAProject.objects.count()),
+]
+
+
+def timeit(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    populate(args.users)
+    print(f"{args.users} users, {N_PROJECTS} projects")
+    print(f"{'operation':>14} {'materialized [ms]':>18} {'query set [ms]':>15} {'speed-up':>9}")
+    for name, reference, current in CASES:
+        before = timeit(args.repeat, reference)
+        after = timeit(args.repeat, current)
+        print(f"{name:>14} {before * 1000:>18.1f} {after * 1000:>15.1f} {before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
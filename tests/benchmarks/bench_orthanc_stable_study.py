@@ -0,0 +1,158 @@
+"""
+Benchmark of the ``OnStableStudy`` hook in ``docker/MAIA-Orthanc/send_to_remote.lua``.
+
+The hook is run in an embedded Lua interpreter (``pip install lupa``), against an in-memory stand-in for the
+Orthanc REST API serving a synthetic study: ``n_series - 1`` untagged series followed by one series whose
+ImageComments names a model. Each internal REST call is counted and charged ``--rest-latency-ms``, as reading the
+tags of an instance from the storage area dominates the cost of the hook in Orthanc. The series-level matching is
+compared against the previous hook, which re-read the models file and fetched the tags of every instance.
+
+Usage:
+    python tests/benchmarks/bench_orthanc_stable_study.py [--repeat 3] [--rest-latency-ms 0.5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+HOOK = Path(__file__).resolve().parents[2] / "docker" / "MAIA-Orthanc" / "send_to_remote.lua"
+MODEL = "MSP-Spleen"
+SIZES = [(2, 200), (4, 500), (4, 2000), (8, 2000)]
+
+PREVIOUS_HOOK = """
+function OnStableStudy(studyId, tags, metadata)
+
+  local models_file = io.open(os.getenv("MODELS_FILE"), "r")
+  local models_json = models_file:read("*a")
+  models_file:close()
+  local models = ParseJson(models_json)
+  local study = ParseJson(RestApiGet('/studies/' .. studyId))
+  local studyUID = study['MainDicomTags']['StudyInstanceUID']
+
+  for _, series in ipairs(study['Series'] or {}) do
+    local seriesDetails = ParseJson(RestApiGet('/series/' .. series))
+    local modality = seriesDetails['MainDicomTags']['Modality']
+    local description = seriesDetails['MainDicomTags']['SeriesDescription']
+    if modality == "SEG" and description == "MAIA-Segmentation-Portal" then
+      return
+    end
+  end
+
+  for _, series in ipairs(study['Series'] or {}) do
+    local seriesDetails = ParseJson(RestApiGet('/series/' .. series))
+    for _, instance in ipairs(seriesDetails['Instances'] or {}) do
+      local instanceTags = ParseJson(RestApiGet('/instances/' .. instance .. '/tags'))
+      if instanceTags and instanceTags['0020,4000'] then
+        local imageComments = instanceTags['0020,4000']['Value']
+        for model, model_info in pairs(models) do
+          if imageComments == model then
+            local queue_dir = os.getenv("INFERENCE_QUEUE_DIR")
+            local job_file = queue_dir .. "/" .. model .. "-" .. studyId .. ".job"
+            local f = io.open(job_file .. ".tmp", "w")
+            f:write(DumpJson({model = model, study_uid = studyUID}, true))
+            f:close()
+            os.rename(job_file .. ".tmp", job_file)
+            return
+          end
+        end
+      end
+    end
+  end
+end
+"""
+
+
+class FakeOrthanc:
+    """Orthanc REST API serving one study, as pre-parsed Lua tables (``ParseJson`` only parses the models file)."""
+
+    def __init__(self, n_series: int, n_instances: int):
+        self.calls = 0
+        series = [
+            {
+                "ID": f"series-{i}",
+                "MainDicomTags": {"Modality": "CT", "SeriesDescription": f"series {i}"},
+                "Instances": [f"instance-{i}-{j}" for j in range(n_instances)],
+            }
+            for i in range(n_series)
+        ]
+        self.responses = {
+            "/studies/study": {"MainDicomTags": {"StudyInstanceUID": "1.2.3"}, "Series": [s["ID"] for s in series]},
+            "/studies/study/series": series,
+        }
+        for i, s in enumerate(series):
+            comment = MODEL if i == n_series - 1 else "CT"
+            self.responses[f"/series/{s['ID']}"] = s
+            for instance in s["Instances"]:
+                self.responses[f"/instances/{instance}/tags"] = {"0020,4000": {"Value": comment}}
+                self.responses[f"/instances/{instance}/simplified-tags"] = {"ImageComments": comment}
+
+    def load_hook(self, source: str):
+        """Load the hook in a new Lua interpreter wired to this API and return ``OnStableStudy``."""
+        from lupa import LuaRuntime
+
+        lua = LuaRuntime(unpack_returned_tuples=True)
+        tables = {uri: lua.table_from(response, recursive=True) for uri, response in self.responses.items()}
+
+        def rest_api_get(uri):
+            self.calls += 1
+            return tables[uri]
+
+        def parse_json(value):
+            return lua.table_from(json.loads(value), recursive=True) if isinstance(value, str) else value
+
+        lua.globals().ParseJson = parse_json
+        lua.execute("function DumpJson(value, keepStrings) return '{}' end")
+        lua.execute("function print(...) end")
+        lua.globals().RestApiGet = rest_api_get
+        lua.execute(source)
+        return lua, lua.globals().OnStableStudy
+
+
+def run(source: str, n_series: int, n_instances: int, repeat: int, latency: float) -> tuple[int, float]:
+    """Return the REST calls and the best hook latency (measured time plus the charged REST latency) in seconds."""
+    orthanc = FakeOrthanc(n_series, n_instances)
+    lua, hook = orthanc.load_hook(source)
+    tags = lua.table_from({"StudyInstanceUID": "1.2.3"})
+    best = float("inf")
+    for _ in range(repeat):
+        orthanc.calls = 0
+        start = time.perf_counter()
+        hook("study", tags, None)
+        best = min(best, time.perf_counter() - start + orthanc.calls * latency)
+    return orthanc.calls, best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--rest-latency-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as queue_dir:
+        models_file = os.path.join(queue_dir, "models.json")
+        with open(models_file, "w") as f:
+            json.dump({MODEL: {"host": "http://monai-label", "label_info": {}}}, f)
+        os.environ["MODELS_FILE"] = models_file
+        os.environ["INFERENCE_QUEUE_DIR"] = queue_dir
+
+        print(
+            f"{'series':>6} {'instances':>9} {'prev calls':>10} {'calls':>6} "
+            f"{'prev [ms]':>10} {'series-level [ms]':>18} {'speed-up':>9}"
+        )
+        for n_series, n_instances in SIZES:
+            previous_calls, previous = run(PREVIOUS_HOOK, n_series, n_instances, args.repeat, args.rest_latency_ms / 1000)
+            calls, current = run(HOOK.read_text(), n_series, n_instances, args.repeat, args.rest_latency_ms / 1000)
+            assert os.path.exists(os.path.join(queue_dir, f"{MODEL}-study.job"))
+            print(
+                f"{n_series:>6} {n_instances:>9} {previous_calls:>10} {calls:>6} "
+                f"{previous * 1000:>10.1f} {current * 1000:>18.2f} {previous / current:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
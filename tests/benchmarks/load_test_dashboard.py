@@ -0,0 +1,201 @@
+"""
+Load test of the MAIA dashboard, recording the latency percentiles of its busiest endpoints.
+
+A pool of client threads replays GET requests against ``/maia/``, ``/maia/resources/`` and
+``/maia-api/gpu-schedulability/`` of a running dashboard, and the p50/p99 latencies and the throughput are reported per
+endpoint. Comparing the Django development server with the gunicorn profile (``MAIA_setup_dashboard --server
+gunicorn``) shows how a slow upstream call affects the other users.
+
+The ``stub`` command serves a local stand-in for the cluster API servers and Keycloak, answering every request after a
+configurable delay, so that the dashboard can be load-tested without a cluster. It prints the cluster configuration to
+drop in the dashboard config folder (``MOUNT_DIR``), as a private cluster authenticated with a static token.
+
+Usage:
+    python tests/benchmarks/load_test_dashboard.py stub [--port 6443] [--latency 0.2] [--nodes 20] [--pods 1500]
+    python tests/benchmarks/load_test_dashboard.py run [--url http://127.0.0.1:8000] [--concurrency 32]
+        [--requests 300] [--cookie sessionid=...]
+
+The pages behind the login need the session cookie of a logged-in user (``--cookie``); without it they are answered
+with a redirect to the login page, which is counted but does not reach the cluster API.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import yaml
+
+ENDPOINTS = ["/maia/", "/maia/resources/", "/maia-api/gpu-schedulability/"]
+STUB_TOKEN = "load-test-token"
+
+
+def make_cluster(n_nodes: int, n_pods: int, n_namespaces: int = 50) -> dict:
+    """Synthetic API server answers, keyed by path."""
+    nodes = [
+        {
+            "metadata": {"name": f"node-{i}", "labels": {"nvidia.com/gpu.product": "A100", "nvidia.com/gpu.memory": "40960"}},
+            "spec": {},
+            "status": {
+                "conditions": [{"type": "Ready", "status": "True"}],
+                "allocatable": {"cpu": "64", "memory": "527939880Ki", "nvidia.com/gpu": "8"},
+            },
+        }
+        for i in range(n_nodes)
+    ]
+    pods = [
+        {
+            "metadata": {"name": f"pod-{j}", "namespace": f"project-{j % n_namespaces}", "annotations": {}},
+            "spec": {"nodeName": f"node-{j % n_nodes}", "containers": [{"resources": {"requests": {"cpu": "250m"}}}]},
+            "status": {"phase": "Running"},
+        }
+        for j in range(n_pods)
+    ]
+    namespaces = [{"metadata": {"name": f"project-{k}"}, "status": {"phase": "Active"}} for k in range(n_namespaces)]
+    return {
+        "/api/v1/nodes": {"items": nodes},
+        "/api/v1/pods": {"items": pods},
+        "/api/v1/namespaces": {"items": namespaces},
+    }
+
+
+def serve_stub(port: int, latency: float, responses: dict) -> ThreadingHTTPServer:
+    """Serve the stub API server and Keycloak on ``port``, answering every request after ``latency`` seconds."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _answer(self):
+            time.sleep(latency)
+            path = self.path.split("?")[0]
+            if path.endswith("/protocol/openid-connect/token"):
+                body = {"access_token": STUB_TOKEN, "expires_in": 300, "refresh_expires_in": 1800, "token_type": "Bearer"}
+            elif path.startswith("/admin/"):
+                body = []
+            else:
+                body = responses.get(path.rstrip("/"), {"items": []})
+            payload = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        do_GET = do_POST = do_PUT = do_DELETE = _answer
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile of ``values``."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def timed_get(url: str, cookie: str | None, body: bytes | None, timeout: float) -> tuple[float, int]:
+    """GET ``url`` and return its latency in seconds and its status code (0 on connection errors)."""
+    request = urllib.request.Request(url, data=body, method="GET")
+    if cookie:
+        request.add_header("Cookie", cookie)
+    if body is not None:
+        request.add_header("Content-Type", "application/json")
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, OSError):
+        status = 0
+    return time.perf_counter() - start, status
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def run_load(url: str, concurrency: int, n_requests: int, cookie: str | None, gpu: str, timeout: float) -> dict:
+    """Replay the endpoints with ``concurrency`` client threads and return the latencies and statuses per endpoint."""
+    # Count the login redirects instead of following them, so that they are not mistaken for served pages.
+    urllib.request.install_opener(urllib.request.build_opener(_NoRedirect))
+    booking = json.dumps(
+        {"booking": {"starting_time": "2030-01-01T00:00:00Z", "ending_time": "2030-01-02T00:00:00Z", "gpu": gpu}}
+    ).encode()
+    jobs = [ENDPOINTS[i % len(ENDPOINTS)] for i in range(n_requests)]
+    results = {endpoint: [] for endpoint in ENDPOINTS}
+
+    def call(endpoint):
+        body = booking if endpoint.startswith("/maia-api/") else None
+        results[endpoint].append(timed_get(url.rstrip("/") + endpoint, cookie, body, timeout))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(call, jobs))
+    return {"elapsed": time.perf_counter() - start, "results": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    stub = subparsers.add_parser("stub", help="Serve the stub cluster API and Keycloak backend")
+    stub.add_argument("--port", type=int, default=6443)
+    stub.add_argument("--latency", type=float, default=0.2, help="Delay of every answer, in seconds")
+    stub.add_argument("--nodes", type=int, default=20)
+    stub.add_argument("--pods", type=int, default=1500)
+
+    run = subparsers.add_parser("run", help="Load-test a running dashboard")
+    run.add_argument("--url", default="http://127.0.0.1:8000")
+    run.add_argument("--concurrency", type=int, default=32)
+    run.add_argument("--requests", type=int, default=300)
+    run.add_argument("--cookie", default=None, help="Session cookie of a logged-in user, e.g. sessionid=...")
+    run.add_argument("--gpu", default="NO", help="GPU name of the schedulability queries (one of GPU_SPECS)")
+    run.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    if args.command == "stub":
+        server = serve_stub(args.port, args.latency, make_cluster(args.nodes, args.pods))
+        api = f"http://127.0.0.1:{args.port}"
+        print("Cluster configuration for the dashboard config folder:\n")
+        print(
+            yaml.dump(
+                {"cluster_name": "load-test", "api": api, "maia_dashboard": {"enabled": True, "token": STUB_TOKEN}},
+                sort_keys=False,
+            )
+        )
+        print(f"Keycloak stand-in: OIDC_SERVER_URL={api}")
+        print(f"Serving on {api} with {args.latency * 1000:.0f} ms latency, press Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    load = run_load(args.url, args.concurrency, args.requests, args.cookie, args.gpu, args.timeout)
+    print(f"{args.requests} requests, {args.concurrency} clients, {load['elapsed']:.1f} s")
+    print(f"{'endpoint':<32} {'requests':>9} {'non-2xx':>8} {'p50 [ms]':>9} {'p99 [ms]':>9} {'req/s':>7}")
+    for endpoint, results in load["results"].items():
+        latencies = [latency for latency, _ in results]
+        errors = sum(1 for _, status in results if not 200 <= status < 300)
+        print(
+            f"{endpoint:<32} {len(results):>9} {errors:>8} {percentile(latencies, 50) * 1000:>9.1f} "
+            f"{percentile(latencies, 99) * 1000:>9.1f} {len(results) / load['elapsed']:>7.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()